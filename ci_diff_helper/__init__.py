@@ -119,6 +119,12 @@ commit is currently being built:
   >>> config.is_merge
   False
 
+To share the resolved values with worker processes, ``config.snapshot()``
+returns a small JSON (and pickle) friendly :class:`dict` and
+``CircleCI.from_snapshot(snapshot)`` restores a configuration that
+answers from it without touching ``git``, the environment or the
+network.
+
 ``git`` tools
 ~~~~~~~~~~~~~
 
@@ -128,7 +134,8 @@ The helpers :func:`~git_tools.git_root`,
 tools for a ``git``-based project.
 
 The most relevant of these for finding diffs is
-:func:`~git_tools.get_changed_files`. For example, to find
+:func:`~git_tools.get_changed_files` (or its streaming counterpart
+:func:`~git_tools.iter_changed_files`). For example, to find
 changed files between a current checkout and an upstream
 branch:
 
@@ -162,6 +169,37 @@ branch:
   ['/path/to/your/git_checkout/project/_supporting.py',
    '/path/to/your/git_checkout/README.md']
 
+When the kind of change matters (e.g. to avoid linting deleted
+files), :func:`~git_tools.get_changes` describes each changed file
+with a :class:`~git_tools.FileChange`, which holds the status, the
+paths before and after a rename, the file modes and the blob SHAs.
+
+For very large checkouts, :func:`~git_tools.get_checked_in_files`
+and :func:`~git_tools.get_changed_files` can return a compact
+:class:`~paths.PathTable` (via ``as_table=True``) rather than a
+:class:`list` of strings. To check which directories (e.g. which
+projects in a monorepo) contain changes, build a
+:class:`~paths.ChangeIndex` from the changed files.
+
+To decide which jobs to run from a list of changed files, a
+:class:`~rules.RuleSet` evaluates many ``.gitignore``-style rules
+against every changed file in a single pass.
+
+In a shallow clone, the diffbase may not be in the local history.
+:func:`~providers.changed_files` falls back to the GitHub API in that
+case and reports whether the list of files it got is complete.
+
+Since the files changed between two commits never change,
+:mod:`~ci_diff_helper.change_cache` can store them (in a local
+directory or a shared HTTP store) so re-runs and other jobs on the
+same commits skip the diff. When many steps of a job need these
+answers, :mod:`~ci_diff_helper.daemon` keeps them warm in a single
+long-running process and serves them over a Unix socket.
+
+On Python 3, :mod:`~ci_diff_helper.aio` has non-blocking versions of
+the ``git`` and GitHub lookups (e.g. ``await config.async_base()``),
+so many of them can run concurrently in a single event loop.
+
 In addition, being able to get the
 root of the current ``git`` checkout may be needed to collect
 files, execute scripts, etc. Getting all checked in files can
@@ -208,8 +246,10 @@ be useful for things like test collection, file linting, etc.
 from ci_diff_helper.appveyor import AppVeyor
 from ci_diff_helper.circle_ci import CircleCI
 from ci_diff_helper.git_tools import get_changed_files
+from ci_diff_helper.git_tools import get_changes
 from ci_diff_helper.git_tools import get_checked_in_files
 from ci_diff_helper.git_tools import git_root
+from ci_diff_helper.git_tools import iter_changed_files
 from ci_diff_helper.travis import Travis
 
 
@@ -217,9 +257,11 @@ __all__ = [
     'AppVeyor',
     'CircleCI',
     'get_changed_files',
+    'get_changes',
     'get_checked_in_files',
     'get_config',
     'git_root',
+    'iter_changed_files',
     'Travis',
 ]
 
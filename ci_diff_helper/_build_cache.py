@@ -0,0 +1,319 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""On-disk cache of values resolved during a single build.
+
+A CI job typically runs many steps (lint, unit tests, docs, ...), each
+a new process. Values such as the ``base`` of the build are the same
+for every step, so the first step to need one computes it and stores
+it here, keyed by a fingerprint of the CI environment variables and
+the HEAD commit (see :func:`fingerprint`).
+
+Every value is computed while holding an exclusive file lock for its
+key, so concurrent steps compute it only once: the others wait and
+then read the stored value. Entries are written atomically. Expired
+entries, and the oldest entries once the cache grows past a number of
+entries or a total size, are evicted.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import six
+
+from ci_diff_helper import _utils
+from ci_diff_helper import environment_vars as env
+
+
+_ENTRY_SUFFIX = '.json'
+_LOCK_SUFFIX = '.lock'
+_FILE_MODE = 0o600
+_MAX_ENTRIES = 256
+_MAX_BYTES = 16 * 1024 * 1024
+_ENV_PREFIXES = ('APPVEYOR', 'CIRCLE', 'CI_PULL_REQUEST', 'TRAVIS')
+# Set by the CI system part way through a build, so not the same for
+# every step.
+_VOLATILE_ENV_VARS = frozenset(['TRAVIS_TEST_RESULT'])
+_MISSING = object()  # Sentinel for a value that is not cached.
+_BUILD_CACHE = _utils.UNSET
+
+
+def ci_environ(environ=None):
+    """Select the environment variables that describe the current build.
+
+    These are every ``TRAVIS_*``, ``CIRCLE_*`` and ``APPVEYOR_*``
+    environment variable (along with ``CI_PULL_REQUEST``\\*), except
+    those set part way through a build.
+
+    Args:
+        environ (Optional[Mapping[str, str]]): The environment. Defaults
+            to :data:`os.environ`.
+
+    Returns:
+        dict: The selected environment variables.
+    """
+    if environ is None:
+        environ = os.environ
+    return dict(
+        (name, value) for name, value in six.iteritems(environ)
+        if name.startswith(_ENV_PREFIXES) and name not in _VOLATILE_ENV_VARS)
+
+
+def fingerprint(head_sha, environ=None):
+    """Compute a key identifying the current build.
+
+    Uses the environment variables selected by :func:`ci_environ` and
+    the SHA of the HEAD commit.
+
+    Args:
+        head_sha (str): The SHA of the HEAD commit.
+        environ (Optional[Mapping[str, str]]): The environment. Defaults
+            to :data:`os.environ`.
+
+    Returns:
+        str: The fingerprint (a hex digest).
+    """
+    hasher = hashlib.sha256(head_sha.encode('utf-8'))
+    for name, value in sorted(six.iteritems(ci_environ(environ))):
+        hasher.update(b'\0')
+        hasher.update(name.encode('utf-8'))
+        hasher.update(b'=')
+        hasher.update(value.encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def _is_same_file(file_desc, path):
+    """Check if an open file is (still) the file at a path.
+
+    Args:
+        file_desc (int): An open file descriptor.
+        path (str): The path of the file.
+
+    Returns:
+        bool: Indicates if ``path`` exists and is the open file.
+    """
+    try:
+        path_stat = os.stat(path)
+    except OSError:
+        return False
+    file_stat = os.fstat(file_desc)
+    return (path_stat.st_dev, path_stat.st_ino) == (
+        file_stat.st_dev, file_stat.st_ino)
+
+
+def _remove_lock(path):
+    """Remove a lock file, unless it is in use.
+
+    The lock file is only removed while holding its lock, so that a
+    process waiting for it notices (see :func:`_is_same_file`) and
+    starts over with a new lock file.
+
+    Args:
+        path (str): The path of the lock file.
+    """
+    try:
+        file_desc = os.open(path, os.O_RDWR)
+    except OSError:
+        return
+    try:
+        if _utils.try_lock(file_desc):
+            os.remove(path)
+    except OSError:  # pragma: NO COVER
+        pass
+    finally:
+        os.close(file_desc)
+
+
+class BuildCache(object):
+    """A size-bounded, on-disk cache of values for the current build.
+
+    Args:
+        directory (str): The directory holding the cache. Created if
+            it doesn't exist.
+        ttl (Optional[float]): The number of seconds for which a value
+            is used. If not provided, values are used until evicted.
+        max_entries (Optional[int]): The maximum number of values to
+            keep.
+        max_bytes (Optional[int]): The maximum total size (in bytes) of
+            the stored values.
+    """
+
+    def __init__(self, directory, ttl=None, max_entries=_MAX_ENTRIES,
+                 max_bytes=_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        """Get the path (without a suffix) of the files for a key.
+
+        Args:
+            key (str): The key of the value.
+
+        Returns:
+            str: The path of the entry, without a suffix.
+        """
+        key_hash = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key_hash)
+
+    def _read(self, path):
+        """Read a stored value.
+
+        Args:
+            path (str): The path of the entry.
+
+        Returns:
+            object: The value, or ``_MISSING`` if there is no (fresh)
+            value.
+        """
+        try:
+            with open(path, 'rb') as file_obj:
+                entry = json.loads(file_obj.read().decode('utf-8'))
+            stored_at = entry['stored_at']
+            value = entry['value']
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return _MISSING
+        if self.ttl is not None and time.time() - stored_at >= self.ttl:
+            return _MISSING
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Look up a value, computing (and storing) it if needed.
+
+        If the value is missing, it is computed while holding a lock
+        for the key, so that other processes wait for it rather than
+        computing it again. If ``compute`` fails, nothing is stored.
+
+        Args:
+            key (str): The key of the value.
+            compute (Callable[[], object]): Computes the value. The
+                value must be JSON serializable (and tuples come back
+                as lists).
+
+        Returns:
+            object: The value.
+        """
+        path = self._path(key)
+        value = self._read(path + _ENTRY_SUFFIX)
+        if value is not _MISSING:
+            return value
+
+        while True:
+            file_desc = os.open(
+                path + _LOCK_SUFFIX, os.O_RDWR | os.O_CREAT, _FILE_MODE)
+            try:
+                with _utils.locked(file_desc):
+                    if not _is_same_file(file_desc, path + _LOCK_SUFFIX):
+                        # The lock file was evicted (by another process)
+                        # while we waited, so others may be using a new
+                        # one.
+                        continue
+                    # Another process may have stored it while we waited.
+                    value = self._read(path + _ENTRY_SUFFIX)
+                    if value is _MISSING:
+                        value = compute()
+                        self._write(path + _ENTRY_SUFFIX, value)
+                    return value
+            finally:
+                os.close(file_desc)
+
+    def _write(self, path, value):
+        """Store a value and evict old entries if needed.
+
+        Args:
+            path (str): The path of the entry.
+            value (object): The value.
+        """
+        entry = {'stored_at': time.time(), 'value': value}
+        _utils.atomic_write(
+            path, json.dumps(entry, sort_keys=True).encode('utf-8'))
+        self._evict()
+
+    def _evict(self):
+        """Remove expired entries and the oldest beyond the limits."""
+        now = time.time()
+        entries = []
+        total_bytes = 0
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(_ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat_result = os.stat(path)
+            except OSError:  # pragma: NO COVER
+                continue
+            entries.append((stat_result.st_mtime, path, stat_result.st_size))
+            total_bytes += stat_result.st_size
+
+        entries.sort()
+        num_entries = len(entries)
+        for mtime, path, size in entries:
+            expired = self.ttl is not None and now - mtime >= self.ttl
+            if (not expired and num_entries <= self.max_entries and
+                    total_bytes <= self.max_bytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:  # pragma: NO COVER
+                pass
+            _remove_lock(path[:-len(_ENTRY_SUFFIX)] + _LOCK_SUFFIX)
+            num_entries -= 1
+            total_bytes -= size
+
+
+def get_build_cache():
+    """Get the cache used for values resolved during the build.
+
+    If no cache has been set (via :func:`set_build_cache`), one is
+    created if the ``CI_DIFF_HELPER_BUILD_CACHE_DIR`` environment
+    variable (:data:`~.environment_vars.BUILD_CACHE_DIR`) is set.
+
+    Returns:
+        Optional[BuildCache]: The current cache, if caching is
+        enabled.
+
+    Raises:
+        ValueError: If the TTL environment variable is not a number.
+    """
+    global _BUILD_CACHE  # pylint: disable=global-statement
+    if _BUILD_CACHE is _utils.UNSET:
+        directory = os.getenv(env.BUILD_CACHE_DIR)
+        if directory is None:
+            _BUILD_CACHE = None
+        else:
+            ttl = os.getenv(env.BUILD_CACHE_TTL)
+            if ttl is not None:
+                ttl = float(ttl)
+            _BUILD_CACHE = BuildCache(directory, ttl=ttl)
+    return _BUILD_CACHE
+
+
+def set_build_cache(cache):
+    """Set the cache used for values resolved during the build.
+
+    Args:
+        cache (Optional[BuildCache]): The new cache. If :data:`None`,
+            caching is disabled.
+
+    Returns:
+        Optional[BuildCache]: The previous cache (if any).
+    """
+    global _BUILD_CACHE  # pylint: disable=global-statement
+    previous, _BUILD_CACHE = _BUILD_CACHE, cache
+    if previous is _utils.UNSET:
+        previous = None
+    return previous
@@ -13,13 +13,20 @@
 """Base for configuration classes and associated helpers."""
 
 import os
+import threading
 
+from six.moves import queue
+
+from ci_diff_helper import _build_cache
 from ci_diff_helper import _utils
+from ci_diff_helper import change_cache
 from ci_diff_helper import git_tools
 
 
 _BRANCH_ERR_TEMPLATE = (
     'Build does not have an associated branch set (via {}).')
+_PREFETCH_WORKERS = 4
+_SNAPSHOT_VERSION = 1
 
 
 def _in_ci(env_var):
@@ -29,11 +36,14 @@ def _in_ci(env_var):
     insensitive).
 
     Args:
-        env_var (str): The environment variable which holds the status.
+        env_var (Optional[str]): The environment variable which holds the
+            status (if the CI system has one).
 
     Returns:
         bool: Flag indicating if we are running in the target CI system.
     """
+    if env_var is None:
+        return False
     return os.getenv(env_var, '').lower() == 'true'
 
 
@@ -58,56 +68,692 @@ def _ci_branch(env_var):
         raise OSError(exc, msg)
 
 
+class LazyProperty(property):
+    """A property computed at most once per instance.
+
+    The value is stored in a (slot) attribute of the instance, which
+    holds :data:`~._utils.UNSET` until the property is first accessed.
+    Access is thread-safe: the first caller computes the value while
+    any others wait for it (rather than computing it again). If the
+    computation fails, nothing is stored and the next caller retries.
+
+    Values which are not JSON serializable (e.g. an :class:`enum.Enum`)
+    need an ``encode`` and ``decode`` function, so that they can be
+    stored in a :meth:`~Config.snapshot` or the :mod:`~._build_cache`.
+    :data:`None` is never passed to either function.
+
+    Args:
+        func (Callable[[Config], object]): Computes the value.
+        storage (str): The attribute holding the value.
+        depends (Optional[Tuple[str, ...]]): The (lazy) properties the
+            value is computed from. Invalidating one of them also
+            invalidates this property.
+        persist (Optional[bool]): Indicates if the value should also be
+            shared with later steps of the build via the
+            :mod:`~._build_cache` (if one is configured).
+        encode (Optional[Callable[[object], object]]): Converts the
+            value into a JSON serializable one.
+        decode (Optional[Callable[[object], object]]): Converts the
+            output of ``encode`` back into the value.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, func, storage, depends=(), persist=False,
+                 encode=None, decode=None):
+        self.func = func
+        self.name = func.__name__
+        self.storage = storage
+        self.depends = tuple(depends)
+        self.persist = persist
+        self._encode = encode
+        self._decode = decode
+        super(LazyProperty, self).__init__(self._get)
+        self.__doc__ = func.__doc__
+    # pylint: enable=too-many-arguments
+
+    def encode(self, value):
+        """Convert a value into a JSON serializable one.
+
+        Args:
+            value (object): The value.
+
+        Returns:
+            object: The encoded value.
+        """
+        if value is None or self._encode is None:
+            return value
+        return self._encode(value)
+
+    def decode(self, value):
+        """Convert an encoded value back into the value.
+
+        Args:
+            value (object): The encoded value.
+
+        Returns:
+            object: The value.
+        """
+        if value is None or self._decode is None:
+            return value
+        return self._decode(value)
+
+    def _get(self, instance):
+        """Get (and compute if needed) the value for an instance.
+
+        Args:
+            instance (Config): The instance.
+
+        Returns:
+            object: The value.
+
+        Raises:
+            ValueError: If the instance was restored from a snapshot
+                which doesn't have the value.
+        """
+        value = getattr(instance, self.storage)
+        if value is not _utils.UNSET:
+            return value
+        return self._store(instance, lambda: self.func(instance))
+
+    def _store(self, instance, compute):
+        """Store the value for an instance, unless it has one.
+
+        Args:
+            instance (Config): The instance.
+            compute (Callable[[], object]): Computes the value.
+
+        Returns:
+            object: The stored value.
+
+        Raises:
+            ValueError: If the instance was restored from a snapshot
+                which doesn't have the value.
+        """
+        # pylint: disable=protected-access
+        with instance._lock_for(self.name):
+            value = getattr(instance, self.storage)
+            if value is _utils.UNSET:
+                if instance._frozen:
+                    raise ValueError('Property not in snapshot', self.name)
+                if self.persist:
+                    value = self.decode(instance._persisted(
+                        self.name, lambda: self.encode(compute())))
+                else:
+                    value = compute()
+                setattr(instance, self.storage, value)
+        # pylint: enable=protected-access
+        return value
+
+    def resolve(self, instance, value):
+        """Store a value computed elsewhere for an instance.
+
+        The value is stored just as if it had been computed on access:
+        a value stored in the meantime wins, nothing is stored on an
+        instance restored from a snapshot and a persisted value is
+        shared with (or replaced by the one from) the build cache.
+
+        Args:
+            instance (Config): The instance.
+            value (object): The value.
+
+        Returns:
+            object: The stored value.
+
+        Raises:
+            ValueError: If the instance was restored from a snapshot
+                which doesn't have the value.
+        """
+        return self._store(instance, lambda: value)
+
+    def invalidate(self, instance):
+        """Forget the value for an instance.
+
+        Args:
+            instance (Config): The instance.
+        """
+        with instance._lock_for(self.name):  # pylint: disable=W0212
+            setattr(instance, self.storage, _utils.UNSET)
+
+
+def lazy_property(storage, depends=(), persist=False, encode=None,
+                  decode=None):
+    """Decorate a method as a :class:`LazyProperty`.
+
+    Args:
+        storage (str): The attribute holding the value.
+        depends (Optional[Tuple[str, ...]]): The (lazy) properties the
+            value is computed from.
+        persist (Optional[bool]): Indicates if the value should be
+            shared with later steps of the build.
+        encode (Optional[Callable[[object], object]]): Converts the
+            value into a JSON serializable one.
+        decode (Optional[Callable[[object], object]]): Converts the
+            output of ``encode`` back into the value.
+
+    Returns:
+        Callable[[Callable[[Config], object]], LazyProperty]: The
+        decorator.
+    """
+    def decorator(func):
+        """Wrap the method.
+
+        Args:
+            func (Callable[[Config], object]): Computes the value.
+
+        Returns:
+            LazyProperty: The property.
+        """
+        return LazyProperty(
+            func, storage, depends=depends, persist=persist,
+            encode=encode, decode=decode)
+
+    return decorator
+
+
+def _group_properties(names, closures):
+    """Group properties which depend on each other.
+
+    Args:
+        names (List[str]): The names of the properties.
+        closures (Dict[str, FrozenSet[str]]): Every (lazy) property
+            each property depends on, directly or indirectly.
+            Properties which are not present depend on nothing.
+
+    Returns:
+        List[List[str]]: The groups. Each group can be resolved
+        independently of the others (a lookup shared by two groups
+        is only computed once, see :class:`LazyProperty`).
+    """
+    groups = []
+    for name in names:
+        members = [name]
+        for group in list(groups):
+            if any(name in closures.get(member, ()) or
+                   member in closures.get(name, ()) for member in group):
+                groups.remove(group)
+                members = group + members
+        # Keep the requested order within the group.
+        members.sort(key=names.index)
+        groups.append(members)
+    return groups
+
+
+def _resolve_groups(config, work, errors):
+    """Resolve groups of properties until there is no work left.
+
+    Args:
+        config (Config): The configuration to resolve properties on.
+        work (queue.Queue): The groups of property names to resolve.
+        errors (dict): Filled with the exception raised by each
+            property that failed.
+    """
+    while True:
+        try:
+            group = work.get_nowait()
+        except queue.Empty:
+            return
+        for name in group:
+            try:
+                getattr(config, name)
+            except Exception as exc:  # pylint: disable=broad-except
+                errors[name] = exc
+
+
 class Config(object):
-    """Base class for caching CI configuration objects."""
+    """Base class for caching CI configuration objects.
+
+    Every cached property is a :class:`LazyProperty`, so a single
+    configuration object can be shared between threads.
 
-    # Default instance attributes.
-    _active = _utils.UNSET
-    _branch = _utils.UNSET
-    _is_merge = _utils.UNSET
-    _tag = _utils.UNSET
+    If the ``CI_DIFF_HELPER_BUILD_CACHE_DIR`` environment variable
+    (:data:`~.environment_vars.BUILD_CACHE_DIR`) is set, the most
+    expensive values (e.g. ``base``) are also stored on disk, so that
+    every step of a build after the first reuses them.
+
+    To hand the resolved values to another process, use
+    :meth:`snapshot` and :meth:`from_snapshot`.
+    """
+
+    __slots__ = (
+        '_active',
+        '_branch',
+        '_build_key_cached',
+        '_frozen',
+        '_head_commit_cached',
+        '_is_merge',
+        '_locks',
+        '_tag',
+    )
     # Class attributes.
     _active_env_var = None
     _branch_env_var = None
     _tag_env_var = None
 
-    @property
+    def __init__(self):
+        self._frozen = False
+        self._locks = {}
+        for prop in self._lazy_properties().values():
+            setattr(self, prop.storage, _utils.UNSET)
+
+    @classmethod
+    def _lazy_properties(cls):
+        """Get the lazy properties of the class.
+
+        Returns:
+            Dict[str, LazyProperty]: The properties, by name.
+        """
+        result = {}
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if isinstance(value, LazyProperty):
+                    result[name] = value
+        return result
+
+    @classmethod
+    def _closures(cls):
+        """Get every property each lazy property depends on.
+
+        Returns:
+            Dict[str, FrozenSet[str]]: The (direct and indirect)
+            dependencies of each lazy property, by name.
+        """
+        lazy = cls._lazy_properties()
+        closures = {}
+
+        def visit(name):
+            """Compute the dependencies of a property."""
+            if name not in closures:
+                closures[name] = frozenset()
+                prop = lazy.get(name)
+                depends = set() if prop is None else set(prop.depends)
+                for dependency in list(depends):
+                    depends |= visit(dependency)
+                closures[name] = frozenset(depends)
+            return closures[name]
+
+        for name in lazy:
+            visit(name)
+        return closures
+
+    def _lock_for(self, name):
+        """Get the lock guarding the computation of a property.
+
+        Args:
+            name (str): The name of the property.
+
+        Returns:
+            threading.Lock: The lock.
+        """
+        lock = self._locks.get(name)
+        if lock is None:
+            # NOTE: ``setdefault`` is atomic, so concurrent callers
+            #       always agree on the lock.
+            lock = self._locks.setdefault(name, threading.Lock())
+        return lock
+
+    @lazy_property('_build_key_cached')
+    def _build_key(self):
+        """Optional[str]: The key of the current build in the build cache.
+
+        This is :data:`None` if there is no build cache or the HEAD
+        commit can't be determined.
+        """
+        if _build_cache.get_build_cache() is None:
+            return None
+        head_sha = _utils.check_output(
+            'git', 'rev-parse', 'HEAD', ignore_err=True)
+        if head_sha is None:
+            return None
+        return _build_cache.fingerprint(head_sha)
+
+    def _persisted(self, name, compute):
+        """Get a value shared between the steps of the build.
+
+        Args:
+            name (str): The name of the value.
+            compute (Callable[[], object]): Computes the value if it
+                has not been stored by an earlier step.
+
+        Returns:
+            object: The value.
+        """
+        cache = _build_cache.get_build_cache()
+        if cache is None or self._frozen:
+            return compute()
+        build_key = self._build_key
+        if build_key is None:
+            return compute()
+        key = '{}:{}.{}'.format(build_key, type(self).__name__, name)
+        return cache.get_or_compute(key, compute)
+
+    def _cached_property(self, name):
+        """Get a cached property by name.
+
+        Args:
+            name (str): The name of the property.
+
+        Returns:
+            LazyProperty: The property.
+
+        Raises:
+            ValueError: If ``name`` is not a cached property.
+        """
+        prop = self._lazy_properties().get(name)
+        if prop is None:
+            raise ValueError('Not a cached property', name)
+        return prop
+
+    def _would_compute(self, name):
+        """Check if accessing a cached property would compute it.
+
+        This is not the case if the value is already stored or if the
+        configuration was restored from a snapshot (which raises
+        instead).
+
+        Args:
+            name (str): The name of the property.
+
+        Returns:
+            bool: Indicates if the value would be computed.
+
+        Raises:
+            ValueError: If ``name`` is not a cached property.
+        """
+        prop = self._cached_property(name)
+        return getattr(self, prop.storage) is _utils.UNSET and not self._frozen
+
+    def _set_resolved(self, name, value):
+        """Store the value of a cached property computed elsewhere.
+
+        Used by :mod:`~.aio`, which computes values without blocking.
+        The value is stored just as if it was computed on access (see
+        :meth:`LazyProperty.resolve`).
+
+        Args:
+            name (str): The name of the property.
+            value (object): The value.
+
+        Returns:
+            object: The stored value. This is not ``value`` if another
+            value was stored first (by another thread or an earlier
+            step of the build).
+
+        Raises:
+            ValueError: If ``name`` is not a cached property, or if the
+                configuration was restored from a snapshot which
+                doesn't have the value.
+        """
+        return self._cached_property(name).resolve(self, value)
+
+    @lazy_property('_active')
     def active(self):
         """bool: Indicates if currently running in the target CI system."""
-        if self._active is _utils.UNSET:
-            self._active = _in_ci(self._active_env_var)
-        return self._active
+        return _in_ci(self._active_env_var)
 
-    @property
+    @lazy_property('_branch')
     def branch(self):
         """bool: Indicates the current branch in the target CI system.
 
         This may indicate the active branch or the base branch of a
         pull request.
         """
-        if self._branch is _utils.UNSET:
-            self._branch = _ci_branch(self._branch_env_var)
-        return self._branch
+        return _ci_branch(self._branch_env_var)
 
-    @property
+    @lazy_property('_head_commit_cached',
+                   encode=git_tools.CommitInfo.to_record,
+                   decode=git_tools.CommitInfo.from_record)
+    def _head_commit(self):
+        """~.git_tools.CommitInfo: The metadata for the HEAD commit.
+
+        This is retrieved with a single ``git`` call and cached, so that
+        every property that needs information about HEAD can share it.
+        It is non-public, but a ``@property`` is used for the caching.
+        """
+        return git_tools.commit_info()
+
+    @lazy_property('_is_merge', depends=('_head_commit',), persist=True)
     def is_merge(self):
         """bool: Indicates if the HEAD commit is a merge commit."""
-        if self._is_merge is _utils.UNSET:
-            self._is_merge = git_tools.merge_commit()
-        return self._is_merge
+        return self._head_commit.is_merge
 
     @property
+    def base(self):
+        """str: The ``git`` object that current build is changed against.
+
+        Only CI systems with a notion of a diffbase (e.g.
+        :attr:`~.travis.Travis.base`) define this.
+
+        Raises:
+            NotImplementedError: Always, unless overridden by a subclass.
+        """
+        raise NotImplementedError(
+            'No base for the current build', type(self).__name__)
+
+    @lazy_property('_tag')
     def tag(self):
         """str: The ``git`` tag of the current CI build."""
-        if self._tag is _utils.UNSET:
-            tag_val = os.getenv(self._tag_env_var, '')
-            # NOTE: On non-tag builds in some environments (e.g. Travis)
-            #       the tag environment variable is still populated, but empty.
-            if tag_val == '':
-                self._tag = None
-            else:
-                self._tag = tag_val
-        return self._tag
+        if self._tag_env_var is None:
+            return None
+        tag_val = os.environ.get(self._tag_env_var, '')
+        # NOTE: On non-tag builds in some environments (e.g. Travis)
+        #       the tag environment variable is still populated, but empty.
+        if tag_val == '':
+            return None
+        return tag_val
+
+    def invalidate(self, *names):
+        """Forget cached property values, so they are computed again.
+
+        Every property depending on an invalidated property (e.g.
+        ``is_merge`` depends on the HEAD commit) is also invalidated.
+
+        Args:
+            names (Tuple[str, ...]): The properties to invalidate. If
+                none are given, every cached value is forgotten.
+
+        Raises:
+            ValueError: If one of ``names`` is not a cached property.
+        """
+        lazy = self._lazy_properties()
+        for name in names:
+            if name not in lazy:
+                raise ValueError('Not a cached property', name)
+        targets = set(names or lazy)
+        for name, depends in self._closures().items():
+            if depends & targets:
+                targets.add(name)
+        for name in targets:
+            lazy[name].invalidate(self)
+
+    def prefetch(self, names, max_workers=_PREFETCH_WORKERS):
+        """Resolve several properties concurrently.
+
+        Properties which don't depend on each other (e.g. ``base``, a
+        GitHub API request, and ``is_merge``, a ``git`` command) are
+        resolved in parallel on a small pool of threads, while those
+        depending on each other (e.g. ``is_merge`` and ``merged_pr``,
+        which needs to know if HEAD is a merge) are resolved one after
+        another in the same thread. The results are cached as if each
+        property was accessed, so the total time is roughly that of the
+        slowest independent lookup:
+
+        .. code-block:: python
+
+          config.prefetch(['base', 'is_merge', 'merged_pr', 'tag'])
+          config.base  # Already cached.
+
+        Args:
+            names (Iterable[str]): The names of the properties.
+            max_workers (Optional[int]): The maximum number of threads
+                to use.
+
+        Raises:
+            ValueError: If one of ``names`` is not a property.
+            Exception: The error raised by the first property (in the
+                order of ``names``) that failed, once every property
+                has been resolved.
+        """
+        unique_names = []
+        for name in names:
+            if not isinstance(getattr(type(self), name, None), property):
+                raise ValueError('Not a property', name)
+            if name not in unique_names:
+                unique_names.append(name)
+
+        work = queue.Queue()
+        groups = _group_properties(unique_names, self._closures())
+        for group in groups:
+            work.put(group)
+        errors = {}
+        threads = [
+            threading.Thread(
+                target=_resolve_groups, args=(self, work, errors))
+            for _ in range(min(max_workers, len(groups)) - 1)
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        # The current thread also does its share of the work.
+        _resolve_groups(self, work, errors)
+        for thread in threads:
+            thread.join()
+
+        for name in unique_names:
+            if name in errors:
+                raise errors[name]
+
+    def snapshot(self, names=()):
+        """Record every resolved property.
+
+        The snapshot only contains JSON serializable values (and so
+        can also be pickled), so it can be cheaply sent to a worker
+        process and restored there with :meth:`from_snapshot`:
+
+        .. code-block:: python
+
+          snapshot = config.snapshot(['base', 'is_merge'])
+          # ... in another process ...
+          config = ci_diff_helper.Travis.from_snapshot(snapshot)
+
+        Args:
+            names (Optional[Iterable[str]]): Properties to resolve (via
+                :meth:`prefetch`) before taking the snapshot. ``active``
+                is always resolved.
+
+        Returns:
+            dict: The snapshot.
+        """
+        self.prefetch(['active'] + list(names))
+        values = {}
+        for name, prop in self._lazy_properties().items():
+            value = getattr(self, prop.storage)
+            if value is not _utils.UNSET:
+                values[name] = prop.encode(value)
+        return {
+            'version': _SNAPSHOT_VERSION,
+            'type': type(self).__name__,
+            'values': values,
+        }
+
+    @classmethod
+    def _subclass_named(cls, name):
+        """Find the class (or a subclass) with a given name.
+
+        Args:
+            name (str): The name of the class.
+
+        Returns:
+            Optional[type]: The class, if there is one.
+        """
+        if cls.__name__ == name:
+            return cls
+        for subclass in cls.__subclasses__():
+            result = subclass._subclass_named(name)
+            if result is not None:
+                return result
+        return None
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Restore a configuration from a snapshot.
+
+        The restored configuration never touches ``git``, the
+        environment or the network: every property is answered from
+        the snapshot (even on a different machine). Accessing a
+        property which was not resolved when the snapshot was taken
+        raises a :exc:`ValueError`.
+
+        Args:
+            snapshot (dict): The output of :meth:`snapshot`. When called
+                on a base class (e.g. ``Config``), the snapshot can be
+                of any subclass.
+
+        Returns:
+            Config: The restored configuration.
+
+        Raises:
+            ValueError: If the snapshot has an unsupported version, is
+                for an unrelated configuration class or has an unknown
+                property.
+        """
+        if snapshot.get('version') != _SNAPSHOT_VERSION:
+            raise ValueError('Unsupported snapshot version',
+                             snapshot.get('version'))
+        klass = cls._subclass_named(snapshot['type'])
+        if klass is None:
+            raise ValueError('Snapshot does not match class',
+                             snapshot['type'], cls.__name__)
+
+        config = klass()
+        lazy = klass._lazy_properties()
+        for name, value in snapshot['values'].items():
+            prop = lazy.get(name)
+            if prop is None:
+                raise ValueError('Not a cached property', name)
+            setattr(config, prop.storage, prop.decode(value))
+        config._frozen = True  # pylint: disable=protected-access
+        return config
+
+    def get_changed_files(self, blob_name='HEAD'):
+        """Get the files changed in the current build.
+
+        Like :func:`~.git_tools.get_changed_files`, diffing against
+        the ``base`` of the build. The result is shared with later
+        steps of the build (see :mod:`~._build_cache`) and with other
+        builds of the same commits (see :mod:`~.change_cache`).
+
+        Args:
+            blob_name (Optional[str]): The ``git`` object to compare
+                against ``base``. Defaults to ``HEAD``.
+
+        Returns:
+            List[str]: List of all filenames changed.
+
+        Raises:
+            NotImplementedError: If the CI system has no ``base``.
+        """
+        return self._persisted(
+            'get_changed_files:' + blob_name,
+            lambda: change_cache.get_changed_files(blob_name, self.base))
+
+    def async_base(self):
+        """Compute the ``base`` of the current build without blocking.
+
+        Every ``git`` command and GitHub API request is made via
+        :mod:`asyncio` (see :func:`~.aio.async_base`). The result is
+        cached and shared with the ``base`` property.
+
+        .. note::
+
+            This requires Python 3.5 or later.
+
+        Returns:
+            Awaitable[str]: The ``git`` object that current build is
+            changed against.
+        """
+        from ci_diff_helper import aio
+
+        return aio.async_base(self)
 
     def __repr__(self):
         """Representation of current configuration.
@@ -0,0 +1,319 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Pure-Python reader for the ``git`` index (``.git/index``).
+
+The index is memory-mapped and entries are produced lazily, so that
+counting entries or filtering by a path prefix or suffix does not
+require decoding (or even visiting) every entry.
+
+Supports the ``DIRC`` format versions 2, 3 and 4 (including the path
+prefix compression used by version 4). Split indices (which have a
+``link`` extension) and sparse indices are not supported and raise
+:exc:`NotImplementedError`.
+"""
+
+import binascii
+import mmap
+import os
+import struct
+
+import six
+
+
+_SIGNATURE = b'DIRC'
+_HEADER = struct.Struct('>4sII')
+# ctime (s, ns), mtime (s, ns), dev, ino, mode, uid, gid, size, SHA-1
+# and flags.
+_ENTRY = struct.Struct('>10I20sH')
+_EXTENDED_FLAGS_SIZE = 2
+_SUPPORTED_VERSIONS = (2, 3, 4)
+_PREFIX_COMPRESSED_VERSION = 4
+_EXTENDED_FLAG = 0x4000
+_STAGE_MASK = 0x3000
+_STAGE_SHIFT = 12
+_SHARED_INDEX_PREFIX = 'sharedindex.'
+_EXTENSION_HEADER = struct.Struct('>4sI')
+_LINK_EXTENSION = b'link'
+_CHECKSUM_SIZE = 20
+_ENTRY_ALIGNMENT = 8
+
+
+def _read_offset_varint(data, pos):
+    """Read a big-endian "offset" varint, as used by index version 4.
+
+    Args:
+        data (bytes): The buffer to read from.
+        pos (int): The position of the first byte.
+
+    Returns:
+        Tuple[int, int]: The value and the position after it.
+    """
+    byte = six.indexbytes(data, pos)
+    pos += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = six.indexbytes(data, pos)
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, pos
+
+
+class IndexEntry(object):
+    """A single entry (i.e. a tracked file) in the ``git`` index.
+
+    Args:
+        path (str): The path of the file, relative to the root of the
+            checkout (using ``/`` as separator).
+        sha (str): The (hex) SHA-1 hash of the blob.
+        mode (int): The file mode (e.g. ``0o100644``).
+        size (int): The size of the file when it was last staged
+            (truncated to 32 bits).
+        ctime (Tuple[int, int]): The seconds and nanoseconds of the
+            last status change when the file was staged.
+        mtime (Tuple[int, int]): The seconds and nanoseconds of the
+            last modification when the file was staged.
+        dev (int): The device of the file.
+        ino (int): The inode of the file.
+        uid (int): The owner of the file.
+        gid (int): The group of the file.
+        flags (int): The raw flags of the entry.
+    """
+
+    __slots__ = (
+        'path',
+        'sha',
+        'mode',
+        'size',
+        'ctime',
+        'mtime',
+        'dev',
+        'ino',
+        'uid',
+        'gid',
+        'flags',
+    )
+
+    def __init__(self, path, sha, mode, size, ctime=(0, 0), mtime=(0, 0),
+                 dev=0, ino=0, uid=0, gid=0, flags=0):
+        self.path = path
+        self.sha = sha
+        self.mode = mode
+        self.size = size
+        self.ctime = ctime
+        self.mtime = mtime
+        self.dev = dev
+        self.ino = ino
+        self.uid = uid
+        self.gid = gid
+        self.flags = flags
+
+    @property
+    def stage(self):
+        """int: The merge stage (``0`` unless the path is unmerged)."""
+        return (self.flags & _STAGE_MASK) >> _STAGE_SHIFT
+
+    def __repr__(self):
+        return '<IndexEntry {:o} {} {!r}>'.format(
+            self.mode, self.sha[:7], self.path)
+
+
+class GitIndex(object):
+    """A memory-mapped ``git`` index.
+
+    Args:
+        path (str): The path to the index file (typically
+            ``.git/index``). If the file doesn't exist (e.g. nothing
+            has been staged yet), the index is empty.
+
+    Raises:
+        NotImplementedError: If the index format is not supported or
+            the repository uses a split index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = b''
+        self.version = None
+        self._num_entries = 0
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+
+        with open(path, 'rb') as file_obj:
+            self._data = mmap.mmap(
+                file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        signature, version, num_entries = _HEADER.unpack_from(self._data)
+        if signature != _SIGNATURE or version not in _SUPPORTED_VERSIONS:
+            self.close()
+            raise NotImplementedError('Unsupported index', path, version)
+        self.version = version
+        self._num_entries = num_entries
+        if self._has_shared_index() and self._has_link_extension():
+            self.close()
+            raise NotImplementedError('Split index', path)
+
+    def _has_shared_index(self):
+        """Check if the ``git`` directory has any shared index files.
+
+        Every split index links to one of these files, so the (cheap)
+        check avoids scanning for the extensions of regular indices.
+
+        Returns:
+            bool: Indicates if there is a shared index file.
+        """
+        git_dir = os.path.dirname(self.path)
+        return any(filename.startswith(_SHARED_INDEX_PREFIX)
+                   for filename in os.listdir(git_dir))
+
+    def _has_link_extension(self):
+        """Check if the index has a ``link`` (i.e. split index) extension.
+
+        Returns:
+            bool: Indicates if the index is split.
+        """
+        data = self._data
+        pos = _HEADER.size
+        for _, _, pos in self._walk():
+            pass
+        end = len(data) - _CHECKSUM_SIZE
+        while pos + _EXTENSION_HEADER.size <= end:
+            signature, size = _EXTENSION_HEADER.unpack_from(data, pos)
+            if signature == _LINK_EXTENSION:
+                return True
+            pos += _EXTENSION_HEADER.size + size
+        return False
+
+    def __len__(self):
+        return self._num_entries
+
+    def __iter__(self):
+        return self.iter_entries()
+
+    def _walk(self):
+        """Walk over the raw entries in the index.
+
+        Yields:
+            Tuple[int, bytes, int]: The offset of the fixed-size part of
+            each entry, the (raw) path of the entry and the offset just
+            past the entry.
+        """
+        data = self._data
+        prefix_compressed = self.version == _PREFIX_COMPRESSED_VERSION
+        pos = _HEADER.size
+        path = b''
+        for _ in six.moves.xrange(self._num_entries):
+            start = pos
+            flags, = struct.unpack_from('>H', data, pos + _ENTRY.size - 2)
+            pos += _ENTRY.size
+            if flags & _EXTENDED_FLAG:
+                pos += _EXTENDED_FLAGS_SIZE
+            if prefix_compressed:
+                strip, pos = _read_offset_varint(data, pos)
+                end = data.find(b'\0', pos)
+                path = path[:len(path) - strip] + data[pos:end]
+                pos = end + 1
+            else:
+                end = data.find(b'\0', pos)
+                path = data[pos:end]
+                # Entries are NUL-padded to a multiple of 8 bytes.
+                entry_size = end - start
+                pos = start + (
+                    (entry_size + _ENTRY_ALIGNMENT) &
+                    ~(_ENTRY_ALIGNMENT - 1))
+            yield start, path, pos
+
+    def _iter_raw(self):
+        """Iterate over the raw entries in the index.
+
+        Yields:
+            Tuple[int, bytes]: The offset of the fixed-size part of each
+            entry and the (raw) path of the entry.
+
+        Raises:
+            NotImplementedError: If the index contains a directory
+                entry (i.e. it is a sparse index).
+        """
+        for start, path, _ in self._walk():
+            if path.endswith(b'/'):
+                # Only a sparse index contains directory entries.
+                raise NotImplementedError('Sparse index', self.path)
+            yield start, path
+
+    def _iter_matching(self, prefix, suffix):
+        """Iterate over the raw entries matching a prefix and suffix.
+
+        Since entries are sorted by path, iteration stops as soon as
+        the entries are past ``prefix``.
+
+        Args:
+            prefix (Optional[str]): A path prefix to match.
+            suffix (Optional[str]): A path suffix to match.
+
+        Yields:
+            Tuple[int, bytes]: The offset of the fixed-size part of each
+            matching entry and the (raw) path of the entry.
+        """
+        prefix_bytes = (prefix or '').encode('utf-8')
+        suffix_bytes = (suffix or '').encode('utf-8')
+        for start, path in self._iter_raw():
+            if not path.startswith(prefix_bytes):
+                if path > prefix_bytes:
+                    return
+                continue
+            if path.endswith(suffix_bytes):
+                yield start, path
+
+    def iter_paths(self, prefix=None, suffix=None):
+        """Iterate over the paths in the index.
+
+        Cheaper than :meth:`iter_entries` since no stat data is
+        decoded.
+
+        Args:
+            prefix (Optional[str]): Only include paths that start with
+                this prefix (e.g. ``'docs/'``).
+            suffix (Optional[str]): Only include paths that end with
+                this suffix (e.g. ``'.py'``).
+
+        Yields:
+            str: Each path (relative to the root of the checkout).
+        """
+        for _, path in self._iter_matching(prefix, suffix):
+            yield path.decode('utf-8')
+
+    def iter_entries(self, prefix=None, suffix=None):
+        """Iterate over the entries in the index.
+
+        Args:
+            prefix (Optional[str]): Only include paths that start with
+                this prefix (e.g. ``'docs/'``).
+            suffix (Optional[str]): Only include paths that end with
+                this suffix (e.g. ``'.py'``).
+
+        Yields:
+            IndexEntry: Each entry in the index.
+        """
+        for start, path in self._iter_matching(prefix, suffix):
+            (ctime_s, ctime_ns, mtime_s, mtime_ns, dev, ino, mode,
+             uid, gid, size, binary_sha, flags) = _ENTRY.unpack_from(
+                 self._data, start)
+            sha = binascii.hexlify(binary_sha).decode('ascii')
+            yield IndexEntry(
+                path.decode('utf-8'), sha, mode, size,
+                ctime=(ctime_s, ctime_ns), mtime=(mtime_s, mtime_ns),
+                dev=dev, ino=ino, uid=uid, gid=gid, flags=flags)
+
+    def close(self):
+        """Unmap the index file."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = b''
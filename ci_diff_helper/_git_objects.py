@@ -0,0 +1,774 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Pure-Python reader for a ``git`` repository.
+
+Reads refs (loose and packed) and objects (loose and from packfiles)
+directly from the ``.git`` directory, so that simple queries can be
+answered without starting a ``git`` process.
+
+Only the subset of ``git`` needed by this library is supported. When
+something is not supported (e.g. an unusual revision syntax or a
+repository configured via environment variables) a
+:exc:`NotImplementedError` is raised, so that callers can fall back
+to running ``git``.
+"""
+
+import binascii
+import mmap
+import os
+import re
+import struct
+import zlib
+
+import six
+
+
+_GIT_ENV_VARS = (
+    'GIT_DIR',
+    'GIT_WORK_TREE',
+    'GIT_COMMON_DIR',
+    'GIT_OBJECT_DIRECTORY',
+    'GIT_ALTERNATE_OBJECT_DIRECTORIES',
+    'GIT_INDEX_FILE',
+)
+_DOT_GIT = '.git'
+_GITDIR_PREFIX = 'gitdir: '
+_SYMREF_PREFIX = 'ref: '
+_HEX_REGEX = re.compile(r'^[0-9a-f]{4,40}$')
+_PEEL_REGEX = re.compile(r'^(.+)\^\{([a-z]*)\}$')
+_ANCESTRY_REGEX = re.compile(r'^(.+?)([~^])(\d*)$')
+_UNSUPPORTED_SYNTAX = (':', '@{', '..', '\\')
+_DWIM_TEMPLATES = (
+    '{}',
+    'refs/{}',
+    'refs/tags/{}',
+    'refs/heads/{}',
+    'refs/remotes/{}',
+    'refs/remotes/{}/HEAD',
+)
+_IDX_MAGIC = b'\377tOc'
+_IDX_VERSION = 2
+_IDX_HEADER_SIZE = 8
+_FANOUT_SIZE = 256 * 4
+_SHA_SIZE = 20
+_LARGE_OFFSET_FLAG = 0x80000000
+_PACK_TYPES = {
+    1: 'commit',
+    2: 'tree',
+    3: 'blob',
+    4: 'tag',
+}
+_OFS_DELTA = 6
+_REF_DELTA = 7
+_CHUNK_SIZE = 4096
+_MAX_SYMREF_DEPTH = 5
+
+
+def _read_text(path):
+    """Read a small text file (if it exists).
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        Optional[str]: The stripped contents of the file, or
+        :data:`None` if the file doesn't exist (or is a directory).
+    """
+    try:
+        with open(path, 'rb') as file_obj:
+            return file_obj.read().decode('utf-8').strip()
+    except (IOError, OSError):
+        return None
+
+
+def _is_root_ref(name):
+    """Check if a name can be looked up directly as a ref.
+
+    ``git`` only looks for a full ref name (e.g. ``refs/heads/master``)
+    or a special ref like ``HEAD`` or ``FETCH_HEAD`` without trying
+    any prefixes.
+
+    Args:
+        name (str): A ref name.
+
+    Returns:
+        bool: Flag indicating if the name can be used as-is.
+    """
+    if name.startswith('refs/'):
+        return True
+    return '/' not in name and name.upper() == name and not name.isdigit()
+
+
+def _read_varint(data, pos):
+    """Read a little-endian base-128 integer, as used in deltas.
+
+    Args:
+        data (bytes): The buffer to read from.
+        pos (int): The position of the first byte.
+
+    Returns:
+        Tuple[int, int]: The value and the position after it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = six.indexbytes(data, pos)
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def apply_delta(base, delta):
+    """Apply a ``git`` delta to a base object.
+
+    Args:
+        base (bytes): The contents of the base object.
+        delta (bytes): The (uncompressed) delta.
+
+    Returns:
+        bytes: The contents of the target object.
+
+    Raises:
+        ValueError: If the delta is not valid for the base.
+    """
+    src_size, pos = _read_varint(delta, 0)
+    dst_size, pos = _read_varint(delta, pos)
+    if src_size != len(base):
+        raise ValueError('Delta does not match base size',
+                         src_size, len(base))
+
+    pieces = []
+    delta_size = len(delta)
+    while pos < delta_size:
+        opcode = six.indexbytes(delta, pos)
+        pos += 1
+        if opcode & 0x80:
+            # Copy from the base object.
+            offset = size = 0
+            for i in six.moves.range(4):
+                if opcode & (1 << i):
+                    offset |= six.indexbytes(delta, pos) << (8 * i)
+                    pos += 1
+            for i in six.moves.range(3):
+                if opcode & (1 << (4 + i)):
+                    size |= six.indexbytes(delta, pos) << (8 * i)
+                    pos += 1
+            pieces.append(base[offset:offset + (size or 0x10000)])
+        elif opcode:
+            # Insert new data from the delta.
+            pieces.append(delta[pos:pos + opcode])
+            pos += opcode
+        else:
+            raise ValueError('Invalid delta opcode', opcode)
+
+    result = b''.join(pieces)
+    if len(result) != dst_size:
+        raise ValueError('Delta result has unexpected size',
+                         len(result), dst_size)
+    return result
+
+
+def _decompress(data, pos, size):
+    """Decompress a zlib stream from a buffer.
+
+    Args:
+        data (bytes): The buffer (e.g. a memory-mapped packfile).
+        pos (int): The start of the zlib stream.
+        size (int): The expected size of the uncompressed data.
+
+    Returns:
+        bytes: The uncompressed data.
+    """
+    decompressor = zlib.decompressobj()
+    pieces = []
+    remaining = size
+    while remaining > 0:
+        chunk = data[pos:pos + _CHUNK_SIZE]
+        if not chunk:
+            raise ValueError('Truncated zlib stream')
+        pos += _CHUNK_SIZE
+        piece = decompressor.decompress(chunk)
+        pieces.append(piece)
+        remaining -= len(piece)
+    return b''.join(pieces)
+
+
+class PackIndex(object):
+    """A memory-mapped version 2 packfile index (``.idx``).
+
+    Args:
+        path (str): The path to the ``.idx`` file.
+
+    Raises:
+        NotImplementedError: If the index is not a version 2 index.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file_obj:
+            self._data = mmap.mmap(
+                file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        if (self._data[:4] != _IDX_MAGIC or
+                struct.unpack_from('>I', self._data, 4)[0] != _IDX_VERSION):
+            self.close()
+            raise NotImplementedError('Unsupported pack index', path)
+        self._fanout = struct.unpack_from('>256I', self._data,
+                                          _IDX_HEADER_SIZE)
+        self.num_objects = self._fanout[-1]
+        self._sha_start = _IDX_HEADER_SIZE + _FANOUT_SIZE
+        self._offset_start = self._sha_start + 24 * self.num_objects
+        self._large_offset_start = self._offset_start + 4 * self.num_objects
+
+    def _sha_at(self, index):
+        """Get the (binary) SHA-1 hash of the ``index``-th object."""
+        start = self._sha_start + _SHA_SIZE * index
+        return self._data[start:start + _SHA_SIZE]
+
+    def _lower_bound(self, binary_sha):
+        """Find the first position with a hash not less than a value.
+
+        Uses the fanout table to narrow the range before a binary
+        search.
+
+        Args:
+            binary_sha (bytes): A (binary) SHA-1 hash.
+
+        Returns:
+            int: The position in the index.
+        """
+        first_byte = six.indexbytes(binary_sha, 0)
+        low = self._fanout[first_byte - 1] if first_byte else 0
+        high = self._fanout[first_byte]
+        while low < high:
+            mid = (low + high) // 2
+            if self._sha_at(mid) < binary_sha:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def find(self, sha):
+        """Find the offset of an object in the packfile.
+
+        Args:
+            sha (str): The (hex) SHA-1 hash of the object.
+
+        Returns:
+            Optional[int]: The offset of the object in the packfile, or
+            :data:`None` if it is not in this pack.
+        """
+        binary_sha = binascii.unhexlify(sha)
+        index = self._lower_bound(binary_sha)
+        if index < self.num_objects and self._sha_at(index) == binary_sha:
+            return self._offset_at(index)
+        return None
+
+    def _offset_at(self, index):
+        """Get the packfile offset of the ``index``-th object."""
+        offset, = struct.unpack_from(
+            '>I', self._data, self._offset_start + 4 * index)
+        if offset & _LARGE_OFFSET_FLAG:
+            large_index = offset & ~_LARGE_OFFSET_FLAG
+            offset, = struct.unpack_from(
+                '>Q', self._data, self._large_offset_start + 8 * large_index)
+        return offset
+
+    def match_prefix(self, prefix):
+        """Find all objects with a (hex) SHA-1 hash prefix.
+
+        Args:
+            prefix (str): A hex prefix of a hash.
+
+        Returns:
+            List[str]: The (hex) hashes of all matching objects.
+        """
+        lowest = binascii.unhexlify(prefix.ljust(2 * _SHA_SIZE, '0'))
+        index = self._lower_bound(lowest)
+        matches = []
+        while index < self.num_objects:
+            sha = binascii.hexlify(self._sha_at(index)).decode('ascii')
+            if not sha.startswith(prefix):
+                break
+            matches.append(sha)
+            index += 1
+        return matches
+
+    def close(self):
+        """Close the memory map."""
+        self._data.close()
+
+
+class Pack(object):
+    """A packfile along with its index.
+
+    Args:
+        path (str): The path to the packfile (``.pack``). The index is
+            expected alongside it (``.idx``).
+    """
+
+    def __init__(self, path):
+        self.index = PackIndex(path[:-len('.pack')] + '.idx')
+        with open(path, 'rb') as file_obj:
+            self._data = mmap.mmap(
+                file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_at(self, offset, resolve_ref):
+        """Read the object stored at an offset in the packfile.
+
+        Args:
+            offset (int): The offset of the object.
+            resolve_ref (Callable[[str], Tuple[str, bytes]]): Reads an
+                object by (hex) SHA-1 hash, used for the base of a
+                ``REF_DELTA`` object.
+
+        Returns:
+            Tuple[str, bytes]: The object type and contents.
+        """
+        data = self._data
+        pos = offset
+        byte = six.indexbytes(data, pos)
+        pos += 1
+        obj_type = (byte >> 4) & 0x07
+        size = byte & 0x0f
+        shift = 4
+        while byte & 0x80:
+            byte = six.indexbytes(data, pos)
+            pos += 1
+            size |= (byte & 0x7f) << shift
+            shift += 7
+
+        if obj_type == _OFS_DELTA:
+            byte = six.indexbytes(data, pos)
+            pos += 1
+            base_distance = byte & 0x7f
+            while byte & 0x80:
+                byte = six.indexbytes(data, pos)
+                pos += 1
+                base_distance = ((base_distance + 1) << 7) | (byte & 0x7f)
+            base_type, base = self.read_at(offset - base_distance,
+                                           resolve_ref)
+        elif obj_type == _REF_DELTA:
+            base_sha = binascii.hexlify(
+                data[pos:pos + _SHA_SIZE]).decode('ascii')
+            pos += _SHA_SIZE
+            base_type, base = resolve_ref(base_sha)
+        else:
+            return _PACK_TYPES[obj_type], _decompress(data, pos, size)
+
+        delta = _decompress(data, pos, size)
+        return base_type, apply_delta(base, delta)
+
+    def close(self):
+        """Close the memory maps for the pack and index."""
+        self._data.close()
+        self.index.close()
+
+
+class Repository(object):
+    """A ``git`` repository read directly from disk.
+
+    Args:
+        git_dir (str): The path to the ``.git`` directory.
+        work_tree (Optional[str]): The path to the working tree (if
+            any).
+    """
+
+    def __init__(self, git_dir, work_tree=None):
+        self.git_dir = git_dir
+        self.work_tree = work_tree
+        common_dir = _read_text(os.path.join(git_dir, 'commondir'))
+        if common_dir is None:
+            self.common_dir = git_dir
+        else:
+            self.common_dir = os.path.normpath(
+                os.path.join(git_dir, common_dir))
+        self._object_dirs = self._find_object_dirs()
+        self._packs = None
+        self._packed_refs = None
+        self._shallow = None
+
+    @classmethod
+    def discover(cls, path):
+        """Find the repository containing a directory.
+
+        Args:
+            path (str): A directory, typically the current working
+                directory.
+
+        Returns:
+            Repository: The repository containing ``path``.
+
+        Raises:
+            NotImplementedError: If the repository is configured via
+                environment variables or ``path`` isn't in a
+                repository.
+        """
+        for env_var in _GIT_ENV_VARS:
+            if os.getenv(env_var) is not None:
+                raise NotImplementedError(
+                    'Repository configured via environment', env_var)
+
+        current = os.path.abspath(path)
+        while True:
+            candidate = os.path.join(current, _DOT_GIT)
+            if os.path.isdir(candidate):
+                return cls(candidate, work_tree=current)
+            elif os.path.isfile(candidate):
+                # A worktree or submodule, the file points to the
+                # actual ``git`` directory.
+                contents = _read_text(candidate) or ''
+                if contents.startswith(_GITDIR_PREFIX):
+                    git_dir = os.path.join(
+                        current, contents[len(_GITDIR_PREFIX):])
+                    return cls(os.path.normpath(git_dir), work_tree=current)
+            parent = os.path.dirname(current)
+            if parent == current:
+                raise NotImplementedError('Not in a git repository', path)
+            current = parent
+
+    def _find_object_dirs(self):
+        """Find the object directory along with any alternates.
+
+        Returns:
+            List[str]: The object directories to search.
+        """
+        objects_dir = os.path.join(self.common_dir, 'objects')
+        result = [objects_dir]
+        alternates = _read_text(
+            os.path.join(objects_dir, 'info', 'alternates'))
+        for line in (alternates or '').splitlines():
+            line = line.strip()
+            if line and not line.startswith('#'):
+                result.append(os.path.normpath(
+                    os.path.join(objects_dir, line)))
+        return result
+
+    @property
+    def packs(self):
+        """List[Pack]: All the packfiles in the repository."""
+        if self._packs is None:
+            self._packs = []
+            for objects_dir in self._object_dirs:
+                pack_dir = os.path.join(objects_dir, 'pack')
+                try:
+                    filenames = sorted(os.listdir(pack_dir))
+                except OSError:
+                    continue
+                for filename in filenames:
+                    if filename.endswith('.pack'):
+                        self._packs.append(
+                            Pack(os.path.join(pack_dir, filename)))
+        return self._packs
+
+    @property
+    def shallow(self):
+        """frozenset: The commits at the boundary of a shallow clone."""
+        if self._shallow is None:
+            contents = _read_text(os.path.join(self.common_dir, 'shallow'))
+            self._shallow = frozenset((contents or '').split())
+        return self._shallow
+
+    def _refresh_packs(self):
+        """Forget the loaded packs (e.g. after ``git gc`` ran)."""
+        if self._packs is not None:
+            for pack in self._packs:
+                pack.close()
+        self._packs = None
+
+    def _read_loose(self, sha):
+        """Read a loose object.
+
+        Args:
+            sha (str): The (hex) SHA-1 hash of the object.
+
+        Returns:
+            Optional[Tuple[str, bytes]]: The object type and contents,
+            or :data:`None` if there is no such loose object.
+        """
+        for objects_dir in self._object_dirs:
+            path = os.path.join(objects_dir, sha[:2], sha[2:])
+            try:
+                with open(path, 'rb') as file_obj:
+                    raw = zlib.decompress(file_obj.read())
+            except (IOError, OSError):
+                continue
+            header, _, contents = raw.partition(b'\0')
+            obj_type, _ = header.decode('ascii').split(' ')
+            return obj_type, contents
+        return None
+
+    def _read_packed(self, sha):
+        """Read an object from a packfile.
+
+        Args:
+            sha (str): The (hex) SHA-1 hash of the object.
+
+        Returns:
+            Optional[Tuple[str, bytes]]: The object type and contents,
+            or :data:`None` if the object isn't in any pack.
+        """
+        for pack in self.packs:
+            offset = pack.index.find(sha)
+            if offset is not None:
+                return pack.read_at(offset, self._read_required)
+        return None
+
+    def _read_required(self, sha):
+        """Read an object that must exist (e.g. a delta base).
+
+        Args:
+            sha (str): The (hex) SHA-1 hash of the object.
+
+        Returns:
+            Tuple[str, bytes]: The object type and contents.
+
+        Raises:
+            KeyError: If the object does not exist.
+        """
+        result = self.read_object(sha)
+        if result is None:
+            raise KeyError('Missing object', sha)
+        return result
+
+    def read_object(self, sha):
+        """Read an object from the repository.
+
+        Args:
+            sha (str): The (hex) SHA-1 hash of the object.
+
+        Returns:
+            Optional[Tuple[str, bytes]]: The object type and contents,
+            or :data:`None` if the object doesn't exist.
+        """
+        result = self._read_loose(sha)
+        if result is None:
+            result = self._read_packed(sha)
+        if result is None and self._packs:
+            # A repack may have happened since the packs were loaded.
+            self._refresh_packs()
+            result = self._read_packed(sha)
+        return result
+
+    def _match_prefix(self, prefix):
+        """Find all objects with a (hex) SHA-1 hash prefix.
+
+        Args:
+            prefix (str): A hex prefix of a hash.
+
+        Returns:
+            Set[str]: The (hex) hashes of all matching objects.
+        """
+        matches = set()
+        for objects_dir in self._object_dirs:
+            loose_dir = os.path.join(objects_dir, prefix[:2])
+            try:
+                filenames = os.listdir(loose_dir)
+            except OSError:
+                filenames = ()
+            for filename in filenames:
+                sha = prefix[:2] + filename
+                if sha.startswith(prefix):
+                    matches.add(sha)
+        for pack in self.packs:
+            matches.update(pack.index.match_prefix(prefix))
+        return matches
+
+    @property
+    def packed_refs(self):
+        """dict: The refs stored in the ``packed-refs`` file."""
+        if self._packed_refs is None:
+            self._packed_refs = {}
+            contents = _read_text(os.path.join(self.common_dir,
+                                               'packed-refs'))
+            for line in (contents or '').splitlines():
+                if line.startswith(('#', '^')):
+                    # Comments and peeled tags.
+                    continue
+                sha, _, ref_name = line.partition(' ')
+                self._packed_refs[ref_name] = sha
+        return self._packed_refs
+
+    def read_ref(self, ref_name, depth=0):
+        """Resolve a ref (e.g. ``HEAD`` or ``refs/heads/master``).
+
+        Args:
+            ref_name (str): The full name of a ref.
+            depth (Optional[int]): The number of symbolic refs already
+                followed.
+
+        Returns:
+            Optional[str]: The SHA-1 hash the ref points to, or
+            :data:`None` if it doesn't exist.
+        """
+        if depth > _MAX_SYMREF_DEPTH:
+            return None
+        if ref_name.startswith('refs/'):
+            # NOTE: Per-worktree refs (e.g. ``refs/bisect``) are not
+            #       supported, only refs in the common directory.
+            path = os.path.join(self.common_dir, ref_name)
+        else:
+            path = os.path.join(self.git_dir, ref_name)
+        contents = _read_text(path)
+        if contents is None:
+            return self.packed_refs.get(ref_name)
+        if contents.startswith(_SYMREF_PREFIX):
+            return self.read_ref(contents[len(_SYMREF_PREFIX):], depth + 1)
+        # NOTE: Some files (e.g. ``FETCH_HEAD``) have extra information
+        #       after the hash.
+        sha = contents[:2 * _SHA_SIZE]
+        if _HEX_REGEX.match(sha) and len(sha) == 2 * _SHA_SIZE:
+            return sha
+        return None
+
+    def _resolve_basic(self, name):
+        """Resolve a name without any suffixes.
+
+        Follows the same order as ``git``: a full hash, then refs
+        (see ``git help revisions``) and then an abbreviated hash.
+
+        Args:
+            name (str): A branch name, tag, a commit SHA or a special
+                reference.
+
+        Returns:
+            Optional[str]: The SHA-1 hash, or :data:`None` if the name
+            can't be resolved (or is ambiguous).
+        """
+        if name == '@':
+            name = 'HEAD'
+        is_hex = _HEX_REGEX.match(name) is not None
+        if is_hex and len(name) == 2 * _SHA_SIZE:
+            return name
+
+        for template in _DWIM_TEMPLATES:
+            ref_name = template.format(name)
+            if template == '{}' and not _is_root_ref(name):
+                continue
+            sha = self.read_ref(ref_name)
+            if sha is not None:
+                return sha
+
+        if is_hex:
+            matches = self._match_prefix(name)
+            if len(matches) == 1:
+                return matches.pop()
+        return None
+
+    def peel(self, sha, target_type):
+        """Peel an object (e.g. a tag) until it has a given type.
+
+        Args:
+            sha (str): The (hex) SHA-1 hash of an object.
+            target_type (str): The desired type (e.g. ``commit``). If
+                empty, peels tags until the object is not a tag.
+
+        Returns:
+            Optional[str]: The SHA-1 hash of the peeled object, or
+            :data:`None` if it can't be peeled to that type.
+        """
+        while True:
+            obj = self.read_object(sha)
+            if obj is None:
+                return None
+            obj_type, contents = obj
+            if target_type in (obj_type, 'object') or (
+                    not target_type and obj_type != 'tag'):
+                return sha
+            if obj_type == 'tag':
+                sha = contents.split(b'\n', 1)[0].split(b' ')[1]
+                sha = sha.decode('ascii')
+            elif obj_type == 'commit' and target_type == 'tree':
+                return contents.split(b'\n', 1)[0].split(b' ')[1].decode(
+                    'ascii')
+            else:
+                return None
+
+    def parents(self, sha):
+        """Get the parents of a commit.
+
+        Commits at the boundary of a shallow clone are treated as
+        having no parents, as ``git`` does.
+
+        Args:
+            sha (str): The (hex) SHA-1 hash of a commit.
+
+        Returns:
+            Optional[List[str]]: The parent hashes, or :data:`None` if
+            the object is not a commit.
+        """
+        obj = self.read_object(sha)
+        if obj is None or obj[0] != 'commit':
+            return None
+        if sha in self.shallow:
+            return []
+        result = []
+        for line in obj[1].split(b'\n'):
+            if not line:
+                break
+            if line.startswith(b'parent '):
+                result.append(line[len(b'parent '):].decode('ascii'))
+        return result
+
+    def resolve(self, name):
+        """Resolve a revision into a SHA-1 hash.
+
+        Supports everything :meth:`_resolve_basic` does, followed by
+        any number of ``^{type}``, ``^{}``, ``~n`` and ``^n`` suffixes.
+
+        Args:
+            name (str): A ``git`` revision.
+
+        Returns:
+            Optional[str]: The SHA-1 hash of the object, or :data:`None`
+            if it can't be found.
+
+        Raises:
+            NotImplementedError: If the revision uses syntax that is not
+                supported.
+        """
+        match = _PEEL_REGEX.match(name)
+        if match is not None:
+            base, target_type = match.groups()
+            sha = self.resolve(base)
+            return None if sha is None else self.peel(sha, target_type)
+
+        match = _ANCESTRY_REGEX.match(name)
+        if match is not None:
+            base, operator, count = match.groups()
+            sha = self.resolve(base)
+            if sha is None:
+                return None
+            sha = self.peel(sha, 'commit')
+            count = 1 if count == '' else int(count)
+            if operator == '~':
+                for _ in six.moves.range(count):
+                    parents = self.parents(sha) if sha else None
+                    sha = parents[0] if parents else None
+                return sha
+            elif count == 0:
+                return sha
+            parents = self.parents(sha) if sha else None
+            if parents is None or len(parents) < count:
+                return None
+            return parents[count - 1]
+
+        for fragment in _UNSUPPORTED_SYNTAX:
+            if fragment in name:
+                raise NotImplementedError(
+                    'Unsupported revision syntax', name)
+        return self._resolve_basic(name)
+
+    def close(self):
+        """Close any open packfiles."""
+        self._refresh_packs()
@@ -10,20 +10,54 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Helper to make calls to the GitHub API."""
-
+"""Helper to make calls to the GitHub API.
+
+All requests share a single :class:`requests.Session` (see
+:func:`get_session`), so connections to the API are kept alive and
+re-used across calls rather than paying for a new TCP and TLS
+handshake on every request.
+
+If a cache directory is configured (see
+:data:`~.environment_vars.GH_CACHE_DIR`), responses are cached on
+disk and re-validated with conditional requests (see
+:func:`get_cache`).
+
+Comparisons of large commit ranges are streamed (see
+:func:`compare_merge_base` and :func:`iter_compare_files`) and the
+files in a pull request are streamed and paginated (see
+:func:`iter_pr_files`), so only the fields that are needed are kept
+in memory.
+
+Several pull requests can be looked up in a single round trip via
+the GraphQL API (see :func:`pr_batch_info`).
+
+Requests are paced and retried based on the rate limit headers sent
+by GitHub (see :func:`get_scheduler`). The budget can be shared by
+every process on a host (see
+:data:`~.environment_vars.GH_RATE_LIMIT_DIR`).
+"""
+
+import atexit
 import os
 import sys
 
 import requests
+from requests import adapters
 import six
 from six.moves import http_client
 
+from ci_diff_helper import _http_cache
+from ci_diff_helper import _json_stream
+from ci_diff_helper import _rate_ledger
+from ci_diff_helper import _rate_limit
+from ci_diff_helper import _utils
 from ci_diff_helper import environment_vars as env
 
 
 _GH_COMPARE_TEMPLATE = 'https://api.github.com/repos/{}/compare/{}...{}'
+_GH_COMPARE_PAGE_TEMPLATE = _GH_COMPARE_TEMPLATE + '?per_page={:d}'
 _GH_PR_TEMPLATE = 'https://api.github.com/repos/{}/pulls/{:d}'
+_GH_PR_FILES_TEMPLATE = _GH_PR_TEMPLATE + '/files?per_page={:d}'
 _RATE_REMAINING_HEADER = 'X-RateLimit-Remaining'
 _RATE_LIMIT_HEADER = 'X-RateLimit-Limit'
 _RATE_RESET_HEADER = 'X-RateLimit-Reset'
@@ -32,6 +66,107 @@ _RATE_LIMIT_TEMPLATE = '{:>25}: {{}}\n{:>25}: {{}}\n{:>25}: {{}}'.format(
 _GH_ENV_VAR_MSG = (
     'You can avoid being rate limited by storing a GitHub OAuth '
     'token in the {} environment variable').format(env.GH_TOKEN)
+_GH_GRAPHQL_URL = 'https://api.github.com/graphql'
+_GH_URL_PREFIX = 'https://'
+_AUTH_HEADER = 'Authorization'
+_POOL_CONNECTIONS = 4
+_POOL_MAXSIZE = 8
+_SESSION = None
+_CACHE = _utils.UNSET
+_SCHEDULER = None
+_CHUNK_SIZE = 64 * 1024
+# Only the first page of a comparison has the merge base and the files
+# (later pages only list commits), so keep the commits on it to a
+# minimum.
+_COMPARE_PER_PAGE = 1
+_FILES_PER_PAGE = 100
+_MERGE_BASE_SHA_PATH = ('merge_base_commit', 'sha')
+_FILENAME_PATH = ('files', None, 'filename')
+_PR_FILENAME_PATH = (None, 'filename')
+_NEXT_LINK = 'next'
+_GRAPHQL_FILES_LIMIT = 100
+_GRAPHQL_PR_TEMPLATE = """\
+    pr{0:d}: pullRequest(number: {0:d}) {{
+      baseRefOid
+      headRefOid
+      merged
+      mergeable
+      state
+      mergeCommit {{ oid }}
+      files(first: {1:d}) {{ totalCount nodes {{ path }} }}
+    }}"""
+_GRAPHQL_QUERY_TEMPLATE = """\
+query($owner: String!, $name: String!) {{
+  repository(owner: $owner, name: $name) {{
+{}
+  }}
+}}"""
+COMPARE_FILES_LIMIT = 300
+"""int: The maximum number of files GitHub includes in a comparison."""
+PR_FILES_LIMIT = 3000
+"""int: The maximum number of files GitHub lists for a pull request."""
+
+
+def make_session(pool_connections=_POOL_CONNECTIONS,
+                 pool_maxsize=_POOL_MAXSIZE):
+    """Create a session with a connection pool for the GitHub API.
+
+    Args:
+        pool_connections (Optional[int]): The number of per-host
+            connection pools to cache.
+        pool_maxsize (Optional[int]): The maximum number of kept-alive
+            connections in each pool (i.e. the number of concurrent
+            requests to one host that can re-use a connection).
+
+    Returns:
+        requests.Session: The new session.
+    """
+    session = requests.Session()
+    adapter = adapters.HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount(_GH_URL_PREFIX, adapter)
+    return session
+
+
+def get_session():
+    """Get the session used for all GitHub API requests.
+
+    If no session has been set (via :func:`set_session`), one is
+    created with :func:`make_session`.
+
+    Returns:
+        requests.Session: The current session.
+    """
+    global _SESSION  # pylint: disable=global-statement
+    if _SESSION is None:
+        _SESSION = make_session()
+    return _SESSION
+
+
+def set_session(session):
+    """Set the session used for all GitHub API requests.
+
+    Args:
+        session (Optional[requests.Session]): The new session. If
+            :data:`None`, a new session will be created on next use.
+
+    Returns:
+        Optional[requests.Session]: The previous session (if any). It
+        is **not** closed, that is left to the caller.
+    """
+    global _SESSION  # pylint: disable=global-statement
+    previous, _SESSION = _SESSION, session
+    return previous
+
+
+def close_session():
+    """Close the current session (if any) and its pooled connections."""
+    session = set_session(None)
+    if session is not None:
+        session.close()
+
+
+atexit.register(close_session)
 
 
 def _rate_limit_info(response):
@@ -59,7 +194,7 @@ def _get_headers():
     headers = {}
     github_token = os.getenv(env.GH_TOKEN, None)
     if github_token is not None:
-        headers['Authorization'] = 'token ' + github_token
+        headers[_AUTH_HEADER] = 'token ' + github_token
 
     return headers
 
@@ -79,6 +214,243 @@ def _maybe_fail(response):
         response.raise_for_status()
 
 
+def get_cache():
+    """Get the cache used for GitHub API responses.
+
+    If no cache has been set (via :func:`set_cache`), one is created
+    if the ``CI_DIFF_HELPER_GITHUB_CACHE_DIR`` environment variable
+    (:data:`~.environment_vars.GH_CACHE_DIR`) is set.
+
+    Returns:
+        Optional[~._http_cache.ResponseCache]: The current cache, if
+        caching is enabled.
+
+    Raises:
+        ValueError: If the TTL environment variable is not a number.
+    """
+    global _CACHE  # pylint: disable=global-statement
+    if _CACHE is _utils.UNSET:
+        directory = os.getenv(env.GH_CACHE_DIR)
+        if directory is None:
+            _CACHE = None
+        else:
+            ttl = os.getenv(env.GH_CACHE_TTL)
+            if ttl is not None:
+                ttl = float(ttl)
+            _CACHE = _http_cache.ResponseCache(directory, ttl=ttl)
+    return _CACHE
+
+
+def set_cache(cache):
+    """Set the cache used for GitHub API responses.
+
+    Args:
+        cache (Optional[~._http_cache.ResponseCache]): The new cache.
+            If :data:`None`, caching is disabled.
+
+    Returns:
+        Optional[~._http_cache.ResponseCache]: The previous cache (if
+        any).
+    """
+    global _CACHE  # pylint: disable=global-statement
+    previous, _CACHE = _CACHE, cache
+    if previous is _utils.UNSET:
+        previous = None
+    return previous
+
+
+def get_scheduler():
+    """Get the scheduler used to pace and retry GitHub API requests.
+
+    If no scheduler has been set (via :func:`set_scheduler`), one is
+    created. If the ``CI_DIFF_HELPER_GITHUB_RATE_LIMIT_DIR``
+    environment variable (:data:`~.environment_vars.GH_RATE_LIMIT_DIR`)
+    is set, the new scheduler shares its budget with other processes
+    via a :class:`~._rate_ledger.Ledger`.
+
+    Returns:
+        ~._rate_limit.Scheduler: The current scheduler.
+    """
+    global _SCHEDULER  # pylint: disable=global-statement
+    if _SCHEDULER is None:
+        ledger = None
+        directory = os.getenv(env.GH_RATE_LIMIT_DIR)
+        if directory is not None:
+            identity = _get_headers().get(_AUTH_HEADER, '')
+            ledger = _rate_ledger.Ledger(directory, identity=identity)
+        _SCHEDULER = _rate_limit.Scheduler(ledger=ledger)
+    return _SCHEDULER
+
+
+def set_scheduler(scheduler):
+    """Set the scheduler used to pace and retry GitHub API requests.
+
+    Args:
+        scheduler (Optional[~._rate_limit.Scheduler]): The new
+            scheduler. If :data:`None`, a new scheduler will be
+            created on next use.
+
+    Returns:
+        Optional[~._rate_limit.Scheduler]: The previous scheduler (if
+        any).
+    """
+    global _SCHEDULER  # pylint: disable=global-statement
+    previous, _SCHEDULER = _SCHEDULER, scheduler
+    return previous
+
+
+def _send(api_url, headers, stream=False):
+    """Send a GET request via the shared session and scheduler.
+
+    Args:
+        api_url (str): The URL of the API endpoint.
+        headers (dict): The headers for the request.
+        stream (Optional[bool]): Flag indicating if the body should be
+            downloaded lazily.
+
+    Returns:
+        requests.Response: The response (which may be a failure).
+    """
+    return get_scheduler().send(
+        get_session().get, api_url, headers=headers, stream=stream)
+
+
+class GetRequest(object):
+    """A GET request to the GitHub API, apart from sending it.
+
+    Adds the token (if any) to the headers and, unless the response
+    will be streamed, uses the response cache (see :func:`get_cache`):
+    a fresh cached response is used as-is and a stale one is
+    revalidated. Nothing is sent here, so that both the blocking
+    (:func:`_get`) and the non-blocking (:mod:`~.aio`) APIs share it.
+
+    Args:
+        api_url (str): The URL of the API endpoint.
+        stream (Optional[bool]): Flag indicating if the body will be
+            downloaded lazily. Streamed responses bypass the cache,
+            since storing them would mean reading them in full.
+
+    Attributes:
+        api_url (str): The URL of the API endpoint.
+        headers (dict): The headers to send.
+        cached (Optional[requests.Response]): A fresh cached response.
+            If set, there is no need to send the request.
+    """
+
+    def __init__(self, api_url, stream=False):
+        self.api_url = api_url
+        self._auth_headers = _get_headers()
+        self._cache = None if stream else get_cache()
+        self._entry = None
+        self.headers = dict(self._auth_headers)
+        self.cached = None
+        if self._cache is None:
+            return
+        entry = self._cache.get(api_url, self._auth_headers)
+        if entry is None:
+            return
+        if self._cache.is_fresh(entry):
+            self.cached = entry.to_response()
+        else:
+            self._entry = entry
+            self.headers.update(entry.conditional_headers())
+
+    def finish(self, response):
+        """Handle the response to the request.
+
+        Args:
+            response (requests.Response): The response.
+
+        Returns:
+            requests.Response: The (successful) response. If the cached
+            response was still valid, it is returned instead.
+
+        Raises:
+            requests.exceptions.HTTPError: If the GitHub API request
+                fails.
+        """
+        if (self._entry is not None and
+                response.status_code == http_client.NOT_MODIFIED):
+            self._cache.refresh(self.api_url, self._auth_headers, self._entry)
+            return self._entry.to_response()
+
+        _maybe_fail(response)
+        if self._cache is not None:
+            self._cache.put(self.api_url, self._auth_headers, response)
+        return response
+
+
+def _get(api_url, stream=False):
+    """Make a GET request to the GitHub API.
+
+    Args:
+        api_url (str): The URL of the API endpoint.
+        stream (Optional[bool]): Flag indicating if the body should be
+            downloaded lazily (e.g. via
+            :meth:`~requests.Response.iter_content`). Streamed responses
+            bypass the cache, since storing them would mean reading
+            them in full.
+
+    Returns:
+        requests.Response: The (successful) response.
+
+    Raises:
+        requests.exceptions.HTTPError: If the GitHub API request fails.
+    """
+    request = GetRequest(api_url, stream=stream)
+    if request.cached is not None:
+        return request.cached
+    return request.finish(_send(api_url, request.headers, stream=stream))
+
+
+def compare_url(slug, start, finish):
+    """Build the URL comparing two commits.
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        start (str): The start commit in a range.
+        finish (str): The last commit in a range.
+
+    Returns:
+        str: The URL of the API endpoint.
+    """
+    return _GH_COMPARE_TEMPLATE.format(slug, start, finish)
+
+
+def compare_page_url(slug, start, finish):
+    """Build the URL of the first page comparing two commits.
+
+    The page lists a single commit, but still has the merge base and
+    the changed files.
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        start (str): The start commit in a range.
+        finish (str): The last commit in a range.
+
+    Returns:
+        str: The URL of the API endpoint.
+    """
+    return _GH_COMPARE_PAGE_TEMPLATE.format(
+        slug, start, finish, _COMPARE_PER_PAGE)
+
+
+def pr_url(slug, pr_id):
+    """Build the URL of a pull request.
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        pr_id (int): The pull request ID.
+
+    Returns:
+        str: The URL of the API endpoint.
+    """
+    return _GH_PR_TEMPLATE.format(slug, pr_id)
+
+
 def commit_compare(slug, start, finish):
     """Makes GitHub API request to compare two commits.
 
@@ -94,13 +466,182 @@ def commit_compare(slug, start, finish):
     Raises:
         requests.exceptions.HTTPError: If the GitHub API request fails.
     """
-    api_url = _GH_COMPARE_TEMPLATE.format(slug, start, finish)
+    return _get(compare_url(slug, start, finish)).json()
 
-    headers = _get_headers()
-    response = requests.get(api_url, headers=headers)
-    _maybe_fail(response)
 
-    return response.json()
+def _iter_values(response, path):
+    """Stream the values at a path out of a response body.
+
+    Args:
+        response (requests.Response): A (streamed) response.
+        path (tuple): The path of the values to report (as in
+            :func:`~._json_stream.iter_fields`).
+
+    Yields:
+        Union[str, int, float, bool, None]: Each value.
+    """
+    chunks = response.iter_content(chunk_size=_CHUNK_SIZE)
+    for _, value in _json_stream.iter_fields(chunks, (path,)):
+        yield value
+
+
+def read_merge_base(chunks):
+    """Read the merge base out of (the start of) a comparison.
+
+    Args:
+        chunks (Iterable[bytes]): The body of the comparison. Nothing
+            is read past the merge base.
+
+    Returns:
+        Optional[str]: The commit SHA of the merge base, or
+        :data:`None` if the payload doesn't contain one.
+    """
+    fields = _json_stream.iter_fields(chunks, (_MERGE_BASE_SHA_PATH,))
+    for _, sha in fields:
+        return sha
+    return None
+
+
+def _get_compare_page(slug, start, finish):
+    """Get the first page comparing two commits.
+
+    The page is streamed, unless responses are cached (see
+    :func:`get_cache`): it only lists a single commit, so it is read in
+    full and stored, and a repeat lookup is answered from the cache
+    (or with a ``304``, which doesn't count against the rate limit).
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        start (str): The start commit in a range.
+        finish (str): The last commit in a range.
+
+    Returns:
+        requests.Response: The (successful) response.
+
+    Raises:
+        requests.exceptions.HTTPError: If the GitHub API request fails.
+    """
+    return _get(compare_page_url(slug, start, finish),
+                stream=get_cache() is None)
+
+
+def compare_merge_base(slug, start, finish):
+    """Get the merge base of two commits from the GitHub API.
+
+    Only the first (single commit) page of the comparison is requested
+    and (unless responses are cached) the download stops as soon as the
+    merge base has been read, so the commits and patches in the payload
+    are never transferred in full.
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        start (str): The start commit in a range.
+        finish (str): The last commit in a range.
+
+    Returns:
+        Optional[str]: The commit SHA of the merge base, or
+        :data:`None` if the payload doesn't contain one.
+
+    Raises:
+        requests.exceptions.HTTPError: If the GitHub API request fails.
+    """
+    response = _get_compare_page(slug, start, finish)
+    try:
+        return read_merge_base(
+            response.iter_content(chunk_size=_CHUNK_SIZE))
+    finally:
+        response.close()
+
+
+def _iter_paginated(api_url, path):
+    """Stream the values at a path from every page of a response.
+
+    Follows the ``Link`` header through every page. Each page is
+    stream-parsed, so only the requested values are held in memory.
+
+    Args:
+        api_url (str): The URL of the first page.
+        path (tuple): The path of the values to report (as in
+            :func:`~._json_stream.iter_fields`).
+
+    Yields:
+        Union[str, int, float, bool, None]: Each distinct value (once,
+        even if it appears on more than one page).
+
+    Raises:
+        requests.exceptions.HTTPError: If a GitHub API request fails.
+    """
+    seen = set()
+    while api_url is not None:
+        response = _get(api_url, stream=True)
+        try:
+            for value in _iter_values(response, path):
+                if value not in seen:
+                    seen.add(value)
+                    yield value
+            api_url = response.links.get(_NEXT_LINK, {}).get('url')
+        finally:
+            response.close()
+
+
+def iter_compare_files(slug, start, finish):
+    """Iterate over the files changed between two commits.
+
+    Only the first page of the comparison is requested, since GitHub
+    only lists the files there (later pages only list more commits).
+    Unless responses are cached, the page is streamed, so only the
+    filenames (and not the commits or patches) are ever held in memory.
+
+    .. note::
+
+        GitHub includes at most :data:`COMPARE_FILES_LIMIT` files in
+        a comparison.
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        start (str): The start commit in a range.
+        finish (str): The last commit in a range.
+
+    Yields:
+        str: Each changed filename.
+
+    Raises:
+        requests.exceptions.HTTPError: If the GitHub API request fails.
+    """
+    response = _get_compare_page(slug, start, finish)
+    try:
+        for filename in _iter_values(response, _FILENAME_PATH):
+            yield filename
+    finally:
+        response.close()
+
+
+def iter_pr_files(slug, pr_id, per_page=_FILES_PER_PAGE):
+    """Iterate over the files changed in a pull request.
+
+    .. note::
+
+        GitHub lists at most :data:`PR_FILES_LIMIT` files for a pull
+        request.
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        pr_id (int): The pull request ID.
+        per_page (Optional[int]): The number of files to request per
+            page.
+
+    Yields:
+        str: Each changed filename.
+
+    Raises:
+        requests.exceptions.HTTPError: If a GitHub API request fails.
+    """
+    api_url = _GH_PR_FILES_TEMPLATE.format(slug, pr_id, per_page)
+    return _iter_paginated(api_url, _PR_FILENAME_PATH)
 
 
 def pr_info(slug, pr_id):
@@ -117,10 +658,101 @@ def pr_info(slug, pr_id):
     Raises:
         requests.exceptions.HTTPError: If the GitHub API request fails.
     """
-    api_url = _GH_PR_TEMPLATE.format(slug, pr_id)
+    return _get(pr_url(slug, pr_id)).json()
+
+
+def graphql(query, variables=None):
+    """Make a request to the GitHub GraphQL API.
 
-    headers = _get_headers()
-    response = requests.get(api_url, headers=headers)
+    .. note::
+
+        Unlike the REST API, the GraphQL API requires authentication
+        (see :data:`~.environment_vars.GH_TOKEN`).
+
+    Args:
+        query (str): The GraphQL query.
+        variables (Optional[dict]): The values of the variables used in
+            the query.
+
+    Returns:
+        dict: The ``data`` in the response.
+
+    Raises:
+        requests.exceptions.HTTPError: If the GitHub API request fails.
+        ValueError: If the response reports errors in the query.
+    """
+    payload = {'query': query, 'variables': variables or {}}
+    response = get_scheduler().send(
+        get_session().post, _GH_GRAPHQL_URL, headers=_get_headers(),
+        json=payload, resource=_rate_limit.GRAPHQL_RESOURCE)
     _maybe_fail(response)
+    result = response.json()
+    if result.get('errors'):
+        raise ValueError('GraphQL request failed', result['errors'])
+    return result['data']
+
+
+def _parse_batch_pr(info):
+    """Convert the GraphQL result for a pull request.
+
+    Args:
+        info (dict): The fields of a ``PullRequest``.
 
-    return response.json()
+    Returns:
+        dict: The pull request information.
+    """
+    files = info['files']
+    merge_commit = info['mergeCommit'] or {}
+    paths = [node['path'] for node in files['nodes']]
+    return {
+        'base_sha': info['baseRefOid'],
+        'head_sha': info['headRefOid'],
+        'merged': info['merged'],
+        'mergeable': info['mergeable'],
+        'state': info['state'],
+        'merge_commit_sha': merge_commit.get('oid'),
+        'files': paths,
+        'files_complete': len(paths) >= files['totalCount'],
+    }
+
+
+def pr_batch_info(slug, pr_ids, files_limit=_GRAPHQL_FILES_LIMIT):
+    """Get info about several pull requests in a single request.
+
+    Uses the GraphQL API, so the base and head SHAs, the merge state
+    and the changed files of every pull request are fetched in one
+    round trip (rather than one or more REST requests per pull
+    request).
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        pr_ids (Iterable[int]): The pull request IDs.
+        files_limit (Optional[int]): The maximum number of files to
+            list for each pull request (at most 100).
+
+    Returns:
+        Dict[int, dict]: The information for each pull request, with
+        keys ``base_sha``, ``head_sha``, ``merged``, ``mergeable``,
+        ``state``, ``merge_commit_sha`` (:data:`None` unless merged),
+        ``files`` and ``files_complete`` (indicating if ``files``
+        contains every changed file).
+
+    Raises:
+        requests.exceptions.HTTPError: If the GitHub API request fails.
+        ValueError: If the response reports errors (e.g. a pull
+            request does not exist).
+    """
+    pr_ids = sorted(set(pr_ids))
+    if not pr_ids:
+        return {}
+    owner, name = slug.split('/', 1)
+    fields = '\n'.join(
+        _GRAPHQL_PR_TEMPLATE.format(pr_id, files_limit) for pr_id in pr_ids)
+    query = _GRAPHQL_QUERY_TEMPLATE.format(fields)
+    data = graphql(query, {'owner': owner, 'name': name})
+    repository = data['repository']
+    return {
+        pr_id: _parse_batch_pr(repository['pr{:d}'.format(pr_id)])
+        for pr_id in pr_ids
+    }
@@ -0,0 +1,272 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persistent cache for (conditional) GitHub API requests.
+
+Each response is stored in its own file, keyed by a hash of the URL
+and of the credentials used (so that responses are never shared
+between tokens and the token itself is never written to disk). The
+least recently used entries are evicted once the cache grows past a
+number of entries or a total size.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import requests
+from requests import structures
+from six.moves import http_client
+
+from ci_diff_helper import _utils
+
+
+_AUTH_HEADER = 'Authorization'
+_ETAG_HEADER = 'ETag'
+_LAST_MODIFIED_HEADER = 'Last-Modified'
+_IF_NONE_MATCH_HEADER = 'If-None-Match'
+_IF_MODIFIED_SINCE_HEADER = 'If-Modified-Since'
+_ENTRY_SUFFIX = '.json'
+_MAX_ENTRIES = 512
+_MAX_BYTES = 64 * 1024 * 1024
+
+
+class CacheEntry(object):
+    """A cached GitHub API response.
+
+    Args:
+        url (str): The URL that was requested.
+        body (bytes): The body of the response.
+        etag (Optional[str]): The ``ETag`` of the response.
+        last_modified (Optional[str]): The ``Last-Modified`` header of
+            the response.
+        stored_at (float): The time the response was (last)
+            validated, as a UNIX timestamp.
+    """
+
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'stored_at')
+
+    def __init__(self, url, body, etag, last_modified, stored_at):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    def conditional_headers(self):
+        """Get the headers for a conditional request.
+
+        Returns:
+            dict: The ``If-None-Match`` and / or ``If-Modified-Since``
+            headers.
+        """
+        headers = {}
+        if self.etag is not None:
+            headers[_IF_NONE_MATCH_HEADER] = self.etag
+        if self.last_modified is not None:
+            headers[_IF_MODIFIED_SINCE_HEADER] = self.last_modified
+        return headers
+
+    def to_response(self):
+        """Convert the entry into a (successful) response.
+
+        Returns:
+            requests.Response: The response.
+        """
+        response = requests.Response()
+        response.status_code = http_client.OK
+        response.url = self.url
+        response.headers = structures.CaseInsensitiveDict()
+        if self.etag is not None:
+            response.headers[_ETAG_HEADER] = self.etag
+        if self.last_modified is not None:
+            response.headers[_LAST_MODIFIED_HEADER] = self.last_modified
+        # pylint: disable=protected-access
+        response._content = self.body
+        # Allow ``iter_content()`` to re-use the body.
+        response._content_consumed = True
+        # pylint: enable=protected-access
+        return response
+
+    def to_json(self):
+        """Serialize the entry.
+
+        Returns:
+            bytes: The serialized entry.
+        """
+        info = {
+            'url': self.url,
+            'body': self.body.decode('utf-8'),
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'stored_at': self.stored_at,
+        }
+        return json.dumps(info).encode('utf-8')
+
+    @classmethod
+    def from_json(cls, serialized):
+        """Deserialize an entry.
+
+        Args:
+            serialized (bytes): The output of :meth:`to_json`.
+
+        Returns:
+            CacheEntry: The entry.
+        """
+        info = json.loads(serialized.decode('utf-8'))
+        return cls(info['url'], info['body'].encode('utf-8'),
+                   info['etag'], info['last_modified'], info['stored_at'])
+
+
+class ResponseCache(object):
+    """A size-bounded, on-disk cache of GitHub API responses.
+
+    Args:
+        directory (str): The directory holding the cache. Created if
+            it doesn't exist.
+        ttl (Optional[float]): The number of seconds for which a cached
+            response is used without contacting GitHub. If not
+            provided, every use is re-validated via a conditional
+            request.
+        max_entries (Optional[int]): The maximum number of responses
+            to keep.
+        max_bytes (Optional[int]): The maximum total size (in bytes) of
+            the stored responses.
+    """
+
+    def __init__(self, directory, ttl=None, max_entries=_MAX_ENTRIES,
+                 max_bytes=_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, url, headers):
+        """Get the path of the file for a request.
+
+        Args:
+            url (str): The URL being requested.
+            headers (dict): The headers of the request. Only the
+                ``Authorization`` header is used (and only a hash of
+                it ends up in the key).
+
+        Returns:
+            str: The path of the cache entry.
+        """
+        identity = headers.get(_AUTH_HEADER) or ''
+        identity_hash = hashlib.sha256(identity.encode('utf-8')).hexdigest()
+        key = hashlib.sha256(
+            (identity_hash + '\n' + url).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + _ENTRY_SUFFIX)
+
+    def get(self, url, headers):
+        """Look up a cached response.
+
+        Also marks the entry as recently used.
+
+        Args:
+            url (str): The URL being requested.
+            headers (dict): The headers of the request.
+
+        Returns:
+            Optional[CacheEntry]: The cached entry, if any.
+        """
+        path = self._path(url, headers)
+        try:
+            with open(path, 'rb') as file_obj:
+                entry = CacheEntry.from_json(file_obj.read())
+            os.utime(path, None)
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        """Check if an entry can be used without re-validating it.
+
+        Args:
+            entry (CacheEntry): A cached entry.
+
+        Returns:
+            bool: Flag indicating if the entry is within the TTL.
+        """
+        if self.ttl is None:
+            return False
+        return time.time() - entry.stored_at < self.ttl
+
+    def _write(self, url, headers, entry):
+        """Store an entry and evict old entries if needed.
+
+        Args:
+            url (str): The URL that was requested.
+            headers (dict): The headers of the request.
+            entry (CacheEntry): The entry to store.
+        """
+        _utils.atomic_write(self._path(url, headers), entry.to_json())
+        self._evict()
+
+    def put(self, url, headers, response):
+        """Store a response (if it can be re-validated or has a TTL).
+
+        Args:
+            url (str): The URL that was requested.
+            headers (dict): The headers of the request.
+            response (requests.Response): A successful response.
+        """
+        etag = response.headers.get(_ETAG_HEADER)
+        last_modified = response.headers.get(_LAST_MODIFIED_HEADER)
+        if etag is None and last_modified is None and self.ttl is None:
+            return
+        entry = CacheEntry(
+            url, response.content, etag, last_modified, time.time())
+        self._write(url, headers, entry)
+
+    def refresh(self, url, headers, entry):
+        """Mark an entry as validated (e.g. after a ``304``).
+
+        Args:
+            url (str): The URL that was requested.
+            headers (dict): The headers of the request.
+            entry (CacheEntry): The entry that was validated.
+        """
+        entry.stored_at = time.time()
+        self._write(url, headers, entry)
+
+    def _evict(self):
+        """Remove the least recently used entries beyond the limits."""
+        entries = []
+        total_bytes = 0
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(_ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat_result = os.stat(path)
+            except OSError:  # pragma: NO COVER
+                continue
+            entries.append((stat_result.st_mtime, path, stat_result.st_size))
+            total_bytes += stat_result.st_size
+
+        entries.sort()
+        num_entries = len(entries)
+        for _, path, size in entries:
+            if (num_entries <= self.max_entries and
+                    total_bytes <= self.max_bytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:  # pragma: NO COVER
+                pass
+            num_entries -= 1
+            total_bytes -= size
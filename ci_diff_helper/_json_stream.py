@@ -0,0 +1,179 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Pick scalar fields out of a JSON document as it is downloaded.
+
+Large GitHub API payloads (e.g. a comparison including every patch)
+are mostly data that is never used. Rather than decoding the whole
+document into nested dictionaries, :func:`iter_fields` tokenizes the
+raw bytes chunk by chunk and only decodes the values at the requested
+paths, so memory use is bounded by the largest single token (rather
+than the size of the document) and the caller can stop reading as
+soon as it has what it needs.
+
+The input is assumed to be well-formed JSON (e.g. a successful API
+response); it is not fully validated.
+"""
+
+import json
+import re
+
+
+_TOKEN = re.compile(
+    br'[ \t\r\n]*(?:'
+    br'([{}\[\]:,])|'  # Structural character.
+    br'("[^"\\]*(?:\\.[^"\\]*)*")|'  # String.
+    br'([^ \t\r\n{}\[\]:,"]+)'  # Number, ``true``, ``false`` or ``null``.
+    br')')
+_WHITESPACE = b' \t\r\n'
+_OBJECT_START = b'{'
+_ARRAY_START = b'['
+_CONTAINER_END = (b'}', b']')
+_KEY_SEPARATOR = b':'
+_ITEM_SEPARATOR = b','
+_ESCAPE = b'\\'
+_NO_KEY = object()
+
+
+class _Tokenizer(object):
+    """Split a stream of bytes into JSON tokens.
+
+    Args:
+        chunks (Iterable[bytes]): The document, in pieces.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+        self._pos = 0
+        self._done = False
+
+    def _fill(self):
+        """Read more of the document into the buffer.
+
+        At least doubles the unread part of the buffer (so that a long
+        token spanning many chunks is not re-scanned once per chunk).
+
+        Returns:
+            bool: Flag indicating if more data was read.
+        """
+        pieces = [self._buffer[self._pos:]]
+        wanted = max(len(pieces[0]), 1)
+        added = 0
+        for chunk in self._chunks:
+            pieces.append(chunk)
+            added += len(chunk)
+            if added >= wanted:
+                break
+        else:
+            self._done = True
+        self._buffer = b''.join(pieces)
+        self._pos = 0
+        return added > 0
+
+    def __iter__(self):
+        """Iterate over the tokens.
+
+        Yields:
+            Tuple[Optional[bytes], Optional[bytes], Optional[bytes]]:
+            Each token, as a triple of a structural character, a
+            (still quoted and escaped) string and any other literal.
+            Exactly one of the three is set.
+
+        Raises:
+            ValueError: If the document contains invalid characters or
+                ends in the middle of a token.
+        """
+        while True:
+            match = _TOKEN.match(self._buffer, self._pos)
+            # A match ending at the end of the buffer may be a
+            # truncated literal (e.g. ``12`` out of ``123``).
+            if (match is None or
+                    match.end() == len(self._buffer)) and not self._done:
+                self._fill()
+                continue
+            if match is None:
+                if self._buffer[self._pos:].strip(_WHITESPACE):
+                    raise ValueError('Invalid JSON', self._buffer[self._pos:])
+                return
+            self._pos = match.end()
+            yield match.groups()
+
+
+def _decode_key(token):
+    """Decode an object key.
+
+    Args:
+        token (bytes): The quoted key.
+
+    Returns:
+        str: The key.
+    """
+    if _ESCAPE in token:
+        return json.loads(token.decode('utf-8'))
+    return token[1:-1].decode('utf-8')
+
+
+def iter_fields(chunks, paths):
+    """Iterate over the scalar values at some paths in a JSON document.
+
+    A path is a tuple of object keys, with :data:`None` standing for
+    any item of an array. For example, in a GitHub comparison
+    ``('merge_base_commit', 'sha')`` is the SHA of the merge base and
+    ``('files', None, 'filename')`` is the name of each changed file.
+
+    Values which are objects or arrays are not reported.
+
+    Args:
+        chunks (Iterable[bytes]): The document, in pieces (e.g. from
+            :meth:`requests.Response.iter_content`).
+        paths (Iterable[tuple]): The paths to report.
+
+    Yields:
+        Tuple[tuple, Union[str, int, float, bool, None]]: Each path
+        and the value found there, in document order.
+
+    Raises:
+        ValueError: If the document is not valid JSON.
+    """
+    paths = frozenset(paths)
+    # The innermost container is last.
+    containers = []
+    # The key of each object, or ``None`` for an array.
+    path = []
+    expecting_key = False
+    for structural, string, literal in _Tokenizer(chunks):
+        if structural is not None:
+            if structural == _OBJECT_START:
+                containers.append(structural)
+                path.append(_NO_KEY)
+                expecting_key = True
+            elif structural == _ARRAY_START:
+                containers.append(structural)
+                path.append(None)
+            elif structural in _CONTAINER_END:
+                containers.pop()
+                path.pop()
+                expecting_key = False
+            elif structural == _KEY_SEPARATOR:
+                expecting_key = False
+            elif structural == _ITEM_SEPARATOR:
+                expecting_key = containers[-1] == _OBJECT_START
+            continue
+
+        if expecting_key:
+            path[-1] = _decode_key(string)
+            continue
+        current = tuple(path)
+        if current in paths:
+            value = string if literal is None else literal
+            yield current, json.loads(value.decode('utf-8'))
@@ -0,0 +1,158 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rate limit budget shared by every process on a host.
+
+When many builds on the same machine share one GitHub token, each
+process only sees the responses to its own requests. A :class:`Ledger`
+is a small memory-mapped file (one per token, keyed by a hash of the
+credentials) holding the most recent view of the budget. Every update
+and every request sent goes through the ledger while holding an
+exclusive file lock, so all processes pace themselves against the
+same numbers.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+
+from ci_diff_helper import _utils
+
+
+# limit, remaining, reset (UNIX time) and the time the last request was
+# sent. A zero means "unknown".
+_RECORD = struct.Struct('<qqqd')
+_LEDGER_SUFFIX = '.ledger'
+_FILE_MODE = 0o600
+
+
+def _to_state(values):
+    """Convert a raw record into a budget.
+
+    Args:
+        values (Tuple[int, int, int, float]): The unpacked record.
+
+    Returns:
+        Tuple[Optional[int], Optional[int], Optional[int], \
+        Optional[float]]: The limit, remaining requests, reset time and
+        the time the last request was sent (:data:`None` if unknown).
+    """
+    limit, remaining, reset, last_sent = values
+    if not reset:
+        remaining = None
+    return (limit or None, remaining, reset or None, last_sent or None)
+
+
+class Ledger(object):
+    """A rate limit budget shared across processes.
+
+    Args:
+        directory (str): The directory holding the ledger files.
+            Created if it doesn't exist.
+        identity (Optional[str]): The credentials the budget belongs
+            to (e.g. the ``Authorization`` header). Only a hash of it
+            is used in the filename.
+    """
+
+    def __init__(self, directory, identity=''):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        key = hashlib.sha256(identity.encode('utf-8')).hexdigest()
+        self.path = os.path.join(directory, key + _LEDGER_SUFFIX)
+        self._file_desc = os.open(
+            self.path, os.O_RDWR | os.O_CREAT, _FILE_MODE)
+        with _utils.locked(self._file_desc):
+            size = os.fstat(self._file_desc).st_size
+            if size < _RECORD.size:
+                os.lseek(self._file_desc, size, os.SEEK_SET)
+                os.write(self._file_desc, b'\0' * (_RECORD.size - size))
+        self._data = mmap.mmap(self._file_desc, _RECORD.size)
+
+    def _read(self):
+        """Read the raw record. The caller must hold the lock.
+
+        Returns:
+            Tuple[int, int, int, float]: The unpacked record.
+        """
+        return _RECORD.unpack_from(self._data, 0)
+
+    def _write(self, values):
+        """Write the raw record. The caller must hold the lock.
+
+        Args:
+            values (Tuple[int, int, int, float]): The record.
+        """
+        _RECORD.pack_into(self._data, 0, *values)
+
+    def read(self):
+        """Read the shared budget.
+
+        Returns:
+            Tuple[Optional[int], Optional[int], Optional[int], \
+            Optional[float]]: The limit, remaining requests, reset time
+            and the time the last request was sent.
+        """
+        with _utils.locked(self._file_desc):
+            return _to_state(self._read())
+
+    def update(self, limit, remaining, reset):
+        """Merge the rate limit headers of a response into the budget.
+
+        Responses may arrive out of order, so within a window the
+        lowest ``remaining`` wins and headers from an earlier window
+        are ignored.
+
+        Args:
+            limit (Optional[int]): The ``X-RateLimit-Limit`` header.
+            remaining (int): The ``X-RateLimit-Remaining`` header.
+            reset (int): The ``X-RateLimit-Reset`` header.
+
+        Returns:
+            Tuple[Optional[int], Optional[int], Optional[int], \
+            Optional[float]]: The merged budget (as in :meth:`read`).
+        """
+        with _utils.locked(self._file_desc):
+            values = self._read()
+            stored_limit, stored_remaining, stored_reset, last_sent = values
+            if reset > stored_reset:
+                values = (limit or stored_limit, remaining, reset, last_sent)
+            elif reset == stored_reset and remaining < stored_remaining:
+                values = (limit or stored_limit, remaining, reset, last_sent)
+            self._write(values)
+            return _to_state(values)
+
+    def acquire(self, now):
+        """Record that a request is being sent.
+
+        Args:
+            now (float): The current UNIX time.
+
+        Returns:
+            Tuple[Optional[int], Optional[int], Optional[int], \
+            Optional[float]]: The budget (as in :meth:`read`) after
+            accounting for the request.
+        """
+        with _utils.locked(self._file_desc):
+            limit, remaining, reset, _ = self._read()
+            if reset > now and remaining > 0:
+                remaining -= 1
+            values = (limit, remaining, reset, now)
+            self._write(values)
+            return _to_state(values)
+
+    def close(self):
+        """Unmap and close the ledger file."""
+        if self._data is not None:
+            self._data.close()
+            os.close(self._file_desc)
+            self._data = None
@@ -0,0 +1,335 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rate limit aware scheduling of GitHub API requests.
+
+Every response carries ``X-RateLimit-Remaining`` and
+``X-RateLimit-Reset`` headers. The :class:`Scheduler` uses them to
+model the remaining budget as a token bucket which is refilled at the
+reset time. When the budget runs low, requests are spaced out evenly
+over the rest of the window (rather than failing once it is used up).
+
+Rate limited responses (``403`` or ``429``, including secondary rate
+limits which send ``Retry-After``) are retried once the limit resets
+and server errors (``5xx``) are retried with jittered exponential
+backoff, as long as the total wait fits within a deadline.
+
+A scheduler can keep its budget in a :class:`~._rate_ledger.Ledger`
+so that every process on a host using the same token shares it.
+
+Only the budget of the REST API (the ``core`` resource) is tracked.
+Other resources (e.g. the points of the GraphQL API) are limited
+separately by GitHub, so requests for them are not paced against (and
+their headers don't update) that budget. They are still retried.
+"""
+
+import random
+import threading
+import time
+
+from six.moves import http_client
+
+
+REMAINING_HEADER = 'X-RateLimit-Remaining'
+LIMIT_HEADER = 'X-RateLimit-Limit'
+RESET_HEADER = 'X-RateLimit-Reset'
+RESOURCE_HEADER = 'X-RateLimit-Resource'
+RETRY_AFTER_HEADER = 'Retry-After'
+CORE_RESOURCE = 'core'
+GRAPHQL_RESOURCE = 'graphql'
+_RATE_LIMITED_STATUSES = (
+    http_client.FORBIDDEN,
+    429,  # Too Many Requests, not in ``httplib`` on Python 2.7.
+)
+_MAX_RETRIES = 3
+_DEADLINE = 60.0
+_BACKOFF_BASE = 1.0
+_BACKOFF_CAP = 16.0
+_LOW_WATER_FRACTION = 0.1
+
+
+def _header_int(headers, name):
+    """Parse an integer header.
+
+    Args:
+        headers (Mapping[str, str]): The response headers.
+        name (str): The header name.
+
+    Returns:
+        Optional[int]: The value, or :data:`None` if the header is
+        missing or not an integer.
+    """
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+class Scheduler(object):
+    """Space out and retry requests based on the rate limit headers.
+
+    Args:
+        max_retries (Optional[int]): The maximum number of times a
+            request is retried.
+        deadline (Optional[float]): The maximum total number of seconds
+            spent waiting (across pacing and retries) for a single
+            request.
+        low_water_fraction (Optional[float]): The fraction of the limit
+            below which requests are spaced out over the rest of the
+            rate limit window.
+        clock (Optional[Callable[[], float]]): Returns the current UNIX
+            time. Defaults to :func:`time.time`.
+        sleep (Optional[Callable[[float], None]]): Waits for a number
+            of seconds. Defaults to :func:`time.sleep`.
+        ledger (Optional[~._rate_ledger.Ledger]): A budget shared with
+            other processes. If provided, it is consulted before every
+            request and updated from every response.
+    """
+
+    def __init__(self, max_retries=_MAX_RETRIES, deadline=_DEADLINE,
+                 low_water_fraction=_LOW_WATER_FRACTION, clock=time.time,
+                 sleep=time.sleep, ledger=None):
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.low_water_fraction = low_water_fraction
+        self._clock = clock
+        self._sleep = sleep
+        self.ledger = ledger
+        self._lock = threading.Lock()
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+        self._last_sent = None
+
+    def _load(self, state):
+        """Replace the budget with the state of the ledger.
+
+        Args:
+            state (Tuple[Optional[int], Optional[int], Optional[int], \
+            Optional[float]]): The limit, remaining requests, reset time
+                and the time the last request was sent.
+        """
+        with self._lock:
+            self.limit, self.remaining, self.reset, self._last_sent = state
+
+    def update(self, headers):
+        """Update the budget from the headers of a response.
+
+        Responses which report the budget of a resource other than the
+        REST API (see :data:`RESOURCE_HEADER`) are ignored.
+
+        Args:
+            headers (Mapping[str, str]): The response headers.
+        """
+        if headers.get(RESOURCE_HEADER, CORE_RESOURCE) != CORE_RESOURCE:
+            return
+        remaining = _header_int(headers, REMAINING_HEADER)
+        reset = _header_int(headers, RESET_HEADER)
+        if remaining is None or reset is None:
+            return
+        limit = _header_int(headers, LIMIT_HEADER)
+        if self.ledger is not None:
+            self._load(self.ledger.update(limit, remaining, reset))
+            return
+        with self._lock:
+            self.limit = limit
+            self.remaining = remaining
+            self.reset = reset
+
+    def delay(self):
+        """Compute how long to wait before sending the next request.
+
+        Returns:
+            float: The number of seconds to wait.
+        """
+        if self.ledger is not None:
+            self._load(self.ledger.read())
+        now = self._clock()
+        with self._lock:
+            if self.remaining is None or self.reset <= now:
+                # Unknown budget, or the window has been refilled.
+                return 0.0
+            window = self.reset - now
+            if self.remaining <= 0:
+                return window
+            low_water = (self.limit or 0) * self.low_water_fraction
+            if self.remaining > low_water or self._last_sent is None:
+                return 0.0
+            interval = window / self.remaining
+            return max(0.0, self._last_sent + interval - now)
+
+    def _acquire(self):
+        """Record that a request is being sent."""
+        if self.ledger is not None:
+            self._load(self.ledger.acquire(self._clock()))
+            return
+        with self._lock:
+            if self.remaining is not None and self.remaining > 0:
+                self.remaining -= 1
+            self._last_sent = self._clock()
+
+    def _retry_delay(self, response, attempt):
+        """Decide if (and when) a failed request should be retried.
+
+        Args:
+            response (requests.Response): The response.
+            attempt (int): The number of retries so far.
+
+        Returns:
+            Optional[float]: The number of seconds to wait before
+            retrying, or :data:`None` if the response should not be
+            retried.
+        """
+        status_code = response.status_code
+        if status_code in _RATE_LIMITED_STATUSES:
+            retry_after = _header_int(response.headers, RETRY_AFTER_HEADER)
+            if retry_after is not None:
+                return float(retry_after)
+            if _header_int(response.headers, REMAINING_HEADER) == 0:
+                reset = _header_int(response.headers, RESET_HEADER)
+                if reset is not None:
+                    return max(0.0, reset - self._clock())
+            # Forbidden for some other reason (e.g. permissions).
+            return None
+        if status_code >= http_client.INTERNAL_SERVER_ERROR:
+            backoff = min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt)
+            return random.uniform(0, backoff)
+        return None
+
+    def attempts(self, resource=CORE_RESOURCE):
+        """Start pacing and retrying a single request.
+
+        Args:
+            resource (Optional[str]): The rate limited resource the
+                request counts against.
+
+        Returns:
+            Attempts: The attempts to send the request.
+        """
+        return Attempts(self, resource=resource)
+
+    def send(self, func, *args, **kwargs):
+        """Send a request, pacing and retrying as needed.
+
+        Args:
+            func (Callable[..., requests.Response]): Sends the request
+                (e.g. :meth:`requests.Session.get`).
+            args (tuple): Positional arguments for ``func``.
+            kwargs (dict): Keyword arguments for ``func``. The
+                ``resource`` keyword argument is not passed along: it
+                names the rate limited resource the request counts
+                against (defaults to :data:`CORE_RESOURCE`). Only
+                requests for the core resource are paced.
+
+        Returns:
+            requests.Response: The last response. If the request could
+            not be retried within the deadline, this is the failed
+            response.
+        """
+        attempts = self.attempts(kwargs.pop('resource', CORE_RESOURCE))
+        delay = attempts.first_delay()
+        while True:
+            if delay > 0:
+                self._sleep(delay)
+            attempts.start()
+            response = func(*args, **kwargs)
+            delay = attempts.retry_delay(response)
+            if delay is None:
+                return response
+            # Read the (error) body of a streamed response, so that
+            # its connection goes back to the pool.
+            response.content  # pylint: disable=pointless-statement
+
+
+class Attempts(object):
+    """The pacing and retries of a single request.
+
+    Nothing is sent (or waited for) here, so that both the blocking
+    (:meth:`Scheduler.send`) and the non-blocking (:mod:`~.aio`) APIs
+    can share the decisions:
+
+    .. code-block:: python
+
+      attempts = scheduler.attempts()
+      delay = attempts.first_delay()
+      while delay is not None:
+          wait(delay)
+          attempts.start()
+          response = send_request()
+          delay = attempts.retry_delay(response)
+
+    Args:
+        scheduler (Scheduler): The scheduler tracking the budget.
+        resource (Optional[str]): The rate limited resource the
+            request counts against. Only requests for
+            :data:`CORE_RESOURCE` are paced.
+    """
+
+    def __init__(self, scheduler, resource=CORE_RESOURCE):
+        self.scheduler = scheduler
+        self.core = resource == CORE_RESOURCE
+        self.attempt = 0
+        self.waited = 0.0
+
+    def _wait(self, delay):
+        """Limit a delay to the rest of the deadline and account for it.
+
+        Args:
+            delay (float): The number of seconds to wait.
+
+        Returns:
+            float: The number of seconds to actually wait.
+        """
+        delay = max(0.0, min(delay, self.scheduler.deadline - self.waited))
+        self.waited += delay
+        return delay
+
+    def first_delay(self):
+        """Compute how long to wait before the first attempt.
+
+        Returns:
+            float: The number of seconds to wait.
+        """
+        if not self.core:
+            return 0.0
+        return self._wait(self.scheduler.delay())
+
+    def start(self):
+        """Record that an attempt is being sent."""
+        if self.core:
+            self.scheduler._acquire()  # pylint: disable=protected-access
+
+    def retry_delay(self, response):
+        """Handle the response to an attempt.
+
+        Args:
+            response (requests.Response): The response.
+
+        Returns:
+            Optional[float]: The number of seconds to wait before
+            retrying, or :data:`None` if the response is final (it
+            succeeded, can't be retried or the retries are used up).
+        """
+        scheduler = self.scheduler
+        scheduler.update(response.headers)
+        if self.attempt >= scheduler.max_retries:
+            return None
+        # pylint: disable=protected-access
+        delay = scheduler._retry_delay(response, self.attempt)
+        # pylint: enable=protected-access
+        if delay is None or self.waited + delay > scheduler.deadline:
+            return None
+        self.attempt += 1
+        return self._wait(delay)
@@ -0,0 +1,558 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Command runner backends used by :func:`._utils.check_output`.
+
+A runner is any object with a ``check_output(args, ignore_err=False)``
+method and a ``close()`` method. The default runner simply forks a
+new process for every command. The batch runner keeps long-lived
+``git cat-file`` processes around and answers object queries (e.g.
+``git rev-parse``, ``git log --no-walk``) from them, falling
+back to a new process for any command it can't batch. The Python
+runner answers the same queries by reading the ``.git`` directory
+directly, without any processes at all.
+"""
+
+import os
+import re
+import subprocess
+import threading
+
+from ci_diff_helper import _git_objects
+
+
+_GIT_MISSING_STATUS = 128
+_BATCH_CHECK_ARGS = ('git', 'cat-file', '--batch-check')
+_BATCH_ARGS = ('git', 'cat-file', '--batch')
+_COMMIT_SUFFIX = '^{commit}'
+_SHOW_TOPLEVEL_ARGS = ('git', 'rev-parse', '--show-toplevel')
+_SHALLOW_PATH_ARGS = ('git', 'rev-parse', '--git-path', 'shallow')
+_FULL_SHA_REGEX = re.compile(r'^[0-9a-fA-F]{40}$')
+COMMIT_FORMAT = '%H%n%T%n%P%n%at%n%ct%n%s'
+"""The ``git log`` format used to describe a commit (one field per line)."""
+COMMIT_INFO_ARGS = (
+    'git', 'log', '--no-walk=unsorted', '-z', '--format=' + COMMIT_FORMAT)
+"""Command (without revisions) used to describe commits.
+
+The output has a NUL-terminated record in :data:`COMMIT_FORMAT` for
+each (distinct) commit.
+"""
+
+
+def decode_output(cmd_output):
+    """Convert raw command output into a stripped string.
+
+    Args:
+        cmd_output (bytes): The raw STDOUT from a command.
+
+    Returns:
+        str: The decoded output, stripped of surrounding whitespace.
+    """
+    # On Python 3, STDOUT is bytes, so we convert to a string.
+    cmd_output_str = cmd_output.decode('utf-8')
+    # Also strip the output since it usually has a trailing newline.
+    return cmd_output_str.strip()
+
+
+def parse_commit(raw_commit):
+    """Parse the contents of a raw ``git`` commit object.
+
+    Args:
+        raw_commit (bytes): The contents of a commit object, as
+            returned by ``git cat-file commit``.
+
+    Returns:
+        Tuple[dict, bytes]: Pair of the headers (a dictionary of lists
+        of values, since headers like ``parent`` may repeat) and the
+        commit message.
+    """
+    headers = {}
+    header_block, _, message = raw_commit.partition(b'\n\n')
+    last_key = None
+    for line in header_block.split(b'\n'):
+        if line.startswith(b' ') and last_key is not None:
+            # Continuation line (e.g. in a ``gpgsig`` header).
+            values = headers[last_key]
+            values[-1] += b'\n' + line[1:]
+            continue
+        key, _, value = line.partition(b' ')
+        last_key = key.decode('ascii')
+        headers.setdefault(last_key, []).append(value)
+    return headers, message
+
+
+def commit_subject(message):
+    """Compute the subject of a commit in the same way as ``git``.
+
+    ``git`` uses the first paragraph of the message (after skipping
+    leading blank lines), joining the lines in it with a space.
+
+    Args:
+        message (bytes): The message of a commit object.
+
+    Returns:
+        bytes: The commit subject.
+    """
+    lines = []
+    for line in message.split(b'\n'):
+        line = line.rstrip()
+        if line:
+            lines.append(line)
+        elif lines:
+            break
+    return b' '.join(lines)
+
+
+def _signature_time(signature):
+    """Get the timestamp from an ``author`` or ``committer`` header.
+
+    Args:
+        signature (bytes): A signature of the form
+            ``{name} <{email}> {timestamp} {tz_offset}``.
+
+    Returns:
+        bytes: The timestamp.
+    """
+    return signature.rsplit(b' ', 2)[1]
+
+
+def format_commit(sha, raw_commit, parents=None):
+    """Describe a commit in the same way as :data:`COMMIT_INFO_ARGS`.
+
+    Args:
+        sha (str): The SHA-1 hash of the commit.
+        raw_commit (bytes): The contents of the commit object.
+        parents (Optional[List[str]]): The parents of the commit, if
+            they differ from the parents in the commit object (e.g. at
+            the boundary of a shallow clone).
+
+    Returns:
+        str: The commit formatted with :data:`COMMIT_FORMAT`.
+    """
+    headers, message = parse_commit(raw_commit)
+    if parents is None:
+        parent_shas = headers.get('parent', [])
+    else:
+        parent_shas = [parent.encode('ascii') for parent in parents]
+    fields = [
+        sha.encode('ascii'),
+        headers['tree'][0],
+        b' '.join(parent_shas),
+        _signature_time(headers['author'][0]),
+        _signature_time(headers['committer'][0]),
+        commit_subject(message),
+    ]
+    return b'\n'.join(fields).decode('utf-8')
+
+
+def _missing_error(args):
+    """Create the error ``git`` would emit for an unknown object.
+
+    Args:
+        args (tuple): The command that could not be completed.
+
+    Returns:
+        subprocess.CalledProcessError: The error to be raised.
+    """
+    return subprocess.CalledProcessError(_GIT_MISSING_STATUS, list(args))
+
+
+class SubprocessRunner(object):
+    """Run every command in a newly forked process."""
+
+    @staticmethod
+    def check_output(args, ignore_err=False):
+        """Run a command on the operating system.
+
+        Args:
+            args (tuple): Arguments to pass to ``subprocess.check_output``.
+            ignore_err (Optional[bool]): Flag indicating if a failed
+                command should return :data:`None` (and swallow STDERR)
+                rather than raise.
+
+        Returns:
+            Optional[str]: The stripped STDOUT from the command.
+
+        Raises:
+            CalledProcessError: If ``ignore_err`` is not :data:`True` and
+                the system call fails.
+        """
+        try:
+            kwargs = {}
+            if ignore_err:
+                kwargs['stderr'] = subprocess.PIPE  # Swallow stderr.
+            cmd_output = subprocess.check_output(args, **kwargs)
+            return decode_output(cmd_output)
+        except subprocess.CalledProcessError:
+            if ignore_err:
+                return None
+            else:
+                raise
+
+    def close(self):
+        """Release any resources held by the runner.
+
+        A no-op, since no state is held between commands.
+        """
+
+
+class GitBatchRunner(SubprocessRunner):
+    """Answer ``git`` object queries from long-lived processes.
+
+    Keeps a ``git cat-file --batch-check`` process (for object names and
+    types) and a ``git cat-file --batch`` process (for object contents)
+    open and re-uses them for every query. The processes are started
+    lazily and re-started if the current working directory changes,
+    since that may change which repository is being queried.
+
+    Commands that can be answered from the batch processes are
+
+    * ``git rev-parse {rev}``
+    * ``git cat-file -t {rev}``
+    * ``git log --no-walk=unsorted -z --format=... {rev1} {rev2} ...``
+      (see :data:`COMMIT_INFO_ARGS`)
+
+    and everything else falls back to :class:`SubprocessRunner`.
+    """
+
+    def __init__(self):
+        self._procs = {}
+        self._cwd = None
+        self._devnull = None
+        self._shallow = None
+        # Queries on a batch process must not interleave.
+        self._lock = threading.Lock()
+
+    def _get_proc(self, batch_args):
+        """Get (or start) a ``git cat-file`` batch process.
+
+        Args:
+            batch_args (tuple): The command used to start the process.
+
+        Returns:
+            subprocess.Popen: The running process.
+        """
+        cwd = os.getcwd()
+        if cwd != self._cwd:
+            self.close()
+            self._cwd = cwd
+
+        proc = self._procs.get(batch_args)
+        if proc is None or proc.poll() is not None:
+            if self._devnull is None:
+                self._devnull = open(os.devnull, 'wb')
+            proc = subprocess.Popen(
+                batch_args, stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE, stderr=self._devnull)
+            self._procs[batch_args] = proc
+        return proc
+
+    def _query(self, batch_args, name):
+        """Send a single object name to a batch process.
+
+        Args:
+            batch_args (tuple): The command used to start the process.
+            name (str): The object name to query.
+
+        Returns:
+            Tuple[subprocess.Popen, Optional[Tuple[str, str, int]]]: The
+            process (in case the caller needs to read more output) and
+            the hash, type and size of the object. If the object is
+            missing (or ambiguous), the triple will be :data:`None`.
+        """
+        proc = self._get_proc(batch_args)
+        proc.stdin.write(name.encode('utf-8') + b'\n')
+        proc.stdin.flush()
+        header = proc.stdout.readline().decode('utf-8').split()
+        if len(header) != 3:
+            # E.g. ``{name} missing`` or ``{name} ambiguous``.
+            return proc, None
+        sha, obj_type, size = header
+        return proc, (sha, obj_type, int(size))
+
+    def object_info(self, name):
+        """Get the SHA-1 hash, type and size of a ``git`` object.
+
+        Args:
+            name (str): A ``git`` object name, any of a branch name, tag,
+                a commit SHA or a special reference.
+
+        Returns:
+            Optional[Tuple[str, str, int]]: The triple of hash, type
+            and size. If the object doesn't exist, returns :data:`None`.
+        """
+        _, info = self._query(_BATCH_CHECK_ARGS, name)
+        return info
+
+    def read_object(self, name):
+        """Read the contents of a ``git`` object.
+
+        Args:
+            name (str): A ``git`` object name, any of a branch name, tag,
+                a commit SHA or a special reference.
+
+        Returns:
+            Optional[Tuple[str, str, bytes]]: The triple of hash, type
+            and contents. If the object doesn't exist, returns
+            :data:`None`.
+        """
+        proc, info = self._query(_BATCH_ARGS, name)
+        if info is None:
+            return None
+        sha, obj_type, size = info
+        # NOTE: The contents are followed by a newline.
+        contents = proc.stdout.read(size + 1)[:-1]
+        return sha, obj_type, contents
+
+    def _rev_parse(self, rev):
+        """Resolve a revision into a SHA-1 hash.
+
+        As with ``git rev-parse``, a full (hex) SHA-1 hash is returned
+        as-is, even if the object is not in the repository.
+        """
+        info = self.object_info(rev)
+        if info is not None:
+            return info[0]
+        if _FULL_SHA_REGEX.match(rev):
+            return rev.lower()
+        return None
+
+    def _object_type(self, rev):
+        """Determine the type of an object."""
+        info = self.object_info(rev)
+        return None if info is None else info[1]
+
+    def _commit_info(self, *revs):
+        """Describe commits in the same way as :data:`COMMIT_INFO_ARGS`."""
+        records = []
+        seen = set()
+        for rev in revs:
+            obj = self.read_object(rev + _COMMIT_SUFFIX)
+            if obj is None:
+                return None
+            sha, _, raw_commit = obj
+            # NOTE: ``git log`` only shows each commit once.
+            if sha not in seen:
+                seen.add(sha)
+                records.append(self._format_commit(sha, raw_commit) + u'\0')
+        return u''.join(records)
+
+    def _shallow_commits(self):
+        """Get the commits at the boundary of a shallow clone.
+
+        Returns:
+            frozenset: The boundary commits (empty if the repository
+            isn't a shallow clone).
+        """
+        if self._shallow is None:
+            contents = b''
+            path = SubprocessRunner.check_output(
+                _SHALLOW_PATH_ARGS, ignore_err=True)
+            if path is not None:
+                try:
+                    with open(path, 'rb') as file_obj:
+                        contents = file_obj.read()
+                except (IOError, OSError):
+                    pass
+            self._shallow = frozenset(contents.decode('ascii').split())
+        return self._shallow
+
+    def _format_commit(self, sha, raw_commit):
+        """Describe a commit, respecting shallow clone boundaries.
+
+        As with ``git log``, a commit at the boundary of a shallow
+        clone has no parents (whatever the commit object says).
+        """
+        parents = [] if sha in self._shallow_commits() else None
+        return format_commit(sha, raw_commit, parents=parents)
+
+    def _batch_handler(self, args):
+        """Find the method that can answer a command (if any).
+
+        Args:
+            args (tuple): The command being run.
+
+        Returns:
+            Optional[Tuple[Callable, tuple]]: Pair of a method and the
+            revisions to pass to it, or :data:`None` if the command
+            can't be batched.
+        """
+        args = tuple(args)
+        if args[:len(COMMIT_INFO_ARGS)] == COMMIT_INFO_ARGS:
+            method, revs = self._commit_info, args[len(COMMIT_INFO_ARGS):]
+        elif args[:-1] == ('git', 'rev-parse'):
+            method, revs = self._rev_parse, args[-1:]
+        elif args[:-1] == ('git', 'cat-file', '-t'):
+            method, revs = self._object_type, args[-1:]
+        else:
+            return None
+
+        # NOTE: The batch protocol is line-based and reports missing
+        #       objects with a space-separated suffix, so we only batch
+        #       revisions without whitespace.
+        for rev in revs:
+            if rev.startswith('-') or rev.split() != [rev]:
+                return None
+        if not revs:
+            return None
+        return method, revs
+
+    def check_output(self, args, ignore_err=False):
+        """Run a command, using a batch process if possible.
+
+        Args:
+            args (tuple): The command to run.
+            ignore_err (Optional[bool]): Flag indicating if a failed
+                command should return :data:`None` rather than raise.
+
+        Returns:
+            Optional[str]: The stripped STDOUT from the command.
+
+        Raises:
+            CalledProcessError: If ``ignore_err`` is not :data:`True` and
+                the command fails (or the object is missing).
+        """
+        handler = self._batch_handler(args)
+        if handler is None:
+            return super(GitBatchRunner, self).check_output(
+                args, ignore_err=ignore_err)
+
+        method, revs = handler
+        with self._lock:
+            result = method(*revs)
+        if result is None and not ignore_err:
+            raise _missing_error(args)
+        return result
+
+    def close(self):
+        """Shut down all running batch processes."""
+        procs, self._procs = self._procs, {}
+        for proc in procs.values():
+            try:
+                proc.stdin.close()
+            except (IOError, OSError):  # pragma: NO COVER
+                pass
+            proc.wait()
+            proc.stdout.close()
+        self._shallow = None
+        if self._devnull is not None:
+            self._devnull.close()
+            self._devnull = None
+
+
+class PythonGitRunner(GitBatchRunner):
+    """Answer ``git`` object queries without starting any processes.
+
+    Reads refs and objects directly from the ``.git`` directory (see
+    :class:`._git_objects.Repository`). Answers the same commands as
+    :class:`GitBatchRunner` along with ``git rev-parse --show-toplevel``.
+    If a command can't be answered (e.g. it uses an unsupported revision
+    syntax or the repository is configured via environment variables),
+    it falls back to :class:`SubprocessRunner`.
+    """
+
+    def __init__(self):
+        super(PythonGitRunner, self).__init__()
+        self._repos = {}
+
+    @property
+    def repo(self):
+        """~._git_objects.Repository: The repository for the current path.
+
+        Raises:
+            NotImplementedError: If the current directory can't be read
+                without ``git``.
+        """
+        cwd = os.getcwd()
+        repo = self._repos.get(cwd)
+        if repo is None:
+            repo = _git_objects.Repository.discover(cwd)
+            self._repos[cwd] = repo
+        return repo
+
+    def object_info(self, name):
+        """Get the SHA-1 hash, type and size of a ``git`` object.
+
+        Args:
+            name (str): A ``git`` object name.
+
+        Returns:
+            Optional[Tuple[str, str, int]]: The triple of hash, type
+            and size. If the object doesn't exist, returns :data:`None`.
+        """
+        obj = self.read_object(name)
+        if obj is None:
+            return None
+        sha, obj_type, contents = obj
+        return sha, obj_type, len(contents)
+
+    def read_object(self, name):
+        """Read the contents of a ``git`` object.
+
+        Args:
+            name (str): A ``git`` object name.
+
+        Returns:
+            Optional[Tuple[str, str, bytes]]: The triple of hash, type
+            and contents. If the object doesn't exist, returns
+            :data:`None`.
+        """
+        sha = self.repo.resolve(name)
+        if sha is None:
+            return None
+        obj = self.repo.read_object(sha)
+        if obj is None:
+            return None
+        obj_type, contents = obj
+        return sha, obj_type, contents
+
+    def _shallow_commits(self):
+        """Get the commits at the boundary of a shallow clone.
+
+        Returns:
+            frozenset: The boundary commits.
+        """
+        return self.repo.shallow
+
+    def check_output(self, args, ignore_err=False):
+        """Run a command, reading from the ``.git`` directory if possible.
+
+        Args:
+            args (tuple): The command to run.
+            ignore_err (Optional[bool]): Flag indicating if a failed
+                command should return :data:`None` rather than raise.
+
+        Returns:
+            Optional[str]: The stripped STDOUT from the command.
+
+        Raises:
+            CalledProcessError: If ``ignore_err`` is not :data:`True` and
+                the command fails (or the object is missing).
+        """
+        try:
+            if tuple(args) == _SHOW_TOPLEVEL_ARGS:
+                work_tree = self.repo.work_tree
+                if work_tree is not None:
+                    return work_tree
+            else:
+                return super(PythonGitRunner, self).check_output(
+                    args, ignore_err=ignore_err)
+        except NotImplementedError:
+            pass
+        return SubprocessRunner.check_output(args, ignore_err=ignore_err)
+
+    def close(self):
+        """Close any open packfiles."""
+        super(PythonGitRunner, self).close()
+        repos, self._repos = self._repos, {}
+        for repo in repos.values():
+            repo.close()
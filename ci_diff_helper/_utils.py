@@ -12,17 +12,95 @@
 
 """Shared utilities for ci-diff-helper."""
 
+import atexit
+import contextlib
+import os
 import re
 import subprocess
+import tempfile
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # pragma: NO COVER
+    fcntl = None
+    import msvcrt  # pylint: disable=import-error
+
+from ci_diff_helper import _runners
+from ci_diff_helper import environment_vars as env
 
 
 _PR_ID_REGEX = re.compile(r'#(\d+)')
+_DEFAULT_BACKEND = 'subprocess'
+_RUNNER_CLASSES = {
+    'batch': _runners.GitBatchRunner,
+    'python': _runners.PythonGitRunner,
+    'subprocess': _runners.SubprocessRunner,
+}
+_RUNNER = None
+_CHUNK_SIZE = 64 * 1024
 UNSET = object()  # Sentinel for unset config values.
 
 
+def _close_runner():
+    """Close the current command runner (if any)."""
+    if _RUNNER is not None:
+        _RUNNER.close()
+
+
+atexit.register(_close_runner)
+
+
+def get_runner():
+    """Get the command runner used by :func:`check_output`.
+
+    If no runner has been set, one is created based on the
+    ``CI_DIFF_HELPER_GIT_BACKEND`` environment variable
+    (:data:`~.environment_vars.GIT_BACKEND`).
+
+    Returns:
+        object: The current command runner.
+
+    Raises:
+        ValueError: If the environment variable is not one of the
+            expected backend names.
+    """
+    global _RUNNER  # pylint: disable=global-statement
+    if _RUNNER is None:
+        backend = os.getenv(env.GIT_BACKEND, _DEFAULT_BACKEND)
+        try:
+            runner_class = _RUNNER_CLASSES[backend.lower()]
+        except KeyError:
+            raise ValueError('Invalid git backend', backend,
+                             'Expected one of', sorted(_RUNNER_CLASSES))
+        _RUNNER = runner_class()
+    return _RUNNER
+
+
+def set_runner(runner):
+    """Set the command runner used by :func:`check_output`.
+
+    Args:
+        runner (object): The new command runner. Must have a
+            ``check_output(args, ignore_err=False)`` method and a
+            ``close()`` method. If :data:`None`, the runner will
+            be re-created from the environment on next use.
+
+    Returns:
+        object: The previous command runner (if any). It is **not**
+        closed, that is left to the caller.
+    """
+    global _RUNNER  # pylint: disable=global-statement
+    previous, _RUNNER = _RUNNER, runner
+    return previous
+
+
 def check_output(*args, **kwargs):
     """Run a command on the operation system.
 
+    The command is passed along to the current runner (see
+    :func:`get_runner`), which by default forks a new process.
+
     If the command fails a :class:`~subprocess.CalledProcessError`
     will occur. However, if you would like to silently ignore this
     error, pass the ``ignore_err`` flag::
@@ -49,21 +127,136 @@ def check_output(*args, **kwargs):
         raise TypeError('Got unexpected keyword argument(s)',
                         list(kwargs.keys()))
 
+    return get_runner().check_output(args, ignore_err=ignore_err)
+
+
+def iter_output(*args, **kwargs):
+    """Stream the output of a command as delimited records.
+
+    Rather than waiting for the command to finish, the output is read
+    incrementally from the pipe and each record is yielded as soon as
+    it is complete. Only a single (partial) record is ever buffered::
+
+      >>> list(iter_output('echo', '-n', 'a b', delimiter=b' '))
+      ['a', 'b']
+
+    If the generator is closed before the command finishes, the
+    command is killed.
+
+    Args:
+        args (tuple): The command to run.
+        kwargs (dict): Keyword arguments for this helper. Currently the
+            only accepted keyword argument is ``delimiter`` (defaults
+            to the NUL byte).
+
+    Yields:
+        str: Each record in the output (converted from bytes).
+
+    Raises:
+        TypeError: If any unrecognized keyword arguments are used.
+        CalledProcessError: If the command fails.
+    """
+    delimiter = kwargs.pop('delimiter', b'\0')
+    if kwargs:
+        raise TypeError('Got unexpected keyword argument(s)',
+                        list(kwargs.keys()))
+
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE)
+    # NOTE: ``read1`` returns whatever is available on the pipe instead
+    #       of blocking until the full chunk is read, but is not
+    #       available on Python 2.
+    read = getattr(proc.stdout, 'read1', proc.stdout.read)
+    finished = False
+    try:
+        pending = b''
+        chunk = read(_CHUNK_SIZE)
+        while chunk:
+            records = (pending + chunk).split(delimiter)
+            pending = records.pop()
+            for record in records:
+                yield record.decode('utf-8')
+            chunk = read(_CHUNK_SIZE)
+        if pending:
+            yield pending.decode('utf-8')
+        finished = True
+    finally:
+        if not finished:
+            proc.kill()
+        proc.stdout.close()
+        return_code = proc.wait()
+
+    if return_code != 0:
+        raise subprocess.CalledProcessError(return_code, list(args))
+
+
+def atomic_write(path, contents):
+    """Write a file so that readers never see partial contents.
+
+    Args:
+        path (str): The path of the file.
+        contents (bytes): The new contents.
+    """
+    directory = os.path.dirname(path)
+    file_desc, temp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(file_desc, 'wb') as file_obj:
+        file_obj.write(contents)
+    try:
+        os.rename(temp_path, path)
+    except OSError:  # pragma: NO COVER
+        # On Windows, ``rename`` can't replace an existing file.
+        os.remove(path)
+        os.rename(temp_path, path)
+
+
+@contextlib.contextmanager
+def locked(file_desc):
+    """Hold an exclusive lock on an open file.
+
+    Blocks until the lock is available. Every process locking the
+    same file must use this helper (on Windows, only the first byte
+    of the file is locked).
+
+    Args:
+        file_desc (int): An open file descriptor.
+
+    Yields:
+        None: While the lock is held.
+    """
+    if fcntl is None:  # pragma: NO COVER
+        os.lseek(file_desc, 0, os.SEEK_SET)
+        msvcrt.locking(file_desc, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            os.lseek(file_desc, 0, os.SEEK_SET)
+            msvcrt.locking(file_desc, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(file_desc, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file_desc, fcntl.LOCK_UN)
+
+
+def try_lock(file_desc):
+    """Take an exclusive lock on an open file, unless it is held.
+
+    Unlike :func:`locked`, doesn't wait for the lock, which is held
+    until the file is closed. On Windows, the lock is never taken.
+
+    Args:
+        file_desc (int): An open file descriptor.
+
+    Returns:
+        bool: Indicates if the lock was taken.
+    """
+    if fcntl is None:  # pragma: NO COVER
+        return False
     try:
-        kwargs = {}
-        if ignore_err:
-            kwargs['stderr'] = subprocess.PIPE  # Swallow stderr.
-        cmd_output = subprocess.check_output(args, **kwargs)
-        # On Python 3, this returns bytes (from STDOUT), so we
-        # convert to a string.
-        cmd_output_str = cmd_output.decode('utf-8')
-        # Also strip the output since it usually has a trailing newline.
-        return cmd_output_str.strip()
-    except subprocess.CalledProcessError:
-        if ignore_err:
-            return
-        else:
-            raise
+        fcntl.flock(file_desc, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except (IOError, OSError):
+        return False
+    return True
 
 
 def pr_from_commit(merge_subject):
@@ -0,0 +1,818 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Non-blocking (:mod:`asyncio`) versions of ``git`` and GitHub lookups.
+
+.. note::
+
+    This module requires Python 3.5 or later (it is not imported by
+    the top-level package).
+
+Every ``git`` command runs via :func:`asyncio.create_subprocess_exec`
+and every GitHub API request goes through a small HTTP/1.1 client
+built on :func:`asyncio.open_connection` (which keeps connections
+alive and re-uses them). Many repositories and pull requests can be
+resolved concurrently from a single event loop:
+
+.. code-block:: python
+
+  import asyncio
+
+  from ci_diff_helper import aio
+
+  async def bases(slug, pr_ids):
+      return await asyncio.gather(
+          *[aio.async_pr_info(slug, pr_id) for pr_id in pr_ids])
+
+Configuration objects also have an awaitable counterpart of
+:attr:`~.travis.Travis.base` (e.g. ``await config.async_base()``).
+
+GitHub requests share the cache and the scheduler of the blocking
+API (see :func:`~._github.get_cache` and
+:func:`~._github.get_scheduler`), but wait with :func:`asyncio.sleep`
+rather than blocking.
+"""
+
+import asyncio
+import base64
+import socket
+import ssl
+import subprocess
+
+import requests
+from requests import structures
+from six.moves.urllib import parse
+
+from ci_diff_helper import _build_cache
+from ci_diff_helper import _github
+from ci_diff_helper import _runners
+from ci_diff_helper import circle_ci
+from ci_diff_helper import git_tools
+from ci_diff_helper import travis
+
+
+_CRLF = b'\r\n'
+_HEAD_END = _CRLF + _CRLF
+_CONNECT_TEMPLATE = 'CONNECT {0}:{1} HTTP/1.1\r\nHost: {0}:{1}\r\n{2}\r\n'
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+_HTTPS = 'https'
+_REQUEST_TEMPLATE = 'GET {} HTTP/1.1\r\n{}\r\n'
+_USER_AGENT = 'ci-diff-helper'
+_CHUNKED = 'chunked'
+_CLOSE = 'close'
+_MAX_IDLE = 4
+_MAX_REDIRECTS = 30
+_NO_BODY_STATUSES = (204, 304)
+_RECV_SIZE = 4096
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+_TRANSPORT = None
+
+
+class Transport(object):
+    """A minimal, non-blocking HTTP/1.1 client.
+
+    Only supports what the GitHub API needs: ``GET`` requests and
+    responses delimited by ``Content-Length``, chunked encoding or the
+    end of the connection. Idle connections are kept alive and
+    re-used (within the same event loop).
+
+    Like :class:`requests.Session`, it follows redirects and (unless
+    ``trust_env`` is :data:`False`) sends requests through the proxies
+    set in the environment (``HTTP_PROXY``, ``HTTPS_PROXY`` and
+    ``NO_PROXY``). HTTPS requests are tunnelled through the proxy
+    with ``CONNECT``. A request is retried (once) on a new connection
+    if the connection is reset, e.g. when the server closed an idle
+    connection.
+
+    Args:
+        max_idle (Optional[int]): The maximum number of idle
+            connections to keep for each host.
+        trust_env (Optional[bool]): Flag indicating if proxies
+            should be read from the environment.
+    """
+
+    def __init__(self, max_idle=_MAX_IDLE, trust_env=True):
+        self.max_idle = max_idle
+        self.trust_env = trust_env
+        self._idle = {}
+        self._loop = None
+        self._ssl_context = None
+
+    def _get_ssl_context(self):
+        """Get the (shared) SSL context for HTTPS connections.
+
+        Returns:
+            ssl.SSLContext: The default SSL context.
+        """
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    def _get_proxy(self, url):
+        """Get the proxy (if any) to send a request through.
+
+        Args:
+            url (str): The URL to request.
+
+        Returns:
+            Optional[str]: The proxy URL, or :data:`None` if the request
+            should be sent directly.
+        """
+        if not self.trust_env:
+            return None
+        proxy = requests.utils.select_proxy(
+            url, requests.utils.get_environ_proxies(url))
+        if proxy and '://' not in proxy:
+            proxy = 'http://' + proxy
+        return proxy or None
+
+    @staticmethod
+    async def _open_tunnel(proxy, host, port):
+        """Open a socket tunnelled through a proxy via ``CONNECT``.
+
+        Args:
+            proxy (str): The proxy URL.
+            host (str): The host to tunnel to.
+            port (int): The port to tunnel to.
+
+        Returns:
+            socket.socket: The (non-blocking) socket, connected to the
+            proxy and tunnelled to ``host:port``.
+
+        Raises:
+            requests.exceptions.ProxyError: If the proxy refuses to
+                open the tunnel.
+        """
+        proxy_parts = parse.urlsplit(proxy)
+        loop = asyncio.get_event_loop()
+        family, sock_type, proto, _, address = (await loop.getaddrinfo(
+            proxy_parts.hostname,
+            proxy_parts.port or _DEFAULT_PORTS['http'],
+            type=socket.SOCK_STREAM))[0]
+        sock = socket.socket(family, sock_type, proto)
+        sock.setblocking(False)
+        header_lines = ''.join(
+            '{}: {}\r\n'.format(name, value)
+            for name, value in sorted(_proxy_headers(proxy).items()))
+        try:
+            await loop.sock_connect(sock, address)
+            await loop.sock_sendall(sock, _CONNECT_TEMPLATE.format(
+                host, port, header_lines).encode('latin-1'))
+            head = b''
+            while _HEAD_END not in head:
+                chunk = await loop.sock_recv(sock, _RECV_SIZE)
+                if not chunk:
+                    raise ConnectionError(
+                        'Proxy closed the connection', proxy)
+                head += chunk
+            status_line = head.split(_CRLF, 1)[0].decode('latin-1')
+            if status_line.split(' ', 2)[1:2] != ['200']:
+                raise requests.exceptions.ProxyError(
+                    'Tunnel connection failed', status_line)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    async def _connect(self, scheme, host, port, proxy=None):
+        """Open a new connection.
+
+        Args:
+            scheme (str): The URL scheme (``http`` or ``https``).
+            host (str): The host to connect to.
+            port (int): The port to connect to.
+            proxy (Optional[str]): The proxy to connect through.
+
+        Returns:
+            Tuple[asyncio.StreamReader, asyncio.StreamWriter]: The
+            connection.
+
+        Raises:
+            NotImplementedError: If the proxy uses HTTPS.
+        """
+        ssl_context = None
+        if scheme == _HTTPS:
+            ssl_context = self._get_ssl_context()
+        if proxy is None:
+            return await asyncio.open_connection(
+                host, port, ssl=ssl_context)
+
+        proxy_parts = parse.urlsplit(proxy)
+        if proxy_parts.scheme != 'http':
+            raise NotImplementedError(
+                'Only HTTP proxies are supported', proxy)
+        if scheme == _HTTPS:
+            sock = await self._open_tunnel(proxy, host, port)
+            return await asyncio.open_connection(
+                sock=sock, ssl=ssl_context, server_hostname=host)
+        return await asyncio.open_connection(
+            proxy_parts.hostname,
+            proxy_parts.port or _DEFAULT_PORTS['http'])
+
+    async def _acquire(self, key):
+        """Get an idle connection or open a new one.
+
+        Args:
+            key (Tuple[str, str, int, Optional[str]]): The scheme,
+                host, port and proxy.
+
+        Returns:
+            Tuple[asyncio.StreamReader, asyncio.StreamWriter]: The
+            connection.
+        """
+        loop = asyncio.get_event_loop()
+        if loop is not self._loop:
+            # Connections belong to the loop which opened them (which
+            # may already be closed), so they can't be re-used.
+            self._idle = {}
+            self._loop = loop
+        idle = self._idle.get(key, [])
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return await self._connect(*key)
+
+    def _release(self, key, connection):
+        """Keep a connection for re-use (or close it).
+
+        Args:
+            key (Tuple[str, str, int, Optional[str]]): The scheme,
+                host, port and proxy.
+            connection (Tuple[asyncio.StreamReader, \
+            asyncio.StreamWriter]): The connection.
+        """
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_idle:
+            idle.append(connection)
+        else:
+            connection[1].close()
+
+    @staticmethod
+    async def _read_body(reader, headers, status, method='GET'):
+        """Read the body of a response.
+
+        Args:
+            reader (asyncio.StreamReader): The connection.
+            headers (requests.structures.CaseInsensitiveDict): The
+                response headers.
+            status (int): The status code of the response.
+            method (Optional[str]): The method of the request.
+
+        Returns:
+            Tuple[bytes, bool]: The body and a flag indicating if the
+            connection can be re-used.
+        """
+        keep_alive = headers.get('Connection', '').lower() != _CLOSE
+        if (method == 'HEAD' or status < 200 or
+                status in _NO_BODY_STATUSES):
+            # These never have a body (whatever the headers say), so
+            # reading until the end of the connection would hang.
+            return b'', keep_alive
+        if headers.get('Transfer-Encoding', '').lower() == _CHUNKED:
+            pieces = []
+            while True:
+                size_line = await reader.readline()
+                size = int(size_line.split(b';', 1)[0], 16)
+                if size == 0:
+                    # Skip (empty) trailers.
+                    while (await reader.readline()).strip():
+                        pass
+                    return b''.join(pieces), keep_alive
+                pieces.append(await reader.readexactly(size))
+                await reader.readexactly(len(_CRLF))
+        length = headers.get('Content-Length')
+        if length is None:
+            return await reader.read(), False
+        return await reader.readexactly(int(length)), keep_alive
+
+    @staticmethod
+    async def _read_head(reader):
+        """Read the status line and headers of a response.
+
+        Args:
+            reader (asyncio.StreamReader): The connection.
+
+        Returns:
+            Tuple[int, str, requests.structures.CaseInsensitiveDict]:
+            The status code, reason and headers.
+
+        Raises:
+            ConnectionError: If the connection is closed before a
+                response is received.
+        """
+        status_line = (await reader.readline()).decode('latin-1').strip()
+        if not status_line:
+            raise ConnectionError('Connection closed without a response')
+        _, status, reason = (status_line.split(' ', 2) + [''])[:3]
+        headers = structures.CaseInsensitiveDict()
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                return int(status), reason, headers
+            name, _, value = line.partition(':')
+            headers[name.strip()] = value.strip()
+
+    async def _request(self, url, headers):
+        """Send a single ``GET`` request (without following redirects).
+
+        Args:
+            url (str): The URL to request.
+            headers (dict): Headers for the request.
+
+        Returns:
+            requests.Response: The (fully read) response.
+        """
+        parts = parse.urlsplit(url)
+        port = parts.port or _DEFAULT_PORTS[parts.scheme]
+        proxy = self._get_proxy(url)
+        key = (parts.scheme, parts.hostname, port, proxy)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        request_headers = {
+            'Host': parts.netloc,
+            'User-Agent': _USER_AGENT,
+            'Accept-Encoding': 'identity',
+        }
+        if proxy is not None and parts.scheme != _HTTPS:
+            # Plain HTTP is forwarded by the proxy (rather than
+            # tunnelled), so it needs the absolute URL.
+            target = parse.urlunsplit(parts[:4] + ('',))
+            request_headers.update(_proxy_headers(proxy))
+        request_headers.update(headers)
+        request = _REQUEST_TEMPLATE.format(target, ''.join(
+            '{}: {}\r\n'.format(name, value)
+            for name, value in sorted(request_headers.items())))
+
+        retried = False
+        while True:
+            reader, writer = await self._acquire(key)
+            try:
+                writer.write(request.encode('latin-1'))
+                status, reason, response_headers = await self._read_head(
+                    reader)
+                body, keep_alive = await self._read_body(
+                    reader, response_headers, status)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if retried:
+                    raise
+                retried = True
+                continue
+            except BaseException:
+                writer.close()
+                raise
+            break
+
+        if keep_alive:
+            self._release(key, (reader, writer))
+        else:
+            writer.close()
+
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.url = url
+        response.headers = response_headers
+        response._content = body  # pylint: disable=protected-access
+        return response
+
+    async def get(self, url, headers=None):
+        """Send a ``GET`` request.
+
+        Redirects are followed (dropping the ``Authorization`` header
+        if the redirect leaves the host).
+
+        Args:
+            url (str): The URL to request.
+            headers (Optional[dict]): Headers for the request.
+
+        Returns:
+            requests.Response: The (fully read) response. It is a
+            :class:`requests.Response` so that it can be handled just
+            like responses from the blocking API.
+
+        Raises:
+            requests.exceptions.TooManyRedirects: If there are too many
+                redirects.
+        """
+        headers = dict(headers or {})
+        history = []
+        while True:
+            response = await self._request(url, headers)
+            location = response.headers.get('Location')
+            if (response.status_code not in _REDIRECT_STATUSES or
+                    location is None):
+                response.history = history
+                return response
+            if len(history) >= _MAX_REDIRECTS:
+                raise requests.exceptions.TooManyRedirects(
+                    'Exceeded {} redirects.'.format(_MAX_REDIRECTS),
+                    response=response)
+            history.append(response)
+            new_url = parse.urljoin(url, location)
+            if (parse.urlsplit(new_url).hostname !=
+                    parse.urlsplit(url).hostname):
+                headers = {
+                    name: value for name, value in headers.items()
+                    if name.lower() != 'authorization'}
+            url = new_url
+
+    def close(self):
+        """Close every idle connection."""
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle.clear()
+
+
+def _proxy_headers(proxy):
+    """Get the headers needed to authenticate with a proxy.
+
+    Args:
+        proxy (str): The proxy URL (which may contain credentials).
+
+    Returns:
+        dict: The ``Proxy-Authorization`` header (if the proxy URL
+        contains credentials).
+    """
+    username, password = requests.utils.get_auth_from_url(proxy)
+    if not username:
+        return {}
+    credentials = '{}:{}'.format(username, password).encode('latin-1')
+    return {
+        'Proxy-Authorization': 'Basic ' + base64.b64encode(
+            credentials).decode('ascii'),
+    }
+
+
+def get_transport():
+    """Get the transport used for all non-blocking GitHub requests.
+
+    Returns:
+        Transport: The current transport.
+    """
+    global _TRANSPORT  # pylint: disable=global-statement
+    if _TRANSPORT is None:
+        _TRANSPORT = Transport()
+    return _TRANSPORT
+
+
+def set_transport(transport):
+    """Set the transport used for all non-blocking GitHub requests.
+
+    Args:
+        transport (Optional[Transport]): The new transport. If
+            :data:`None`, a new transport will be created on next use.
+
+    Returns:
+        Optional[Transport]: The previous transport (if any). It is
+        **not** closed, that is left to the caller.
+    """
+    global _TRANSPORT  # pylint: disable=global-statement
+    previous, _TRANSPORT = _TRANSPORT, transport
+    return previous
+
+
+async def async_check_output(*args, ignore_err=False):
+    """Run a command without blocking the event loop.
+
+    Args:
+        args (tuple): The command and its arguments.
+        ignore_err (Optional[bool]): Flag indicating if a failed
+            command should return :data:`None` (and swallow STDERR)
+            rather than raise.
+
+    Returns:
+        Optional[str]: The stripped STDOUT from the command.
+
+    Raises:
+        CalledProcessError: If ``ignore_err`` is not :data:`True` and
+            the command fails.
+    """
+    stderr = subprocess.PIPE if ignore_err else None
+    proc = await asyncio.create_subprocess_exec(
+        *args, stdout=subprocess.PIPE, stderr=stderr)
+    stdout, _ = await proc.communicate()
+    if proc.returncode != 0:
+        if ignore_err:
+            return None
+        raise subprocess.CalledProcessError(
+            proc.returncode, args, output=stdout)
+    return _runners.decode_output(stdout)
+
+
+async def async_git_root():
+    """Return the root directory of the current ``git`` checkout.
+
+    Returns:
+        str: Filesystem path to ``git`` checkout root.
+    """
+    return await async_check_output('git', 'rev-parse', '--show-toplevel')
+
+
+async def async_get_checked_in_files(pathspecs=None, globs=None):
+    """Gets a list of files in the current ``git`` repository.
+
+    Non-blocking version of :func:`~.git_tools.get_checked_in_files`.
+
+    Args:
+        pathspecs (Optional[Iterable[str]]): ``git`` pathspecs limiting
+            the files returned.
+        globs (Optional[Iterable[str]]): Glob patterns (e.g.
+            ``'**/*.py'``), relative to the root of the checkout,
+            limiting the files returned.
+
+    Returns:
+        list: All filenames checked into the repository.
+    """
+    args = git_tools.checked_in_files_command(
+        pathspecs=pathspecs, globs=globs)
+    if args is None:
+        args = git_tools.checked_in_files_command(
+            root=await async_git_root())
+    cmd_output = await async_check_output(*args)
+    return git_tools.parse_files(cmd_output, absolute=True)
+
+
+async def async_get_changed_files(blob_name1, blob_name2, pathspecs=None,
+                                  globs=None, statuses=None):
+    """Gets a list of changed files between two ``git`` revisions.
+
+    Non-blocking version of :func:`~.git_tools.get_changed_files`.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference.
+        blob_name2 (str): A ``git`` object reference.
+        pathspecs (Optional[Iterable[str]]): ``git`` pathspecs limiting
+            the files returned.
+        globs (Optional[Iterable[str]]): Glob patterns (e.g.
+            ``'**/*.py'``), relative to the root of the checkout,
+            limiting the files returned.
+        statuses (Optional[Iterable[FileStatus]]): The statuses to
+            keep.
+
+    Returns:
+        list: All filenames changed.
+    """
+    args = git_tools.changed_files_command(
+        blob_name1, blob_name2, pathspecs=pathspecs, globs=globs,
+        statuses=statuses)
+    if args is None:
+        return []
+    return git_tools.parse_files(await async_check_output(*args))
+
+
+async def _async_send(api_url, headers):
+    """Send a request, pacing and retrying via the shared scheduler.
+
+    Non-blocking version of :meth:`~._rate_limit.Scheduler.send`.
+
+    Args:
+        api_url (str): The URL of the API endpoint.
+        headers (dict): The headers for the request.
+
+    Returns:
+        requests.Response: The last response (which may be a failure).
+    """
+    attempts = _github.get_scheduler().attempts()
+    transport = get_transport()
+    delay = attempts.first_delay()
+    while True:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        attempts.start()
+        response = await transport.get(api_url, headers=headers)
+        delay = attempts.retry_delay(response)
+        if delay is None:
+            return response
+
+
+async def _async_get(api_url):
+    """Make a non-blocking GET request to the GitHub API.
+
+    Non-blocking version of :func:`~._github._get` (including the use
+    of the response cache).
+
+    Args:
+        api_url (str): The URL of the API endpoint.
+
+    Returns:
+        requests.Response: The (successful) response.
+
+    Raises:
+        requests.exceptions.HTTPError: If the GitHub API request fails.
+    """
+    request = _github.GetRequest(api_url)
+    if request.cached is not None:
+        return request.cached
+    return request.finish(await _async_send(api_url, request.headers))
+
+
+async def async_commit_compare(slug, start, finish):
+    """Makes a non-blocking GitHub API request to compare two commits.
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        start (str): The start commit in a range.
+        finish (str): The last commit in a range.
+
+    Returns:
+        dict: The parsed JSON payload of the request.
+
+    Raises:
+        requests.exceptions.HTTPError: If the GitHub API request fails.
+    """
+    response = await _async_get(_github.compare_url(slug, start, finish))
+    return response.json()
+
+
+async def async_compare_merge_base(slug, start, finish):
+    """Get the merge base of two commits without blocking.
+
+    Only the first (single commit) page of the comparison is
+    requested (see :func:`~._github.compare_merge_base`).
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        start (str): The start commit in a range.
+        finish (str): The last commit in a range.
+
+    Returns:
+        Optional[str]: The commit SHA of the merge base, or
+        :data:`None` if the payload doesn't contain one.
+
+    Raises:
+        requests.exceptions.HTTPError: If the GitHub API request fails.
+    """
+    api_url = _github.compare_page_url(slug, start, finish)
+    response = await _async_get(api_url)
+    return _github.read_merge_base([response.content])
+
+
+async def async_pr_info(slug, pr_id):
+    """Makes a non-blocking GitHub API request for a pull request.
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        pr_id (int): The pull request ID.
+
+    Returns:
+        dict: The pull request information.
+
+    Raises:
+        requests.exceptions.HTTPError: If the GitHub API request fails.
+    """
+    response = await _async_get(_github.pr_url(slug, pr_id))
+    return response.json()
+
+
+async def _travis_push_build_base(slug):
+    """Get the diffbase for a Travis "push" build without blocking.
+
+    Args:
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+
+    Returns:
+        str: The commit SHA of the diff base.
+
+    Raises:
+        KeyError: If the merge base is needed from GitHub, but the
+            payload doesn't contain it.
+        ValueError: If the start commit is in the local history but
+            is not the merge base of the commit range.
+    """
+    start, finish = travis.get_commit_range()
+    start_full = await async_check_output(
+        'git', 'rev-parse', start, ignore_err=True)
+    if start_full is None:
+        # The start commit isn't in the local history.
+        sha = await async_compare_merge_base(slug, start, finish)
+        return travis.check_github_merge_base(sha, slug, start, finish)
+
+    merge_base = await async_check_output(
+        'git', 'merge-base', start_full, finish, ignore_err=True)
+    travis.check_merge_base(merge_base, start_full, finish)
+    return start_full
+
+
+async def _resolve_build_key(config):
+    """Resolve the key of the build in the build cache without blocking.
+
+    The key depends on the HEAD commit, which would otherwise be
+    looked up (with a blocking ``git`` command) when a persisted value
+    is first stored.
+
+    Args:
+        config (~._config_base.Config): The configuration.
+    """
+    # pylint: disable=protected-access
+    if (_build_cache.get_build_cache() is not None and
+            config._would_compute('_build_key')):
+        build_key = None
+        head_sha = await async_check_output(
+            'git', 'rev-parse', 'HEAD', ignore_err=True)
+        if head_sha is not None:
+            build_key = _build_cache.fingerprint(head_sha)
+        config._set_resolved('_build_key', build_key)
+
+
+async def _off_loop(func, *args):
+    """Call a function which may wait on the build cache.
+
+    Values shared with other steps of the build are guarded by a
+    (blocking) file lock, so with a build cache the function is run
+    in the default executor rather than on the event loop.
+
+    Args:
+        func (Callable): The function to call.
+        args (tuple): The arguments to pass to ``func``.
+
+    Returns:
+        object: The result of ``func``.
+    """
+    if _build_cache.get_build_cache() is None:
+        return func(*args)
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, func, *args)
+
+
+async def _travis_prefetch(config):
+    """Resolve the lookups of a Travis diffbase without blocking.
+
+    Only a "push" build needs any (the diffbase of a "pull request"
+    build is its branch).
+
+    Args:
+        config (~.travis.Travis): The configuration.
+    """
+    # pylint: disable=protected-access
+    if (config._would_compute('base') and
+            config.event_type is travis.TravisEventType.push):
+        await _off_loop(
+            config._set_resolved, 'base',
+            await _travis_push_build_base(config.slug))
+
+
+async def _circle_ci_prefetch(config):
+    """Resolve the lookups of a CircleCI diffbase without blocking.
+
+    Only a build for a pull request on GitHub needs any (the pull
+    request information).
+
+    Args:
+        config (~.circle_ci.CircleCI): The configuration.
+    """
+    # pylint: disable=protected-access
+    if (config._would_compute('base') and
+            config._would_compute('_pr_info') and config.in_pr and
+            config.provider is circle_ci.CircleCIRepoProvider.github):
+        config._set_resolved(
+            '_pr_info', await async_pr_info(config.slug, config.pr))
+
+
+async def async_base(config):
+    """Compute (and cache) the diffbase of a build without blocking.
+
+    Non-blocking version of the ``base`` property of a configuration
+    object. Usually called as ``await config.async_base()``.
+
+    The ``git`` commands and GitHub API requests are awaited, then
+    ``base`` is computed from their results just like the blocking
+    property (and is stored on the configuration in the same way).
+    If there is a build cache, storing the value waits on a file lock
+    (shared with the other steps of the build), so that is done in the
+    default executor of the event loop.
+
+    Args:
+        config (~._config_base.Config): The configuration for the
+            current build.
+
+    Returns:
+        str: The ``git`` object that current build is changed against.
+
+    Raises:
+        NotImplementedError: If the configuration doesn't support a
+            diffbase.
+    """
+    await _resolve_build_key(config)
+    if isinstance(config, travis.Travis):
+        await _travis_prefetch(config)
+    elif isinstance(config, circle_ci.CircleCI):
+        await _circle_ci_prefetch(config)
+    return await _off_loop(getattr, config, 'base')
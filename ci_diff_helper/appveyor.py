@@ -64,12 +64,12 @@ To use the :class:`AppVeyor` configuration type directly:
   <AppVeyorRepoProvider.github: 'github'>
 """
 
+import operator
 import os
 
 import enum
 
 from ci_diff_helper import _config_base
-from ci_diff_helper import _utils
 from ci_diff_helper import environment_vars as env
 
 
@@ -108,19 +108,18 @@ class AppVeyorRepoProvider(enum.Enum):
 class AppVeyor(_config_base.Config):
     """Represent AppVeyor state and cache return values."""
 
-    # Default instance attributes.
-    _provider = _utils.UNSET
+    __slots__ = ('_provider',)
     # Class attributes.
     _active_env_var = env.IN_APPVEYOR
     _branch_env_var = env.APPVEYOR_BRANCH
     _tag_env_var = env.APPVEYOR_TAG
 
-    @property
+    @_config_base.lazy_property(
+        '_provider', encode=operator.attrgetter('name'),
+        decode=AppVeyorRepoProvider.__getitem__)
     def provider(self):
         """str: The code hosting provider for the current AppVeyor build."""
-        if self._provider is _utils.UNSET:
-            self._provider = _appveyor_provider()
-        return self._provider
+        return _appveyor_provider()
 
     @property
     def tag(self):
@@ -0,0 +1,455 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cache the files changed between two commits.
+
+For a given pair of commits, the list of changed files never changes,
+yet every re-run of a build (and every job in a build matrix) asks
+``git`` for it again. On a large repository, each diff can take
+seconds. A :class:`ChangeSetCache` resolves both revisions to commit
+SHAs and stores the diff under a key derived from them (along with
+the diff options), so the diff is only computed once:
+
+.. code-block:: python
+
+  >>> from ci_diff_helper import change_cache
+  >>> backend = change_cache.DirectoryBackend('/var/cache/changes')
+  >>> cache = change_cache.ChangeSetCache(backend)
+  >>> cache.get_changed_files('HEAD', 'origin/master')
+  ['setup.py', 'project/feature.py']
+
+Change sets are kept by a :class:`Backend`. A :class:`DirectoryBackend`
+stores them in a local directory (which may also be a shared network
+mount) and an :class:`HTTPBackend` in a shared HTTP store. Any other
+storage can be used by implementing :class:`Backend`.
+
+If the ``CI_DIFF_HELPER_CHANGE_CACHE_DIR`` or
+``CI_DIFF_HELPER_CHANGE_CACHE_URL`` environment variable is set (see
+:data:`~.environment_vars.CHANGE_CACHE_DIR` and
+:data:`~.environment_vars.CHANGE_CACHE_URL`), :func:`get_changed_files`
+(and the ``get_changed_files()`` method of each configuration type)
+uses a cache automatically.
+"""
+
+import hashlib
+import json
+import os
+import zlib
+
+import requests
+from six.moves import http_client
+
+from ci_diff_helper import _utils
+from ci_diff_helper import environment_vars as env
+from ci_diff_helper import git_tools
+
+
+_COMMIT_SUFFIX = '^{commit}'
+_ENTRY_SUFFIX = '.changes'
+_FORMAT_VERSION = 1
+_MAX_ENTRIES = 1024
+_MAX_BYTES = 64 * 1024 * 1024
+_HTTP_TIMEOUT = 10.0
+_CACHE = _utils.UNSET
+
+
+class Backend(object):
+    """Storage for change sets.
+
+    Keys are hex digests and values are opaque bytes. A backend only
+    needs to be best effort: a missing (or lost) value just means the
+    change set is computed again.
+    """
+
+    def get(self, key):
+        """Look up a stored change set.
+
+        Args:
+            key (str): The key of the change set.
+
+        Returns:
+            Optional[bytes]: The stored value, if any.
+
+        Raises:
+            NotImplementedError: Always, subclasses must implement it.
+        """
+        raise NotImplementedError
+
+    def put(self, key, data):
+        """Store a change set.
+
+        Args:
+            key (str): The key of the change set.
+            data (bytes): The value to store.
+
+        Raises:
+            NotImplementedError: Always, subclasses must implement it.
+        """
+        raise NotImplementedError
+
+
+class DirectoryBackend(Backend):
+    """Store change sets as files in a directory.
+
+    Writes are atomic, so the directory can be shared by concurrent
+    jobs. The least recently used change sets are evicted once there
+    are too many of them or they take up too much space.
+
+    Args:
+        directory (str): The directory holding the change sets.
+            Created if it doesn't exist.
+        max_entries (Optional[int]): The maximum number of change
+            sets to keep.
+        max_bytes (Optional[int]): The maximum total size (in bytes) of
+            the stored change sets.
+    """
+
+    def __init__(self, directory, max_entries=_MAX_ENTRIES,
+                 max_bytes=_MAX_BYTES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        """Get the path of the file for a change set.
+
+        Args:
+            key (str): The key of the change set.
+
+        Returns:
+            str: The path of the file.
+        """
+        return os.path.join(self.directory, key + _ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Look up a stored change set.
+
+        Also marks the change set as recently used.
+
+        Args:
+            key (str): The key of the change set.
+
+        Returns:
+            Optional[bytes]: The stored value, if any.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file_obj:
+                data = file_obj.read()
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        return data
+
+    def put(self, key, data):
+        """Store a change set and evict old ones if needed.
+
+        Args:
+            key (str): The key of the change set.
+            data (bytes): The value to store.
+        """
+        _utils.atomic_write(self._path(key), data)
+        self._evict()
+
+    def _evict(self):
+        """Remove the least recently used change sets beyond the limits."""
+        entries = []
+        total_bytes = 0
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(_ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat_result = os.stat(path)
+            except OSError:  # pragma: NO COVER
+                continue
+            entries.append((stat_result.st_mtime, path, stat_result.st_size))
+            total_bytes += stat_result.st_size
+
+        entries.sort()
+        num_entries = len(entries)
+        for _, path, size in entries:
+            if (num_entries <= self.max_entries and
+                    total_bytes <= self.max_bytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:  # pragma: NO COVER
+                pass
+            num_entries -= 1
+            total_bytes -= size
+
+
+class HTTPBackend(Backend):
+    """Store change sets in a shared HTTP store.
+
+    A change set is read with ``GET {base_url}/{key}`` and stored with
+    ``PUT {base_url}/{key}``, which most object stores and caching
+    proxies support. Any failure to reach the store is treated as a
+    missing change set (or ignored, when storing).
+
+    Args:
+        base_url (str): The URL of the store.
+        session (Optional[requests.Session]): The session used to make
+            requests. If not provided, a new one is created.
+        timeout (Optional[float]): The number of seconds to wait for
+            the store.
+    """
+
+    def __init__(self, base_url, session=None, timeout=_HTTP_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        if session is None:
+            session = requests.Session()
+        self.session = session
+        self.timeout = timeout
+
+    def _url(self, key):
+        """Get the URL of a change set.
+
+        Args:
+            key (str): The key of the change set.
+
+        Returns:
+            str: The URL.
+        """
+        return '{}/{}'.format(self.base_url, key)
+
+    def get(self, key):
+        """Look up a stored change set.
+
+        Args:
+            key (str): The key of the change set.
+
+        Returns:
+            Optional[bytes]: The stored value, if any.
+        """
+        try:
+            response = self.session.get(self._url(key), timeout=self.timeout)
+        except requests.RequestException:
+            return None
+        if response.status_code != http_client.OK:
+            return None
+        return response.content
+
+    def put(self, key, data):
+        """Store a change set.
+
+        Args:
+            key (str): The key of the change set.
+            data (bytes): The value to store.
+        """
+        try:
+            self.session.put(self._url(key), data=data, timeout=self.timeout)
+        except requests.RequestException:
+            pass
+
+
+def _resolve(blob_name1, blob_name2):
+    """Resolve two revisions to commit SHAs with a single ``git`` call.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference.
+        blob_name2 (str): A ``git`` object reference.
+
+    Returns:
+        Optional[Tuple[str, str]]: The SHAs, or :data:`None` if either
+        is not a commit.
+    """
+    output = _utils.check_output(
+        'git', 'rev-parse', blob_name1 + _COMMIT_SUFFIX,
+        blob_name2 + _COMMIT_SUFFIX, ignore_err=True)
+    if output is None:
+        return None
+    shas = output.split('\n')
+    if len(shas) != 2:
+        return None
+    return shas[0], shas[1]
+
+
+def _sorted_or_none(values):
+    """Sort values, keeping :data:`None` as-is.
+
+    Args:
+        values (Optional[Iterable[str]]): The values.
+
+    Returns:
+        Optional[List[str]]: The sorted values.
+    """
+    if values is None:
+        return None
+    return sorted(values)
+
+
+class ChangeSetCache(object):
+    """Cache of the files changed between two commits.
+
+    Args:
+        backend (Backend): The storage for change sets.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def key(sha1, sha2, pathspecs=None, globs=None, statuses=None,
+            prefix=None):
+        """Compute the key of a change set.
+
+        Args:
+            sha1 (str): A commit SHA.
+            sha2 (str): A commit SHA.
+            pathspecs (Optional[Iterable[str]]): ``git`` pathspecs
+                limiting the files.
+            globs (Optional[Iterable[str]]): Glob patterns limiting the
+                files.
+            statuses (Optional[Iterable[~.git_tools.FileStatus]]): The
+                statuses to keep.
+            prefix (Optional[str]): The current directory, relative to
+                the root of the checkout (as printed by
+                ``git rev-parse --show-prefix``). Needed along with
+                ``pathspecs``, which are relative to it.
+
+        Returns:
+            str: The key (a hex digest).
+        """
+        if statuses is not None:
+            statuses = [status.value for status in statuses]
+        fields = [
+            _FORMAT_VERSION, sha1, sha2, _sorted_or_none(pathspecs),
+            _sorted_or_none(globs), _sorted_or_none(statuses), prefix,
+        ]
+        return hashlib.sha256(
+            json.dumps(fields).encode('utf-8')).hexdigest()
+
+    def get_changed_files(self, blob_name1, blob_name2, pathspecs=None,
+                          globs=None, statuses=None):
+        """Get the files changed between two revisions.
+
+        Like :func:`~.git_tools.get_changed_files`, but a stored change
+        set is used if there is one. If either revision is not a commit
+        (e.g. a tree), the cache is not used.
+
+        Args:
+            blob_name1 (str): A ``git`` object reference.
+            blob_name2 (str): A ``git`` object reference.
+            pathspecs (Optional[Iterable[str]]): ``git`` pathspecs
+                limiting the files returned.
+            globs (Optional[Iterable[str]]): Glob patterns limiting the
+                files returned.
+            statuses (Optional[Iterable[~.git_tools.FileStatus]]): The
+                statuses to keep.
+
+        Returns:
+            List[str]: All filenames changed.
+        """
+        shas = _resolve(blob_name1, blob_name2)
+        if shas is None:
+            return git_tools.get_changed_files(
+                blob_name1, blob_name2, pathspecs=pathspecs, globs=globs,
+                statuses=statuses)
+
+        if statuses is not None:
+            statuses = list(statuses)
+        prefix = None
+        if pathspecs is not None:
+            pathspecs = list(pathspecs)
+            # NOTE: Pathspecs are relative to the current directory.
+            prefix = _utils.check_output('git', 'rev-parse', '--show-prefix')
+        key = self.key(shas[0], shas[1], pathspecs=pathspecs, globs=globs,
+                       statuses=statuses, prefix=prefix)
+        data = self.backend.get(key)
+        if data is not None:
+            try:
+                return json.loads(zlib.decompress(data).decode('utf-8'))
+            except (zlib.error, ValueError):
+                pass  # A corrupt change set is computed again.
+
+        files = git_tools.get_changed_files(
+            shas[0], shas[1], pathspecs=pathspecs, globs=globs,
+            statuses=statuses)
+        self.backend.put(key, zlib.compress(json.dumps(files).encode('utf-8')))
+        return files
+
+
+def get_change_cache():
+    """Get the cache used for change sets.
+
+    If no cache has been set (via :func:`set_change_cache`), one is
+    created from the ``CI_DIFF_HELPER_CHANGE_CACHE_URL`` environment
+    variable (:data:`~.environment_vars.CHANGE_CACHE_URL`), if set, or
+    else ``CI_DIFF_HELPER_CHANGE_CACHE_DIR``
+    (:data:`~.environment_vars.CHANGE_CACHE_DIR`).
+
+    Returns:
+        Optional[ChangeSetCache]: The current cache, if caching is
+        enabled.
+    """
+    global _CACHE  # pylint: disable=global-statement
+    if _CACHE is _utils.UNSET:
+        url = os.getenv(env.CHANGE_CACHE_URL)
+        directory = os.getenv(env.CHANGE_CACHE_DIR)
+        if url is not None:
+            _CACHE = ChangeSetCache(HTTPBackend(url))
+        elif directory is not None:
+            _CACHE = ChangeSetCache(DirectoryBackend(directory))
+        else:
+            _CACHE = None
+    return _CACHE
+
+
+def set_change_cache(cache):
+    """Set the cache used for change sets.
+
+    Args:
+        cache (Optional[ChangeSetCache]): The new cache. If
+            :data:`None`, caching is disabled.
+
+    Returns:
+        Optional[ChangeSetCache]: The previous cache (if any).
+    """
+    global _CACHE  # pylint: disable=global-statement
+    previous, _CACHE = _CACHE, cache
+    if previous is _utils.UNSET:
+        previous = None
+    return previous
+
+
+def get_changed_files(blob_name1, blob_name2, pathspecs=None, globs=None,
+                      statuses=None):
+    """Get the files changed between two revisions, using the cache.
+
+    Uses the cache from :func:`get_change_cache` if caching is enabled
+    and otherwise just calls :func:`~.git_tools.get_changed_files`.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference.
+        blob_name2 (str): A ``git`` object reference.
+        pathspecs (Optional[Iterable[str]]): ``git`` pathspecs limiting
+            the files returned.
+        globs (Optional[Iterable[str]]): Glob patterns limiting the
+            files returned.
+        statuses (Optional[Iterable[~.git_tools.FileStatus]]): The
+            statuses to keep.
+
+    Returns:
+        List[str]: All filenames changed.
+    """
+    cache = get_change_cache()
+    if cache is None:
+        return git_tools.get_changed_files(
+            blob_name1, blob_name2, pathspecs=pathspecs, globs=globs,
+            statuses=statuses)
+    return cache.get_changed_files(
+        blob_name1, blob_name2, pathspecs=pathspecs, globs=globs,
+        statuses=statuses)
@@ -120,7 +120,6 @@ import enum
 
 from ci_diff_helper import _config_base
 from ci_diff_helper import _github
-from ci_diff_helper import _utils
 from ci_diff_helper import environment_vars as env
 
 
@@ -211,30 +210,54 @@ class CircleCIRepoProvider(enum.Enum):
 # pylint: enable=too-few-public-methods
 
 
+def _encode_provider_slug(value):
+    """Convert a provider and slug into a JSON serializable value.
+
+    Args:
+        value (Tuple[CircleCIRepoProvider, str]): The provider and slug.
+
+    Returns:
+        List[str]: The name of the provider and the slug.
+    """
+    provider, slug = value
+    return [provider.name, slug]
+
+
+def _decode_provider_slug(value):
+    """Convert the output of :func:`_encode_provider_slug` back.
+
+    Args:
+        value (List[str]): The name of the provider and the slug.
+
+    Returns:
+        Tuple[CircleCIRepoProvider, str]: The provider and slug.
+    """
+    name, slug = value
+    return CircleCIRepoProvider[name], slug
+
+
 class CircleCI(_config_base.Config):
     """Represent CircleCI state and cache return values."""
 
-    # Default instance attributes.
-    _base = _utils.UNSET
-    _pr = _utils.UNSET
-    _pr_info_cached = _utils.UNSET
-    _provider = _utils.UNSET
-    _repo_url = _utils.UNSET
-    _slug = _utils.UNSET
+    __slots__ = (
+        '_base',
+        '_pr',
+        '_pr_info_cached',
+        '_provider_slug_cached',
+        '_repo_url',
+    )
     # Class attributes.
     _active_env_var = env.IN_CIRCLE_CI
     _branch_env_var = env.CIRCLE_CI_BRANCH
     _tag_env_var = env.CIRCLE_CI_TAG
 
-    @property
+    @_config_base.lazy_property('_pr')
     def pr(self):
         """int: The current CircleCI pull request (if any).
 
         If there is no active pull request, returns :data:`None`.
         """
-        if self._pr is _utils.UNSET:
-            self._pr = _circle_ci_pr()
-        return self._pr
+        return _circle_ci_pr()
 
     @property
     def in_pr(self):
@@ -245,7 +268,8 @@ class CircleCI(_config_base.Config):
         """
         return self.pr is not None
 
-    @property
+    @_config_base.lazy_property(
+        '_pr_info_cached', depends=('pr', '_provider_slug'))
     def _pr_info(self):
         """dict: The information for the current pull request.
 
@@ -257,40 +281,39 @@ class CircleCI(_config_base.Config):
             This property is only meant to be used in a pull request
             from a GitHub repository.
         """
-        if self._pr_info_cached is not _utils.UNSET:
-            return self._pr_info_cached
-
         current_pr = self.pr
         if current_pr is None:
-            self._pr_info_cached = {}
+            return {}
         elif self.provider is CircleCIRepoProvider.github:
-            self._pr_info_cached = _github.pr_info(self.slug, current_pr)
+            return _github.pr_info(self.slug, current_pr)
         else:
             raise NotImplementedError(
                 'GitHub is only supported way to retrieve PR info')
 
-        return self._pr_info_cached
-
-    @property
+    @_config_base.lazy_property('_repo_url')
     def repo_url(self):
         """str: The URL of the current repository being built.
 
         For example: ``https://github.com/{organization}/{repository}`` or
         ``https://bitbucket.org/{user}/{repository}``.
         """
-        if self._repo_url is _utils.UNSET:
-            self._repo_url = _repo_url()
-        return self._repo_url
+        return _repo_url()
+
+    @_config_base.lazy_property(
+        '_provider_slug_cached', depends=('repo_url',),
+        encode=_encode_provider_slug, decode=_decode_provider_slug)
+    def _provider_slug(self):
+        """Tuple[CircleCIRepoProvider, str]: The provider and slug.
+
+        Both are parsed from the repository URL at once. It is
+        non-public, but a ``@property`` is used for the caching.
+        """
+        return _provider_slug(self.repo_url)
 
     @property
     def provider(self):
         """str: The code hosting provider for the current CircleCI build."""
-        if self._provider is _utils.UNSET:
-            # NOTE: One **could** check here that _slug isn't already set,
-            #       but that would be over-protective, since the only
-            #       way it could be set also sets _provider.
-            self._provider, self._slug = _provider_slug(self.repo_url)
-        return self._provider
+        return self._provider_slug[0]
 
     @property
     def slug(self):
@@ -298,14 +321,10 @@ class CircleCI(_config_base.Config):
 
         Of the form ``{organization}/{repository}``.
         """
-        if self._slug is _utils.UNSET:
-            # NOTE: One **could** check here that _provider isn't already set,
-            #       but that would be over-protective, since the only
-            #       way it could be set also sets _slug.
-            self._provider, self._slug = _provider_slug(self.repo_url)
-        return self._slug
+        return self._provider_slug[1]
 
-    @property
+    @_config_base.lazy_property(
+        '_base', depends=('pr', '_pr_info'), persist=True)
     def base(self):
         """str: The ``git`` object that current build is changed against.
 
@@ -317,13 +336,10 @@ class CircleCI(_config_base.Config):
             This property will currently only work in a build for a
             pull request from a GitHub repository.
         """
-        if self._base is not _utils.UNSET:
-            return self._base
-
         if self.in_pr:
             pr_info = self._pr_info
             try:
-                self._base = pr_info['base']['sha']
+                return pr_info['base']['sha']
             except KeyError:
                 raise KeyError(
                     'Missing key in the GitHub API payload',
@@ -332,5 +348,3 @@ class CircleCI(_config_base.Config):
         else:
             raise NotImplementedError(
                 'Diff base currently only supported in a PR from GitHub')
-
-        return self._base
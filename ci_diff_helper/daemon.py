@@ -0,0 +1,888 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Answer queries from a long-running process over a Unix socket.
+
+A CI job may use ``ci_diff_helper`` from dozens of steps and tools,
+each of which would otherwise resolve the configuration, run ``git``
+and call GitHub from scratch. A :class:`Server` keeps that state warm
+in one process: the resolved configuration, the changed files (see
+:mod:`~.change_cache`), the checked in files, ``git cat-file --batch``
+processes and the pooled GitHub session. Each step then asks it via a
+:class:`Client` (or the command line):
+
+.. code-block:: bash
+
+  $ python -m ci_diff_helper.daemon start
+  $ python -m ci_diff_helper.daemon config base is_merge
+  {"base": "a5a1b2c3...", "is_merge": false}
+  $ python -m ci_diff_helper.daemon changed-files HEAD origin/master
+  setup.py
+  project/feature.py
+
+Before answering a query, the server checks the HEAD commit and the
+modification time of the ``git`` index and forgets everything that
+may depend on them if either changed. Clients send their CI
+environment variables (see :func:`~._build_cache.ci_environ`) with
+each configuration query, so jobs sharing a checkout (e.g. in a build
+matrix) each get the configuration for their own environment. The
+server shuts down after being idle for a while (see
+:data:`~.environment_vars.DAEMON_IDLE_TIMEOUT`).
+
+Requests and responses are single lines of JSON. Paths (e.g. for
+``pathspecs``) are relative to the root of the checkout.
+
+.. note::
+
+    This requires a platform with Unix domain sockets.
+"""
+
+from __future__ import print_function
+
+import collections
+import contextlib
+import errno
+import hashlib
+import json
+import os
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import six
+
+import ci_diff_helper
+from ci_diff_helper import _build_cache
+from ci_diff_helper import _config_base
+from ci_diff_helper import _git_objects
+from ci_diff_helper import _runners
+from ci_diff_helper import _utils
+from ci_diff_helper import change_cache
+from ci_diff_helper import environment_vars as env
+from ci_diff_helper import git_tools
+
+
+_IDLE_TIMEOUT = 600.0
+_CONNECTION_TIMEOUT = 60.0
+_CLIENT_TIMEOUT = 300.0
+_START_TIMEOUT = 10.0
+_START_POLL_INTERVAL = 0.05
+_ACCEPT_POLL_INTERVAL = 0.1
+_BACKLOG = 16
+_SOCKET_MODE = 0o600
+_SOCKET_DIR_MODE = 0o700
+_SHARED_MODE_BITS = 0o077
+_SOCKET_DIR_TEMPLATE = 'ci-diff-helper-{}'
+_MAX_MEMORY_ENTRIES = 256
+_INDEX_FILENAME = 'index'
+_SOCKET_TEMPLATE = 'ci-diff-helper-{}.sock'
+# NOTE: ``__name__`` is ``__main__`` when run via ``python -m``.
+_MODULE_NAME = 'ci_diff_helper.daemon'
+_ERROR_TYPES = {
+    'KeyError': KeyError,
+    'NotImplementedError': NotImplementedError,
+    'OSError': OSError,
+    'TypeError': TypeError,
+    'ValueError': ValueError,
+}
+
+
+def _repo_root():
+    """Find the root of the current checkout.
+
+    Reads the filesystem directly when possible, so that a client
+    doesn't need to run ``git``.
+
+    Returns:
+        str: The root of the current checkout.
+    """
+    try:
+        repo = _git_objects.Repository.discover(os.getcwd())
+    except NotImplementedError:
+        return git_tools.git_root()
+    if repo.work_tree is None:  # pragma: NO COVER
+        return git_tools.git_root()
+    return repo.work_tree
+
+
+def _socket_dir():
+    """Get (and create if needed) the private directory for sockets.
+
+    The directory is in the temporary directory, which is shared with
+    other users, so it must belong to the current user and be
+    inaccessible to everyone else. Otherwise another user could create
+    the socket and answer queries in place of the server.
+
+    Returns:
+        str: The path of the directory.
+
+    Raises:
+        ValueError: If the directory is not private to the current user.
+    """
+    path = os.path.join(
+        tempfile.gettempdir(), _SOCKET_DIR_TEMPLATE.format(os.getuid()))
+    try:
+        os.mkdir(path, _SOCKET_DIR_MODE)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            raise
+    info = os.lstat(path)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or
+            info.st_mode & _SHARED_MODE_BITS):
+        raise ValueError('Socket directory is not private', path)
+    return path
+
+
+def socket_path():
+    """Get the path of the socket for the current checkout.
+
+    Uses the ``CI_DIFF_HELPER_DAEMON_SOCKET`` environment variable
+    (:data:`~.environment_vars.DAEMON_SOCKET`) if set, and otherwise a
+    path derived from the root of the checkout, in a directory private
+    to the user (within the temporary directory).
+
+    Returns:
+        str: The path of the socket.
+
+    Raises:
+        ValueError: If the directory of the socket is not private to
+            the current user.
+    """
+    path = os.getenv(env.DAEMON_SOCKET)
+    if path is not None:
+        return path
+    digest = hashlib.sha256(_repo_root().encode('utf-8')).hexdigest()
+    # NOTE: Socket paths are limited to ~100 bytes, so only part of the
+    #       hash is used.
+    return os.path.join(
+        _socket_dir(), _SOCKET_TEMPLATE.format(digest[:16]))
+
+
+def _check_owner(path):
+    """Check that a socket belongs to the current user.
+
+    Args:
+        path (str): The path of the socket.
+
+    Raises:
+        ValueError: If the socket belongs to another user.
+    """
+    try:
+        owner = os.stat(path).st_uid
+    except OSError:
+        return  # Connecting will fail.
+    if owner != os.getuid():
+        raise ValueError('Socket belongs to another user', path)
+
+
+def _idle_timeout():
+    """Get the idle timeout from the environment.
+
+    Returns:
+        float: The number of seconds to wait for a query before
+        shutting down.
+
+    Raises:
+        ValueError: If the environment variable is not a number.
+    """
+    return float(os.getenv(env.DAEMON_IDLE_TIMEOUT, str(_IDLE_TIMEOUT)))
+
+
+class _MemoryBackend(change_cache.Backend):
+    """Keep recently used change sets in memory.
+
+    Args:
+        fallback (Optional[~.change_cache.Backend]): A (slower) backend
+            to also read from and write to.
+        max_entries (Optional[int]): The maximum number of change sets
+            to keep in memory.
+    """
+
+    def __init__(self, fallback=None, max_entries=_MAX_MEMORY_ENTRIES):
+        self.fallback = fallback
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+
+    def _remember(self, key, data):
+        """Store a change set in memory, evicting the oldest if needed.
+
+        Args:
+            key (str): The key of the change set.
+            data (bytes): The value to store.
+        """
+        self._entries.pop(key, None)
+        self._entries[key] = data
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Look up a stored change set.
+
+        Args:
+            key (str): The key of the change set.
+
+        Returns:
+            Optional[bytes]: The stored value, if any.
+        """
+        data = self._entries.get(key)
+        if data is None and self.fallback is not None:
+            data = self.fallback.get(key)
+        if data is not None:
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        """Store a change set.
+
+        Args:
+            key (str): The key of the change set.
+            data (bytes): The value to store.
+        """
+        self._remember(key, data)
+        if self.fallback is not None:
+            self.fallback.put(key, data)
+
+
+def _to_statuses(values):
+    """Convert status letters from a request into file statuses.
+
+    Args:
+        values (Optional[List[str]]): The status letters (e.g. ``A``).
+
+    Returns:
+        Optional[List[~.git_tools.FileStatus]]: The statuses.
+    """
+    if values is None:
+        return None
+    return [git_tools.FileStatus(value) for value in values]
+
+
+@contextlib.contextmanager
+def _ci_environ(environ):
+    """Replace the CI environment variables of this process.
+
+    Args:
+        environ (Mapping[str, str]): The CI environment variables to use
+            (see :func:`~._build_cache.ci_environ`).
+
+    Yields:
+        None: After the environment variables are replaced. They are
+        restored afterwards.
+    """
+    saved = _build_cache.ci_environ()
+    for name in saved:
+        del os.environ[name]
+    os.environ.update(environ)
+    try:
+        yield
+    finally:
+        for name in _build_cache.ci_environ():
+            del os.environ[name]
+        os.environ.update(saved)
+
+
+def _send(file_obj, message):
+    """Write a single message.
+
+    Args:
+        file_obj (file): The (binary) file to write to.
+        message (dict): The message. Values which are not JSON
+            serializable are sent as strings.
+    """
+    line = json.dumps(message, default=str) + '\n'
+    file_obj.write(line.encode('utf-8'))
+    file_obj.flush()
+
+
+def _receive(file_obj):
+    """Read a single message.
+
+    Args:
+        file_obj (file): The (binary) file to read from.
+
+    Returns:
+        Optional[dict]: The message, or :data:`None` if the other end
+        closed the connection.
+    """
+    line = file_obj.readline()
+    if not line:
+        return None
+    return json.loads(line.decode('utf-8'))
+
+
+class Server(object):
+    """Answer queries for the current checkout over a Unix socket.
+
+    If no ``git`` backend is configured (via
+    :data:`~.environment_vars.GIT_BACKEND`), the server re-uses
+    ``git cat-file --batch`` processes (see
+    :class:`~._runners.GitBatchRunner`).
+
+    Each connection is served on its own thread, so a slow (or idle)
+    client doesn't hold up the others. Requests are still answered one
+    at a time, since they share state (and configuration requests
+    replace the CI environment variables of the process).
+
+    Args:
+        path (str): The path of the socket.
+        idle_timeout (Optional[float]): The number of seconds to wait
+            for a query before shutting down.
+    """
+
+    def __init__(self, path, idle_timeout=_IDLE_TIMEOUT):
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self._configs = {}
+        self._changes = change_cache.ChangeSetCache(
+            _MemoryBackend(fallback=_fallback_backend()))
+        self._checked_in = {}
+        self._last_state = None
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._connections = 0
+        self._last_active = time.time()
+        self._connections_lock = threading.Lock()
+        try:
+            self._repo = _git_objects.Repository.discover(os.getcwd())
+        except NotImplementedError:
+            self._repo = None
+
+    def _state(self):
+        """Get the state of the checkout that answers depend on.
+
+        Returns:
+            tuple: The HEAD commit and the modification time of the
+            index.
+        """
+        if self._repo is None:
+            head_sha = _runners.SubprocessRunner.check_output(
+                ('git', 'rev-parse', 'HEAD'), ignore_err=True)
+            return head_sha, None
+        index_path = os.path.join(self._repo.git_dir, _INDEX_FILENAME)
+        try:
+            index_mtime = os.stat(index_path).st_mtime
+        except OSError:
+            index_mtime = None
+        return self._repo.read_ref('HEAD'), index_mtime
+
+    def _refresh(self):
+        """Forget everything that depends on the state, if it changed."""
+        state = self._state()
+        if state == self._last_state:
+            return
+        self._last_state = state
+        for config in six.itervalues(self._configs):
+            config.invalidate()
+        self._checked_in.clear()
+        # The batch processes may have cached the old refs.
+        _utils.get_runner().close()
+
+    def _get_config(self, environ):
+        """Get (and create if needed) the configuration of a build.
+
+        Must be called with the CI environment variables of the build
+        in place.
+
+        Args:
+            environ (Mapping[str, str]): The CI environment variables
+                of the build.
+
+        Returns:
+            ~._config_base.Config: The configuration.
+        """
+        key = tuple(sorted(six.iteritems(environ)))
+        config = self._configs.get(key)
+        if config is None:
+            config = ci_diff_helper.get_config()
+            self._configs[key] = config
+        return config
+
+    @staticmethod
+    def _do_ping():
+        """Check that the server is running.
+
+        Returns:
+            dict: The ID of the server process.
+        """
+        return {'pid': os.getpid()}
+
+    def _do_shutdown(self):
+        """Stop the server after responding."""
+        self._stopped = True
+
+    def _do_config(self, names=(), environ=None):
+        """Resolve properties of the configuration.
+
+        Args:
+            names (Optional[List[str]]): The properties to resolve.
+            environ (Optional[Dict[str, str]]): The CI environment
+                variables of the client (see
+                :func:`~._build_cache.ci_environ`). Defaults to those
+                of the server.
+
+        Returns:
+            dict: A snapshot of the configuration (see
+            :meth:`~._config_base.Config.snapshot`).
+        """
+        if environ is None:
+            environ = _build_cache.ci_environ()
+        with _ci_environ(environ):
+            return self._get_config(environ).snapshot(names)
+
+    def _do_changed_files(self, blob_name1, blob_name2, pathspecs=None,
+                          globs=None, statuses=None):
+        """Get the files changed between two revisions.
+
+        Args:
+            blob_name1 (str): A ``git`` object reference.
+            blob_name2 (str): A ``git`` object reference.
+            pathspecs (Optional[List[str]]): ``git`` pathspecs limiting
+                the files returned.
+            globs (Optional[List[str]]): Glob patterns limiting the
+                files returned.
+            statuses (Optional[List[str]]): The status letters to keep.
+
+        Returns:
+            List[str]: All filenames changed.
+        """
+        return self._changes.get_changed_files(
+            blob_name1, blob_name2, pathspecs=pathspecs, globs=globs,
+            statuses=_to_statuses(statuses))
+
+    def _do_checked_in_files(self, pathspecs=None, globs=None):
+        """Get the files checked in to the repository.
+
+        Args:
+            pathspecs (Optional[List[str]]): ``git`` pathspecs limiting
+                the files returned.
+            globs (Optional[List[str]]): Glob patterns limiting the
+                files returned.
+
+        Returns:
+            List[str]: All filenames checked in.
+        """
+        key = json.dumps([pathspecs, globs])
+        files = self._checked_in.get(key)
+        if files is None:
+            files = git_tools.get_checked_in_files(
+                pathspecs=pathspecs, globs=globs)
+            self._checked_in[key] = files
+        return files
+
+    def handle(self, request):
+        """Answer a single request.
+
+        Args:
+            request (dict): The request, with a ``method`` and
+                (optionally) ``params``.
+
+        Returns:
+            dict: The response, with either a ``result`` or an
+            ``error`` (its ``type`` and ``args``).
+        """
+        try:
+            method_name = request.get('method')
+            method = getattr(self, '_do_{}'.format(method_name), None)
+            if method is None:
+                raise ValueError('Unknown method', method_name)
+            with self._lock:
+                if method_name not in ('ping', 'shutdown'):
+                    self._refresh()
+                result = method(**request.get('params', {}))
+        except Exception as exc:  # pylint: disable=broad-except
+            return {
+                'error': {'type': type(exc).__name__, 'args': exc.args},
+            }
+        return {'result': result}
+
+    def _handle_connection(self, conn):
+        """Answer every request sent on a connection.
+
+        Args:
+            conn (socket.socket): The connection to a client.
+        """
+        conn.settimeout(_CONNECTION_TIMEOUT)
+        file_obj = conn.makefile('rwb')
+        try:
+            while not self._stopped:
+                request = _receive(file_obj)
+                if request is None:
+                    break
+                _send(file_obj, self.handle(request))
+        except (socket.error, ValueError):
+            pass  # A broken client shouldn't stop the server.
+        finally:
+            file_obj.close()
+            conn.close()
+            with self._connections_lock:
+                self._connections -= 1
+                self._last_active = time.time()
+
+    def _is_idle(self):
+        """Check if the server has been idle for too long.
+
+        Returns:
+            bool: Indicates if no client has been connected for the
+            idle timeout.
+        """
+        with self._connections_lock:
+            return (self._connections == 0 and
+                    time.time() - self._last_active >= self.idle_timeout)
+
+    def _bind(self):
+        """Create the listening socket, replacing a stale one.
+
+        Returns:
+            socket.socket: The listening socket.
+
+        Raises:
+            OSError: If another server is already listening.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(self.path)
+        except socket.error as exc:
+            if exc.errno != errno.EADDRINUSE:
+                sock.close()
+                raise
+            if _is_listening(self.path):
+                sock.close()
+                raise OSError(None, 'A server is already running', self.path)
+            # The socket was left behind by a server that exited.
+            os.remove(self.path)
+            sock.bind(self.path)
+        os.chmod(self.path, _SOCKET_MODE)
+        sock.listen(_BACKLOG)
+        # NOTE: Wake up regularly to notice a shutdown (requested on
+        #       another thread) or that the server is idle.
+        sock.settimeout(min(self.idle_timeout, _ACCEPT_POLL_INTERVAL))
+        return sock
+
+    def serve_forever(self):
+        """Answer queries until shut down or idle."""
+        if os.getenv(env.GIT_BACKEND) is None:
+            _utils.set_runner(_runners.GitBatchRunner())
+        sock = self._bind()
+        self._last_active = time.time()
+        try:
+            while not self._stopped:
+                try:
+                    conn, _ = sock.accept()
+                except socket.timeout:
+                    if self._is_idle():
+                        break
+                    continue
+                with self._connections_lock:
+                    self._connections += 1
+                thread = threading.Thread(
+                    target=self._handle_connection, args=(conn,))
+                thread.daemon = True
+                thread.start()
+        finally:
+            sock.close()
+            os.remove(self.path)
+
+
+def _fallback_backend():
+    """Get the backend of the configured change set cache (if any).
+
+    Returns:
+        Optional[~.change_cache.Backend]: The backend.
+    """
+    cache = change_cache.get_change_cache()
+    if cache is None:
+        return None
+    return cache.backend
+
+
+def _is_listening(path):
+    """Check if a server is listening on a socket.
+
+    Args:
+        path (str): The path of the socket.
+
+    Returns:
+        bool: Indicates if a connection could be made.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+class Client(object):
+    """Send queries to a :class:`Server`.
+
+    Errors raised by the server are raised again by the client (as a
+    :exc:`RuntimeError` if they are not a built-in type). Queries are
+    only sent to a socket which belongs to the current user.
+
+    Args:
+        path (Optional[str]): The path of the socket. Defaults to
+            :func:`socket_path`.
+        timeout (Optional[float]): The number of seconds to wait for
+            the server.
+    """
+
+    def __init__(self, path=None, timeout=_CLIENT_TIMEOUT):
+        if path is None:
+            path = socket_path()
+        self.path = path
+        self.timeout = timeout
+
+    def call(self, method, **params):
+        """Send a request to the server.
+
+        Args:
+            method (str): The method to call.
+            params (dict): The parameters of the method.
+
+        Returns:
+            object: The result.
+
+        Raises:
+            socket.error: If the server can't be reached.
+            ValueError: If the socket belongs to another user.
+            Exception: The error raised by the server.
+        """
+        _check_owner(self.path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+            file_obj = sock.makefile('rwb')
+            try:
+                _send(file_obj, {'method': method, 'params': params})
+                response = _receive(file_obj)
+            finally:
+                file_obj.close()
+        finally:
+            sock.close()
+
+        if response is None:
+            raise OSError(None, 'Server closed the connection', self.path)
+        error = response.get('error')
+        if error is not None:
+            error_class = _ERROR_TYPES.get(error['type'])
+            if error_class is None:
+                raise RuntimeError(error['type'], *error['args'])
+            raise error_class(*error['args'])
+        return response['result']
+
+    def ping(self):
+        """Check that the server is running.
+
+        Returns:
+            bool: Indicates if the server responded.
+        """
+        try:
+            self.call('ping')
+        except socket.error:
+            return False
+        return True
+
+    def shutdown(self):
+        """Stop the server."""
+        self.call('shutdown')
+
+    def config(self, names=(), environ=None):
+        """Get the configuration of the build.
+
+        Args:
+            names (Optional[Iterable[str]]): The properties to resolve.
+            environ (Optional[Mapping[str, str]]): The environment of
+                the build. Only the CI environment variables (see
+                :func:`~._build_cache.ci_environ`) are sent. Defaults
+                to :data:`os.environ`.
+
+        Returns:
+            ~._config_base.Config: The configuration, restored from a
+            snapshot (see :meth:`~._config_base.Config.from_snapshot`).
+        """
+        snapshot = self.call('config', names=list(names),
+                             environ=_build_cache.ci_environ(environ))
+        return _config_base.Config.from_snapshot(snapshot)
+
+    def changed_files(self, blob_name1, blob_name2, pathspecs=None,
+                      globs=None, statuses=None):
+        """Get the files changed between two revisions.
+
+        Args:
+            blob_name1 (str): A ``git`` object reference.
+            blob_name2 (str): A ``git`` object reference.
+            pathspecs (Optional[Iterable[str]]): ``git`` pathspecs
+                limiting the files returned.
+            globs (Optional[Iterable[str]]): Glob patterns limiting the
+                files returned.
+            statuses (Optional[Iterable[~.git_tools.FileStatus]]): The
+                statuses to keep.
+
+        Returns:
+            List[str]: All filenames changed.
+        """
+        if pathspecs is not None:
+            pathspecs = list(pathspecs)
+        if globs is not None:
+            globs = list(globs)
+        if statuses is not None:
+            statuses = [status.value for status in statuses]
+        return self.call(
+            'changed_files', blob_name1=blob_name1, blob_name2=blob_name2,
+            pathspecs=pathspecs, globs=globs, statuses=statuses)
+
+    def checked_in_files(self, pathspecs=None, globs=None):
+        """Get the files checked in to the repository.
+
+        Args:
+            pathspecs (Optional[Iterable[str]]): ``git`` pathspecs
+                limiting the files returned.
+            globs (Optional[Iterable[str]]): Glob patterns limiting the
+                files returned.
+
+        Returns:
+            List[str]: All filenames checked in.
+        """
+        if pathspecs is not None:
+            pathspecs = list(pathspecs)
+        if globs is not None:
+            globs = list(globs)
+        return self.call('checked_in_files', pathspecs=pathspecs,
+                         globs=globs)
+
+
+def start(path=None, idle_timeout=None):
+    """Start a server in the background (unless one is running).
+
+    Args:
+        path (Optional[str]): The path of the socket. Defaults to
+            :func:`socket_path`.
+        idle_timeout (Optional[float]): The number of seconds to wait
+            for a query before shutting down. Defaults to
+            :data:`~.environment_vars.DAEMON_IDLE_TIMEOUT`.
+
+    Returns:
+        Client: A client for the server.
+
+    Raises:
+        OSError: If the server doesn't start in time.
+    """
+    client = Client(path=path)
+    if client.ping():
+        return client
+    if idle_timeout is None:
+        idle_timeout = _idle_timeout()
+
+    args = [
+        sys.executable, '-m', _MODULE_NAME, '--socket', client.path, 'serve',
+        '--idle-timeout', str(idle_timeout),
+    ]
+    with open(os.devnull, 'r+b') as devnull:
+        subprocess.Popen(
+            args, stdin=devnull, stdout=devnull, stderr=devnull,
+            cwd=_repo_root(), close_fds=True)
+
+    deadline = time.time() + _START_TIMEOUT
+    while not client.ping():
+        if time.time() > deadline:
+            raise OSError(None, 'Server did not start', client.path)
+        time.sleep(_START_POLL_INTERVAL)
+    return client
+
+
+def _get_parser():
+    """Create the parser for command line arguments.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m ' + _MODULE_NAME,
+        description=__doc__.split('\n')[0])
+    parser.add_argument('--socket', help='The path of the socket.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    for name in ('serve', 'start'):
+        command = commands.add_parser(name)
+        command.add_argument('--idle-timeout', type=float)
+    commands.add_parser('stop')
+    command = commands.add_parser('config')
+    command.add_argument('names', nargs='*')
+    for name in ('changed-files', 'checked-in-files'):
+        command = commands.add_parser(name)
+        if name == 'changed-files':
+            command.add_argument('blob_name1')
+            command.add_argument('blob_name2')
+        command.add_argument('--pathspec', action='append', dest='pathspecs')
+        command.add_argument('--glob', action='append', dest='globs')
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point.
+
+    Args:
+        argv (Optional[List[str]]): The command line arguments.
+            Defaults to :data:`sys.argv`.
+
+    Returns:
+        int: The exit status.
+    """
+    args = _get_parser().parse_args(argv)
+    path = args.socket
+    try:
+        if args.command == 'serve':
+            if path is None:
+                path = socket_path()
+            idle_timeout = args.idle_timeout
+            if idle_timeout is None:
+                idle_timeout = _idle_timeout()
+            Server(path, idle_timeout=idle_timeout).serve_forever()
+        elif args.command == 'start':
+            print(start(path=path, idle_timeout=args.idle_timeout).path)
+        elif args.command == 'stop':
+            Client(path=path).shutdown()
+        elif args.command == 'config':
+            snapshot = Client(path=path).call(
+                'config', names=args.names,
+                environ=_build_cache.ci_environ())
+            values = snapshot['values']
+            if args.names:
+                values = dict((name, values[name]) for name in args.names)
+            print(json.dumps(values, sort_keys=True))
+        elif args.command == 'changed-files':
+            for filename in Client(path=path).changed_files(
+                    args.blob_name1, args.blob_name2,
+                    pathspecs=args.pathspecs, globs=args.globs):
+                print(filename)
+        else:
+            for filename in Client(path=path).checked_in_files(
+                    pathspecs=args.pathspecs, globs=args.globs):
+                print(filename)
+    except Exception as exc:  # pylint: disable=broad-except
+        print('Error: {!r}'.format(exc), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':  # pragma: NO COVER
+    sys.exit(main())
@@ -145,3 +145,85 @@ CIRCLE_CI_PR_OWNER = 'CIRCLE_PR_USERNAME'
 We only expect this environment variable to be set during a
 build that is a part of a pull request from a fork.
 """
+
+GIT_BACKEND = 'CI_DIFF_HELPER_GIT_BACKEND'
+"""The backend used to run ``git`` commands.
+
+One of ``subprocess`` (the default, which forks a new process for
+every command), ``batch`` (which re-uses long-lived
+``git cat-file --batch`` processes to answer object queries) or
+``python`` (which answers object queries and lists checked in files
+by reading the ``.git`` directory directly).
+"""
+
+GH_CACHE_DIR = 'CI_DIFF_HELPER_GITHUB_CACHE_DIR'
+"""Directory for a persistent cache of GitHub API responses.
+
+If set, responses are stored (along with their ``ETag`` and
+``Last-Modified`` headers) and later requests for the same URL are
+sent as conditional requests. A ``304 Not Modified`` response does
+not count against the GitHub rate limit.
+"""
+
+GH_CACHE_TTL = 'CI_DIFF_HELPER_GITHUB_CACHE_TTL'
+"""Number of seconds a cached GitHub API response is used as-is.
+
+Within this window, cached responses are returned without contacting
+GitHub at all. Only used if :data:`GH_CACHE_DIR` is set.
+"""
+
+GH_RATE_LIMIT_DIR = 'CI_DIFF_HELPER_GITHUB_RATE_LIMIT_DIR'
+"""Directory for a GitHub rate limit budget shared across processes.
+
+If set, every process on the host using the same GitHub token keeps
+the remaining budget (from the ``X-RateLimit-*`` headers) in a
+shared, file-locked ledger in this directory and paces its requests
+against it.
+"""
+
+BUILD_CACHE_DIR = 'CI_DIFF_HELPER_BUILD_CACHE_DIR'
+"""Directory for a cache of values resolved during the current build.
+
+If set, expensive configuration values (e.g. the ``base`` of the
+build, whether HEAD is a merge commit and the changed files) are
+stored in this directory, keyed by the CI environment variables and
+the HEAD commit. Later steps of the same build (each a new process)
+re-use them rather than running ``git`` or calling GitHub again.
+"""
+
+BUILD_CACHE_TTL = 'CI_DIFF_HELPER_BUILD_CACHE_TTL'
+"""Number of seconds a value in the build cache is used.
+
+If not set, values are kept until evicted to make room for newer
+ones. Only used if :data:`BUILD_CACHE_DIR` is set.
+"""
+
+CHANGE_CACHE_DIR = 'CI_DIFF_HELPER_CHANGE_CACHE_DIR'
+"""Directory for a cache of the files changed between two commits.
+
+If set, the list of files changed between two commits is stored in
+this directory (keyed by the commit SHAs), so re-runs of a build and
+other jobs on the same commit don't run the diff again. The directory
+may be on a mount shared between machines.
+"""
+
+CHANGE_CACHE_URL = 'CI_DIFF_HELPER_CHANGE_CACHE_URL'
+"""URL of a shared HTTP store for the files changed between two commits.
+
+Like :data:`CHANGE_CACHE_DIR`, but each list of changed files is read
+with ``GET`` and stored with ``PUT`` under this URL. Takes precedence
+over :data:`CHANGE_CACHE_DIR`.
+"""
+
+DAEMON_SOCKET = 'CI_DIFF_HELPER_DAEMON_SOCKET'
+"""Path of the Unix socket used by :mod:`~ci_diff_helper.daemon`.
+
+If not set, a path in the temporary directory is derived from the
+user and the root of the current checkout.
+"""
+
+DAEMON_IDLE_TIMEOUT = 'CI_DIFF_HELPER_DAEMON_IDLE_TIMEOUT'
+"""Number of seconds the daemon waits for a query before shutting down.
+
+Defaults to 600 (10 minutes).
+"""
@@ -14,7 +14,23 @@
 
 import os
 
+import enum
+
+from ci_diff_helper import _git_index
+from ci_diff_helper import _git_objects
+from ci_diff_helper import _runners
 from ci_diff_helper import _utils
+from ci_diff_helper import paths
+
+
+_COMMIT_CACHE = {}  # Commit metadata, keyed by SHA.
+_COMMIT_SUFFIX = '^{commit}'
+_GLOB_MAGIC = ':(top,glob)'
+_INDEX_FILENAME = 'index'
+_NULL_SHA = '0' * 40
+_PATHSPEC_SEPARATOR = '--'
+_RAW_PREFIX = ':'
+_TWO_PATH_STATUSES = ('R', 'C')
 
 
 def git_root():
@@ -26,7 +42,209 @@ def git_root():
     return _utils.check_output('git', 'rev-parse', '--show-toplevel')
 
 
-def get_checked_in_files():
+def _pathspec_args(pathspecs, globs):
+    """Build the trailing pathspec arguments for a ``git`` command.
+
+    Args:
+        pathspecs (Optional[Iterable[str]]): Pathspecs to pass to
+            ``git`` as-is.
+        globs (Optional[Iterable[str]]): Glob patterns, relative to the
+            root of the checkout (e.g. ``'**/*.py'``).
+
+    Returns:
+        List[str]: The arguments (starting with ``--``), or an empty
+        list if there are no pathspecs.
+    """
+    args = []
+    if pathspecs is not None:
+        args.extend(pathspecs)
+    if globs is not None:
+        args.extend(_GLOB_MAGIC + glob for glob in globs)
+    if args:
+        args.insert(0, _PATHSPEC_SEPARATOR)
+    return args
+
+
+def _diff_filter(statuses):
+    """Build the ``--diff-filter`` option for a collection of statuses.
+
+    Args:
+        statuses (Optional[Iterable[FileStatus]]): The statuses to keep.
+
+    Returns:
+        Optional[str]: The option, or :data:`None` if ``statuses`` is
+        :data:`None`. If ``statuses`` is empty (so no change could
+        match), returns the empty string.
+    """
+    if statuses is None:
+        return None
+    diff_filter = ''.join(sorted(status.value for status in statuses))
+    if diff_filter:
+        return '--diff-filter=' + diff_filter
+    return ''
+
+
+def changed_files_command(blob_name1, blob_name2, pathspecs=None,
+                          globs=None, statuses=None, nul_delimited=False):
+    """Build the ``git`` command listing changed files.
+
+    Shared by the functions here and their non-blocking versions in
+    :mod:`~.aio`.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference.
+        blob_name2 (str): A ``git`` object reference.
+        pathspecs (Optional[Iterable[str]]): ``git`` pathspecs limiting
+            the files listed.
+        globs (Optional[Iterable[str]]): Glob patterns, relative to the
+            root of the checkout, limiting the files listed.
+        statuses (Optional[Iterable[FileStatus]]): The statuses to
+            keep.
+        nul_delimited (Optional[bool]): Flag indicating if the
+            filenames should be NUL-delimited (rather than on separate
+            lines).
+
+    Returns:
+        Optional[List[str]]: The command, or :data:`None` if no change
+        could match ``statuses``.
+    """
+    args = ['git', 'diff', '--name-only']
+    if nul_delimited:
+        args.append('-z')
+    diff_filter = _diff_filter(statuses)
+    if diff_filter is not None:
+        if not diff_filter:
+            return None
+        args.append(diff_filter)
+    args.extend((blob_name1, blob_name2))
+    args.extend(_pathspec_args(pathspecs, globs))
+    return args
+
+
+def checked_in_files_command(pathspecs=None, globs=None, root=None,
+                             nul_delimited=False):
+    """Build the ``git`` command listing checked in files.
+
+    Shared by the functions here and their non-blocking versions in
+    :mod:`~.aio`.
+
+    Args:
+        pathspecs (Optional[Iterable[str]]): ``git`` pathspecs limiting
+            the files listed.
+        globs (Optional[Iterable[str]]): Glob patterns, relative to the
+            root of the checkout, limiting the files listed.
+        root (Optional[str]): The root of the checkout, which is listed
+            if there are no ``pathspecs`` or ``globs``.
+        nul_delimited (Optional[bool]): Flag indicating if the
+            filenames should be NUL-delimited (rather than on separate
+            lines).
+
+    Returns:
+        Optional[List[str]]: The command, or :data:`None` if it should
+        list the root of the checkout but ``root`` is not provided.
+    """
+    pathspec_args = _pathspec_args(pathspecs, globs)
+    if not pathspec_args:
+        if root is None:
+            return None
+        pathspec_args = [root]
+    args = ['git', 'ls-files']
+    if nul_delimited:
+        args.append('-z')
+    args.extend(pathspec_args)
+    return args
+
+
+def parse_files(cmd_output, absolute=False):
+    """Split the output of a ``git`` command listing files.
+
+    Args:
+        cmd_output (Optional[str]): The (stripped) output, with one
+            filename per line.
+        absolute (Optional[bool]): Flag indicating if the filenames
+            should be made absolute (they are relative to the current
+            directory).
+
+    Returns:
+        List[str]: The filenames.
+    """
+    if not cmd_output:
+        return []
+    filenames = cmd_output.split('\n')
+    if absolute:
+        return [os.path.abspath(filename) for filename in filenames]
+    return filenames
+
+
+def read_index():
+    """Read the ``git`` index of the current checkout, without ``git``.
+
+    The index file is memory-mapped and entries are only decoded
+    as they are iterated over, so counting the tracked files (via
+    :func:`len`) or only looking at a path prefix or extension (via
+    :meth:`~._git_index.GitIndex.iter_entries`) is cheap even for a
+    very large checkout.
+
+    .. code-block:: python
+
+      >>> index = read_index()
+      >>> len(index)
+      1048576
+      >>> next(index.iter_entries(suffix='.py'))
+      <IndexEntry 100644 3f2a9ce 'docs/conf.py'>
+      >>> index.close()
+
+    Returns:
+        ~._git_index.GitIndex: The index of the current checkout.
+
+    Raises:
+        NotImplementedError: If the index can't be read directly (e.g.
+            the repository is configured via environment variables or
+            uses a split index).
+    """
+    repo = _git_objects.Repository.discover(os.getcwd())
+    return _git_index.GitIndex(
+        os.path.join(repo.git_dir, _INDEX_FILENAME))
+
+
+def _read_index_files(repo, as_table):
+    """Gets a list of files in a repository directly from the index.
+
+    Args:
+        repo (~._git_objects.Repository): The current repository.
+        as_table (bool): Flag indicating if a
+            :class:`~.paths.PathTable` should be returned.
+
+    Returns:
+        Union[list, ~.paths.PathTable]: All filenames checked into the
+        repository.
+
+    Raises:
+        NotImplementedError: If the repository has no working tree or
+            the index can't be read directly.
+    """
+    root_dir = repo.work_tree
+    if root_dir is None:
+        raise NotImplementedError('Bare repository', repo.git_dir)
+
+    index = _git_index.GitIndex(
+        os.path.join(repo.git_dir, _INDEX_FILENAME))
+    try:
+        if os.sep == '/':
+            filenames = (os.path.join(root_dir, path)
+                         for path in index.iter_paths())
+        else:  # pragma: NO COVER
+            filenames = (os.path.join(root_dir, path.replace('/', os.sep))
+                         for path in index.iter_paths())
+        if as_table:
+            return paths.PathTable.from_paths(filenames)
+        else:
+            return list(filenames)
+    finally:
+        index.close()
+
+
+def get_checked_in_files(as_table=False, pathspecs=None, globs=None):
     """Gets a list of files in the current ``git`` repository.
 
     Effectively runs:
@@ -37,20 +255,57 @@ def get_checked_in_files():
 
     and then finds the absolute path for each file returned.
 
+    If ``pathspecs`` or ``globs`` are provided, they replace
+    ``${GIT_ROOT}`` so that ``git`` does the filtering, e.g.
+    ``globs=['**/*.py']`` runs
+
+    .. code-block:: bash
+
+      $ git ls-files -- ':(top,glob)**/*.py'
+
+    When the ``python`` backend is selected (see
+    :data:`~.environment_vars.GIT_BACKEND`) and no filtering is
+    requested, the files are read directly from the index (see
+    :func:`read_index`) instead.
+
+    Args:
+        as_table (Optional[bool]): Flag indicating if the filenames
+            should be returned as a compact :class:`~.paths.PathTable`
+            rather than a :class:`list`. Defaults to :data:`False`.
+        pathspecs (Optional[Iterable[str]]): ``git`` pathspecs (e.g.
+            ``':(exclude)docs'``) limiting the files returned. Passed
+            to ``git`` as-is, so they are relative to the current
+            directory unless they use the ``top`` magic.
+        globs (Optional[Iterable[str]]): Glob patterns (e.g.
+            ``'**/*.py'``), relative to the root of the checkout,
+            limiting the files returned.
+
     Returns:
-        list: List of all filenames checked into the repository.
+        Union[list, ~.paths.PathTable]: All filenames checked into the
+        repository.
     """
-    root_dir = git_root()
-    cmd_output = _utils.check_output('git', 'ls-files', root_dir)
+    args = checked_in_files_command(
+        pathspecs=pathspecs, globs=globs, nul_delimited=as_table)
+    if args is None:
+        runner = _utils.get_runner()
+        if isinstance(runner, _runners.PythonGitRunner):
+            try:
+                return _read_index_files(runner.repo, as_table)
+            except NotImplementedError:
+                pass
+        args = checked_in_files_command(
+            root=git_root(), nul_delimited=as_table)
 
-    result = []
-    for filename in cmd_output.split('\n'):
-        result.append(os.path.abspath(filename))
+    if as_table:
+        return paths.PathTable.from_paths(
+            os.path.abspath(filename)
+            for filename in _utils.iter_output(*args))
 
-    return result
+    return parse_files(_utils.check_output(*args), absolute=True)
 
 
-def get_changed_files(blob_name1, blob_name2):
+def get_changed_files(blob_name1, blob_name2, as_table=False,
+                      pathspecs=None, globs=None, statuses=None):
     """Gets a list of changed files between two ``git`` revisions.
 
     A ``git`` object reference can be any of a branch name, tag,
@@ -59,17 +314,417 @@ def get_changed_files(blob_name1, blob_name2):
     Args:
         blob_name1 (str): A ``git`` object reference.
         blob_name2 (str): A ``git`` object reference.
+        as_table (Optional[bool]): Flag indicating if the filenames
+            should be returned as a compact :class:`~.paths.PathTable`
+            (built while streaming from :func:`iter_changed_files`)
+            rather than a :class:`list`. Defaults to :data:`False`.
+        pathspecs (Optional[Iterable[str]]): ``git`` pathspecs limiting
+            the files returned (passed to ``git`` as-is).
+        globs (Optional[Iterable[str]]): Glob patterns (e.g.
+            ``'**/*.py'``), relative to the root of the checkout,
+            limiting the files returned.
+        statuses (Optional[Iterable[FileStatus]]): The statuses to
+            keep, e.g. to skip deleted files. The filtering is done by
+            ``git`` (via ``--diff-filter``).
+
+    .. note::
+
+        This waits for ``git`` to finish and holds the entire output
+        in memory. For very large diffs (or paths ``git`` would
+        quote, e.g. non-ASCII paths), use :func:`iter_changed_files`.
 
     Returns:
-        list: List of all filenames changed.
+        Union[list, ~.paths.PathTable]: All filenames changed.
     """
-    cmd_output = _utils.check_output(
-        'git', 'diff', '--name-only', blob_name1, blob_name2)
+    if as_table:
+        return paths.PathTable.from_paths(
+            iter_changed_files(blob_name1, blob_name2, pathspecs=pathspecs,
+                               globs=globs, statuses=statuses),
+            sep='/')
 
-    if cmd_output:
-        return cmd_output.split('\n')
-    else:
+    args = changed_files_command(
+        blob_name1, blob_name2, pathspecs=pathspecs, globs=globs,
+        statuses=statuses)
+    if args is None:
         return []
+    return parse_files(_utils.check_output(*args))
+
+
+def iter_changed_files(blob_name1, blob_name2, pathspecs=None, globs=None,
+                       statuses=None):
+    """Iterate over changed files between two ``git`` revisions.
+
+    Effectively runs:
+
+    .. code-block:: bash
+
+      $ git diff --name-only -z ${BLOB_NAME1} ${BLOB_NAME2}
+
+    but yields each filename as soon as ``git`` writes it, so callers
+    can start processing before the diff is complete. Since the
+    output is NUL-delimited, filenames are never quoted by ``git``.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference.
+        blob_name2 (str): A ``git`` object reference.
+        pathspecs (Optional[Iterable[str]]): ``git`` pathspecs limiting
+            the files returned (passed to ``git`` as-is).
+        globs (Optional[Iterable[str]]): Glob patterns (e.g.
+            ``'**/*.py'``), relative to the root of the checkout,
+            limiting the files returned.
+        statuses (Optional[Iterable[FileStatus]]): The statuses to
+            keep. The filtering is done by ``git`` (via
+            ``--diff-filter``).
+
+    Yields:
+        str: Each filename changed.
+    """
+    args = changed_files_command(
+        blob_name1, blob_name2, pathspecs=pathspecs, globs=globs,
+        statuses=statuses, nul_delimited=True)
+    if args is None:
+        return iter(())
+    return _utils.iter_output(*args)
+
+
+# pylint: disable=too-few-public-methods
+class FileStatus(enum.Enum):
+    """Enum representing the status of a file in a ``git`` diff."""
+    added = 'A'
+    copied = 'C'
+    deleted = 'D'
+    modified = 'M'
+    renamed = 'R'
+    type_changed = 'T'
+    unmerged = 'U'
+    unknown = 'X'
+# pylint: enable=too-few-public-methods
+
+
+class FileChange(object):
+    """A single file change between two ``git`` revisions.
+
+    Args:
+        status (FileStatus): The type of change.
+        old_path (Optional[str]): The path before the change. Will be
+            :data:`None` for an added file.
+        new_path (Optional[str]): The path after the change. Will be
+            :data:`None` for a deleted file.
+        old_mode (Optional[int]): The file mode before the change.
+        new_mode (Optional[int]): The file mode after the change.
+        old_sha (Optional[str]): The blob SHA before the change.
+        new_sha (Optional[str]): The blob SHA after the change.
+        score (Optional[int]): The similarity score (as a percentage)
+            for a rename or copy.
+    """
+
+    __slots__ = ('status', 'old_path', 'new_path', 'old_mode', 'new_mode',
+                 'old_sha', 'new_sha', 'score')
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, status, old_path, new_path, old_mode=None,
+                 new_mode=None, old_sha=None, new_sha=None, score=None):
+        self.status = status
+        self.old_path = old_path
+        self.new_path = new_path
+        self.old_mode = old_mode
+        self.new_mode = new_mode
+        self.old_sha = old_sha
+        self.new_sha = new_sha
+        self.score = score
+    # pylint: enable=too-many-arguments
+
+    @property
+    def path(self):
+        """str: The most current path of the file.
+
+        This is the path after the change, unless the file was deleted.
+        """
+        if self.new_path is None:
+            return self.old_path
+        return self.new_path
+
+    def _key(self):
+        """Get a tuple of all the values in the change.
+
+        Returns:
+            tuple: The values of every slot.
+        """
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if not isinstance(other, FileChange):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<FileChange {} {!r} -> {!r}>'.format(
+            self.status.value, self.old_path, self.new_path)
+
+
+def _parse_mode(mode):
+    """Parse an octal file mode from ``git diff --raw``.
+
+    Args:
+        mode (str): The mode, e.g. ``100644``.
+
+    Returns:
+        Optional[int]: The mode as an integer, or :data:`None` if the
+        file doesn't exist on that side of the diff.
+    """
+    value = int(mode, 8)
+    return value or None
+
+
+def _parse_sha(sha):
+    """Parse an object SHA from ``git diff --raw``.
+
+    Args:
+        sha (str): The object SHA.
+
+    Returns:
+        Optional[str]: The SHA, or :data:`None` if the file doesn't
+        exist on that side of the diff.
+    """
+    if sha == _NULL_SHA:
+        return None
+    return sha
+
+
+def _iter_raw_changes(records):
+    """Parse NUL-delimited ``git diff --raw -z`` output into changes.
+
+    Each change is a metadata record of the form::
+
+      :{old_mode} {new_mode} {old_sha} {new_sha} {status}{score}
+
+    followed by one path (or two, for renames and copies).
+
+    Args:
+        records (Iterable[str]): The NUL-delimited records.
+
+    Yields:
+        FileChange: Each change parsed.
+
+    Raises:
+        ValueError: If a record is not in the expected format.
+    """
+    records = iter(records)
+    for meta in records:
+        if not meta.startswith(_RAW_PREFIX):
+            raise ValueError('Unexpected record in raw diff', meta)
+        old_mode, new_mode, old_sha, new_sha, status = meta[1:].split(' ')
+        letter, score = status[0], status[1:]
+        path = next(records)
+        if letter in _TWO_PATH_STATUSES:
+            old_path, new_path = path, next(records)
+        else:
+            old_path = new_path = path
+
+        old_mode = _parse_mode(old_mode)
+        new_mode = _parse_mode(new_mode)
+        if old_mode is None:
+            old_path = None
+        if new_mode is None:
+            new_path = None
+        yield FileChange(
+            FileStatus(letter), old_path, new_path,
+            old_mode=old_mode, new_mode=new_mode,
+            old_sha=_parse_sha(old_sha), new_sha=_parse_sha(new_sha),
+            score=int(score) if score else None)
+
+
+def get_changes(blob_name1, blob_name2, statuses=None):
+    """Gets detailed file changes between two ``git`` revisions.
+
+    Effectively runs:
+
+    .. code-block:: bash
+
+      $ git diff --raw -z -M --no-abbrev ${BLOB_NAME1} ${BLOB_NAME2}
+
+    so that the status, paths (before and after a rename), modes and
+    blob SHAs of every changed file are retrieved in a single call.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference.
+        blob_name2 (str): A ``git`` object reference.
+        statuses (Optional[Iterable[FileStatus]]): The statuses to
+            keep, e.g. to skip deleted files. The filtering is done by
+            ``git`` (via ``--diff-filter``). If not provided, all
+            changes are returned.
+
+    Returns:
+        List[FileChange]: All the files changed.
+    """
+    args = ['git', 'diff', '--raw', '-z', '-M', '--no-abbrev']
+    diff_filter = _diff_filter(statuses)
+    if diff_filter is not None:
+        if not diff_filter:
+            return []
+        args.append(diff_filter)
+    args.extend((blob_name1, blob_name2))
+    return list(_iter_raw_changes(_utils.iter_output(*args)))
+
+
+class CommitInfo(object):
+    """Metadata for a single ``git`` commit.
+
+    Args:
+        sha (str): The SHA-1 hash of the commit.
+        tree (str): The SHA-1 hash of the tree for the commit.
+        parents (Tuple[str, ...]): The SHA-1 hashes of the parent commits.
+        author_time (int): The author timestamp (in seconds since the
+            epoch).
+        committer_time (int): The committer timestamp (in seconds since
+            the epoch).
+        subject (str): The commit subject.
+    """
+
+    __slots__ = ('sha', 'tree', 'parents', 'author_time', 'committer_time',
+                 'subject')
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, sha, tree, parents, author_time, committer_time,
+                 subject):
+        self.sha = sha
+        self.tree = tree
+        self.parents = parents
+        self.author_time = author_time
+        self.committer_time = committer_time
+        self.subject = subject
+    # pylint: enable=too-many-arguments
+
+    @property
+    def is_merge(self):
+        """bool: Indicates if the commit is a merge commit.
+
+        Raises:
+            NotImplementedError: if the number of parents is not 1 or 2.
+        """
+        num_parents = len(self.parents)
+        if num_parents == 1:
+            return False
+        elif num_parents == 2:
+            return True
+        else:
+            raise NotImplementedError(
+                'Unexpected number of parent commits', self.parents)
+
+    @classmethod
+    def from_record(cls, record):
+        """Parse a commit from a ``git log`` record.
+
+        Args:
+            record (str): A commit described by the fields in
+                :data:`._runners.COMMIT_FORMAT` (one per line).
+
+        Returns:
+            CommitInfo: The parsed commit.
+        """
+        sha, tree, parents, author_time, committer_time, subject = (
+            record.split('\n', 5))
+        return cls(sha, tree, tuple(parents.split()), int(author_time),
+                   int(committer_time), subject)
+
+    def to_record(self):
+        """Describe the commit as a ``git log`` record.
+
+        This is the inverse of :meth:`from_record`.
+
+        Returns:
+            str: The fields of the commit (one per line).
+        """
+        return '\n'.join([
+            self.sha, self.tree, ' '.join(self.parents),
+            str(self.author_time), str(self.committer_time), self.subject])
+
+    def __repr__(self):
+        return '<CommitInfo {}>'.format(self.sha)
+
+
+def get_commits(*revisions):
+    """Gets metadata for ``git`` commits with a single ``git`` call.
+
+    Effectively runs:
+
+    .. code-block:: bash
+
+      $ git log --no-walk=unsorted -z \\
+      >   --format=%H%n%T%n%P%n%at%n%ct%n%s ${REVISION1} ${REVISION2} ...
+
+    Results are memoized by commit SHA, so revisions given as a full
+    SHA that have been seen before are returned without calling ``git``.
+
+    Args:
+        revisions (Tuple[str, ...]): The ``git`` revisions, any of a
+            branch name, tag, a commit SHA or a special reference.
+
+    Returns:
+        List[CommitInfo]: The metadata for each revision (in order).
+    """
+    unknown = []
+    for revision in revisions:
+        if revision not in _COMMIT_CACHE and revision not in unknown:
+            unknown.append(revision)
+
+    if unknown:
+        cmd_output = _utils.check_output(
+            *(_runners.COMMIT_INFO_ARGS + tuple(unknown)))
+        records = cmd_output.split('\0')
+        commits = [CommitInfo.from_record(record)
+                   for record in records if record]
+        if len(commits) != len(unknown):
+            # NOTE: ``git log`` only shows each commit once, so if two
+            #       revisions are the same commit we can't tell which
+            #       revision a record belongs to.
+            shas = _utils.check_output(
+                'git', 'rev-parse',
+                *[revision + _COMMIT_SUFFIX for revision in unknown])
+            shas = shas.split('\n')
+        else:
+            shas = [commit.sha for commit in commits]
+
+        by_sha = {}
+        for commit in commits:
+            by_sha[commit.sha] = commit
+            _COMMIT_CACHE[commit.sha] = commit
+        resolved = dict(zip(unknown, shas))
+    else:
+        by_sha = resolved = {}
+
+    result = []
+    for revision in revisions:
+        if revision in _COMMIT_CACHE:
+            result.append(_COMMIT_CACHE[revision])
+        else:
+            result.append(by_sha[resolved[revision]])
+    return result
+
+
+def commit_info(revision='HEAD'):
+    """Gets metadata for a ``git`` commit.
+
+    Args:
+        revision (Optional[str]): A ``git`` revision, any of a branch
+            name, tag, a commit SHA or a special reference.
+
+    Returns:
+        CommitInfo: The metadata for the commit.
+
+    Raises:
+        ValueError: If the revision doesn't resolve to exactly one
+            commit (e.g. if it is a range).
+    """
+    commits = get_commits(revision)
+    if len(commits) != 1:
+        raise ValueError('Expected exactly one commit', revision, commits)
+    return commits[0]
 
 
 def merge_commit(revision='HEAD'):
@@ -85,16 +740,7 @@ def merge_commit(revision='HEAD'):
     Raises:
         NotImplementedError: if the number of parents is not 1 or 2.
     """
-    parents = _utils.check_output(
-        'git', 'log', '--pretty=%P', '-1', revision)
-    num_parents = len(parents.split())
-    if num_parents == 1:
-        return False
-    elif num_parents == 2:
-        return True
-    else:
-        raise NotImplementedError(
-            'Unexpected number of parent commits', parents)
+    return commit_info(revision).is_merge
 
 
 def commit_subject(revision='HEAD'):
@@ -107,5 +753,4 @@ def commit_subject(revision='HEAD'):
     Returns:
         str: The commit subject.
     """
-    return _utils.check_output(
-        'git', 'log', '--pretty=%s', '-1', revision)
+    return commit_info(revision).subject
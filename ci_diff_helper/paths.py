@@ -0,0 +1,581 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compact containers for (very) large lists of file paths.
+
+A :class:`PathTable` can be returned by
+:func:`~.git_tools.get_checked_in_files` and
+:func:`~.git_tools.get_changed_files` (by passing ``as_table=True``)
+instead of a :class:`list` of strings:
+
+.. doctest:: path-table
+
+  >>> from ci_diff_helper.paths import PathTable
+  >>> table = PathTable.from_paths([
+  ...     '/repo/setup.py',
+  ...     '/repo/pkg/__init__.py',
+  ...     '/repo/pkg/feature.py',
+  ...     '/repo/docs/index.rst',
+  ... ], sep='/')
+  >>> table
+  <PathTable (4 paths)>
+  >>> table[1]
+  '/repo/pkg/__init__.py'
+  >>> list(table.with_suffix('.py'))
+  ['/repo/setup.py', '/repo/pkg/__init__.py', '/repo/pkg/feature.py']
+  >>> list(table.in_directory('/repo/pkg'))
+  ['/repo/pkg/__init__.py', '/repo/pkg/feature.py']
+
+To ask many "did anything under this directory change?" questions
+of the same list of paths, build a :class:`ChangeIndex` once.
+"""
+
+import array
+import os
+
+try:
+    from collections import abc as collections_abc
+except ImportError:  # pragma: NO COVER
+    import collections as collections_abc
+
+import six
+
+
+_INDEX_TYPECODE = 'L'
+
+
+def _split(path, sep):
+    """Split a path into its directory and basename.
+
+    Unlike :func:`os.path.split`, the directory keeps its trailing
+    separator, so that the two pieces can simply be concatenated.
+
+    Args:
+        path (str): A path.
+        sep (str): The path separator.
+
+    Returns:
+        Tuple[str, str]: The directory and basename.
+    """
+    split_at = path.rfind(sep) + 1
+    return path[:split_at], path[split_at:]
+
+
+class PathTable(collections_abc.Sequence):
+    """A read-only sequence of paths, stored compactly.
+
+    Rather than one :class:`str` per path, the table holds
+
+    * every distinct directory (including the trailing separator)
+      exactly once, i.e. directory names are interned,
+    * one contiguous buffer with the (UTF-8 encoded) basenames of all
+      paths, along with an array of offsets into that buffer, and
+    * an array holding the directory of each path.
+
+    Paths are only turned into :class:`str` objects when they are
+    accessed, and filtering by prefix, suffix or directory works on
+    the raw buffer without creating a string per path.
+
+    Tables are typically created via :meth:`from_paths`.
+
+    Args:
+        directories (List[str]): The distinct directories, each with
+            a trailing separator (the empty string is used for paths
+            without a directory).
+        dir_ids (array.array): The index (into ``directories``) of the
+            directory of each path.
+        buffer (bytes): The concatenated basenames of all paths.
+        offsets (array.array): The start of each basename in
+            ``buffer``, followed by the end of the last one.
+        sep (Optional[str]): The path separator. Defaults to
+            :data:`os.sep`.
+    """
+
+    def __init__(self, directories, dir_ids, buffer, offsets, sep=os.sep):
+        self._directories = directories
+        self._dir_ids = dir_ids
+        self._buffer = buffer
+        self._offsets = offsets
+        self.sep = sep
+
+    @classmethod
+    def from_paths(cls, paths, sep=os.sep):
+        """Build a table from an iterable of paths.
+
+        The paths are consumed one at a time, so ``paths`` can be a
+        generator (e.g. :func:`~.git_tools.iter_changed_files`) to avoid
+        ever holding every path as a :class:`str`.
+
+        Args:
+            paths (Iterable[str]): The paths to store.
+            sep (Optional[str]): The path separator. Defaults to
+                :data:`os.sep`.
+
+        Returns:
+            PathTable: The table containing ``paths`` (in order).
+        """
+        directories = []
+        dir_lookup = {}
+        dir_ids = array.array(_INDEX_TYPECODE)
+        buffer = bytearray()
+        offsets = array.array(_INDEX_TYPECODE, [0])
+        for path in paths:
+            dirname, basename = _split(path, sep)
+            dir_id = dir_lookup.get(dirname)
+            if dir_id is None:
+                dir_id = dir_lookup[dirname] = len(directories)
+                directories.append(dirname)
+            dir_ids.append(dir_id)
+            buffer.extend(basename.encode('utf-8'))
+            offsets.append(len(buffer))
+        return cls(directories, dir_ids, bytes(buffer), offsets, sep=sep)
+
+    @property
+    def directories(self):
+        """List[str]: The distinct directories that contain paths.
+
+        Each directory includes a trailing separator.
+        """
+        return [self._directories[dir_id]
+                for dir_id in sorted(set(self._dir_ids))]
+
+    def _path_at(self, index):
+        """Build the path at a given position.
+
+        Args:
+            index (int): A (non-negative) position in the table.
+
+        Returns:
+            str: The path.
+        """
+        basename = self._buffer[
+            self._offsets[index]:self._offsets[index + 1]]
+        return self._directories[self._dir_ids[index]] + basename.decode(
+            'utf-8')
+
+    def _select(self, indices):
+        """Create a new table with a subset of the paths.
+
+        The directories are shared with this table.
+
+        Args:
+            indices (Iterable[int]): The positions to keep.
+
+        Returns:
+            PathTable: The new table.
+        """
+        dir_ids = array.array(_INDEX_TYPECODE)
+        pieces = []
+        offsets = array.array(_INDEX_TYPECODE, [0])
+        size = 0
+        for index in indices:
+            dir_ids.append(self._dir_ids[index])
+            start = self._offsets[index]
+            end = self._offsets[index + 1]
+            pieces.append(self._buffer[start:end])
+            size += end - start
+            offsets.append(size)
+        return self.__class__(
+            self._directories, dir_ids, b''.join(pieces), offsets,
+            sep=self.sep)
+
+    def __len__(self):
+        return len(self._dir_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._select(six.moves.xrange(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('PathTable index out of range')
+        return self._path_at(index)
+
+    def __iter__(self):
+        for index in six.moves.xrange(len(self)):
+            yield self._path_at(index)
+
+    def __contains__(self, path):
+        dirname, basename = _split(path, self.sep)
+        basename = basename.encode('utf-8')
+        for index in self._matching_dirs(lambda value: value == dirname):
+            start = self._offsets[index]
+            end = self._offsets[index + 1]
+            if (end - start == len(basename) and
+                    self._buffer.startswith(basename, start, end)):
+                return True
+        return False
+
+    def __repr__(self):
+        return '<{} ({:d} paths)>'.format(self.__class__.__name__, len(self))
+
+    def _matching_dirs(self, predicate):
+        """Find the positions of paths whose directory matches.
+
+        Args:
+            predicate (Callable[[str], bool]): Called once per distinct
+                directory.
+
+        Yields:
+            int: The positions of the paths in matching directories.
+        """
+        matches = [predicate(dirname) for dirname in self._directories]
+        for index, dir_id in enumerate(self._dir_ids):
+            if matches[dir_id]:
+                yield index
+
+    def with_prefix(self, prefix):
+        """Get the paths that start with a given prefix.
+
+        Args:
+            prefix (str): The prefix (e.g. ``'/repo/pkg/test_'``).
+
+        Returns:
+            PathTable: The matching paths.
+        """
+        # Each directory either contains only matching paths, or paths
+        # that may match depending on the basename, or no matches.
+        all_match = []
+        basename_prefixes = []
+        for dirname in self._directories:
+            all_match.append(dirname.startswith(prefix))
+            if prefix.startswith(dirname):
+                basename_prefixes.append(
+                    prefix[len(dirname):].encode('utf-8'))
+            else:
+                basename_prefixes.append(None)
+
+        def matches(index):
+            """Check if the path at a position matches."""
+            dir_id = self._dir_ids[index]
+            if all_match[dir_id]:
+                return True
+            basename_prefix = basename_prefixes[dir_id]
+            if basename_prefix is None:
+                return False
+            return self._buffer.startswith(
+                basename_prefix, self._offsets[index],
+                self._offsets[index + 1])
+
+        return self._select(
+            index for index in six.moves.xrange(len(self)) if matches(index))
+
+    def with_suffix(self, suffix):
+        """Get the paths that end with a given suffix.
+
+        Args:
+            suffix (str): The suffix, typically an extension (e.g.
+                ``'.py'``). Must not contain the path separator.
+
+        Returns:
+            PathTable: The matching paths.
+        """
+        suffix = suffix.encode('utf-8')
+        offsets = self._offsets
+        return self._select(
+            index for index in six.moves.xrange(len(self))
+            if self._buffer.endswith(
+                suffix, offsets[index], offsets[index + 1]))
+
+    def in_directory(self, directory, recursive=True):
+        """Get the paths contained in a directory.
+
+        Args:
+            directory (str): The directory.
+            recursive (Optional[bool]): Flag indicating if paths in
+                subdirectories should be included. Defaults to
+                :data:`True`.
+
+        Returns:
+            PathTable: The matching paths.
+        """
+        if not directory.endswith(self.sep):
+            directory += self.sep
+
+        def predicate(dirname):
+            """Check if a directory is (or is contained in) the target."""
+            if dirname == directory:
+                return True
+            return recursive and dirname.startswith(directory)
+
+        return self._select(self._matching_dirs(predicate))
+
+
+class _TrieNode(object):
+    """A node in a :class:`ChangeIndex`.
+
+    Each outgoing edge is labelled with one or more path components
+    (chains of nodes with a single child are collapsed into one edge).
+
+    Attributes:
+        children (dict): Mapping from the first component of each edge
+            to a pair of the full edge label (a tuple of components)
+            and the child node.
+        terminal (bool): Flag indicating if a path ends at this node.
+        count (int): The number of paths ending at or below this node.
+    """
+
+    __slots__ = ('children', 'terminal', 'count')
+
+    def __init__(self):
+        self.children = {}
+        self.terminal = False
+        self.count = 0
+
+
+def _common_length(label, components, start):
+    """Count the leading components shared by an edge and a path.
+
+    Args:
+        label (tuple): The components labelling an edge.
+        components (tuple): The components of a path.
+        start (int): The position in ``components`` matched against
+            the start of ``label``.
+
+    Returns:
+        int: The length of the shared run.
+    """
+    length = 0
+    limit = min(len(label), len(components) - start)
+    while length < limit and label[length] == components[start + length]:
+        length += 1
+    return length
+
+
+class ChangeIndex(object):
+    """A compressed path trie for "what changed under here" queries.
+
+    Built once from a list of paths (e.g. from
+    :func:`~.git_tools.get_changed_files` or
+    :func:`~.git_tools.get_checked_in_files`), each query costs time
+    proportional to the number of components in the queried path,
+    independent of the number of paths in the index:
+
+    .. doctest:: change-index
+
+      >>> from ci_diff_helper.paths import ChangeIndex
+      >>> index = ChangeIndex([
+      ...     'services/foo/main.py',
+      ...     'services/foo/lib/util.py',
+      ...     'services/bar/README.md',
+      ...     'setup.py',
+      ... ], sep='/')
+      >>> index.has_prefix('services/foo')
+      True
+      >>> index.has_prefix('services/baz')
+      False
+      >>> index.count('services')
+      3
+      >>> sorted(index.child_counts('services').items())
+      [('bar', 1), ('foo', 2)]
+
+    An index of project roots can be used to find the project that
+    owns a path:
+
+    .. doctest:: change-index
+
+      >>> owners = ChangeIndex(['services/foo', 'services'], sep='/')
+      >>> owners.longest_prefix('services/foo/lib/util.py')
+      'services/foo'
+      >>> owners.longest_prefix('services/bar/README.md')
+      'services'
+      >>> owners.longest_prefix('setup.py') is None
+      True
+
+    Args:
+        paths (Optional[Iterable[str]]): The paths to add to the index.
+            May be a :class:`PathTable`.
+        sep (Optional[str]): The path separator. Defaults to the
+            separator of ``paths`` if it is a :class:`PathTable`,
+            otherwise to :data:`os.sep`.
+    """
+
+    def __init__(self, paths=(), sep=None):
+        if sep is None:
+            sep = getattr(paths, 'sep', os.sep)
+        self.sep = sep
+        self._root = _TrieNode()
+        for path in paths:
+            self.add(path)
+
+    def _components(self, path):
+        """Split a path into components.
+
+        Trailing separators are ignored, so ``'a/b/'`` and ``'a/b'``
+        are the same path.
+
+        Args:
+            path (str): A path.
+
+        Returns:
+            tuple: The components of the path.
+        """
+        path = path.rstrip(self.sep)
+        if not path:
+            return ()
+        return tuple(path.split(self.sep))
+
+    def add(self, path):
+        """Add a path to the index.
+
+        Adding a path that is already in the index has no effect.
+
+        Args:
+            path (str): The path to add.
+        """
+        components = self._components(path)
+        visited = [self._root]
+        node = self._root
+        position = 0
+        while position < len(components):
+            edge = node.children.get(components[position])
+            if edge is None:
+                child = _TrieNode()
+                node.children[components[position]] = (
+                    components[position:], child)
+                node = child
+                visited.append(node)
+                break
+
+            label, child = edge
+            shared = _common_length(label, components, position)
+            if shared < len(label):
+                # Split the edge where the path diverges.
+                middle = _TrieNode()
+                middle.count = child.count
+                middle.children[label[shared]] = (label[shared:], child)
+                node.children[components[position]] = (label[:shared], middle)
+                child = middle
+            node = child
+            visited.append(node)
+            position += shared
+
+        if node.terminal:
+            return
+        node.terminal = True
+        for visited_node in visited:
+            visited_node.count += 1
+
+    def _find(self, path):
+        """Find the node for a path.
+
+        Args:
+            path (str): A path.
+
+        Returns:
+            Tuple[Optional[_TrieNode], tuple]: The node at or directly
+            below the end of the path (or :data:`None` if nothing in
+            the index is at or below the path) and the components
+            of the edge leading to that node which extend past the
+            end of the path.
+        """
+        components = self._components(path)
+        node = self._root
+        position = 0
+        while position < len(components):
+            edge = node.children.get(components[position])
+            if edge is None:
+                return None, ()
+            label, node = edge
+            shared = _common_length(label, components, position)
+            if shared < len(label):
+                if position + shared < len(components):
+                    return None, ()
+                return node, label[shared:]
+            position += shared
+        return node, ()
+
+    def __len__(self):
+        return self._root.count
+
+    def __contains__(self, path):
+        node, remaining = self._find(path)
+        return node is not None and not remaining and node.terminal
+
+    def __repr__(self):
+        return '<{} ({:d} paths)>'.format(self.__class__.__name__, len(self))
+
+    def has_prefix(self, directory):
+        """Check if any path is at (or below) a directory.
+
+        Args:
+            directory (str): A directory (or path).
+
+        Returns:
+            bool: Flag indicating if the index contains any matching
+            path.
+        """
+        return self.count(directory) > 0
+
+    def count(self, directory):
+        """Count the paths at (or below) a directory.
+
+        Args:
+            directory (str): A directory (or path).
+
+        Returns:
+            int: The number of matching paths.
+        """
+        node, _ = self._find(directory)
+        if node is None:
+            return 0
+        return node.count
+
+    def child_counts(self, directory):
+        """Count the paths below each child of a directory.
+
+        Args:
+            directory (str): A directory.
+
+        Returns:
+            Dict[str, int]: Mapping from the name of each immediate
+            child of ``directory`` (i.e. a file or subdirectory) to
+            the number of paths at or below it.
+        """
+        node, remaining = self._find(directory)
+        if node is None:
+            return {}
+        if remaining:
+            return {remaining[0]: node.count}
+        return dict(
+            (name, child.count)
+            for name, (_, child) in six.iteritems(node.children))
+
+    def longest_prefix(self, path):
+        """Find the longest path in the index that contains a path.
+
+        Args:
+            path (str): A path.
+
+        Returns:
+            Optional[str]: The longest path in the index which is
+            either ``path`` itself or one of its parent directories.
+            If there is no such path, returns :data:`None`.
+        """
+        components = self._components(path)
+        node = self._root
+        position = 0
+        longest = 0 if node.terminal else None
+        while position < len(components):
+            edge = node.children.get(components[position])
+            if edge is None:
+                break
+            label, node = edge
+            if _common_length(label, components, position) < len(label):
+                break
+            position += len(label)
+            if node.terminal:
+                longest = position
+
+        if longest is None:
+            return None
+        return self.sep.join(components[:longest])
@@ -0,0 +1,194 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Get changed files even when the local history is too short.
+
+CI systems often make shallow clones (e.g. ``git clone --depth=50``),
+in which case the diffbase of a build may not be in the local history
+and :func:`~.git_tools.get_changed_files` fails. :func:`changed_files`
+uses ``git`` when the history is available and otherwise falls back
+to the GitHub API: the files in the pull request (if there is one) or
+a comparison of the two commits.
+
+The GitHub API truncates long lists of files (at 3000 files for a
+pull request and 300 for a comparison), so the result reports whether
+it is complete:
+
+.. testsetup:: providers
+
+  import ci_diff_helper
+  from ci_diff_helper import _github
+  from ci_diff_helper import _utils
+
+  def mock_check(*args, **kwargs):
+      # No merge base: the history is too short.
+      assert args[:2] == ('git', 'merge-base')
+      return None
+
+  _utils.check_output = mock_check
+
+  def mock_pr_files(slug, pr_id):
+      assert (slug, pr_id) == ('organization/repository', 1337)
+      return iter(['setup.py', 'project/feature.py'])
+
+  _github.iter_pr_files = mock_pr_files
+
+.. doctest:: providers
+
+  >>> from ci_diff_helper import providers
+  >>> result = providers.changed_files(
+  ...     'HEAD', 'master', slug='organization/repository', pr_id=1337)
+  >>> result
+  <ChangedFiles (2 files, source=pull_request, complete=True)>
+  >>> result.files
+  ['setup.py', 'project/feature.py']
+
+When a result is not complete, callers should fall back to e.g.
+running every job.
+"""
+
+import enum
+
+from ci_diff_helper import _github
+from ci_diff_helper import _utils
+from ci_diff_helper import git_tools
+
+
+_COMMIT_SUFFIX = '^{commit}'
+
+
+class ChangeSource(enum.Enum):
+    """Enum representing where a list of changed files came from."""
+
+    git = 'git'
+    pull_request = 'pull_request'
+    compare = 'compare'
+
+
+class ChangedFiles(object):
+    """A list of changed files, along with where it came from.
+
+    Args:
+        files (list): The changed files, relative to the root of the
+            checkout.
+        source (ChangeSource): Where the list came from.
+        complete (bool): Flag indicating if the list is known to
+            contain every changed file.
+    """
+
+    __slots__ = ('files', 'source', 'complete')
+
+    def __init__(self, files, source, complete):
+        self.files = files
+        self.source = source
+        self.complete = complete
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def __repr__(self):
+        return '<ChangedFiles ({:d} files, source={}, complete={})>'.format(
+            len(self.files), self.source.value, self.complete)
+
+
+def _has_history(blob_name1, blob_name2):
+    """Check if the local history can be used to diff two revisions.
+
+    Both revisions must exist locally and the history must be deep
+    enough to reach a common ancestor.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference.
+        blob_name2 (str): A ``git`` object reference.
+
+    Returns:
+        bool: Flag indicating if the local history is sufficient.
+    """
+    merge_base = _utils.check_output(
+        'git', 'merge-base', blob_name1, blob_name2, ignore_err=True)
+    return merge_base is not None
+
+
+def _resolve(blob_name):
+    """Resolve a revision to a commit SHA, if it exists locally.
+
+    Args:
+        blob_name (str): A ``git`` object reference.
+
+    Returns:
+        str: The commit SHA, or ``blob_name`` itself if it can't be
+        resolved (e.g. a branch name GitHub may still know about).
+    """
+    sha = _utils.check_output(
+        'git', 'rev-parse', '--verify', '--quiet',
+        blob_name + _COMMIT_SUFFIX, ignore_err=True)
+    return sha or blob_name
+
+
+def _from_github(files, source, limit):
+    """Collect changed files from the GitHub API.
+
+    Args:
+        files (Iterable[str]): The changed files.
+        source (ChangeSource): Where the files came from.
+        limit (int): The maximum number of files the API returns.
+
+    Returns:
+        ChangedFiles: The changed files. The result is reported as
+        incomplete if the API limit was reached.
+    """
+    files = list(files)
+    return ChangedFiles(files, source, len(files) < limit)
+
+
+def changed_files(blob_name1, blob_name2, slug=None, pr_id=None):
+    """Get the files changed between two revisions.
+
+    Uses ``git`` if the local history is sufficient, otherwise the
+    GitHub API (the files of the pull request ``pr_id`` if provided,
+    otherwise a comparison of the two revisions).
+
+    Args:
+        blob_name1 (str): A ``git`` object reference, typically
+            ``HEAD``.
+        blob_name2 (str): A ``git`` object reference for the diffbase
+            (e.g. :attr:`.Travis.base`).
+        slug (Optional[str]): The GitHub repo slug for the current
+            build. Of the form ``{organization}/{repository}``. If not
+            provided, only ``git`` is used.
+        pr_id (Optional[int]): The pull request ID for the current
+            build (if any).
+
+    Returns:
+        ChangedFiles: The changed files.
+
+    Raises:
+        ~subprocess.CalledProcessError: If the local history is not
+            sufficient and ``slug`` is not provided.
+        requests.exceptions.HTTPError: If a GitHub API request fails.
+    """
+    if slug is None or _has_history(blob_name1, blob_name2):
+        files = git_tools.get_changed_files(blob_name1, blob_name2)
+        return ChangedFiles(files, ChangeSource.git, True)
+
+    if pr_id is not None:
+        return _from_github(
+            _github.iter_pr_files(slug, pr_id),
+            ChangeSource.pull_request, _github.PR_FILES_LIMIT)
+
+    files = _github.iter_compare_files(
+        slug, _resolve(blob_name2), _resolve(blob_name1))
+    return _from_github(
+        files, ChangeSource.compare, _github.COMPARE_FILES_LIMIT)
@@ -0,0 +1,283 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Decide which jobs to run based on the files that changed.
+
+A :class:`RuleSet` maps rule names (e.g. CI jobs) to lists of
+``.gitignore``-style patterns. Patterns are matched against paths
+relative to the root of the checkout (as returned by
+:func:`~.git_tools.get_changed_files`) and a pattern starting with
+``!`` excludes paths matched by earlier patterns in the same rule:
+
+.. doctest:: rules
+
+  >>> from ci_diff_helper.rules import RuleSet
+  >>> rule_set = RuleSet({
+  ...     'docs': ['docs/', '*.rst'],
+  ...     'python': ['*.py', '!docs/**'],
+  ...     'services-foo': ['/services/foo/'],
+  ... })
+  >>> sorted(rule_set.match(['docs/conf.py', 'README.rst']))
+  ['docs']
+  >>> sorted(rule_set.match(['services/foo/main.py']))
+  ['python', 'services-foo']
+
+The patterns of every rule are compiled together, so each path is
+checked against all rules at once (rather than calling
+:func:`fnmatch.fnmatch` once per rule and pattern).
+
+Pattern syntax follows ``.gitignore``:
+
+* ``*`` matches anything except ``/``, ``?`` matches any one
+  character except ``/`` and ``[...]`` matches a character class
+* ``**`` matches any number of directories (when it makes up an
+  entire path component)
+* a pattern with a ``/`` at the start or in the middle is matched
+  from the root of the checkout, otherwise it can match at any depth
+* a pattern ending with ``/`` only matches directories (i.e.
+  every path inside it)
+* a pattern matching a directory also matches everything inside it
+* blank lines and lines starting with ``#`` are ignored
+"""
+
+import re
+
+import six
+
+
+_NEGATION_PREFIX = '!'
+_COMMENT_PREFIX = '#'
+_ANY_DIRECTORIES = '(?:.*/)?'
+_DIRECTORY_CONTENTS = '/.*'
+_OPTIONAL_CONTENTS = '(?:/.*)?'
+_NEVER = '(?!)'
+# NOTE: Python 2.7 limits a regular expression to 100 groups.
+_MAX_GROUPS = 99
+
+
+def _translate_class(pattern, start):
+    """Translate a character class (e.g. ``[a-z]``) to a regex.
+
+    Args:
+        pattern (str): A glob pattern.
+        start (int): The position of the opening ``[``.
+
+    Returns:
+        Tuple[Optional[str], int]: The regex for the character class
+        and the position after the closing ``]``. If the class is not
+        terminated, returns :data:`None` for the regex.
+    """
+    position = start + 1
+    negated = position < len(pattern) and pattern[position] in '!^'
+    if negated:
+        position += 1
+    # A ``]`` directly after the opening bracket is a literal.
+    end = pattern.find(']', position + 1)
+    if end == -1:
+        return None, start + 1
+    contents = pattern[position:end].replace('\\', '\\\\')
+    if negated:
+        return '[^/' + contents + ']', end + 1
+    return '[' + contents + ']', end + 1
+
+
+def translate(pattern):
+    """Translate a ``.gitignore``-style pattern into a regex.
+
+    The regex matches paths (relative to the root of the checkout,
+    using ``/`` as separator) and must match the entire path.
+
+    Args:
+        pattern (str): A pattern, without a leading ``!``.
+
+    Returns:
+        str: The regex.
+    """
+    directory_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    pieces = []
+    if not anchored:
+        pieces.append(_ANY_DIRECTORIES)
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        if char == '*':
+            at_component_start = (
+                position == 0 or pattern[position - 1] == '/')
+            after_stars = position + 2
+            if (pattern.startswith('**', position) and at_component_start and
+                    (after_stars == len(pattern) or
+                     pattern[after_stars] == '/')):
+                if after_stars == len(pattern):
+                    pieces.append('.*')
+                else:
+                    # Consume the ``/`` as well, so ``a/**/b`` matches
+                    # ``a/b``.
+                    pieces.append(_ANY_DIRECTORIES)
+                position = after_stars + 1
+                continue
+            while position < len(pattern) and pattern[position] == '*':
+                position += 1
+            pieces.append('[^/]*')
+            continue
+        elif char == '?':
+            pieces.append('[^/]')
+        elif char == '[':
+            char_class, position = _translate_class(pattern, position)
+            pieces.append(re.escape(char) if char_class is None
+                          else char_class)
+            continue
+        elif char == '\\' and position + 1 < len(pattern):
+            position += 1
+            pieces.append(re.escape(pattern[position]))
+        else:
+            pieces.append(re.escape(char))
+        position += 1
+
+    if directory_only:
+        pieces.append(_DIRECTORY_CONTENTS)
+    else:
+        pieces.append(_OPTIONAL_CONTENTS)
+    return ''.join(pieces)
+
+
+def _parse_patterns(patterns):
+    """Split the patterns of a rule into regexes and signs.
+
+    Args:
+        patterns (Iterable[str]): The patterns for a rule.
+
+    Returns:
+        List[Tuple[str, bool]]: Pairs of a regex and a flag indicating
+        if the pattern is negated.
+    """
+    result = []
+    for pattern in patterns:
+        if not pattern or pattern.startswith(_COMMENT_PREFIX):
+            continue
+        negated = pattern.startswith(_NEGATION_PREFIX)
+        if negated:
+            pattern = pattern[len(_NEGATION_PREFIX):]
+        elif pattern.startswith('\\' + _NEGATION_PREFIX):
+            pattern = pattern[1:]
+        result.append((translate(pattern), negated))
+    return result
+
+
+def _rule_regex(patterns):
+    """Combine the patterns of a rule into a single lookahead.
+
+    As with ``.gitignore``, the last matching pattern wins: a path
+    matches the rule if some (positive) pattern matches it and no
+    negated pattern after that one matches it.
+
+    Args:
+        patterns (Iterable[str]): The patterns for a rule.
+
+    Returns:
+        str: A zero-width regex which succeeds if the rule matches.
+    """
+    parsed = _parse_patterns(patterns)
+    alternatives = []
+    for index, (regex, negated) in enumerate(parsed):
+        if negated:
+            continue
+        pieces = ['(?=(?:{})\\Z)'.format(regex)]
+        for later_regex, later_negated in parsed[index + 1:]:
+            if later_negated:
+                pieces.append('(?!(?:{})\\Z)'.format(later_regex))
+        alternatives.append(''.join(pieces))
+    if not alternatives:
+        return _NEVER
+    return '(?:{})'.format('|'.join(alternatives))
+
+
+class RuleSet(object):
+    """A compiled set of rules.
+
+    Each rule gets an (empty) capturing group inside an optional
+    lookahead, so a single :meth:`re.match` per path reports every
+    rule that matches the path.
+
+    Args:
+        rules (Union[dict, Iterable[Tuple[str, Iterable[str]]]]): The
+            rules, as a mapping (or pairs) from the name of each rule
+            to its patterns.
+    """
+
+    def __init__(self, rules):
+        if isinstance(rules, dict):
+            rules = sorted(six.iteritems(rules))
+        self.names = []
+        self._compiled = []
+        pieces = []
+        names = []
+        for name, patterns in rules:
+            self.names.append(name)
+            pieces.append('(?:{}())?'.format(_rule_regex(patterns)))
+            names.append(name)
+            if len(names) == _MAX_GROUPS:
+                self._add_regex(pieces, names)
+                pieces, names = [], []
+        if names:
+            self._add_regex(pieces, names)
+
+    def _add_regex(self, pieces, names):
+        """Compile a combined regex for some of the rules.
+
+        Args:
+            pieces (List[str]): The regex for each rule.
+            names (List[str]): The name of each rule.
+        """
+        regex = re.compile('(?s)' + ''.join(pieces))
+        self._compiled.append((regex, tuple(names)))
+
+    def match_path(self, path):
+        """Find the rules matching a single path.
+
+        Args:
+            path (str): A path, relative to the root of the checkout.
+
+        Returns:
+            Set[str]: The names of the matching rules.
+        """
+        return self.match((path,))
+
+    def match(self, paths):
+        """Find the rules triggered by any of a collection of paths.
+
+        Stops early once every rule has been triggered.
+
+        Args:
+            paths (Iterable[str]): Paths relative to the root of the
+                checkout (e.g. from
+                :func:`~.git_tools.get_changed_files`).
+
+        Returns:
+            Set[str]: The names of the triggered rules.
+        """
+        triggered = set()
+        num_rules = len(self.names)
+        for path in paths:
+            for regex, names in self._compiled:
+                match = regex.match(path)
+                if match.lastindex is None:
+                    continue
+                for name, group in zip(names, match.groups()):
+                    if group is not None:
+                        triggered.add(name)
+            if len(triggered) == num_rules:
+                break
+        return triggered
@@ -144,6 +144,7 @@ PR that was merged:
   1355
 """
 
+import operator
 import os
 
 import enum
@@ -152,7 +153,6 @@ from ci_diff_helper import _github
 from ci_diff_helper import _config_base
 from ci_diff_helper import _utils
 from ci_diff_helper import environment_vars as env
-from ci_diff_helper import git_tools
 
 
 _RANGE_DELIMITER = '...'
@@ -192,7 +192,7 @@ def _travis_event_type():
                          [enum_val.name for enum_val in TravisEventType])
 
 
-def _get_commit_range():
+def get_commit_range():
     """Get the Travis commit range from the environment.
 
     Uses the ``TRAVIS_COMMIT_RANGE`` environment variable and then
@@ -220,24 +220,70 @@ def _get_commit_range():
             exc, 'Commit range in unexpected format', commit_range)
 
 
-def _verify_merge_base(start, finish):
-    """Verifies that the merge base of a commit range **is** the start.
+def check_merge_base(merge_base, start, finish):
+    """Check that the merge base of a commit range **is** the start.
+
+    Shared by :attr:`Travis.base` and its non-blocking version in
+    :mod:`~.aio`.
 
     Args:
+        merge_base (Optional[str]): The merge base found by ``git``.
         start (str): The start commit in a range.
         finish (str): The last commit in a range.
 
     Raises:
         ValueError: If the merge base is not the start commit.
     """
-    merge_base = _utils.check_output(
-        'git', 'merge-base', start, finish, ignore_err=True)
     if merge_base != start:
         raise ValueError(
             'git merge base is not the start commit in range',
             merge_base, start, finish)
 
 
+def _verify_merge_base(start, finish):
+    """Verifies that the merge base of a commit range **is** the start.
+
+    Args:
+        start (str): The start commit in a range.
+        finish (str): The last commit in a range.
+
+    Raises:
+        ValueError: If the merge base is not the start commit.
+    """
+    merge_base = _utils.check_output(
+        'git', 'merge-base', start, finish, ignore_err=True)
+    check_merge_base(merge_base, start, finish)
+
+
+def check_github_merge_base(sha, slug, start, finish):
+    """Check the merge base retrieved from the GitHub API.
+
+    Shared by :attr:`Travis.base` and its non-blocking version in
+    :mod:`~.aio`.
+
+    Args:
+        sha (Optional[str]): The merge base from the GitHub API (see
+            :func:`~._github.compare_merge_base`).
+        slug (str): The GitHub repo slug for the current build.
+            Of the form ``{organization}/{repository}``.
+        start (str): The start commit in a range.
+        finish (str): The last commit in a range.
+
+    Returns:
+        str: The commit SHA of the merge base.
+
+    Raises:
+        KeyError: If the payload didn't contain the nested key
+            merge_base_commit->sha.
+    """
+    if sha is None:
+        raise KeyError(
+            'Missing key in the GitHub API payload',
+            'expected merge_base_commit->sha',
+            slug, start, finish)
+    return sha
+
+
 def _get_merge_base_from_github(slug, start, finish):
     """Retrieves the merge base of two commits from the GitHub API.
 
@@ -257,14 +303,8 @@ def _get_merge_base_from_github(slug, start, finish):
         KeyError: If the payload doesn't contain the nested key
             merge_base_commit->sha.
     """
-    payload = _github.commit_compare(slug, start, finish)
-    try:
-        return payload['merge_base_commit']['sha']
-    except KeyError:
-        raise KeyError(
-            'Missing key in the GitHub API payload',
-            'expected merge_base_commit->sha',
-            payload, slug, start, finish)
+    sha = _github.compare_merge_base(slug, start, finish)
+    return check_github_merge_base(sha, slug, start, finish)
 
 
 def _push_build_base(slug):
@@ -277,7 +317,7 @@ def _push_build_base(slug):
     Returns:
         str: The commit SHA of the diff base.
     """
-    start, finish = _get_commit_range()
+    start, finish = get_commit_range()
     # Resolve the start object name into a 40-char SHA1 hash.
     start_full = _utils.check_output('git', 'rev-parse', start,
                                      ignore_err=True)
@@ -326,19 +366,21 @@ class TravisEventType(enum.Enum):
 class Travis(_config_base.Config):
     """Represent Travis state and cache return values."""
 
-    # Default instance attributes.
-    _base = _utils.UNSET
-    _event_type = _utils.UNSET
-    _merged_pr = _utils.UNSET
-    _pr = _utils.UNSET
-    _repo_url = _utils.UNSET
-    _slug = _utils.UNSET
+    __slots__ = (
+        '_base',
+        '_event_type',
+        '_merged_pr',
+        '_pr',
+        '_repo_url',
+        '_slug',
+    )
     # Class attributes.
     _active_env_var = env.IN_TRAVIS
     _branch_env_var = env.TRAVIS_BRANCH
     _tag_env_var = env.TRAVIS_TAG
 
-    @property
+    @_config_base.lazy_property(
+        '_base', depends=('event_type', 'branch', 'slug'), persist=True)
     def base(self):
         """str: The ``git`` object that current build is changed against.
 
@@ -400,21 +442,19 @@ class Travis(_config_base.Config):
             This property is only meant to be used in a "pull request" or
             "push" build.
         """
-        if self._base is _utils.UNSET:
-            if self.in_pr:
-                self._base = self.branch
-            elif self.event_type is TravisEventType.push:
-                self._base = _push_build_base(self.slug)
-            else:
-                raise NotImplementedError
-        return self._base
+        if self.in_pr:
+            return self.branch
+        elif self.event_type is TravisEventType.push:
+            return _push_build_base(self.slug)
+        else:
+            raise NotImplementedError
 
-    @property
+    @_config_base.lazy_property(
+        '_event_type', encode=operator.attrgetter('name'),
+        decode=TravisEventType.__getitem__)
     def event_type(self):
         """bool: Indicates if currently running in Travis."""
-        if self._event_type is _utils.UNSET:
-            self._event_type = _travis_event_type()
-        return self._event_type
+        return _travis_event_type()
 
     @property
     def in_pr(self):
@@ -427,7 +467,9 @@ class Travis(_config_base.Config):
         """
         return self.event_type is TravisEventType.pull_request
 
-    @property
+    @_config_base.lazy_property(
+        '_merged_pr', depends=('event_type', 'is_merge', '_head_commit'),
+        persist=True)
     def merged_pr(self):
         """int: The pull request corresponding to a merge commit at HEAD.
 
@@ -445,50 +487,39 @@ class Travis(_config_base.Config):
             This property is only meant to be used in a "pull request" or
             "push" build.
         """
-        if self._merged_pr is not _utils.UNSET:
-            return self._merged_pr
-
         if self.in_pr:
-            self._merged_pr = None
+            return None
         elif self.event_type is TravisEventType.push:
-            if git_tools.merge_commit():
-                merge_subject = git_tools.commit_subject()
-                self._merged_pr = _utils.pr_from_commit(merge_subject)
-            else:
-                self._merged_pr = None
+            if self.is_merge:
+                merge_subject = self._head_commit.subject
+                return _utils.pr_from_commit(merge_subject)
+            return None
         else:
             raise NotImplementedError
-        return self._merged_pr
 
-    @property
+    @_config_base.lazy_property('_pr')
     def pr(self):
         """int: The current Travis pull request (if any).
 
         If there is no active pull request, returns :data:`None`.
         """
-        if self._pr is _utils.UNSET:
-            self._pr = _travis_pr()
-        return self._pr
+        return _travis_pr()
 
-    @property
+    @_config_base.lazy_property('_slug')
     def slug(self):
         """str: The current slug in the Travis build.
 
         Of the form ``{organization}/{repository}``.
         """
-        if self._slug is _utils.UNSET:
-            self._slug = _travis_slug()
-        return self._slug
+        return _travis_slug()
 
-    @property
+    @_config_base.lazy_property('_repo_url', depends=('slug',))
     def repo_url(self):
         """str: The URL of the current repository being built.
 
         Of the form ``https://github.com/{organization}/{repository}``.
         """
-        if self._repo_url is _utils.UNSET:
-            self._repo_url = _URL_TEMPLATE.format(self.slug)
-        return self._repo_url
+        return _URL_TEMPLATE.format(self.slug)
 
     @property
     def tag(self):
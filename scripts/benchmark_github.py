@@ -0,0 +1,187 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark the GitHub API client against a local fake server.
+
+Drives :mod:`ci_diff_helper._github`, :attr:`.CircleCI.base` and
+:attr:`.Travis.base` against :class:`tests.fake_github.FakeGitHub` and
+reports latency percentiles, request counts and connections opened
+for each scenario.
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+import mock
+
+
+_SCRIPTS_DIR = os.path.dirname(__file__)
+_ROOT_DIR = os.path.abspath(os.path.join(_SCRIPTS_DIR, '..'))
+sys.path.insert(0, _ROOT_DIR)
+
+# pylint: disable=wrong-import-position
+import ci_diff_helper  # noqa: E402
+from ci_diff_helper import _github  # noqa: E402
+from ci_diff_helper import _rate_limit  # noqa: E402
+from tests import fake_github  # noqa: E402
+# pylint: enable=wrong-import-position
+
+
+_SLUG = 'organization/repository'
+_PR_ID = 1337
+# NOTE: ``git rev-parse`` accepts any full (40 character) SHA, even if
+#       the commit doesn't exist, so an abbreviated SHA is used to make
+#       sure the start of the Travis range is missing locally.
+_MISSING_SHA = 'a' * 12
+_HEAD_SHA = 'b' * 40
+_PERCENTILES = (50, 90, 99)
+_HEADER = '{:<24} {:>8} {:>8} {:>8} {:>9} {:>6}'.format(
+    'scenario', 'p50 ms', 'p90 ms', 'p99 ms', 'requests', 'conns')
+_ROW = '{:<24} {:>8.2f} {:>8.2f} {:>8.2f} {:>9d} {:>6d}'
+
+
+def _percentile(sorted_values, percent):
+    """Compute a percentile with the nearest-rank method.
+
+    Args:
+        sorted_values (List[float]): The (sorted) values.
+        percent (int): The percentile to compute.
+
+    Returns:
+        float: The percentile.
+    """
+    rank = max(1, int(round(percent / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def _circle_ci_base():
+    """Compute the diffbase of a CircleCI pull request build.
+
+    Returns:
+        str: The diffbase.
+    """
+    environ = {
+        'CIRCLECI': 'true',
+        'CIRCLE_PR_NUMBER': str(_PR_ID),
+        'CIRCLE_REPOSITORY_URL': 'https://github.com/' + _SLUG,
+    }
+    with mock.patch('os.environ', new=environ):
+        return ci_diff_helper.CircleCI().base
+
+
+def _travis_base():
+    """Compute the diffbase of a Travis push build.
+
+    The start of the commit range is not in the local history, so the
+    merge base comes from the GitHub API.
+
+    Returns:
+        str: The diffbase.
+    """
+    environ = {
+        'TRAVIS': 'true',
+        'TRAVIS_EVENT_TYPE': 'push',
+        'TRAVIS_COMMIT_RANGE': '{}...{}'.format(_MISSING_SHA, _HEAD_SHA),
+        'TRAVIS_REPO_SLUG': _SLUG,
+    }
+    with mock.patch('os.environ', new=environ):
+        return ci_diff_helper.Travis().base
+
+
+def _scenarios():
+    """Get the benchmark scenarios.
+
+    Returns:
+        List[Tuple[str, Callable[[], object]]]: Pairs of a name and a
+        function to time.
+    """
+    return [
+        ('commit_compare', lambda: _github.commit_compare(
+            _SLUG, _MISSING_SHA, _HEAD_SHA)),
+        ('compare_merge_base', lambda: _github.compare_merge_base(
+            _SLUG, _MISSING_SHA, _HEAD_SHA)),
+        ('iter_compare_files', lambda: list(_github.iter_compare_files(
+            _SLUG, _MISSING_SHA, _HEAD_SHA))),
+        ('pr_info', lambda: _github.pr_info(_SLUG, _PR_ID)),
+        ('iter_pr_files', lambda: list(_github.iter_pr_files(
+            _SLUG, _PR_ID))),
+        ('CircleCI.base', _circle_ci_base),
+        ('Travis.base', _travis_base),
+    ]
+
+
+def _run_scenario(name, func, args):
+    """Time a scenario against a fresh fake server.
+
+    Args:
+        name (str): The name of the scenario.
+        func (Callable[[], object]): The function to time.
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        str: A row of the report.
+    """
+    files = ['src/file{:05d}.py'.format(index)
+             for index in range(args.files)]
+    fake = fake_github.FakeGitHub(
+        latency=args.latency, files=files, num_commits=args.commits,
+        patch_size=args.patch_size)
+    fake.add_pull_request(_PR_ID, _MISSING_SHA, _HEAD_SHA, files=files)
+    timings = []
+    with fake:
+        if args.error_every:
+            scheduler = _rate_limit.Scheduler(sleep=lambda seconds: None)
+            _github.set_scheduler(scheduler)
+        for iteration in range(args.iterations):
+            if args.error_every and iteration % args.error_every == 0:
+                fake.inject_errors(503)
+            start = time.time()
+            func()
+            timings.append(1000.0 * (time.time() - start))
+    timings.sort()
+    percentiles = [_percentile(timings, percent) for percent in _PERCENTILES]
+    return _ROW.format(
+        name, *(percentiles + [len(fake.requests), fake.connections]))
+
+
+def _get_args():
+    """Parse the command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='Seconds of server latency per request.')
+    parser.add_argument('--files', type=int, default=250)
+    parser.add_argument('--commits', type=int, default=50)
+    parser.add_argument('--patch-size', type=int, default=2048)
+    parser.add_argument('--error-every', type=int, default=0,
+                        help='Inject a 503 every N iterations.')
+    return parser.parse_args()
+
+
+def main():
+    """Script entry point."""
+    args = _get_args()
+    print(_HEADER)
+    for name, func in _scenarios():
+        print(_run_scenario(name, func, args))
+
+
+if __name__ == '__main__':
+    main()
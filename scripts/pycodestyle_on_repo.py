@@ -26,6 +26,9 @@ import sys
 import ci_diff_helper
 
 
+PYTHON_GLOBS = ('**/*.py',)
+
+
 def main(all_files=None):
     """Run pycodestyle on all Python files in the repository.
 
@@ -33,7 +36,9 @@ def main(all_files=None):
         all_files (Optional[list]): A list of all files to consider.
     """
     if all_files is None:
-        all_files = ci_diff_helper.get_checked_in_files()
+        # Let ``git`` filter out the non-Python files.
+        all_files = ci_diff_helper.get_checked_in_files(
+            globs=PYTHON_GLOBS)
 
     python_files = []
     for filename in all_files:
@@ -22,7 +22,8 @@ def main():
 
     Runs Pylint and pycodestyle.
     """
-    all_files = ci_diff_helper.get_checked_in_files()
+    all_files = ci_diff_helper.get_checked_in_files(
+        globs=pycodestyle_on_repo.PYTHON_GLOBS)
     pycodestyle_on_repo.main(all_files=all_files)
     run_pylint.main(all_files=all_files)
 
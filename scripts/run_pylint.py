@@ -82,6 +82,9 @@ _ROOT_DIR = os.path.abspath(os.path.join(_SCRIPTS_DIR, '..'))
 IGNORED_FILES = (
     os.path.join(_ROOT_DIR, 'docs', 'conf.py'),
 )
+if six.PY2:
+    # The asyncio API uses ``async`` / ``await`` syntax.
+    IGNORED_FILES += (os.path.join(_ROOT_DIR, 'ci_diff_helper', 'aio.py'),)
 
 
 def get_default_config():
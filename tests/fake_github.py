@@ -0,0 +1,541 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A local fake of the GitHub API, for offline tests and benchmarks.
+
+Serves ``compare``, ``pulls/{n}`` and ``pulls/{n}/files`` (with
+``Link`` pagination), answers GraphQL queries for pull requests (as
+sent by :func:`~ci_diff_helper._github.pr_batch_info`) and sends the
+``X-RateLimit-*`` headers. As on GitHub, responses have an ``ETag``
+(a matching ``If-None-Match`` gets a bodiless ``304``), only the
+first page of a comparison lists the changed files and the GraphQL
+API has its own rate limit (and requires a token). Latency, injected
+errors and exhaustion of the rate limit are configurable.
+
+While active, the shared :mod:`ci_diff_helper._github` session sends
+every request for ``https://api.github.com`` to the fake server, so
+the real client code (connection pool, scheduler, streaming) is
+exercised.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+
+from requests import adapters
+import six
+from six.moves import BaseHTTPServer
+from six.moves import http_client
+from six.moves import socketserver
+from six.moves.urllib import parse
+
+
+PUBLIC_URL = 'https://api.github.com'
+_COMPARE_RE = re.compile(
+    r'^/repos/([^/]+/[^/]+)/compare/([^/]+)\.\.\.([^/]+)$')
+_PR_RE = re.compile(r'^/repos/([^/]+/[^/]+)/pulls/(\d+)$')
+_PR_FILES_RE = re.compile(r'^/repos/([^/]+/[^/]+)/pulls/(\d+)/files$')
+_GRAPHQL_PATH = '/graphql'
+_GRAPHQL_PR_RE = re.compile(r'(\w+): pullRequest\(number: (\d+)\)')
+_GRAPHQL_FILES_RE = re.compile(r'files\(first: (\d+)\)')
+_CORE_RESOURCE = 'core'
+_GRAPHQL_RESOURCE = 'graphql'
+_DEFAULT_PER_PAGE = 30
+_LINK_TEMPLATE = '<{}{}?{}>; rel="next"'
+
+
+class _LocalAdapter(adapters.HTTPAdapter):
+    """Send requests for the public API to a local server instead.
+
+    Args:
+        local_url (str): The base URL of the local server.
+        kwargs (dict): Passed to :class:`~requests.adapters.HTTPAdapter`.
+    """
+
+    def __init__(self, local_url, **kwargs):
+        self._local_url = local_url
+        super(_LocalAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        request.url = self._local_url + request.url[len(PUBLIC_URL):]
+        return super(_LocalAdapter, self).send(request, **kwargs)
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """A threaded HTTP server which knows about its fake."""
+
+    daemon_threads = True
+
+    def __init__(self, fake):
+        self.fake = fake
+        BaseHTTPServer.HTTPServer.__init__(
+            self, ('127.0.0.1', 0), _Handler)
+
+    def handle_error(self, request, client_address):  # pragma: NO COVER
+        """Ignore clients dropping connections (e.g. after an error)."""
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answer a request by delegating to the fake."""
+
+    # Keep connections alive, as GitHub does.
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, don't let Nagle's
+    # algorithm hold back the body.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.fake.record_connection()
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._reply(*self.server.fake.respond(
+            self.path, self.headers.get('If-None-Match')))
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        length = int(self.headers['Content-Length'])
+        request = json.loads(self.rfile.read(length).decode('utf-8'))
+        self._reply(*self.server.fake.respond_graphql(
+            self.path, dict(self.headers), request))
+
+    def _reply(self, status, headers, payload):
+        """Send a JSON response.
+
+        Args:
+            status (int): The status code.
+            headers (dict): The headers of the response.
+            payload (object): The body of the response. If
+                :data:`None`, the response has no body (not even a
+                ``Content-Length``, as for a ``304`` from GitHub).
+        """
+        self.send_response(status)
+        for name, value in sorted(six.iteritems(headers)):
+            self.send_header(name, value)
+        if payload is None:
+            self.end_headers()
+            return
+        body = json.dumps(payload).encode('utf-8')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def _page(items, query):
+    """Select a page of items.
+
+    Args:
+        items (list): All of the items.
+        query (dict): The parsed query string of the request.
+
+    Returns:
+        Tuple[list, Optional[dict]]: The items on the page and the
+        query string for the next page (if there is one).
+    """
+    per_page = int(query.get('per_page', [_DEFAULT_PER_PAGE])[0])
+    page = int(query.get('page', ['1'])[0])
+    start = (page - 1) * per_page
+    next_query = None
+    if start + per_page < len(items):
+        next_query = {'per_page': per_page, 'page': page + 1}
+    return items[start:start + per_page], next_query
+
+
+class FakeGitHub(object):
+    """A fake GitHub API server.
+
+    Use as a context manager: on entry the server is started and
+    installed as the target of the shared :mod:`~ci_diff_helper._github`
+    session. On exit, the previous session, cache and scheduler are
+    restored.
+
+    Args:
+        latency (Optional[float]): Seconds to wait before answering
+            each request.
+        rate_limit (Optional[int]): The number of requests allowed per
+            rate limit window.
+        reset_after (Optional[float]): The length (in seconds) of a
+            rate limit window.
+        files (Optional[List[str]]): The files changed in every
+            comparison.
+        num_commits (Optional[int]): The number of commits in every
+            comparison.
+        patch_size (Optional[int]): The size of the patch sent for each
+            file in a comparison.
+        merge_base (Optional[str]): The merge base of every comparison.
+    """
+
+    def __init__(self, latency=0.0, rate_limit=5000, reset_after=3600.0,
+                 files=('setup.py',), num_commits=3, patch_size=256,
+                 merge_base='f' * 40):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.reset_after = reset_after
+        self.files = list(files)
+        self.num_commits = num_commits
+        self.patch_size = patch_size
+        self.merge_base = merge_base
+        self.pulls = {}
+        self.requests = []
+        self.graphql_requests = []
+        self.connections = 0
+        self.not_modified = 0
+        self._errors = []
+        self._lock = threading.Lock()
+        self._remaining = {}
+        self._reset = {}
+        self._server = None
+        self._thread = None
+        self._previous = None
+
+    # pylint: disable=too-many-arguments
+    def add_pull_request(self, pr_id, base_sha, head_sha, files=(),
+                         merge_commit_sha=None):
+        """Add a pull request.
+
+        Args:
+            pr_id (int): The pull request ID.
+            base_sha (str): The SHA of the base commit.
+            head_sha (str): The SHA of the head commit.
+            files (Optional[List[str]]): The changed files.
+            merge_commit_sha (Optional[str]): The SHA of the merge
+                commit, if the pull request has been merged.
+        """
+        merged = merge_commit_sha is not None
+        self.pulls[pr_id] = {
+            'number': pr_id,
+            'base': {'sha': base_sha, 'ref': 'master'},
+            'head': {'sha': head_sha, 'ref': 'feature'},
+            'state': 'closed' if merged else 'open',
+            'merged': merged,
+            'mergeable': True,
+            'merge_commit_sha': merge_commit_sha,
+            'changed_files': len(files),
+            '_files': list(files),
+        }
+    # pylint: enable=too-many-arguments
+
+    def inject_errors(self, status, count=1, retry_after=None):
+        """Answer the next requests with an error.
+
+        Args:
+            status (int): The status code of the errors.
+            count (Optional[int]): The number of requests to fail.
+            retry_after (Optional[int]): Value of the ``Retry-After``
+                header sent with each error.
+        """
+        with self._lock:
+            self._errors.extend([(status, retry_after)] * count)
+
+    def exhaust(self, resource=_CORE_RESOURCE):
+        """Use up the rest of the current rate limit window.
+
+        Args:
+            resource (Optional[str]): The rate limited resource, either
+                ``'core'`` (the REST API) or ``'graphql'``.
+        """
+        with self._lock:
+            self._window(resource, time.time())
+            self._remaining[resource] = 0
+
+    def record_connection(self):
+        """Count a new client connection."""
+        with self._lock:
+            self.connections += 1
+
+    def _window(self, resource, now):
+        """Start a new rate limit window for a resource if needed.
+
+        Must be called while holding the lock.
+
+        Args:
+            resource (str): The rate limited resource.
+            now (float): The current time.
+        """
+        if now >= self._reset.get(resource, 0.0):
+            self._remaining[resource] = self.rate_limit
+            self._reset[resource] = now + self.reset_after
+
+    def _rate_limit(self, resource=_CORE_RESOURCE):
+        """Consume one request from the rate limit.
+
+        Args:
+            resource (Optional[str]): The rate limited resource.
+
+        Returns:
+            Tuple[dict, bool]: The rate limit headers and a flag
+            indicating if the request is allowed.
+        """
+        with self._lock:
+            self._window(resource, time.time())
+            allowed = self._remaining[resource] > 0
+            if allowed:
+                self._remaining[resource] -= 1
+            headers = {
+                'X-RateLimit-Limit': str(self.rate_limit),
+                'X-RateLimit-Remaining': str(self._remaining[resource]),
+                'X-RateLimit-Reset': str(int(self._reset[resource])),
+                'X-RateLimit-Resource': resource,
+            }
+            return headers, allowed
+
+    def _compare(self, query, slug, start, finish):
+        """Build a (page of a) comparison.
+
+        Args:
+            query (dict): The parsed query string of the request.
+            slug (str): The repository slug.
+            start (str): The start commit.
+            finish (str): The last commit.
+
+        Returns:
+            Tuple[dict, Optional[dict]]: The payload and the query
+            string for the next page (if any).
+        """
+        commits = [
+            {'sha': '{:040x}'.format(index), 'commit': {'message': 'Fix'}}
+            for index in six.moves.xrange(self.num_commits)]
+        page_commits, next_query = _page(commits, query)
+        page_files = []
+        if query.get('page', ['1']) == ['1']:
+            # Only the first page has the files (all of them).
+            page_files = [
+                {'filename': filename, 'status': 'modified',
+                 'patch': '+' * self.patch_size}
+                for filename in self.files]
+        payload = {
+            'url': '{}/repos/{}/compare/{}...{}'.format(
+                PUBLIC_URL, slug, start, finish),
+            'base_commit': {'sha': start},
+            'merge_base_commit': {'sha': self.merge_base},
+            'status': 'ahead',
+            'total_commits': self.num_commits,
+            'commits': page_commits,
+            'files': page_files,
+        }
+        return payload, next_query
+
+    def _start_request(self, url, resource=_CORE_RESOURCE):
+        """Record a request and decide if it fails.
+
+        Args:
+            url (str): The path and query string of the request.
+            resource (Optional[str]): The rate limited resource.
+
+        Returns:
+            Tuple[dict, Optional[Tuple[int, object]]]: The headers of
+            the response and, if the request fails (it is rate limited
+            or an error was injected), the status and payload.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests.append(url)
+            error = self._errors.pop(0) if self._errors else None
+
+        headers, allowed = self._rate_limit(resource)
+        if not allowed:
+            return headers, (http_client.FORBIDDEN,
+                             {'message': 'API rate limit exceeded'})
+        if error is not None:
+            status, retry_after = error
+            if retry_after is not None:
+                headers['Retry-After'] = str(retry_after)
+            return headers, (status, {'message': 'Injected error'})
+        return headers, None
+
+    def _graphql_pr(self, pr_id, files_limit):
+        """Describe a pull request as in a GraphQL response.
+
+        Args:
+            pr_id (int): The pull request ID.
+            files_limit (int): The number of files to list.
+
+        Returns:
+            Optional[dict]: The fields of the ``PullRequest`` (or
+            :data:`None` if there is no such pull request).
+        """
+        info = self.pulls.get(pr_id)
+        if info is None:
+            return None
+        merge_commit = None
+        if info['merged']:
+            merge_commit = {'oid': info['merge_commit_sha']}
+        return {
+            'baseRefOid': info['base']['sha'],
+            'headRefOid': info['head']['sha'],
+            'merged': info['merged'],
+            'mergeable': 'MERGEABLE' if info['mergeable'] else 'CONFLICTING',
+            'state': 'MERGED' if info['merged'] else 'OPEN',
+            'mergeCommit': merge_commit,
+            'files': {
+                'totalCount': len(info['_files']),
+                'nodes': [
+                    {'path': path}
+                    for path in info['_files'][:files_limit]],
+            },
+        }
+
+    def respond_graphql(self, url, headers, request):
+        """Answer a GraphQL ``POST`` request.
+
+        Only the pull request fields sent by
+        :func:`~ci_diff_helper._github.pr_batch_info` are supported.
+
+        Args:
+            url (str): The path of the request.
+            headers (dict): The headers of the request.
+            request (dict): The (parsed) body of the request.
+
+        Returns:
+            Tuple[int, dict, object]: The status, headers and payload
+            of the response.
+        """
+        with self._lock:
+            self.graphql_requests.append((headers, request))
+        if url != _GRAPHQL_PATH:
+            return http_client.NOT_FOUND, {}, {'message': 'Not Found'}
+        if 'Authorization' not in headers:
+            return (http_client.UNAUTHORIZED, {},
+                    {'message': 'This endpoint requires you to be '
+                                'authenticated.'})
+        response_headers, failure = self._start_request(
+            url, resource=_GRAPHQL_RESOURCE)
+        if failure is not None:
+            status, payload = failure
+            return status, response_headers, payload
+
+        query = request['query']
+        files_match = _GRAPHQL_FILES_RE.search(query)
+        files_limit = 0 if files_match is None else int(files_match.group(1))
+        repository = {}
+        errors = []
+        for alias, pr_id in _GRAPHQL_PR_RE.findall(query):
+            repository[alias] = self._graphql_pr(int(pr_id), files_limit)
+            if repository[alias] is None:
+                errors.append({
+                    'type': 'NOT_FOUND',
+                    'path': ['repository', alias],
+                    'message': 'Could not resolve to a PullRequest with '
+                               'the number of {}.'.format(pr_id),
+                })
+        payload = {'data': {'repository': repository}}
+        if errors:
+            payload['errors'] = errors
+        return http_client.OK, response_headers, payload
+
+    def respond(self, url, if_none_match=None):
+        """Answer a ``GET`` request.
+
+        Args:
+            url (str): The path and query string of the request.
+            if_none_match (Optional[str]): The ``If-None-Match`` header
+                of the request (if any).
+
+        Returns:
+            Tuple[int, dict, object]: The status, headers and payload
+            of the response. The payload is :data:`None` if the
+            response is ``304 Not Modified``.
+        """
+        path, _, query_string = url.partition('?')
+        query = parse.parse_qs(query_string)
+        headers, failure = self._start_request(url)
+        if failure is not None:
+            status, payload = failure
+            return status, headers, payload
+
+        next_query = None
+        match = _COMPARE_RE.match(path)
+        pr_match = _PR_RE.match(path) or _PR_FILES_RE.match(path)
+        if match is not None:
+            payload, next_query = self._compare(query, *match.groups())
+        elif pr_match is not None and int(pr_match.group(2)) in self.pulls:
+            info = self.pulls[int(pr_match.group(2))]
+            if path.endswith('/files'):
+                files = [{'filename': filename, 'status': 'modified'}
+                         for filename in info['_files']]
+                payload, next_query = _page(files, query)
+            else:
+                payload = dict(
+                    (key, value) for key, value in six.iteritems(info)
+                    if not key.startswith('_'))
+        else:
+            return http_client.NOT_FOUND, headers, {'message': 'Not Found'}
+
+        if next_query is not None:
+            headers['Link'] = _LINK_TEMPLATE.format(
+                PUBLIC_URL, path, parse.urlencode(sorted(next_query.items())))
+        headers['ETag'] = '"{}"'.format(hashlib.sha1(json.dumps(
+            payload, sort_keys=True).encode('utf-8')).hexdigest())
+        if if_none_match == headers['ETag']:
+            with self._lock:
+                self.not_modified += 1
+            return http_client.NOT_MODIFIED, headers, None
+        return http_client.OK, headers, payload
+
+    @property
+    def local_url(self):
+        """str: The base URL of the running server."""
+        host, port = self._server.server_address
+        return 'http://{}:{:d}'.format(host, port)
+
+    def make_session(self):
+        """Create a session that sends API requests to this server.
+
+        Returns:
+            requests.Session: The session, with the same connection
+            pool settings as :func:`~._github.make_session`.
+        """
+        from ci_diff_helper import _github
+
+        session = _github.make_session()
+        # Don't route requests to the local server via a proxy.
+        session.trust_env = False
+        adapter = _LocalAdapter(
+            self.local_url, pool_connections=_github._POOL_CONNECTIONS,
+            pool_maxsize=_github._POOL_MAXSIZE)
+        session.mount(PUBLIC_URL, adapter)
+        return session
+
+    def __enter__(self):
+        from ci_diff_helper import _github
+
+        self._server = _Server(self)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.01,))
+        self._thread.daemon = True
+        self._thread.start()
+        # NOTE: The cache is saved as-is (rather than via the return
+        #       value of ``set_cache``) so that an unset cache is still
+        #       configured from the environment after exit.
+        self._previous = (
+            _github.set_session(self.make_session()),
+            _github._CACHE,  # pylint: disable=protected-access
+            _github.set_scheduler(None),
+        )
+        _github.set_cache(None)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        from ci_diff_helper import _github
+
+        session, cache, scheduler = self._previous
+        _github.set_session(session).close()
+        _github.set_cache(cache)
+        _github.set_scheduler(scheduler)
+        self._server.shutdown()
+        self._server.server_close()
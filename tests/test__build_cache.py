@@ -0,0 +1,400 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class Test_ci_environ(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(environ=None):
+        from ci_diff_helper._build_cache import ci_environ
+        return ci_environ(environ=environ)
+
+    def test_it(self):
+        environ = {
+            'APPVEYOR': 'True',
+            'CIRCLECI': 'true',
+            'CI_PULL_REQUEST': 'https://github.com/a/b/pull/1',
+            'HOME': '/root',
+            'TRAVIS_BRANCH': 'master',
+            'TRAVIS_TEST_RESULT': '0',
+        }
+        expected = dict(environ)
+        del expected['HOME']
+        del expected['TRAVIS_TEST_RESULT']
+        self.assertEqual(self._call_function_under_test(environ), expected)
+
+    def test_default_environ(self):
+        import os
+        import mock
+
+        environ = {'HOME': '/root', 'TRAVIS': 'true'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            self.assertEqual(self._call_function_under_test(),
+                             {'TRAVIS': 'true'})
+
+
+class Test_fingerprint(unittest.TestCase):
+
+    SHA = 'c3b0c1d1e05e0a0e8d2c6a3a4d6e1b0f8d2c6a3a'
+
+    @staticmethod
+    def _call_function_under_test(head_sha, environ=None):
+        from ci_diff_helper._build_cache import fingerprint
+        return fingerprint(head_sha, environ=environ)
+
+    def test_relevant_vars(self):
+        environ = {'TRAVIS_BRANCH': 'master', 'CIRCLE_BUILD_NUM': '4'}
+        key = self._call_function_under_test(self.SHA, environ)
+        self.assertEqual(len(key), 64)
+        # Unrelated (and volatile) variables are ignored.
+        environ2 = dict(environ, HOME='/root', TRAVIS_TEST_RESULT='0')
+        self.assertEqual(
+            self._call_function_under_test(self.SHA, environ2), key)
+        # Every relevant variable matters.
+        environ3 = dict(environ, APPVEYOR_REPO_BRANCH='master')
+        self.assertNotEqual(
+            self._call_function_under_test(self.SHA, environ3), key)
+        environ4 = dict(environ, TRAVIS_BRANCH='feature')
+        self.assertNotEqual(
+            self._call_function_under_test(self.SHA, environ4), key)
+
+    def test_head_sha(self):
+        key1 = self._call_function_under_test(self.SHA, {})
+        key2 = self._call_function_under_test('0' * 40, {})
+        self.assertNotEqual(key1, key2)
+
+    def test_default_environ(self):
+        import os
+        import mock
+
+        environ = {'TRAVIS': 'true'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            key = self._call_function_under_test(self.SHA)
+        self.assertEqual(
+            key, self._call_function_under_test(self.SHA, environ))
+
+
+class TestBuildCache(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._build_cache import BuildCache
+        return BuildCache
+
+    def _make_one(self, **kwargs):
+        import os
+        import shutil
+        import tempfile
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        klass = self._get_target_class()
+        return klass(os.path.join(directory, 'cache'), **kwargs)
+
+    def test_constructor(self):
+        import os
+        from ci_diff_helper import _build_cache
+
+        cache = self._make_one()
+        self.assertTrue(os.path.isdir(cache.directory))
+        self.assertIsNone(cache.ttl)
+        self.assertEqual(cache.max_entries, _build_cache._MAX_ENTRIES)
+        self.assertEqual(cache.max_bytes, _build_cache._MAX_BYTES)
+        # Re-using an existing directory.
+        klass = self._get_target_class()
+        self.assertEqual(klass(cache.directory).directory, cache.directory)
+
+    def test_get_or_compute(self):
+        import mock
+
+        cache = self._make_one()
+        compute = mock.Mock(return_value={'base': 'abc', 'pr': 7})
+        self.assertEqual(cache.get_or_compute('key', compute),
+                         {'base': 'abc', 'pr': 7})
+        self.assertEqual(cache.get_or_compute('key', compute),
+                         {'base': 'abc', 'pr': 7})
+        compute.assert_called_once_with()
+        # A different cache object (e.g. in a later step) re-uses it.
+        klass = self._get_target_class()
+        other = klass(cache.directory)
+        self.assertEqual(other.get_or_compute('key', compute),
+                         {'base': 'abc', 'pr': 7})
+        self.assertEqual(compute.call_count, 1)
+
+    def test_get_or_compute_stored_while_waiting(self):
+        import mock
+        from ci_diff_helper import _build_cache
+
+        cache = self._make_one()
+        read_results = [_build_cache._MISSING, 'stored']
+        compute = mock.Mock(spec=[])
+        with mock.patch.object(cache, '_read',
+                               side_effect=read_results) as read:
+            self.assertEqual(cache.get_or_compute('key', compute), 'stored')
+        self.assertEqual(read.call_count, 2)
+
+    def test_get_or_compute_lock_evicted_while_waiting(self):
+        import mock
+
+        cache = self._make_one()
+        compute = mock.Mock(return_value='value')
+        patch_same = mock.patch(
+            'ci_diff_helper._build_cache._is_same_file',
+            side_effect=[False, True])
+        with patch_same as same:
+            self.assertEqual(cache.get_or_compute('key', compute), 'value')
+        # Started over with the new lock file.
+        self.assertEqual(same.call_count, 2)
+        compute.assert_called_once_with()
+
+    def test_get_or_compute_none(self):
+        import mock
+
+        cache = self._make_one()
+        compute = mock.Mock(return_value=None)
+        self.assertIsNone(cache.get_or_compute('key', compute))
+        self.assertIsNone(cache.get_or_compute('key', compute))
+        compute.assert_called_once_with()
+
+    def test_get_or_compute_failure(self):
+        import mock
+
+        cache = self._make_one()
+        compute = mock.Mock(side_effect=[KeyError('nope'), 'value'])
+        with self.assertRaises(KeyError):
+            cache.get_or_compute('key', compute)
+        self.assertEqual(cache.get_or_compute('key', compute), 'value')
+        self.assertEqual(compute.call_count, 2)
+
+    def test_corrupt_entry(self):
+        import mock
+
+        cache = self._make_one()
+        with open(cache._path('key') + '.json', 'wb') as file_obj:
+            file_obj.write(b'{"value": 1}')
+        compute = mock.Mock(return_value=2)
+        self.assertEqual(cache.get_or_compute('key', compute), 2)
+
+    def test_ttl(self):
+        import mock
+
+        cache = self._make_one(ttl=60)
+        compute = mock.Mock(side_effect=['old', 'new'])
+        with mock.patch('time.time', return_value=1000.0):
+            self.assertEqual(cache.get_or_compute('key', compute), 'old')
+        with mock.patch('time.time', return_value=1059.0):
+            self.assertEqual(cache.get_or_compute('key', compute), 'old')
+        with mock.patch('time.time', return_value=1060.0):
+            self.assertEqual(cache.get_or_compute('key', compute), 'new')
+
+    def _set_mtime(self, cache, key, mtime):
+        import os
+        os.utime(cache._path(key) + '.json', (mtime, mtime))
+
+    def test_evict_max_entries(self):
+        import os
+
+        cache = self._make_one(max_entries=2)
+        for index in range(3):
+            key = 'key' + str(index)
+            cache.get_or_compute(key, lambda: index)
+            self._set_mtime(cache, key, 1000 + index)
+
+        self.assertFalse(os.path.exists(cache._path('key0') + '.json'))
+        self.assertFalse(os.path.exists(cache._path('key0') + '.lock'))
+        self.assertEqual(cache.get_or_compute('key1', None), 1)
+        self.assertEqual(cache.get_or_compute('key2', None), 2)
+
+    def test_evict_held_lock(self):
+        import os
+        from ci_diff_helper import _utils
+
+        cache = self._make_one(max_entries=1)
+        cache.get_or_compute('key0', lambda: 0)
+        self._set_mtime(cache, 'key0', 1000)
+        lock_path = cache._path('key0') + '.lock'
+        # Another process is waiting for (or computing) the value.
+        file_desc = os.open(lock_path, os.O_RDWR)
+        try:
+            with _utils.locked(file_desc):
+                cache.get_or_compute('key1', lambda: 1)
+        finally:
+            os.close(file_desc)
+        self.assertFalse(os.path.exists(cache._path('key0') + '.json'))
+        self.assertTrue(os.path.exists(lock_path))
+
+    def test_evict_max_bytes(self):
+        import os
+
+        cache = self._make_one(max_bytes=300)
+        cache.get_or_compute('a', lambda: '1' * 100)
+        self._set_mtime(cache, 'a', 1000)
+        cache.get_or_compute('b', lambda: '2' * 100)
+        self._set_mtime(cache, 'b', 1001)
+        cache.get_or_compute('c', lambda: '3' * 100)
+        self.assertFalse(os.path.exists(cache._path('a') + '.json'))
+        self.assertEqual(cache.get_or_compute('c', None), '3' * 100)
+        # Stray files in the directory are left alone.
+        with open(os.path.join(cache.directory, 'README'), 'w'):
+            pass
+        cache._evict()
+        self.assertIn('README', os.listdir(cache.directory))
+
+    def test_evict_expired(self):
+        import os
+
+        cache = self._make_one(ttl=60)
+        cache.get_or_compute('old', lambda: 1)
+        self._set_mtime(cache, 'old', 0)
+        cache.get_or_compute('new', lambda: 2)
+        self.assertFalse(os.path.exists(cache._path('old') + '.json'))
+        self.assertTrue(os.path.exists(cache._path('new') + '.json'))
+
+
+class Test__is_same_file(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(file_desc, path):
+        from ci_diff_helper._build_cache import _is_same_file
+        return _is_same_file(file_desc, path)
+
+    def test_it(self):
+        import os
+        import shutil
+        import tempfile
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'a.lock')
+        file_desc = os.open(path, os.O_RDWR | os.O_CREAT)
+        try:
+            self.assertTrue(self._call_function_under_test(file_desc, path))
+            os.remove(path)
+            self.assertFalse(
+                self._call_function_under_test(file_desc, path))
+            # Re-created by another process.
+            os.close(os.open(path, os.O_RDWR | os.O_CREAT))
+            self.assertFalse(
+                self._call_function_under_test(file_desc, path))
+        finally:
+            os.close(file_desc)
+
+
+class Test__remove_lock(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(path):
+        from ci_diff_helper._build_cache import _remove_lock
+        return _remove_lock(path)
+
+    def test_missing(self):
+        import os
+        import shutil
+        import tempfile
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.assertIsNone(self._call_function_under_test(
+            os.path.join(directory, 'a.lock')))
+
+    def test_held(self):
+        import mock
+
+        patch_open = mock.patch('os.open', return_value=7)
+        patch_close = mock.patch('os.close')
+        patch_lock = mock.patch(
+            'ci_diff_helper._utils.try_lock', return_value=False)
+        with patch_open, patch_close as close, patch_lock:
+            with mock.patch('os.remove') as remove:
+                self._call_function_under_test('a.lock')
+        remove.assert_not_called()
+        close.assert_called_once_with(7)
+
+
+class Test_get_build_cache(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper._build_cache import get_build_cache
+        return get_build_cache()
+
+    def _helper(self, environ):
+        import os
+        import mock
+        from ci_diff_helper import _build_cache
+        from ci_diff_helper import _utils
+
+        patch_env = mock.patch.dict(os.environ, environ, clear=True)
+        patch_cache = mock.patch(
+            'ci_diff_helper._build_cache._BUILD_CACHE', new=_utils.UNSET)
+        with patch_env:
+            with patch_cache:
+                result = self._call_function_under_test()
+                # The result is re-used.
+                self.assertIs(_build_cache._BUILD_CACHE, result)
+                self.assertIs(self._call_function_under_test(), result)
+        return result
+
+    def test_disabled(self):
+        self.assertIsNone(self._helper({}))
+
+    def test_from_env(self):
+        import os
+        import shutil
+        import tempfile
+        from ci_diff_helper import _build_cache
+        from ci_diff_helper import environment_vars as env
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = self._helper({env.BUILD_CACHE_DIR: directory})
+        self.assertIsInstance(cache, _build_cache.BuildCache)
+        self.assertEqual(cache.directory, directory)
+        self.assertIsNone(cache.ttl)
+
+        cache = self._helper({
+            env.BUILD_CACHE_DIR: os.path.join(directory, 'sub'),
+            env.BUILD_CACHE_TTL: '3600',
+        })
+        self.assertEqual(cache.ttl, 3600.0)
+
+    def test_bad_ttl(self):
+        from ci_diff_helper import environment_vars as env
+
+        with self.assertRaises(ValueError):
+            self._helper({
+                env.BUILD_CACHE_DIR: '/tmp/unused',
+                env.BUILD_CACHE_TTL: 'soon',
+            })
+
+
+class Test_set_build_cache(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(cache):
+        from ci_diff_helper._build_cache import set_build_cache
+        return set_build_cache(cache)
+
+    def test_it(self):
+        import mock
+        from ci_diff_helper import _build_cache
+        from ci_diff_helper import _utils
+
+        cache = mock.sentinel.cache
+        with mock.patch('ci_diff_helper._build_cache._BUILD_CACHE',
+                        new=_utils.UNSET):
+            self.assertIsNone(self._call_function_under_test(cache))
+            self.assertIs(_build_cache._BUILD_CACHE, cache)
+            self.assertIs(self._call_function_under_test(None), cache)
+            self.assertIsNone(_build_cache._BUILD_CACHE)
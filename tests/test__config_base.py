@@ -46,6 +46,9 @@ class Test__in_ci(unittest.TestCase):
         env_var = 'HI_BYE_CI'
         self.assertFalse(self._helper(env_var, 'Treeoooh'))
 
+    def test_no_env_var(self):
+        self.assertFalse(self._call_function_under_test(None))
+
 
 class Test__ci_branch(unittest.TestCase):
 
@@ -73,6 +76,217 @@ class Test__ci_branch(unittest.TestCase):
                 self._call_function_under_test(env_var)
 
 
+class Test__group_properties(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(names, shared_lookups):
+        from ci_diff_helper import _config_base
+        return _config_base._group_properties(names, shared_lookups)
+
+    def test_independent(self):
+        result = self._call_function_under_test(['a', 'b'], {})
+        self.assertEqual(result, [['a'], ['b']])
+
+    def test_dependent(self):
+        closures = {
+            'a': frozenset(['x']),
+            'b': frozenset(['y']),
+            'c': frozenset(['a', 'b', 'x', 'y']),
+            'd': frozenset(['x']),
+        }
+        result = self._call_function_under_test(
+            ['a', 'd', 'b', 'e', 'c', 'x'], closures)
+        # ``a`` and ``d`` only share a dependency, so are independent.
+        self.assertEqual(result, [['e'], ['a', 'd', 'b', 'c', 'x']])
+
+    def test_shared_dependency(self):
+        closures = {'a': frozenset(['x']), 'd': frozenset(['x'])}
+        result = self._call_function_under_test(['a', 'd'], closures)
+        self.assertEqual(result, [['a'], ['d']])
+
+
+class TestLazyProperty(unittest.TestCase):
+
+    @staticmethod
+    def _make_class(func, depends=()):
+        from ci_diff_helper import _config_base
+
+        class Lazy(_config_base.Config):
+            __slots__ = ('_value', '_other')
+
+            value = _config_base.lazy_property(
+                '_value', depends=depends)(func)
+
+            @_config_base.lazy_property('_other', depends=('value',))
+            def other(self):
+                return ('other', self.value)
+
+        return Lazy
+
+    def test_attributes(self):
+        def value(config):
+            """int: A value."""
+
+        klass = self._make_class(value, depends=['a'])
+        prop = klass.__dict__['value']
+        self.assertIsInstance(prop, property)
+        self.assertIs(prop.func, value)
+        self.assertEqual(prop.name, 'value')
+        self.assertEqual(prop.storage, '_value')
+        self.assertEqual(prop.depends, ('a',))
+        self.assertFalse(prop.persist)
+        self.assertEqual(prop.__doc__, 'int: A value.')
+
+    def test_encode_decode(self):
+        from ci_diff_helper import _config_base
+
+        prop = _config_base.LazyProperty(
+            lambda config: None, '_value', encode=str, decode=int)
+        self.assertEqual(prop.encode(12), '12')
+        self.assertEqual(prop.decode('12'), 12)
+        self.assertIsNone(prop.encode(None))
+        self.assertIsNone(prop.decode(None))
+
+        prop = _config_base.LazyProperty(lambda config: None, '_value')
+        self.assertEqual(prop.encode(12), 12)
+        self.assertEqual(prop.decode(12), 12)
+
+    def test_once(self):
+        from ci_diff_helper import _utils
+
+        calls = []
+        config = self._make_class(lambda config: calls.append(1) or 42)()
+        self.assertIs(config._value, _utils.UNSET)
+        self.assertEqual(config.value, 42)
+        self.assertEqual(config.value, 42)
+        self.assertEqual(config._value, 42)
+        self.assertEqual(calls, [1])
+
+    def test_resolve(self):
+        calls = []
+        klass = self._make_class(lambda config: calls.append(1) or 42)
+        prop = klass.__dict__['value']
+        config = klass()
+        self.assertEqual(prop.resolve(config, 10), 10)
+        self.assertEqual(config.value, 10)
+        # A stored value wins.
+        self.assertEqual(prop.resolve(config, 11), 10)
+        self.assertEqual(calls, [])
+
+    def test_resolve_frozen(self):
+        from ci_diff_helper import _utils
+
+        klass = self._make_class(lambda config: 42)
+        config = klass()
+        config._frozen = True
+        with self.assertRaises(ValueError):
+            klass.__dict__['value'].resolve(config, 10)
+        self.assertIs(config._value, _utils.UNSET)
+
+    def test_read_only(self):
+        config = self._make_class(lambda config: 42)()
+        with self.assertRaises(AttributeError):
+            config.value = 10
+        with self.assertRaises(AttributeError):
+            config.not_a_slot = 10
+
+    def test_concurrent_once(self):
+        import threading
+
+        started = threading.Event()
+        finish = threading.Event()
+        calls = []
+
+        def value(config):
+            calls.append(threading.current_thread())
+            started.set()
+            finish.wait(5.0)
+            return 42
+
+        config = self._make_class(value)()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(config.value))
+            for _ in range(4)
+        ]
+        threads[0].start()
+        started.wait(5.0)
+        for thread in threads[1:]:
+            thread.start()
+        finish.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [42] * 4)
+        self.assertEqual(calls, [threads[0]])
+
+    def test_failure_not_cached(self):
+        from ci_diff_helper import _utils
+
+        results = [KeyError('a'), 42]
+
+        def value(config):
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        config = self._make_class(value)()
+        with self.assertRaises(KeyError):
+            getattr(config, 'value')
+        self.assertIs(config._value, _utils.UNSET)
+        self.assertEqual(config.value, 42)
+
+    def test_invalidate(self):
+        values = [1, 2]
+        config = self._make_class(lambda config: values.pop(0))()
+        self.assertEqual(config.other, ('other', 1))
+        config.invalidate('value')
+        self.assertEqual(config.other, ('other', 2))
+
+    def test_invalidate_dependent_only(self):
+        config = self._make_class(lambda config: 1)()
+        self.assertEqual(config.other, ('other', 1))
+        config.invalidate('other')
+        self.assertEqual(config._value, 1)
+
+    def test_invalidate_all(self):
+        from ci_diff_helper import _utils
+
+        config = self._make_class(lambda config: 1)()
+        config._active = True
+        self.assertEqual(config.other, ('other', 1))
+        config.invalidate()
+        self.assertIs(config._active, _utils.UNSET)
+        self.assertIs(config._value, _utils.UNSET)
+        self.assertIs(config._other, _utils.UNSET)
+
+    def test_invalidate_unknown(self):
+        config = self._make_class(lambda config: 1)()
+        with self.assertRaises(ValueError):
+            config.invalidate('value', 'nope')
+
+    def test_closures(self):
+        klass = self._make_class(lambda config: 1, depends=('is_merge',))
+        closures = klass._closures()
+        self.assertEqual(closures['value'],
+                         frozenset(['is_merge', '_head_commit']))
+        self.assertEqual(closures['other'],
+                         frozenset(['value', 'is_merge', '_head_commit']))
+        self.assertEqual(closures['active'], frozenset())
+
+    def test_closures_not_lazy(self):
+        klass = self._make_class(lambda config: 1, depends=('plain',))
+        closures = klass._closures()
+        self.assertEqual(closures['value'], frozenset(['plain']))
+        self.assertEqual(closures['plain'], frozenset())
+
+    def test_closures_cycle(self):
+        klass = self._make_class(lambda config: 1, depends=('other',))
+        # Cycles are not supported, but don't recurse forever.
+        closures = klass._closures()
+        self.assertIn('value', closures['other'])
+
+
 class TestConfig(unittest.TestCase):
 
     @staticmethod
@@ -80,8 +294,12 @@ class TestConfig(unittest.TestCase):
         from ci_diff_helper import _config_base
         return _config_base.Config
 
-    def _make_one(self):
+    def _make_one(self, **class_attrs):
         klass = self._get_target_class()
+        if class_attrs:
+            # Instances have ``__slots__``, so class attributes are
+            # overridden on a subclass.
+            klass = type(klass.__name__, (klass,), class_attrs)
         return klass()
 
     def test_constructor(self):
@@ -93,14 +311,14 @@ class TestConfig(unittest.TestCase):
         self.assertIs(config._active, _utils.UNSET)
         self.assertIs(config._branch, _utils.UNSET)
         self.assertIs(config._is_merge, _utils.UNSET)
+        self.assertFalse(hasattr(config, '__dict__'))
 
     def _active_helper(self, env_var, active_val):
         import mock
         from ci_diff_helper import _utils
 
-        config = self._make_one()
-        # Fake the environment variable on the instance.
-        config._active_env_var = env_var
+        # Fake the environment variable on the class.
+        config = self._make_one(_active_env_var=env_var)
         # Make sure there is no _active value set.
         self.assertIs(config._active, _utils.UNSET)
 
@@ -136,9 +354,8 @@ class TestConfig(unittest.TestCase):
         import mock
         from ci_diff_helper import _utils
 
-        config = self._make_one()
-        # Fake the environment variable on the instance.
-        config._branch_env_var = env_var
+        # Fake the environment variable on the class.
+        config = self._make_one(_branch_env_var=env_var)
         # Make sure there is no _branch value set.
         self.assertIs(config._branch, _utils.UNSET)
 
@@ -182,16 +399,24 @@ class TestConfig(unittest.TestCase):
     def _is_merge_helper(self, is_merge_val):
         import mock
         from ci_diff_helper import _utils
+        from ci_diff_helper import git_tools
 
         config = self._make_one()
         # Make sure there is no _is_merge value set.
         self.assertIs(config._is_merge, _utils.UNSET)
 
         # Patch the helper so we can control the value.
-        merge_commit_patch = mock.patch(
-            'ci_diff_helper.git_tools.merge_commit',
-            return_value=is_merge_val)
-        with merge_commit_patch as mocked:
+        parents = ('e9b5c87f8153fd177a0e10f7abda0b4bb4730626',)
+        if is_merge_val:
+            parents += ('ce60976326725217c16fe84b5120c6a8661177a8',)
+        head_commit = git_tools.CommitInfo(
+            '8103a3b85aa5f3e2b14200bfef815539c1be109a',
+            '9c1d5b2d41c8ad3a3d2e5d1fb6d1e0b8e94bbf46',
+            parents, 1475953149, 1475953150, 'Subject.')
+        commit_info_patch = mock.patch(
+            'ci_diff_helper.git_tools.commit_info',
+            return_value=head_commit)
+        with commit_info_patch as mocked:
             result = config.is_merge
             if is_merge_val:
                 self.assertTrue(result)
@@ -215,13 +440,23 @@ class TestConfig(unittest.TestCase):
         # Make sure the mock did not get called again on future access.
         self.assertEqual(mocked.call_count, 1)
 
+    def test_head_commit_property_cache(self):
+        import mock
+
+        config = self._make_one()
+        commit_info_patch = mock.patch(
+            'ci_diff_helper.git_tools.commit_info')
+        with commit_info_patch as mocked:
+            self.assertIs(config._head_commit, mocked.return_value)
+            self.assertIs(config._head_commit, mocked.return_value)
+            mocked.assert_called_once_with()
+
     def _tag_helper(self, env_var, tag_val='', expected=None):
         import mock
         from ci_diff_helper import _utils
 
-        config = self._make_one()
-        # Fake the environment variable on the instance.
-        config._tag_env_var = env_var
+        # Fake the environment variable on the class.
+        config = self._make_one(_tag_env_var=env_var)
         # Make sure there is no _tag value set.
         self.assertIs(config._tag, _utils.UNSET)
 
@@ -246,6 +481,10 @@ class TestConfig(unittest.TestCase):
         tag = '0.1.0'
         self._tag_helper(env_var, tag, tag)
 
+    def test_tag_property_no_env_var(self):
+        config = self._make_one()
+        self.assertIsNone(config.tag)
+
     def test_tag_property_cache(self):
         env_var = 'MY_CI'
         tag = '0.0.144'
@@ -255,6 +494,396 @@ class TestConfig(unittest.TestCase):
         # Test that cached value is re-used.
         self.assertEqual(config.tag, tag)
 
+    def test_prefetch_concurrent(self):
+        import threading
+
+        klass = self._get_target_class()
+        first_started = threading.Event()
+        second_started = threading.Event()
+
+        class Waiting(klass):
+            _first = None
+            _second = None
+
+            @property
+            def first(self):
+                first_started.set()
+                self._first = second_started.wait(5.0)
+                return self._first
+
+            @property
+            def second(self):
+                second_started.set()
+                self._second = first_started.wait(5.0)
+                return self._second
+
+        config = Waiting()
+        config.prefetch(['first', 'second'])
+        # Each property only finished once the other had started.
+        self.assertTrue(config._first)
+        self.assertTrue(config._second)
+
+    def test_prefetch_dependent(self):
+        import threading
+        from ci_diff_helper import _config_base
+
+        klass = self._get_target_class()
+        threads = {}
+
+        class Dependent(klass):
+            __slots__ = ('_a', '_b')
+
+            @_config_base.lazy_property('_a')
+            def a(self):
+                threads['a'] = threading.current_thread()
+
+            @_config_base.lazy_property('_b', depends=('a',))
+            def b(self):
+                threads['b'] = threading.current_thread()
+
+            @property
+            def c(self):
+                threads['c'] = threading.current_thread()
+
+        Dependent().prefetch(['b', 'c', 'a'])
+        self.assertIs(threads['a'], threads['b'])
+        self.assertEqual(sorted(threads), ['a', 'b', 'c'])
+
+    def test_prefetch_caches(self):
+        import mock
+        from ci_diff_helper import git_tools
+
+        config = self._make_one(_tag_env_var='MY_CI')
+        head_commit = git_tools.CommitInfo(
+            '8103a3b85aa5f3e2b14200bfef815539c1be109a',
+            '9c1d5b2d41c8ad3a3d2e5d1fb6d1e0b8e94bbf46',
+            ('e9b5c87f8153fd177a0e10f7abda0b4bb4730626',),
+            1475953149, 1475953150, 'Subject.')
+        commit_info_patch = mock.patch(
+            'ci_diff_helper.git_tools.commit_info',
+            return_value=head_commit)
+        with commit_info_patch as mocked:
+            with mock.patch('os.environ', new={'MY_CI': '1.0'}):
+                config.prefetch(['is_merge', 'tag', 'is_merge'])
+        mocked.assert_called_once_with()
+        self.assertFalse(config._is_merge)
+        self.assertEqual(config._tag, '1.0')
+
+    def test_prefetch_single_thread(self):
+        import threading
+
+        klass = self._get_target_class()
+        threads = []
+
+        class Single(klass):
+
+            @property
+            def a(self):
+                threads.append(threading.current_thread())
+
+            @property
+            def b(self):
+                threads.append(threading.current_thread())
+
+        Single().prefetch(['a', 'b'], max_workers=1)
+        self.assertEqual(threads, [threading.current_thread()] * 2)
+
+    def test_prefetch_empty(self):
+        config = self._make_one()
+        self.assertIsNone(config.prefetch([]))
+
+    def test_prefetch_not_property(self):
+        config = self._make_one()
+        with self.assertRaises(ValueError):
+            config.prefetch(['tag', 'prefetch'])
+        with self.assertRaises(ValueError):
+            config.prefetch(['nope'])
+
+    def test_prefetch_error(self):
+        klass = self._get_target_class()
+        calls = []
+
+        class Failing(klass):
+
+            @property
+            def ok(self):
+                calls.append('ok')
+
+            @property
+            def bad(self):
+                calls.append('bad')
+                raise KeyError('bad')
+
+            @property
+            def worse(self):
+                calls.append('worse')
+                raise OSError('worse')
+
+        with self.assertRaises(OSError):
+            Failing().prefetch(['worse', 'ok', 'bad'])
+        # Every property is still resolved.
+        self.assertEqual(sorted(calls), ['bad', 'ok', 'worse'])
+
+    def _patch_build_cache(self):
+        import shutil
+        import tempfile
+        import mock
+        from ci_diff_helper import _build_cache
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = _build_cache.BuildCache(directory)
+        return mock.patch(
+            'ci_diff_helper._build_cache._BUILD_CACHE', new=cache)
+
+    def test_build_key_no_cache(self):
+        import mock
+
+        config = self._make_one()
+        cache_patch = mock.patch(
+            'ci_diff_helper._build_cache._BUILD_CACHE', new=None)
+        check_patch = mock.patch('ci_diff_helper._utils.check_output')
+        with cache_patch:
+            with check_patch as mocked:
+                self.assertIsNone(config._build_key)
+                mocked.assert_not_called()
+
+    def test_build_key_no_head(self):
+        import mock
+
+        config = self._make_one()
+        check_patch = mock.patch(
+            'ci_diff_helper._utils.check_output', return_value=None)
+        with self._patch_build_cache():
+            with check_patch as mocked:
+                self.assertIsNone(config._build_key)
+                mocked.assert_called_once_with(
+                    'git', 'rev-parse', 'HEAD', ignore_err=True)
+
+    def test_build_key(self):
+        import os
+        import mock
+        from ci_diff_helper import _build_cache
+
+        config = self._make_one()
+        head_sha = 'a' * 40
+        check_patch = mock.patch(
+            'ci_diff_helper._utils.check_output', return_value=head_sha)
+        env_patch = mock.patch.dict(
+            os.environ, {'TRAVIS_BRANCH': 'master'}, clear=True)
+        with self._patch_build_cache():
+            with check_patch:
+                with env_patch:
+                    self.assertEqual(
+                        config._build_key,
+                        _build_cache.fingerprint(head_sha))
+
+    def test_is_merge_shared_between_steps(self):
+        import mock
+
+        commit_info_patch = mock.patch(
+            'ci_diff_helper.git_tools.commit_info',
+            return_value=mock.Mock(is_merge=True))
+        check_patch = mock.patch(
+            'ci_diff_helper._utils.check_output', return_value='a' * 40)
+        with self._patch_build_cache():
+            with check_patch:
+                with commit_info_patch as mocked:
+                    # Each config stands in for a separate build step.
+                    self.assertTrue(self._make_one().is_merge)
+                    self.assertTrue(self._make_one().is_merge)
+                    mocked.assert_called_once_with()
+
+    def test__persisted_disabled(self):
+        import mock
+
+        config = self._make_one()
+        compute = mock.Mock(return_value=10)
+        with mock.patch('ci_diff_helper._build_cache._BUILD_CACHE',
+                        new=None):
+            self.assertEqual(config._persisted('value', compute), 10)
+            self.assertEqual(config._persisted('value', compute), 10)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_is_merge_persisted_frozen(self):
+        import mock
+
+        config = self._make_one()
+        config._frozen = True
+        commit_info_patch = mock.patch(
+            'ci_diff_helper.git_tools.commit_info',
+            return_value=mock.Mock(is_merge=False))
+        check_patch = mock.patch('ci_diff_helper._utils.check_output')
+        with self._patch_build_cache():
+            with check_patch as mocked:
+                with self.assertRaises(ValueError):
+                    getattr(config, 'is_merge')
+                config._frozen = False
+                config._build_key_cached = None
+                with commit_info_patch:
+                    self.assertFalse(config.is_merge)
+                mocked.assert_not_called()
+
+    def test__would_compute(self):
+        config = self._make_one()
+        self.assertTrue(config._would_compute('tag'))
+        config._tag = None
+        self.assertFalse(config._would_compute('tag'))
+        config._frozen = True
+        self.assertFalse(config._would_compute('branch'))
+        with self.assertRaises(ValueError):
+            config._would_compute('base')
+
+    def test__set_resolved(self):
+        config = self._make_one()
+        self.assertEqual(config._set_resolved('tag', 'v1'), 'v1')
+        self.assertEqual(config.tag, 'v1')
+        self.assertEqual(config._set_resolved('tag', 'v2'), 'v1')
+        with self.assertRaises(ValueError):
+            config._set_resolved('base', 'abc')
+
+    def test__set_resolved_frozen(self):
+        config = self._make_one()
+        config._frozen = True
+        with self.assertRaises(ValueError):
+            config._set_resolved('tag', 'v1')
+
+    def test__set_resolved_persisted(self):
+        import mock
+
+        check_patch = mock.patch(
+            'ci_diff_helper._utils.check_output', return_value='a' * 40)
+        with self._patch_build_cache():
+            with check_patch:
+                self.assertTrue(self._make_one()._set_resolved(
+                    'is_merge', True))
+                # A later step uses the value stored by the first.
+                config = self._make_one()
+                self.assertTrue(config._set_resolved('is_merge', False))
+                self.assertTrue(config.is_merge)
+
+    def test_snapshot(self):
+        import mock
+        from ci_diff_helper import _config_base
+
+        config = self._make_one(_active_env_var='MY_CI')
+        config._branch = 'master'
+        config._tag = None
+        with mock.patch('os.environ', new={'MY_CI': 'true'}):
+            snapshot = config.snapshot()
+        self.assertEqual(snapshot, {
+            'version': _config_base._SNAPSHOT_VERSION,
+            'type': 'Config',
+            'values': {'active': True, 'branch': 'master', 'tag': None},
+        })
+
+    def test_snapshot_prefetch(self):
+        import mock
+
+        config = self._make_one()
+        klass = self._get_target_class()
+        with mock.patch.object(klass, 'prefetch') as mocked:
+            config.snapshot(('branch', 'tag'))
+        mocked.assert_called_once_with(['active', 'branch', 'tag'])
+
+    def test_from_snapshot(self):
+        import mock
+        from ci_diff_helper import _config_base
+
+        klass = self._get_target_class()
+        snapshot = {
+            'version': _config_base._SNAPSHOT_VERSION,
+            'type': 'Config',
+            'values': {'active': False, 'branch': 'master'},
+        }
+        with mock.patch('os.environ', new={}):
+            config = klass.from_snapshot(snapshot)
+            self.assertIs(type(config), klass)
+            self.assertFalse(config.active)
+            self.assertEqual(config.branch, 'master')
+            with self.assertRaises(ValueError):
+                getattr(config, 'tag')
+        # The restored config can be snapshotted again.
+        self.assertEqual(config.snapshot(), snapshot)
+
+    def test_from_snapshot_bad_version(self):
+        klass = self._get_target_class()
+        with self.assertRaises(ValueError):
+            klass.from_snapshot({'version': 0, 'type': 'Config'})
+        with self.assertRaises(ValueError):
+            klass.from_snapshot({})
+
+    def test_from_snapshot_wrong_class(self):
+        from ci_diff_helper import _config_base
+        from ci_diff_helper import appveyor
+        from ci_diff_helper import travis
+
+        snapshot = {
+            'version': _config_base._SNAPSHOT_VERSION,
+            'type': 'Travis',
+            'values': {},
+        }
+        self.assertIsInstance(
+            travis.Travis.from_snapshot(snapshot), travis.Travis)
+        with self.assertRaises(ValueError):
+            appveyor.AppVeyor.from_snapshot(snapshot)
+        snapshot['type'] = 'Unknown'
+        with self.assertRaises(ValueError):
+            self._get_target_class().from_snapshot(snapshot)
+
+    def test_from_snapshot_unknown_property(self):
+        from ci_diff_helper import _config_base
+
+        klass = self._get_target_class()
+        snapshot = {
+            'version': _config_base._SNAPSHOT_VERSION,
+            'type': 'Config',
+            'values': {'nope': 1},
+        }
+        with self.assertRaises(ValueError):
+            klass.from_snapshot(snapshot)
+
+    def test_get_changed_files(self):
+        import mock
+
+        klass = self._get_target_class()
+
+        class WithBase(klass):
+            __slots__ = ()
+            base = 'upstream/master'
+
+        files = ['a.py', 'b.py']
+        check_patch = mock.patch(
+            'ci_diff_helper._utils.check_output', return_value='a' * 40)
+        changed_patch = mock.patch(
+            'ci_diff_helper.change_cache.get_changed_files',
+            return_value=files)
+        with self._patch_build_cache():
+            with check_patch:
+                with changed_patch as mocked:
+                    self.assertEqual(WithBase().get_changed_files(), files)
+                    self.assertEqual(WithBase().get_changed_files(), files)
+                    self.assertEqual(
+                        WithBase().get_changed_files('feature'), files)
+        self.assertEqual(mocked.mock_calls, [
+            mock.call('HEAD', 'upstream/master'),
+            mock.call('feature', 'upstream/master'),
+        ])
+
+    def test_get_changed_files_no_base(self):
+        import mock
+
+        config = self._make_one()
+        with mock.patch('ci_diff_helper._build_cache._BUILD_CACHE',
+                        new=None):
+            with self.assertRaises(NotImplementedError):
+                config.get_changed_files()
+
+    def test_base(self):
+        config = self._make_one()
+        with self.assertRaises(NotImplementedError):
+            getattr(config, 'base')
+
     def test___repr__(self):
         import mock
 
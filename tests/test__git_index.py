@@ -0,0 +1,269 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from tests import utils
+
+
+class Test__read_offset_varint(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(data, pos):
+        from ci_diff_helper._git_index import _read_offset_varint
+        return _read_offset_varint(data, pos)
+
+    def test_single_byte(self):
+        self.assertEqual(self._call_function_under_test(b'x\x05', 1), (5, 2))
+
+    def test_multi_byte(self):
+        # 0x81 0x00 encodes ((1 + 1) << 7) | 0 == 256.
+        result = self._call_function_under_test(b'\x81\x00', 0)
+        self.assertEqual(result, (256, 2))
+
+
+class TestIndexEntry(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._git_index import IndexEntry
+        return IndexEntry
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_constructor_defaults(self):
+        entry = self._make_one('a/b.py', 'ab' * 20, 0o100644, 10)
+        self.assertEqual(entry.path, 'a/b.py')
+        self.assertEqual(entry.mtime, (0, 0))
+        self.assertEqual(entry.flags, 0)
+        self.assertEqual(entry.stage, 0)
+
+    def test_stage(self):
+        entry = self._make_one('a', 'ab' * 20, 0o100644, 10, flags=0x2001)
+        self.assertEqual(entry.stage, 2)
+
+    def test___repr__(self):
+        entry = self._make_one('a/b.py', 'abcdef0' + '1' * 33, 0o100755, 1)
+        self.assertEqual(repr(entry), "<IndexEntry 100755 abcdef0 'a/b.py'>")
+
+
+class TestGitIndex(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._git_index import GitIndex
+        return GitIndex
+
+    def _make_one(self, path):
+        klass = self._get_target_class()
+        return klass(path)
+
+    @staticmethod
+    def _index_path(temp_repo):
+        import os
+        return os.path.join(temp_repo.path, '.git', 'index')
+
+    @staticmethod
+    def _populate(temp_repo):
+        temp_repo.commit('Initial.', **{
+            'README.md': 'readme',
+            'docs/conf.py': 'conf',
+            'docs/index.rst': 'index',
+            'pkg/__init__.py': '',
+            'pkg/sub/a-very-long-module-name.py': 'a',
+            'pkg/sub/a-very-long-module-name2.py': 'b',
+            'setup.py': 'setup',
+        })
+        temp_repo.git('update-index', '--chmod=+x', 'setup.py')
+
+    @staticmethod
+    def _expected(temp_repo):
+        output = temp_repo.git('ls-files', '--stage', '-z')
+        result = []
+        for line in output.split('\0'):
+            if line:
+                info, path = line.split('\t')
+                mode, sha, stage = info.split()
+                result.append((path, sha, int(mode, 8), int(stage)))
+        return result
+
+    def _check(self, temp_repo, version):
+        import os
+
+        index = self._make_one(self._index_path(temp_repo))
+        try:
+            self.assertEqual(index.version, version)
+            expected = self._expected(temp_repo)
+            self.assertEqual(len(index), len(expected))
+            entries = list(index)
+            self.assertEqual(
+                [(entry.path, entry.sha, entry.mode, entry.stage)
+                 for entry in entries],
+                expected)
+            stat_result = os.stat(os.path.join(temp_repo.path, 'README.md'))
+            readme, = [entry for entry in entries
+                       if entry.path == 'README.md']
+            self.assertEqual(readme.size, stat_result.st_size)
+            self.assertEqual(readme.ino, stat_result.st_ino)
+            self.assertEqual(readme.mtime[0], int(stat_result.st_mtime))
+
+            self.assertEqual(
+                list(index.iter_paths(prefix='pkg/sub/')),
+                ['pkg/sub/a-very-long-module-name.py',
+                 'pkg/sub/a-very-long-module-name2.py'])
+            self.assertEqual(
+                list(index.iter_paths(suffix='.py')),
+                ['docs/conf.py',
+                 'pkg/__init__.py',
+                 'pkg/sub/a-very-long-module-name.py',
+                 'pkg/sub/a-very-long-module-name2.py',
+                 'setup.py'])
+            self.assertEqual(
+                [entry.path for entry in index.iter_entries(
+                    prefix='docs/', suffix='.rst')],
+                ['docs/index.rst'])
+            self.assertEqual(list(index.iter_paths(prefix='nope/')), [])
+        finally:
+            index.close()
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_version2(self):
+        with utils.TempRepo() as temp_repo:
+            self._populate(temp_repo)
+            temp_repo.git('update-index', '--index-version', '2')
+            self._check(temp_repo, 2)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_version3_extended_flags(self):
+        with utils.TempRepo() as temp_repo:
+            self._populate(temp_repo)
+            temp_repo.git('update-index', '--index-version', '2')
+            # Marking an entry skip-worktree needs the extended flags
+            # (and bumps the index to version 3).
+            temp_repo.git('update-index', '--skip-worktree', 'docs/conf.py')
+            self._check(temp_repo, 3)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_version4(self):
+        with utils.TempRepo() as temp_repo:
+            self._populate(temp_repo)
+            temp_repo.git('update-index', '--index-version', '4')
+            self._check(temp_repo, 4)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_unmerged(self):
+        import subprocess
+
+        with utils.TempRepo() as temp_repo:
+            temp_repo.commit('Initial.', a='base')
+            temp_repo.git('checkout', '--quiet', '-b', 'other')
+            temp_repo.commit('Other.', a='other')
+            temp_repo.git('checkout', '--quiet', 'master')
+            temp_repo.commit('Ours.', a='ours', b='b')
+            with self.assertRaises(subprocess.CalledProcessError):
+                temp_repo.git('merge', '--quiet', 'other')
+            self._check_stages(temp_repo)
+
+    def _check_stages(self, temp_repo):
+        index = self._make_one(self._index_path(temp_repo))
+        try:
+            self.assertEqual(
+                [(entry.path, entry.stage) for entry in index],
+                [('a', 1), ('a', 2), ('a', 3), ('b', 0)])
+        finally:
+            index.close()
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_missing(self):
+        with utils.TempRepo() as temp_repo:
+            index = self._make_one(self._index_path(temp_repo))
+            self.assertIsNone(index.version)
+            self.assertEqual(len(index), 0)
+            self.assertEqual(list(index), [])
+            index.close()
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_split_index(self):
+        with utils.TempRepo() as temp_repo:
+            self._populate(temp_repo)
+            temp_repo.git('update-index', '--split-index')
+            with self.assertRaises(NotImplementedError):
+                self._make_one(self._index_path(temp_repo))
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_stale_shared_index(self):
+        with utils.TempRepo() as temp_repo:
+            self._populate(temp_repo)
+            temp_repo.git('update-index', '--split-index')
+            # Back to a regular index, the shared index file may stay.
+            temp_repo.git('update-index', '--no-split-index')
+            self._check(temp_repo, 2)
+
+    def test_shared_index_no_link(self):
+        import os
+        from ci_diff_helper import _git_index
+
+        header = _git_index._HEADER.pack(b'DIRC', 2, 0)
+        extension = _git_index._EXTENSION_HEADER.pack(b'TREE', 2) + b'ab'
+        path = self._write_index(header + extension + b'\0' * 20)
+        shared_path = os.path.join(
+            os.path.dirname(path), 'sharedindex.' + 'a' * 40)
+        with open(shared_path, 'wb'):
+            pass
+        index = self._make_one(path)
+        self.assertEqual(index.version, 2)
+        self.assertEqual(list(index), [])
+        index.close()
+
+    def test_empty_file(self):
+        path = self._write_index(b'')
+        index = self._make_one(path)
+        self.assertIsNone(index.version)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(list(index), [])
+        index.close()
+
+    def _write_index(self, contents):
+        import os
+        import shutil
+        import tempfile
+
+        git_dir = tempfile.mkdtemp()
+        path = os.path.join(git_dir, 'index')
+        with open(path, 'wb') as file_obj:
+            file_obj.write(contents)
+        self.addCleanup(shutil.rmtree, git_dir)
+        return path
+
+    def test_unsupported_version(self):
+        path = self._write_index(b'DIRC\x00\x00\x00\x05\x00\x00\x00\x00')
+        with self.assertRaises(NotImplementedError):
+            self._make_one(path)
+
+    def test_bad_signature(self):
+        path = self._write_index(b'JUNK\x00\x00\x00\x02\x00\x00\x00\x00')
+        with self.assertRaises(NotImplementedError):
+            self._make_one(path)
+
+    def test_sparse_directory_entry(self):
+        from ci_diff_helper import _git_index
+
+        header = _git_index._HEADER.pack(b'DIRC', 4, 1)
+        entry = _git_index._ENTRY.pack(
+            0, 0, 0, 0, 0, 0, 0o040000, 0, 0, 0, b'\0' * 20, 4)
+        path = self._write_index(header + entry + b'\x00dir/\x00')
+        index = self._make_one(path)
+        with self.assertRaises(NotImplementedError):
+            list(index.iter_paths())
+        index.close()
@@ -0,0 +1,330 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from tests import utils
+
+
+class Test__is_root_ref(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(name):
+        from ci_diff_helper._git_objects import _is_root_ref
+        return _is_root_ref(name)
+
+    def test_full_ref(self):
+        self.assertTrue(self._call_function_under_test('refs/heads/x'))
+
+    def test_special_ref(self):
+        self.assertTrue(self._call_function_under_test('FETCH_HEAD'))
+
+    def test_branch_name(self):
+        self.assertFalse(self._call_function_under_test('master'))
+        self.assertFalse(self._call_function_under_test('A/B'))
+        self.assertFalse(self._call_function_under_test('1234'))
+
+
+class Test_apply_delta(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(base, delta):
+        from ci_diff_helper._git_objects import apply_delta
+        return apply_delta(base, delta)
+
+    def test_copy_and_insert(self):
+        base = b'0123456789'
+        delta = (
+            b'\x0a'  # Source size: 10.
+            b'\x07'  # Target size: 7.
+            b'\x91\x02\x03'  # Copy 3 bytes from offset 2.
+            b'\x04abcd'  # Insert 4 bytes.
+        )
+        result = self._call_function_under_test(base, delta)
+        self.assertEqual(result, b'234abcd')
+
+    def test_copy_default_size(self):
+        base = b'x' * 0x10000
+        delta = (
+            b'\x80\x80\x04'  # Source size: 0x10000.
+            b'\x80\x80\x04'  # Target size: 0x10000.
+            b'\x80'  # Copy (default) 0x10000 bytes from offset 0.
+        )
+        result = self._call_function_under_test(base, delta)
+        self.assertEqual(result, base)
+
+    def test_bad_base_size(self):
+        with self.assertRaises(ValueError):
+            self._call_function_under_test(b'abc', b'\x04\x01\x01a')
+
+    def test_bad_opcode(self):
+        with self.assertRaises(ValueError):
+            self._call_function_under_test(b'abc', b'\x03\x01\x00')
+
+    def test_bad_target_size(self):
+        with self.assertRaises(ValueError):
+            self._call_function_under_test(b'abc', b'\x03\x05\x01a')
+
+
+class Test__decompress(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(data, pos, size):
+        from ci_diff_helper._git_objects import _decompress
+        return _decompress(data, pos, size)
+
+    def test_it(self):
+        import zlib
+
+        contents = b'hello world ' * 1000
+        data = b'prefix' + zlib.compress(contents) + b'trailing-data'
+        result = self._call_function_under_test(data, 6, len(contents))
+        self.assertEqual(result, contents)
+
+    def test_truncated(self):
+        import zlib
+
+        data = zlib.compress(b'hello world')[:-6]
+        with self.assertRaises(ValueError):
+            self._call_function_under_test(data, 0, 11)
+
+
+class TestRepository(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._git_objects import Repository
+        return Repository
+
+    def _discover(self, path):
+        return self._get_target_class().discover(path)
+
+    def test_discover_env_var(self):
+        import mock
+
+        with mock.patch('os.environ', new={'GIT_DIR': '/x/.git'}):
+            with self.assertRaises(NotImplementedError):
+                self._discover('/x')
+
+    def test_discover_not_in_repo(self):
+        import mock
+
+        with mock.patch('os.path.isdir', return_value=False):
+            with mock.patch('os.path.isfile', return_value=False):
+                with self.assertRaises(NotImplementedError):
+                    self._discover('/a/b')
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_discover_subdirectory(self):
+        import os
+
+        with utils.TempRepo() as temp_repo:
+            temp_repo.commit('Initial.', **{'a/b/c.txt': 'c'})
+            repo = self._discover(os.path.join(temp_repo.path, 'a', 'b'))
+            self.assertEqual(repo.work_tree, temp_repo.path)
+            self.assertEqual(repo.git_dir,
+                             os.path.join(temp_repo.path, '.git'))
+            self.assertEqual(repo.resolve('HEAD'),
+                             temp_repo.git('rev-parse', 'HEAD'))
+            repo.close()
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_discover_worktree(self):
+        import os
+        import shutil
+        import tempfile
+
+        worktree = os.path.join(
+            os.path.realpath(tempfile.mkdtemp()), 'worktree')
+        try:
+            with utils.TempRepo() as temp_repo:
+                temp_repo.commit('Initial.', a='a')
+                temp_repo.git('branch', 'other')
+                temp_repo.git('worktree', 'add', '--quiet', worktree,
+                              'other')
+                temp_repo.git('pack-refs', '--all')
+                with utils.TempRepo.chdir(worktree):
+                    repo = self._discover(worktree)
+                    self.assertEqual(repo.work_tree, worktree)
+                    self.assertEqual(
+                        repo.common_dir, os.path.join(temp_repo.path, '.git'))
+                    self.assertEqual(repo.resolve('HEAD'),
+                                     temp_repo.git('rev-parse', 'other'))
+                    repo.close()
+        finally:
+            shutil.rmtree(os.path.dirname(worktree))
+
+    def _history(self, temp_repo):
+        # Build a history with a merge, a tag and a large file that
+        # changes a little in every commit (so packs have deltas).
+        lines = ['line {:d}\n'.format(i) for i in range(2000)]
+        temp_repo.commit('Initial.', big=''.join(lines))
+        for i in range(3):
+            lines[i * 100] = 'changed {:d}\n'.format(i)
+            temp_repo.commit('Change {:d}.'.format(i), big=''.join(lines))
+        temp_repo.git('tag', '-a', 'v1.0', '-m', 'Version 1.0.', 'HEAD~1')
+        temp_repo.git('tag', 'light', 'HEAD~2')
+        temp_repo.git('checkout', '--quiet', '-b', 'feature', 'HEAD~2')
+        temp_repo.commit('Feature.', feature='feature')
+        temp_repo.git('checkout', '--quiet', 'master')
+        temp_repo.git('merge', '--quiet', '--no-edit', 'feature')
+
+    REVISIONS = (
+        'HEAD',
+        '@',
+        'master',
+        'refs/heads/master',
+        'heads/feature',
+        'v1.0',
+        'v1.0^{}',
+        'v1.0^{commit}',
+        'v1.0^{tree}',
+        'v1.0^{object}',
+        'light',
+        'HEAD^',
+        'HEAD^1',
+        'HEAD^2',
+        'HEAD^0',
+        'HEAD~2',
+        'HEAD~1^{tree}',
+        'HEAD^2~1',
+    )
+    MISSING = (
+        'HEAD~50',
+        'HEAD^3',
+        'not-a-branch',
+        'not-a-branch~1',
+        'not-a-branch^{commit}',
+        'HEAD^{blob}',
+        'v1.0^{tree}^{commit}',
+        'HEAD~1^{tree}~1',
+        '0000000',
+    )
+
+    def _check_resolve(self, temp_repo, repo):
+        for revision in self.REVISIONS:
+            expected = temp_repo.git('rev-parse', revision)
+            self.assertEqual(repo.resolve(revision), expected)
+        for revision in self.MISSING:
+            self.assertIsNone(repo.resolve(revision))
+
+        short_sha = temp_repo.git('rev-parse', '--short', 'HEAD~1')
+        self.assertEqual(repo.resolve(short_sha),
+                         temp_repo.git('rev-parse', 'HEAD~1'))
+        full_sha = temp_repo.git('rev-parse', 'HEAD')
+        self.assertEqual(repo.resolve(full_sha), full_sha)
+
+        for revision in ('HEAD~1', 'v1.0', 'HEAD^{tree}', 'HEAD:big'):
+            sha = temp_repo.git('rev-parse', revision)
+            obj_type, contents = repo.read_object(sha)
+            self.assertEqual(obj_type, temp_repo.git('cat-file', '-t', sha))
+            expected = subprocess_output('git', 'cat-file', obj_type, sha)
+            self.assertEqual(contents, expected)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_loose(self):
+        with utils.TempRepo() as temp_repo:
+            self._history(temp_repo)
+            repo = self._discover(temp_repo.path)
+            self.assertEqual(repo.packs, [])
+            self._check_resolve(temp_repo, repo)
+            repo.close()
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_packed(self):
+        import os
+
+        with utils.TempRepo() as temp_repo:
+            self._history(temp_repo)
+            temp_repo.git('gc', '--quiet', '--aggressive')
+            objects_dir = os.path.join(temp_repo.path, '.git', 'objects')
+            self.assertFalse(os.path.exists(
+                os.path.join(objects_dir, 'info', 'alternates')))
+            repo = self._discover(temp_repo.path)
+            self.assertEqual(len(repo.packs), 1)
+            self._check_resolve(temp_repo, repo)
+            repo.close()
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_repack_after_load(self):
+        with utils.TempRepo() as temp_repo:
+            temp_repo.commit('Initial.', a='a')
+            temp_repo.git('gc', '--quiet')
+            repo = self._discover(temp_repo.path)
+            self.assertEqual(len(repo.packs), 1)
+            sha = temp_repo.commit('Second.', b='b')
+            temp_repo.git('gc', '--quiet')
+            self.assertEqual(repo.read_object(sha)[0], 'commit')
+            self.assertIsNone(repo.read_object('0' * 40))
+            repo.close()
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_alternates_and_shallow(self):
+        import os
+        import shutil
+        import tempfile
+
+        clone_dir = os.path.realpath(tempfile.mkdtemp())
+        try:
+            with utils.TempRepo() as temp_repo:
+                self._history(temp_repo)
+                temp_repo.git('clone', '--quiet', '--shared',
+                              temp_repo.path, clone_dir + '/shared')
+                temp_repo.git('clone', '--quiet', '--depth=1',
+                              'file://' + temp_repo.path,
+                              clone_dir + '/shallow')
+
+                repo = self._discover(clone_dir + '/shared')
+                sha = temp_repo.git('rev-parse', 'HEAD')
+                self.assertEqual(repo.resolve('origin/master'), sha)
+                self.assertEqual(repo.read_object(sha)[0], 'commit')
+                self.assertEqual(repo.shallow, frozenset())
+                repo.close()
+
+                repo = self._discover(clone_dir + '/shallow')
+                self.assertEqual(repo.shallow, frozenset([sha]))
+                self.assertEqual(repo.parents(sha), [])
+                self.assertIsNone(repo.resolve('HEAD~1'))
+                repo.close()
+        finally:
+            shutil.rmtree(clone_dir)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_symref_loop(self):
+        import os
+
+        with utils.TempRepo() as temp_repo:
+            temp_repo.commit('Initial.', a='a')
+            refs_dir = os.path.join(temp_repo.path, '.git', 'refs', 'heads')
+            with open(os.path.join(refs_dir, 'loop'), 'w') as file_obj:
+                file_obj.write('ref: refs/heads/loop\n')
+            with open(os.path.join(refs_dir, 'junk'), 'w') as file_obj:
+                file_obj.write('not-a-sha\n')
+            repo = self._discover(temp_repo.path)
+            self.assertIsNone(repo.resolve('loop'))
+            self.assertIsNone(repo.resolve('junk'))
+            repo.close()
+
+    def test_unsupported_syntax(self):
+        import mock
+
+        klass = self._get_target_class()
+        with mock.patch('os.path.isdir', return_value=False):
+            repo = klass('/x/.git', work_tree='/x')
+        for revision in ('HEAD:path', 'HEAD@{1}', 'a..b', 'a\\b'):
+            with self.assertRaises(NotImplementedError):
+                repo.resolve(revision)
+
+
+def subprocess_output(*args):
+    import subprocess
+    return subprocess.check_output(args)
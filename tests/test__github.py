@@ -12,6 +12,8 @@
 
 import unittest
 
+from tests import fake_github
+
 
 class Test__rate_limit_info(unittest.TestCase):
 
@@ -104,23 +106,491 @@ class Test__maybe_fail(unittest.TestCase):
             patched.assert_called_once_with(response)
 
 
-class Test_commit_compare(unittest.TestCase):
+class Test_make_session(unittest.TestCase):
 
     @staticmethod
-    def _call_function_under_test(slug, start, finish):
+    def _call_function_under_test(**kwargs):
         from ci_diff_helper import _github
-        return _github.commit_compare(slug, start, finish)
+        return _github.make_session(**kwargs)
+
+    def test_defaults(self):
+        import requests
+        from ci_diff_helper import _github
+
+        session = self._call_function_under_test()
+        self.assertIsInstance(session, requests.Session)
+        adapter = session.get_adapter(_github._GH_COMPARE_TEMPLATE)
+        self.assertEqual(adapter._pool_connections,
+                         _github._POOL_CONNECTIONS)
+        self.assertEqual(adapter._pool_maxsize, _github._POOL_MAXSIZE)
+        session.close()
+
+    def test_explicit(self):
+        session = self._call_function_under_test(
+            pool_connections=1, pool_maxsize=32)
+        adapter = session.get_adapter('https://api.github.com/')
+        self.assertEqual(adapter._pool_connections, 1)
+        self.assertEqual(adapter._pool_maxsize, 32)
+        session.close()
+
+
+class Test_get_session(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import _github
+        return _github.get_session()
+
+    def test_cached(self):
+        import mock
+
+        with mock.patch('ci_diff_helper._github._SESSION', new=None):
+            make_patch = mock.patch(
+                'ci_diff_helper._github.make_session',
+                return_value=mock.sentinel.session)
+            with make_patch as mocked:
+                session = self._call_function_under_test()
+                self.assertIs(self._call_function_under_test(), session)
+                mocked.assert_called_once_with()
+        self.assertIs(session, mock.sentinel.session)
+
+
+class Test_set_session(unittest.TestCase):
 
     @staticmethod
-    def _make_response(payload):
-        import json
+    def _call_function_under_test(session):
+        from ci_diff_helper import _github
+        return _github.set_session(session)
+
+    def test_it(self):
+        import mock
+        from ci_diff_helper import _github
+
+        with mock.patch('ci_diff_helper._github._SESSION',
+                        new=mock.sentinel.previous):
+            previous = self._call_function_under_test(mock.sentinel.new)
+            self.assertIs(previous, mock.sentinel.previous)
+            self.assertIs(_github.get_session(), mock.sentinel.new)
+
+
+class Test_close_session(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import _github
+        return _github.close_session()
+
+    def test_it(self):
+        import mock
+        from ci_diff_helper import _github
+
+        session = mock.Mock(spec=['close'])
+        with mock.patch('ci_diff_helper._github._SESSION', new=session):
+            self._call_function_under_test()
+            self.assertIsNone(_github._SESSION)
+        session.close.assert_called_once_with()
+
+    def test_no_session(self):
+        import mock
+        from ci_diff_helper import _github
+
+        with mock.patch('ci_diff_helper._github._SESSION', new=None):
+            self._call_function_under_test()
+            self.assertIsNone(_github._SESSION)
+
+
+class TestGetRequest(unittest.TestCase):
+
+    URL = 'https://api.github.com/x'
+    HEADERS = {'Authorization': 'token a'}
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._github import GetRequest
+        return GetRequest
+
+    def _make_one(self, cache, stream=False):
+        import mock
+
+        headers_mock = mock.Mock(return_value=dict(self.HEADERS))
+        with mock.patch.multiple('ci_diff_helper._github',
+                                 _get_headers=headers_mock, _CACHE=cache):
+            return self._get_target_class()(self.URL, stream=stream)
+
+    def _make_cache(self, **kwargs):
+        import shutil
+        import tempfile
+        from ci_diff_helper import _http_cache
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        return _http_cache.ResponseCache(directory, **kwargs)
+
+    def test_no_cache(self):
+        import mock
+
+        request = self._make_one(None)
+        self.assertEqual(request.api_url, self.URL)
+        self.assertEqual(request.headers, self.HEADERS)
+        self.assertIsNone(request.cached)
+        response = _make_response({'a': 1})
+        self.assertIs(request.finish(response), response)
+
+        failure = mock.Mock(status_code=404, spec=['status_code'])
+        with mock.patch('ci_diff_helper._github._maybe_fail') as mocked:
+            request.finish(failure)
+        mocked.assert_called_once_with(failure)
+
+    def test_stale(self):
         import requests
         from six.moves import http_client
 
-        response = requests.Response()
-        response.status_code = http_client.OK
-        response._content = json.dumps(payload).encode('utf-8')
-        return response
+        cache = self._make_cache()
+        stored = _make_response({'a': 1})
+        stored.headers['ETag'] = '"e1"'
+        cache.put(self.URL, self.HEADERS, stored)
+        request = self._make_one(cache)
+        self.assertIsNone(request.cached)
+        self.assertEqual(request.headers,
+                         dict(self.HEADERS, **{'If-None-Match': '"e1"'}))
+
+        not_modified = requests.Response()
+        not_modified.status_code = http_client.NOT_MODIFIED
+        result = request.finish(not_modified)
+        self.assertEqual(result.status_code, http_client.OK)
+        self.assertEqual(result.json(), {'a': 1})
+
+    def test_fresh(self):
+        cache = self._make_cache(ttl=3600)
+        cache.put(self.URL, self.HEADERS, _make_response({'a': 1}))
+        request = self._make_one(cache)
+        self.assertEqual(request.cached.json(), {'a': 1})
+        # Streamed responses bypass the cache.
+        self.assertIsNone(self._make_one(cache, stream=True).cached)
+
+
+class Test__get(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(api_url):
+        from ci_diff_helper import _github
+        return _github._get(api_url)
+
+    def test_it(self):
+        import mock
+
+        session = mock.Mock(spec=['get'])
+        session.get.return_value = mock.Mock(headers={}, status_code=200)
+        headers = {'Authorization': 'token a'}
+        headers_mock = mock.Mock(return_value=headers)
+        fail_mock = mock.Mock()
+        session_mock = mock.Mock(return_value=session)
+        with mock.patch.multiple('ci_diff_helper._github',
+                                 _get_headers=headers_mock,
+                                 _maybe_fail=fail_mock,
+                                 get_session=session_mock,
+                                 _CACHE=None,
+                                 _SCHEDULER=None):
+            result = self._call_function_under_test(mock.sentinel.url)
+
+        self.assertIs(result, session.get.return_value)
+        headers_mock.assert_called_once_with()
+        session.get.assert_called_once_with(
+            mock.sentinel.url, headers=headers, stream=False)
+        fail_mock.assert_called_once_with(result)
+
+    def test_stream(self):
+        import mock
+
+        session = mock.Mock(spec=['get'])
+        session.get.return_value = _make_response({'a': 1})
+        with mock.patch.multiple('ci_diff_helper._github',
+                                 get_session=mock.Mock(return_value=session),
+                                 _CACHE=None,
+                                 _SCHEDULER=None):
+            from ci_diff_helper import _github
+            result = _github._get(mock.sentinel.url, stream=True)
+
+        self.assertIs(result, session.get.return_value)
+        session.get.assert_called_once_with(
+            mock.sentinel.url, headers=mock.ANY, stream=True)
+
+    def test_stream_bypasses_cache(self):
+        import mock
+
+        session = mock.Mock(spec=['get'])
+        session.get.return_value = _make_response({'a': 1})
+        cache = mock.Mock(spec=[])
+        with mock.patch.multiple('ci_diff_helper._github',
+                                 get_session=mock.Mock(return_value=session),
+                                 _CACHE=cache,
+                                 _SCHEDULER=None):
+            from ci_diff_helper import _github
+            result = _github._get(mock.sentinel.url, stream=True)
+
+        self.assertIs(result, session.get.return_value)
+        session.get.assert_called_once_with(
+            mock.sentinel.url, headers=mock.ANY, stream=True)
+
+    def _make_cache(self, **kwargs):
+        import shutil
+        import tempfile
+        from ci_diff_helper import _http_cache
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        return _http_cache.ResponseCache(directory, **kwargs)
+
+    def _cache_helper(self, cache, *responses):
+        import mock
+
+        session = mock.Mock(spec=['get'])
+        session.get.side_effect = responses
+        headers_mock = mock.Mock(return_value={'Authorization': 'token a'})
+        with mock.patch.multiple('ci_diff_helper._github',
+                                 _get_headers=headers_mock,
+                                 get_session=mock.Mock(return_value=session),
+                                 _CACHE=cache,
+                                 _SCHEDULER=None):
+            results = [
+                self._call_function_under_test('https://api.github.com/x')
+                for _ in responses]
+        return results, session.get.call_args_list
+
+    def test_cache_not_modified(self):
+        import requests
+        from six.moves import http_client
+
+        cache = self._make_cache()
+        first = _make_response({'a': 1})
+        first.headers['ETag'] = '"e1"'
+        not_modified = requests.Response()
+        not_modified.status_code = http_client.NOT_MODIFIED
+        results, calls = self._cache_helper(cache, first, not_modified)
+
+        self.assertIs(results[0], first)
+        self.assertEqual(results[1].status_code, http_client.OK)
+        self.assertEqual(results[1].json(), {'a': 1})
+        self.assertEqual(calls[0][1]['headers'],
+                         {'Authorization': 'token a'})
+        self.assertEqual(calls[1][1]['headers'], {
+            'Authorization': 'token a',
+            'If-None-Match': '"e1"',
+        })
+
+    def test_cache_modified(self):
+        cache = self._make_cache()
+        first = _make_response({'a': 1})
+        first.headers['ETag'] = '"e1"'
+        second = _make_response({'a': 2})
+        second.headers['ETag'] = '"e2"'
+        results, calls = self._cache_helper(cache, first, second)
+
+        self.assertIs(results[1], second)
+        self.assertEqual(calls[1][1]['headers']['If-None-Match'], '"e1"')
+        entry = cache.get('https://api.github.com/x',
+                          {'Authorization': 'token a'})
+        self.assertEqual(entry.etag, '"e2"')
+
+    def test_cache_fresh(self):
+        cache = self._make_cache(ttl=3600)
+        first = _make_response({'a': 1})
+        results, _ = self._cache_helper(cache, first)
+        self.assertIs(results[0], first)
+
+        result = self._cache_hit(cache)
+        self.assertEqual(result.json(), {'a': 1})
+
+    def _cache_hit(self, cache):
+        import mock
+
+        session = mock.Mock(spec=['get'])
+        headers_mock = mock.Mock(return_value={'Authorization': 'token a'})
+        with mock.patch.multiple('ci_diff_helper._github',
+                                 _get_headers=headers_mock,
+                                 get_session=mock.Mock(return_value=session),
+                                 _CACHE=cache,
+                                 _SCHEDULER=None):
+            result = self._call_function_under_test(
+                'https://api.github.com/x')
+        session.get.assert_not_called()
+        return result
+
+    def test_retries_via_scheduler(self):
+        import mock
+        import requests
+        from ci_diff_helper import _rate_limit
+
+        failure = requests.Response()
+        failure.status_code = 502
+        success = _make_response({'a': 1})
+        session = mock.Mock(spec=['get'])
+        session.get.side_effect = [failure, success]
+        sleep = mock.Mock()
+        scheduler = _rate_limit.Scheduler(sleep=sleep)
+        with mock.patch.multiple('ci_diff_helper._github',
+                                 get_session=mock.Mock(return_value=session),
+                                 _CACHE=None,
+                                 _SCHEDULER=scheduler):
+            result = self._call_function_under_test(
+                'https://api.github.com/x')
+        self.assertIs(result, success)
+        self.assertEqual(session.get.call_count, 2)
+        sleep.assert_called_once_with(mock.ANY)
+
+
+class Test_get_scheduler(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import _github
+        return _github.get_scheduler()
+
+    def test_cached(self):
+        import mock
+        from ci_diff_helper import _rate_limit
+
+        with mock.patch('ci_diff_helper._github._SCHEDULER', new=None):
+            with mock.patch('os.environ', new={}):
+                scheduler = self._call_function_under_test()
+                self.assertIs(self._call_function_under_test(), scheduler)
+        self.assertIsInstance(scheduler, _rate_limit.Scheduler)
+        self.assertIsNone(scheduler.ledger)
+
+    def test_shared_ledger(self):
+        import os
+        import shutil
+        import tempfile
+
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        mock_env = {
+            env.GH_RATE_LIMIT_DIR: directory,
+            env.GH_TOKEN: 'abc',
+        }
+        with mock.patch('ci_diff_helper._github._SCHEDULER', new=None):
+            with mock.patch('os.environ', new=mock_env):
+                scheduler = self._call_function_under_test()
+        self.addCleanup(scheduler.ledger.close)
+        self.assertEqual(os.path.dirname(scheduler.ledger.path), directory)
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+
+class Test_set_scheduler(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(scheduler):
+        from ci_diff_helper import _github
+        return _github.set_scheduler(scheduler)
+
+    def test_it(self):
+        import mock
+        from ci_diff_helper import _github
+
+        with mock.patch('ci_diff_helper._github._SCHEDULER',
+                        new=mock.sentinel.previous):
+            previous = self._call_function_under_test(mock.sentinel.new)
+            self.assertIs(previous, mock.sentinel.previous)
+            self.assertIs(_github.get_scheduler(), mock.sentinel.new)
+
+
+class Test_get_cache(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import _github
+        return _github.get_cache()
+
+    def _helper(self, mock_env):
+        import mock
+        from ci_diff_helper import _utils
+
+        with mock.patch('os.environ', new=mock_env):
+            with mock.patch('ci_diff_helper._github._CACHE',
+                            new=_utils.UNSET):
+                cache = self._call_function_under_test()
+                self.assertIs(self._call_function_under_test(), cache)
+                return cache
+
+    def test_disabled(self):
+        self.assertIsNone(self._helper({}))
+
+    def test_enabled(self):
+        import shutil
+        import tempfile
+        from ci_diff_helper import _http_cache
+        from ci_diff_helper import environment_vars as env
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = self._helper({env.GH_CACHE_DIR: directory})
+        self.assertIsInstance(cache, _http_cache.ResponseCache)
+        self.assertEqual(cache.directory, directory)
+        self.assertIsNone(cache.ttl)
+
+    def test_ttl(self):
+        import shutil
+        import tempfile
+        from ci_diff_helper import environment_vars as env
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = self._helper({env.GH_CACHE_DIR: directory,
+                              env.GH_CACHE_TTL: '90'})
+        self.assertEqual(cache.ttl, 90.0)
+
+    def test_bad_ttl(self):
+        from ci_diff_helper import environment_vars as env
+
+        with self.assertRaises(ValueError):
+            self._helper({env.GH_CACHE_DIR: '/x', env.GH_CACHE_TTL: 'z'})
+
+
+class Test_set_cache(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(cache):
+        from ci_diff_helper import _github
+        return _github.set_cache(cache)
+
+    def test_it(self):
+        import mock
+        from ci_diff_helper import _github
+
+        with mock.patch('ci_diff_helper._github._CACHE',
+                        new=mock.sentinel.previous):
+            previous = self._call_function_under_test(mock.sentinel.new)
+            self.assertIs(previous, mock.sentinel.previous)
+            self.assertIs(_github.get_cache(), mock.sentinel.new)
+
+    def test_unset(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        with mock.patch('ci_diff_helper._github._CACHE', new=_utils.UNSET):
+            self.assertIsNone(self._call_function_under_test(None))
+
+
+def _make_response(payload):
+    import json
+    import requests
+    from six.moves import http_client
+
+    response = requests.Response()
+    response.status_code = http_client.OK
+    response._content = json.dumps(payload).encode('utf-8')
+    return response
+
+
+class Test_commit_compare(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(slug, start, finish):
+        from ci_diff_helper import _github
+        return _github.commit_compare(slug, start, finish)
 
     def test_success(self):
         import mock
@@ -128,51 +598,222 @@ class Test_commit_compare(unittest.TestCase):
         from ci_diff_helper import _github
 
         payload = {'hi': 'bye'}
-        response = self._make_response(payload)
+        response = _make_response(payload)
 
-        patch_get = mock.patch('requests.get', return_value=response)
         slug = 'a/b'
         start = '1234'
         finish = '6789'
         expected_url = _github._GH_COMPARE_TEMPLATE.format(
             slug, start, finish)
 
-        headers_mock = mock.Mock(
-            return_value=mock.sentinel.headers)
-        fail_mock = mock.Mock()
-        with mock.patch.multiple('ci_diff_helper._github',
-                                 _get_headers=headers_mock,
-                                 _maybe_fail=fail_mock):
-            with patch_get as mocked_get:
-                result = self._call_function_under_test(
-                    slug, start, finish)
+        patch_get = mock.patch('ci_diff_helper._github._get',
+                               return_value=response)
+        with patch_get as mocked_get:
+            result = self._call_function_under_test(slug, start, finish)
 
         self.assertEqual(result, payload)
+        mocked_get.assert_called_once_with(expected_url)
 
-        # Verify mocks.
-        headers_mock.assert_called_once_with()
-        fail_mock.assert_called_once_with(response)
+
+def _make_stream_response(payload, next_url=None):
+    import io
+    import json
+
+    import mock
+    import requests
+    from six.moves import http_client
+
+    response = requests.Response()
+    response.status_code = http_client.OK
+    response.raw = io.BytesIO(json.dumps(payload).encode('utf-8'))
+    response.close = mock.Mock(wraps=response.close)
+    if next_url is not None:
+        response.headers['Link'] = '<{}>; rel="next"'.format(next_url)
+    return response
+
+
+class Test_compare_url(unittest.TestCase):
+
+    def test_it(self):
+        from ci_diff_helper import _github
+
+        self.assertEqual(
+            _github.compare_url('a/b', 'c', 'd'),
+            'https://api.github.com/repos/a/b/compare/c...d')
+
+
+class Test_compare_page_url(unittest.TestCase):
+
+    def test_it(self):
+        from ci_diff_helper import _github
+
+        self.assertEqual(
+            _github.compare_page_url('a/b', 'c', 'd'),
+            'https://api.github.com/repos/a/b/compare/c...d?per_page=1')
+
+
+class Test_pr_url(unittest.TestCase):
+
+    def test_it(self):
+        from ci_diff_helper import _github
+
+        self.assertEqual(_github.pr_url('a/b', 12),
+                         'https://api.github.com/repos/a/b/pulls/12')
+
+
+class Test_read_merge_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(chunks):
+        from ci_diff_helper import _github
+        return _github.read_merge_base(chunks)
+
+    def test_stops_early(self):
+        def chunks():
+            yield b'{"merge_base_commit": {"sh'
+            yield b'a": "abc"}, "files": ['
+            raise AssertionError('Read past the merge base')
+
+        self.assertEqual(self._call_function_under_test(chunks()), 'abc')
+
+    def test_missing(self):
+        self.assertIsNone(self._call_function_under_test([b'{"a": 1}']))
+
+
+class Test_compare_merge_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(slug, start, finish):
+        from ci_diff_helper import _github
+        return _github.compare_merge_base(slug, start, finish)
+
+    def _helper(self, payload, cache=None):
+        import mock
+
+        response = _make_stream_response(payload)
+        patch_get = mock.patch('ci_diff_helper._github._get',
+                               return_value=response)
+        patch_cache = mock.patch('ci_diff_helper._github.get_cache',
+                                 return_value=cache)
+        with patch_get as mocked_get:
+            with patch_cache:
+                result = self._call_function_under_test(
+                    'a/b', '1234', '6789')
+
+        # The page is only streamed if it can't be cached.
         mocked_get.assert_called_once_with(
-            expected_url, headers=mock.sentinel.headers)
+            'https://api.github.com/repos/a/b/compare/1234...6789'
+            '?per_page=1', stream=cache is None)
+        response.close.assert_called_once_with()
+        return result
 
+    def test_success(self):
+        sha = 'f8c2476b625f6a6f35a9e7f4d566c9b036722f11'
+        payload = {
+            'base_commit': {'sha': 'abc'},
+            'merge_base_commit': {'sha': sha},
+            'files': [{'filename': 'a.py', 'patch': 'x' * 4096}],
+        }
+        self.assertEqual(self._helper(payload), sha)
+
+    def test_missing(self):
+        self.assertIsNone(self._helper({'base_commit': {'sha': 'abc'}}))
+
+    def test_cached(self):
+        import mock
 
-class Test_pr_info(unittest.TestCase):
+        payload = {'merge_base_commit': {'sha': 'abc'}}
+        self.assertEqual(self._helper(payload, mock.sentinel.cache), 'abc')
+
+    def test_revalidated(self):
+        import shutil
+        import tempfile
+        from ci_diff_helper import _github
+        from ci_diff_helper import _http_cache
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with fake_github.FakeGitHub(merge_base='abc') as server:
+            _github.set_cache(_http_cache.ResponseCache(directory))
+            first = self._call_function_under_test('a/b', '1234', '6789')
+            second = self._call_function_under_test('a/b', '1234', '6789')
+            files = list(_github.iter_compare_files('a/b', '1234', '6789'))
+        self.assertEqual((first, second), ('abc', 'abc'))
+        self.assertEqual(files, ['setup.py'])
+        # Repeat lookups are only re-validated.
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(server.not_modified, 2)
+
+
+class Test_iter_compare_files(unittest.TestCase):
 
     @staticmethod
-    def _call_function_under_test(slug, pr_id):
+    def _call_function_under_test(slug, start, finish):
         from ci_diff_helper import _github
-        return _github.pr_info(slug, pr_id)
+        return _github.iter_compare_files(slug, start, finish)
+
+    def test_first_page_only(self):
+        import mock
+
+        page1 = _make_stream_response({
+            'merge_base_commit': {'sha': 'abc'},
+            'files': [
+                {'filename': 'a.py', 'patch': '@@ -1 +1 @@'},
+                {'filename': 'b.py', 'status': 'added'},
+            ],
+        }, next_url='https://api.github.com/page2')
+        patch_get = mock.patch('ci_diff_helper._github._get',
+                               return_value=page1)
+        patch_cache = mock.patch('ci_diff_helper._github.get_cache',
+                                 return_value=None)
+        with patch_get as mocked_get:
+            with patch_cache:
+                result = list(self._call_function_under_test(
+                    'a/b', '1234', '6789'))
+
+        self.assertEqual(result, ['a.py', 'b.py'])
+        # Later pages only list more commits, so are never requested.
+        mocked_get.assert_called_once_with(
+            'https://api.github.com/repos/a/b/compare/1234...6789'
+            '?per_page=1', stream=True)
+        page1.close.assert_called_once_with()
+
+
+class Test_iter_pr_files(unittest.TestCase):
 
     @staticmethod
-    def _make_response(payload):
-        import json
-        import requests
-        from six.moves import http_client
+    def _call_function_under_test(slug, pr_id, **kwargs):
+        from ci_diff_helper import _github
+        return _github.iter_pr_files(slug, pr_id, **kwargs)
+
+    def test_paginated(self):
+        import mock
+
+        page2_url = 'https://api.github.com/page2'
+        page1 = _make_stream_response([
+            {'filename': 'a.py', 'patch': '@@ -1 +1 @@'},
+            {'filename': 'b.py', 'previous_filename': 'old.py'},
+        ], next_url=page2_url)
+        page2 = _make_stream_response([{'filename': 'c.py'}])
+        patch_get = mock.patch('ci_diff_helper._github._get',
+                               side_effect=[page1, page2])
+        with patch_get as mocked_get:
+            result = list(self._call_function_under_test('a/b', 808))
+
+        self.assertEqual(result, ['a.py', 'b.py', 'c.py'])
+        self.assertEqual(mocked_get.mock_calls, [
+            mock.call('https://api.github.com/repos/a/b/pulls/808/files'
+                      '?per_page=100', stream=True),
+            mock.call(page2_url, stream=True),
+        ])
 
-        response = requests.Response()
-        response.status_code = http_client.OK
-        response._content = json.dumps(payload).encode('utf-8')
-        return response
+
+class Test_pr_info(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(slug, pr_id):
+        from ci_diff_helper import _github
+        return _github.pr_info(slug, pr_id)
 
     def test_success(self):
         import mock
@@ -181,27 +822,124 @@ class Test_pr_info(unittest.TestCase):
 
         base_sha = '04facb05d80e871107892b3635e24fee60a4fc36'
         payload = {'base': {'sha': base_sha}}
-        response = self._make_response(payload)
+        response = _make_response(payload)
 
-        patch_get = mock.patch('requests.get', return_value=response)
         slug = 'a/b'
         pr_id = 808
         expected_url = _github._GH_PR_TEMPLATE.format(slug, pr_id)
 
-        headers_mock = mock.Mock(
-            return_value=mock.sentinel.headers)
-        fail_mock = mock.Mock()
-        with mock.patch.multiple('ci_diff_helper._github',
-                                 _get_headers=headers_mock,
-                                 _maybe_fail=fail_mock):
-            with patch_get as mocked_get:
-                result = self._call_function_under_test(
-                    slug, pr_id)
+        patch_get = mock.patch('ci_diff_helper._github._get',
+                               return_value=response)
+        with patch_get as mocked_get:
+            result = self._call_function_under_test(slug, pr_id)
 
         self.assertEqual(result, payload)
+        mocked_get.assert_called_once_with(expected_url)
 
-        # Verify mocks.
-        headers_mock.assert_called_once_with()
-        fail_mock.assert_called_once_with(response)
-        mocked_get.assert_called_once_with(
-            expected_url, headers=mock.sentinel.headers)
+
+def _graphql_server(token='a'):
+    """Create a fake GitHub server and configure a token for it.
+
+    Args:
+        token (Optional[str]): The GitHub token (if any).
+
+    Returns:
+        Tuple[~tests.fake_github.FakeGitHub, mock._patch]: The server
+        and a patch of the environment.
+    """
+    import os
+    import mock
+    from ci_diff_helper import environment_vars as env
+
+    environ = {} if token is None else {env.GH_TOKEN: token}
+    patch_env = mock.patch.dict(os.environ, environ, clear=True)
+    return fake_github.FakeGitHub(), patch_env
+
+
+class Test_pr_batch_info(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(slug, pr_ids, **kwargs):
+        from ci_diff_helper import _github
+        return _github.pr_batch_info(slug, pr_ids, **kwargs)
+
+    def test_single_round_trip(self):
+        server, patch_env = _graphql_server()
+        server.add_pull_request(7, 'b7', 'b7-head', files=['a.py'],
+                                merge_commit_sha='m7')
+        server.add_pull_request(
+            12, 'b12', 'b12-head', files=['b.py', 'c.py', 'd.py'])
+        with patch_env:
+            with server:
+                result = self._call_function_under_test(
+                    'org/repo', [12, 7, 12], files_limit=2)
+
+        self.assertEqual(result, {
+            7: {
+                'base_sha': 'b7',
+                'head_sha': 'b7-head',
+                'merged': True,
+                'mergeable': 'MERGEABLE',
+                'state': 'MERGED',
+                'merge_commit_sha': 'm7',
+                'files': ['a.py'],
+                'files_complete': True,
+            },
+            12: {
+                'base_sha': 'b12',
+                'head_sha': 'b12-head',
+                'merged': False,
+                'mergeable': 'MERGEABLE',
+                'state': 'OPEN',
+                'merge_commit_sha': None,
+                'files': ['b.py', 'c.py'],
+                'files_complete': False,
+            },
+        })
+        self.assertEqual(server.requests, ['/graphql'])
+        (headers, body), = server.graphql_requests
+        self.assertEqual(headers['Authorization'], 'token a')
+        self.assertEqual(body['variables'],
+                         {'owner': 'org', 'name': 'repo'})
+        self.assertIn('pr7: pullRequest(number: 7)', body['query'])
+        self.assertIn('pr12: pullRequest(number: 12)', body['query'])
+        self.assertIn('files(first: 2)', body['query'])
+
+    def test_empty(self):
+        import mock
+
+        with mock.patch('ci_diff_helper._github.graphql') as mocked:
+            self.assertEqual(self._call_function_under_test('a/b', []), {})
+        mocked.assert_not_called()
+
+    def test_query_errors(self):
+        server, patch_env = _graphql_server()
+        with patch_env:
+            with server:
+                with self.assertRaises(ValueError):
+                    self._call_function_under_test('a/b', [1])
+
+    def test_http_error(self):
+        import mock
+        import requests
+
+        server, patch_env = _graphql_server(token=None)
+        with patch_env:
+            with server:
+                with mock.patch('ci_diff_helper._github._rate_limit_info'):
+                    with self.assertRaises(requests.exceptions.HTTPError):
+                        self._call_function_under_test('a/b', [1])
+
+    def test_separate_rate_limit(self):
+        from ci_diff_helper import _github
+
+        server, patch_env = _graphql_server()
+        server.add_pull_request(1, 'base', 'head')
+        with patch_env:
+            with server:
+                _github.pr_info('a/b', 1)
+                scheduler = _github.get_scheduler()
+                remaining = scheduler.remaining
+                self._call_function_under_test('a/b', [1])
+                # The GraphQL budget is not mixed up with the REST one.
+                self.assertEqual(scheduler.remaining, remaining)
@@ -0,0 +1,208 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+def _make_response(body, **headers):
+    import requests
+    from six.moves import http_client
+
+    response = requests.Response()
+    response.status_code = http_client.OK
+    response.headers.update(headers)
+    response._content = body
+    return response
+
+
+class TestCacheEntry(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._http_cache import CacheEntry
+        return CacheEntry
+
+    def _make_one(self, etag='"abc"', last_modified=None):
+        klass = self._get_target_class()
+        return klass('https://api.github.com/x', b'{"a": 1}', etag,
+                     last_modified, 10.5)
+
+    def test_conditional_headers(self):
+        entry = self._make_one(last_modified='Mon, 10 Oct 2016')
+        self.assertEqual(entry.conditional_headers(), {
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Mon, 10 Oct 2016',
+        })
+
+    def test_conditional_headers_empty(self):
+        entry = self._make_one(etag=None)
+        self.assertEqual(entry.conditional_headers(), {})
+
+    def test_to_response(self):
+        entry = self._make_one(last_modified='Mon, 10 Oct 2016')
+        response = entry.to_response()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'a': 1})
+        self.assertEqual(response.url, entry.url)
+        self.assertEqual(response.headers['etag'], '"abc"')
+        self.assertEqual(response.headers['last-modified'],
+                         'Mon, 10 Oct 2016')
+
+    def test_to_response_no_headers(self):
+        response = self._make_one(etag=None).to_response()
+        self.assertEqual(dict(response.headers), {})
+
+    def test_json_round_trip(self):
+        klass = self._get_target_class()
+        entry = self._make_one()
+        new_entry = klass.from_json(entry.to_json())
+        for name in klass.__slots__:
+            self.assertEqual(getattr(new_entry, name), getattr(entry, name))
+
+
+class TestResponseCache(unittest.TestCase):
+
+    URL = 'https://api.github.com/repos/a/b/pulls/1'
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._http_cache import ResponseCache
+        return ResponseCache
+
+    def _make_one(self, **kwargs):
+        import os
+        import shutil
+        import tempfile
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        klass = self._get_target_class()
+        return klass(os.path.join(directory, 'cache'), **kwargs)
+
+    def test_constructor(self):
+        import os
+        from ci_diff_helper import _http_cache
+
+        cache = self._make_one()
+        self.assertTrue(os.path.isdir(cache.directory))
+        self.assertIsNone(cache.ttl)
+        self.assertEqual(cache.max_entries, _http_cache._MAX_ENTRIES)
+        self.assertEqual(cache.max_bytes, _http_cache._MAX_BYTES)
+        # Re-using an existing directory.
+        klass = self._get_target_class()
+        self.assertEqual(klass(cache.directory).directory, cache.directory)
+
+    def test__path(self):
+        import os
+
+        cache = self._make_one()
+        path1 = cache._path(self.URL, {})
+        path2 = cache._path(self.URL, {'Authorization': 'token a'})
+        path3 = cache._path(self.URL, {'Authorization': 'token b'})
+        self.assertEqual(len(set([path1, path2, path3])), 3)
+        self.assertEqual(os.path.dirname(path1), cache.directory)
+        self.assertNotIn('token', path2)
+        self.assertEqual(path1, cache._path(self.URL, {'Accept': 'x'}))
+
+    def test_get_missing(self):
+        cache = self._make_one()
+        self.assertIsNone(cache.get(self.URL, {}))
+
+    def test_get_corrupt(self):
+        cache = self._make_one()
+        with open(cache._path(self.URL, {}), 'wb') as file_obj:
+            file_obj.write(b'not-json')
+        self.assertIsNone(cache.get(self.URL, {}))
+
+    def test_put_and_get(self):
+        cache = self._make_one()
+        headers = {'Authorization': 'token a'}
+        response = _make_response(b'{"x": 2}', ETag='"e1"')
+        cache.put(self.URL, headers, response)
+
+        entry = cache.get(self.URL, headers)
+        self.assertEqual(entry.body, b'{"x": 2}')
+        self.assertEqual(entry.etag, '"e1"')
+        self.assertIsNone(entry.last_modified)
+        # Other credentials don't see the entry.
+        self.assertIsNone(cache.get(self.URL, {}))
+
+    def test_put_not_cacheable(self):
+        import os
+
+        cache = self._make_one()
+        cache.put(self.URL, {}, _make_response(b'{}'))
+        self.assertEqual(os.listdir(cache.directory), [])
+
+    def test_put_ttl_without_validators(self):
+        cache = self._make_one(ttl=60)
+        cache.put(self.URL, {}, _make_response(b'{}'))
+        self.assertIsNotNone(cache.get(self.URL, {}))
+
+    def test_is_fresh(self):
+        import mock
+        from ci_diff_helper._http_cache import CacheEntry
+
+        entry = CacheEntry(self.URL, b'', None, None, 100.0)
+        cache = self._make_one()
+        self.assertFalse(cache.is_fresh(entry))
+        cache.ttl = 30
+        with mock.patch('time.time', return_value=120.0):
+            self.assertTrue(cache.is_fresh(entry))
+        with mock.patch('time.time', return_value=130.0):
+            self.assertFalse(cache.is_fresh(entry))
+
+    def test_refresh(self):
+        import mock
+
+        cache = self._make_one(ttl=10)
+        with mock.patch('time.time', return_value=100.0):
+            cache.put(self.URL, {}, _make_response(b'{}', ETag='"e"'))
+        entry = cache.get(self.URL, {})
+        with mock.patch('time.time', return_value=500.0):
+            cache.refresh(self.URL, {}, entry)
+        self.assertEqual(cache.get(self.URL, {}).stored_at, 500.0)
+
+    def _set_mtime(self, cache, url, mtime):
+        import os
+        os.utime(cache._path(url, {}), (mtime, mtime))
+
+    def test_evict_max_entries(self):
+        cache = self._make_one(max_entries=2)
+        for index in range(3):
+            url = self.URL + str(index)
+            cache.put(url, {}, _make_response(b'{}', ETag='"e"'))
+            self._set_mtime(cache, url, 1000 + index)
+            # Reading an entry marks it as recently used.
+            self.assertIsNotNone(cache.get(self.URL + '0', {}))
+            self._set_mtime(cache, self.URL + '0', 2000 + index)
+
+        self.assertIsNotNone(cache.get(self.URL + '0', {}))
+        self.assertIsNone(cache.get(self.URL + '1', {}))
+        self.assertIsNotNone(cache.get(self.URL + '2', {}))
+
+    def test_evict_max_bytes(self):
+        import os
+
+        cache = self._make_one(max_bytes=300)
+        cache.put(self.URL + 'a', {}, _make_response(b'1' * 100, ETag='"e"'))
+        self._set_mtime(cache, self.URL + 'a', 1000)
+        cache.put(self.URL + 'b', {}, _make_response(b'2' * 100, ETag='"e"'))
+        self._set_mtime(cache, self.URL + 'b', 1001)
+        cache.put(self.URL + 'c', {}, _make_response(b'3' * 100, ETag='"e"'))
+        self.assertIsNone(cache.get(self.URL + 'a', {}))
+        self.assertIsNotNone(cache.get(self.URL + 'c', {}))
+        # Stray files in the directory are left alone.
+        with open(os.path.join(cache.directory, 'README'), 'w'):
+            pass
+        cache._evict()
+        self.assertIn('README', os.listdir(cache.directory))
@@ -0,0 +1,110 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+def _chunked(document, size):
+    return [document[index:index + size]
+            for index in range(0, len(document), size)]
+
+
+class Test__decode_key(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(token):
+        from ci_diff_helper._json_stream import _decode_key
+        return _decode_key(token)
+
+    def test_plain(self):
+        self.assertEqual(self._call_function_under_test(b'"sha"'), u'sha')
+
+    def test_escaped(self):
+        self.assertEqual(self._call_function_under_test(b'"a\\"b\\u00e9"'),
+                         u'a"bé')
+
+
+class Test_iter_fields(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(chunks, paths):
+        from ci_diff_helper._json_stream import iter_fields
+        return list(iter_fields(chunks, paths))
+
+    def test_nested(self):
+        import json
+
+        payload = {
+            'url': 'https://api.github.com',
+            'merge_base_commit': {
+                'sha': 'abc',
+                'parents': [{'sha': 'not-this-one'}],
+            },
+            'files': [
+                {'filename': 'a.py', 'patch': '@@ "quoted" \\ @@' * 500},
+                {'filename': u'bé.py', 'changes': 12},
+                {'other': {'filename': 'nested'}},
+            ],
+            'flags': [True, False, None, -1.5e3, 0],
+        }
+        document = json.dumps(payload, indent=2).encode('utf-8')
+        paths = [
+            ('merge_base_commit', 'sha'),
+            ('files', None, 'filename'),
+            ('flags', None),
+        ]
+        expected = [
+            (('merge_base_commit', 'sha'), 'abc'),
+            (('files', None, 'filename'), 'a.py'),
+            (('files', None, 'filename'), u'bé.py'),
+            (('flags', None), True),
+            (('flags', None), False),
+            (('flags', None), None),
+            (('flags', None), -1500.0),
+            (('flags', None), 0),
+        ]
+        for size in (1, 2, 7, 1024, len(document)):
+            result = self._call_function_under_test(
+                _chunked(document, size), paths)
+            self.assertEqual(result, expected)
+
+    def test_containers_not_reported(self):
+        result = self._call_function_under_test(
+            [b'{"a": {"b": 1}, "c": [2]}'], [('a',), ('c',)])
+        self.assertEqual(result, [])
+
+    def test_top_level_scalar(self):
+        result = self._call_function_under_test([b' 42 '], [()])
+        self.assertEqual(result, [((), 42)])
+
+    def test_empty_chunks(self):
+        result = self._call_function_under_test(
+            [b'', b'{"a"', b'', b': 1}', b''], [('a',)])
+        self.assertEqual(result, [(('a',), 1)])
+
+    def test_stops_early(self):
+        from ci_diff_helper._json_stream import iter_fields
+
+        def chunks():
+            yield b'{"a": 1, '
+            raise AssertionError('Read too far')
+
+        fields = iter_fields(chunks(), [('a',)])
+        self.assertEqual(next(fields), (('a',), 1))
+
+    def test_truncated(self):
+        with self.assertRaises(ValueError):
+            self._call_function_under_test([b'{"a": "bc'], [('a',)])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self._call_function_under_test([b'{"a": \x00}'], [('a',)])
@@ -0,0 +1,121 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class Test__to_state(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(values):
+        from ci_diff_helper._rate_ledger import _to_state
+        return _to_state(values)
+
+    def test_unknown(self):
+        self.assertEqual(self._call_function_under_test((0, 0, 0, 0.0)),
+                         (None, None, None, None))
+
+    def test_known(self):
+        self.assertEqual(
+            self._call_function_under_test((60, 0, 1000, 12.5)),
+            (60, 0, 1000, 12.5))
+
+
+class TestLedger(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._rate_ledger import Ledger
+        return Ledger
+
+    def _make_one(self, directory=None, identity=''):
+        import shutil
+        import tempfile
+
+        if directory is None:
+            directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, directory)
+        ledger = self._get_target_class()(directory, identity=identity)
+        self.addCleanup(ledger.close)
+        return ledger
+
+    def test_constructor(self):
+        import os
+        import shutil
+        import tempfile
+
+        parent = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, parent)
+        directory = os.path.join(parent, 'ledgers')
+        ledger = self._make_one(directory=directory, identity='token abc')
+        self.assertEqual(os.path.dirname(ledger.path), directory)
+        self.assertNotIn('abc', ledger.path)
+        self.assertEqual(ledger.read(), (None, None, None, None))
+        # Re-opening an existing ledger keeps its contents.
+        ledger.update(60, 10, 1000)
+        other = self._make_one(directory=directory, identity='token abc')
+        self.assertEqual(other.path, ledger.path)
+        self.assertEqual(other.read(), (60, 10, 1000, None))
+
+    def test_separate_identities(self):
+        import os
+
+        ledger = self._make_one(identity='token abc')
+        other = self._make_one(
+            directory=os.path.dirname(ledger.path), identity='token def')
+        self.assertNotEqual(ledger.path, other.path)
+        ledger.update(60, 10, 1000)
+        self.assertEqual(other.read(), (None, None, None, None))
+
+    def test_shared(self):
+        import os
+
+        ledger = self._make_one()
+        other = self._make_one(directory=os.path.dirname(ledger.path))
+        ledger.update(5000, 100, 1000)
+        self.assertEqual(other.read(), (5000, 100, 1000, None))
+        other.acquire(500.0)
+        self.assertEqual(ledger.read(), (5000, 99, 1000, 500.0))
+
+    def test_update_merge(self):
+        ledger = self._make_one()
+        self.assertEqual(ledger.update(5000, 100, 1000),
+                         (5000, 100, 1000, None))
+        # Lower remaining in the same window wins.
+        self.assertEqual(ledger.update(None, 90, 1000),
+                         (5000, 90, 1000, None))
+        # A late response from the same window is ignored.
+        self.assertEqual(ledger.update(5000, 95, 1000),
+                         (5000, 90, 1000, None))
+        # A response from an earlier window is ignored.
+        self.assertEqual(ledger.update(5000, 3, 900),
+                         (5000, 90, 1000, None))
+        # A new window replaces the budget.
+        self.assertEqual(ledger.update(5000, 4999, 4600),
+                         (5000, 4999, 4600, None))
+
+    def test_acquire(self):
+        ledger = self._make_one()
+        self.assertEqual(ledger.acquire(10.0), (None, None, None, 10.0))
+        ledger.update(60, 1, 1000)
+        self.assertEqual(ledger.acquire(20.0), (60, 0, 1000, 20.0))
+        self.assertEqual(ledger.acquire(30.0), (60, 0, 1000, 30.0))
+        # Past the reset, the budget is not decremented.
+        ledger.update(60, 5, 1100)
+        self.assertEqual(ledger.acquire(2000.0), (60, 5, 1100, 2000.0))
+
+    def test_close(self):
+        ledger = self._make_one()
+        ledger.close()
+        self.assertIsNone(ledger._data)
+        # Closing twice is a no-op.
+        ledger.close()
@@ -0,0 +1,346 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+def _make_response(status_code=200, **headers):
+    import requests
+
+    response = requests.Response()
+    response.status_code = status_code
+    for name, value in headers.items():
+        response.headers[name.replace('_', '-')] = value
+    return response
+
+
+def _limit_headers(remaining, reset, limit=5000):
+    return {
+        'X-RateLimit-Remaining': str(remaining),
+        'X-RateLimit-Reset': str(reset),
+        'X-RateLimit-Limit': str(limit),
+    }
+
+
+class _FakeClock(object):
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Test__header_int(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(headers, name):
+        from ci_diff_helper._rate_limit import _header_int
+        return _header_int(headers, name)
+
+    def test_it(self):
+        self.assertEqual(self._call_function_under_test({'a': '12'}, 'a'),
+                         12)
+        self.assertIsNone(self._call_function_under_test({}, 'a'))
+        self.assertIsNone(self._call_function_under_test({'a': 'x'}, 'a'))
+
+
+class TestScheduler(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._rate_limit import Scheduler
+        return Scheduler
+
+    def _make_one(self, clock=None, **kwargs):
+        if clock is None:
+            clock = _FakeClock()
+        klass = self._get_target_class()
+        return klass(clock=clock, sleep=clock.sleep, **kwargs), clock
+
+    def test_constructor_defaults(self):
+        import time
+        from ci_diff_helper import _rate_limit
+
+        scheduler = self._get_target_class()()
+        self.assertEqual(scheduler.max_retries, _rate_limit._MAX_RETRIES)
+        self.assertEqual(scheduler.deadline, _rate_limit._DEADLINE)
+        self.assertIs(scheduler._clock, time.time)
+        self.assertIs(scheduler._sleep, time.sleep)
+        self.assertIsNone(scheduler.remaining)
+
+    def test_update(self):
+        scheduler, _ = self._make_one()
+        scheduler.update(_limit_headers(17, 2000, limit=60))
+        self.assertEqual(scheduler.remaining, 17)
+        self.assertEqual(scheduler.reset, 2000)
+        self.assertEqual(scheduler.limit, 60)
+        # Missing headers leave the model alone.
+        scheduler.update({})
+        self.assertEqual(scheduler.remaining, 17)
+
+    def test_update_other_resource(self):
+        scheduler, _ = self._make_one()
+        headers = _limit_headers(17, 2000, limit=60)
+        headers['X-RateLimit-Resource'] = 'core'
+        scheduler.update(headers)
+        # The GraphQL budget doesn't replace the REST budget.
+        graphql_headers = _limit_headers(4990, 3000, limit=5000)
+        graphql_headers['X-RateLimit-Resource'] = 'graphql'
+        scheduler.update(graphql_headers)
+        self.assertEqual(scheduler.remaining, 17)
+        self.assertEqual(scheduler.reset, 2000)
+        self.assertEqual(scheduler.limit, 60)
+
+    def test_delay_unknown(self):
+        scheduler, _ = self._make_one()
+        self.assertEqual(scheduler.delay(), 0.0)
+
+    def test_delay_plenty_left(self):
+        scheduler, _ = self._make_one()
+        scheduler.update(_limit_headers(4000, 2000))
+        scheduler._acquire()
+        self.assertEqual(scheduler.delay(), 0.0)
+        self.assertEqual(scheduler.remaining, 3999)
+
+    def test_delay_exhausted(self):
+        scheduler, _ = self._make_one()
+        scheduler.update(_limit_headers(0, 1300))
+        self.assertEqual(scheduler.delay(), 300.0)
+
+    def test_delay_window_passed(self):
+        scheduler, _ = self._make_one()
+        scheduler.update(_limit_headers(0, 900))
+        self.assertEqual(scheduler.delay(), 0.0)
+
+    def test_delay_spaced_out(self):
+        scheduler, clock = self._make_one()
+        # 10 requests left in a 100 second window (below the low water
+        # mark of 10% of 5000).
+        scheduler.update(_limit_headers(11, 1100))
+        self.assertEqual(scheduler.delay(), 0.0)
+        scheduler._acquire()
+        self.assertEqual(scheduler.delay(), 10.0)
+        # The interval is recomputed from the rest of the window.
+        clock.now += 4.0
+        self.assertAlmostEqual(scheduler.delay(), 5.6)
+        clock.now += 10.0
+        self.assertEqual(scheduler.delay(), 0.0)
+
+    def test_shared_ledger(self):
+        import os
+        import shutil
+        import tempfile
+
+        from ci_diff_helper import _rate_ledger
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        ledger = _rate_ledger.Ledger(directory)
+        self.addCleanup(ledger.close)
+        other_ledger = _rate_ledger.Ledger(directory)
+        self.addCleanup(other_ledger.close)
+        scheduler, clock = self._make_one(ledger=ledger)
+        other, _ = self._make_one(clock=clock, ledger=other_ledger)
+        self.assertEqual(
+            os.listdir(directory), [os.path.basename(ledger.path)])
+
+        scheduler.update(_limit_headers(11, 1100))
+        self.assertEqual(other.delay(), 0.0)
+        self.assertEqual(other.remaining, 11)
+        # A request sent by one process paces the other.
+        scheduler._acquire()
+        self.assertEqual(other.delay(), 10.0)
+        self.assertEqual(other.remaining, 10)
+        # Missing headers leave the ledger alone.
+        other.update({})
+        self.assertEqual(ledger.read(), (5000, 10, 1100, 1000.0))
+
+    def test_send_success(self):
+        import mock
+
+        scheduler, clock = self._make_one()
+        response = _make_response(**_limit_headers(10, 2000))
+        func = mock.Mock(return_value=response)
+        result = scheduler.send(func, 'url', headers={'a': 'b'})
+        self.assertIs(result, response)
+        func.assert_called_once_with('url', headers={'a': 'b'})
+        self.assertEqual(scheduler.remaining, 10)
+        self.assertEqual(clock.sleeps, [])
+
+    def test_send_paced(self):
+        import mock
+
+        scheduler, clock = self._make_one()
+        scheduler.update(_limit_headers(0, 1030))
+        func = mock.Mock(return_value=_make_response())
+        scheduler.send(func)
+        self.assertEqual(clock.sleeps, [30.0])
+
+    def test_send_other_resource(self):
+        import mock
+
+        scheduler, clock = self._make_one()
+        scheduler.update(_limit_headers(0, 1030))
+        headers = _limit_headers(4990, 4000)
+        headers['X-RateLimit-Resource'] = 'graphql'
+        failure = _make_response(502, **headers)
+        success = _make_response(**headers)
+        func = mock.Mock(side_effect=[failure, success])
+        with mock.patch('random.uniform', return_value=0.5):
+            result = scheduler.send(func, 'url', resource='graphql')
+        self.assertIs(result, success)
+        self.assertEqual(func.mock_calls, [mock.call('url')] * 2)
+        # Neither paced against nor counted in the REST budget, but
+        # still retried.
+        self.assertEqual(clock.sleeps, [0.5])
+        self.assertEqual(scheduler.remaining, 0)
+        self.assertEqual(scheduler.reset, 1030)
+
+    def test_send_pacing_capped_by_deadline(self):
+        import mock
+
+        scheduler, clock = self._make_one(deadline=5.0)
+        scheduler.update(_limit_headers(0, 1030))
+        func = mock.Mock(return_value=_make_response())
+        scheduler.send(func)
+        self.assertEqual(clock.sleeps, [5.0])
+
+    def test_send_rate_limited(self):
+        import mock
+
+        scheduler, clock = self._make_one()
+        limited = _make_response(403, **_limit_headers(0, 1020))
+        success = _make_response(**_limit_headers(4999, 4600))
+        func = mock.Mock(side_effect=[limited, success])
+        result = scheduler.send(func)
+        self.assertIs(result, success)
+        self.assertEqual(clock.sleeps, [20.0])
+
+    def test_send_secondary_rate_limit(self):
+        import mock
+
+        scheduler, clock = self._make_one()
+        limited = _make_response(429, Retry_After='7')
+        success = _make_response()
+        func = mock.Mock(side_effect=[limited, success])
+        self.assertIs(scheduler.send(func), success)
+        self.assertEqual(clock.sleeps, [7.0])
+
+    def test_send_rate_limited_past_deadline(self):
+        import mock
+
+        scheduler, clock = self._make_one()
+        limited = _make_response(403, **_limit_headers(0, 5000))
+        func = mock.Mock(return_value=limited)
+        self.assertIs(scheduler.send(func), limited)
+        func.assert_called_once_with()
+        self.assertEqual(clock.sleeps, [])
+
+    def test_send_forbidden(self):
+        import mock
+
+        forbidden = _make_response(403, **_limit_headers(4000, 5000))
+        forbidden_no_reset = _make_response(
+            403, X_RateLimit_Remaining='0')
+        for response in (forbidden, forbidden_no_reset):
+            scheduler, clock = self._make_one()
+            func = mock.Mock(return_value=response)
+            self.assertIs(scheduler.send(func), response)
+            func.assert_called_once_with()
+            self.assertEqual(clock.sleeps, [])
+
+    def test_send_server_error_backoff(self):
+        import mock
+
+        scheduler, clock = self._make_one(max_retries=2)
+        error = _make_response(503)
+        func = mock.Mock(return_value=error)
+        with mock.patch('random.uniform',
+                        side_effect=lambda low, high: high) as mocked:
+            self.assertIs(scheduler.send(func), error)
+        self.assertEqual(func.call_count, 3)
+        # The body of each retried response is read.
+        self.assertIsNone(error._content)
+        self.assertEqual(clock.sleeps, [1.0, 2.0])
+        mocked.assert_any_call(0, 1.0)
+        mocked.assert_any_call(0, 2.0)
+
+    def test_send_client_error(self):
+        import mock
+
+        scheduler, clock = self._make_one()
+        error = _make_response(404)
+        func = mock.Mock(return_value=error)
+        self.assertIs(scheduler.send(func), error)
+        func.assert_called_once_with()
+
+
+class TestAttempts(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._rate_limit import Attempts
+        return Attempts
+
+    def _make_one(self, resource='core', **kwargs):
+        from ci_diff_helper._rate_limit import Scheduler
+
+        clock = _FakeClock()
+        scheduler = Scheduler(clock=clock, sleep=clock.sleep, **kwargs)
+        return scheduler.attempts(resource=resource), scheduler
+
+    def test_constructor(self):
+        attempts, scheduler = self._make_one()
+        self.assertIsInstance(attempts, self._get_target_class())
+        self.assertIs(attempts.scheduler, scheduler)
+        self.assertTrue(attempts.core)
+        self.assertEqual(attempts.attempt, 0)
+        self.assertEqual(attempts.waited, 0.0)
+
+    def test_paced(self):
+        import mock
+
+        attempts, scheduler = self._make_one(deadline=5.0)
+        with mock.patch.object(scheduler, 'delay', return_value=8.0):
+            self.assertEqual(attempts.first_delay(), 5.0)
+        attempts.start()
+        self.assertIsNotNone(scheduler._last_sent)
+        # The deadline has been used up.
+        failure = _make_response(429, Retry_After='1')
+        self.assertIsNone(attempts.retry_delay(failure))
+
+    def test_retries(self):
+        attempts, _ = self._make_one(max_retries=1)
+        self.assertEqual(attempts.first_delay(), 0.0)
+        failure = _make_response(429, Retry_After='2')
+        self.assertEqual(attempts.retry_delay(failure), 2.0)
+        self.assertEqual(attempts.attempt, 1)
+        self.assertEqual(attempts.waited, 2.0)
+        self.assertIsNone(attempts.retry_delay(failure))
+        self.assertIsNone(attempts.retry_delay(_make_response(200)))
+
+    def test_other_resource(self):
+        import mock
+
+        attempts, scheduler = self._make_one(resource='graphql')
+        self.assertFalse(attempts.core)
+        with mock.patch.object(scheduler, 'delay') as delay:
+            self.assertEqual(attempts.first_delay(), 0.0)
+        delay.assert_not_called()
+        attempts.start()
+        self.assertIsNone(scheduler._last_sent)
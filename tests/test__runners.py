@@ -0,0 +1,455 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from tests import utils
+
+
+RAW_COMMIT = (
+    b'tree 9c1d5b2d41c8ad3a3d2e5d1fb6d1e0b8e94bbf46\n'
+    b'parent 47ebd0bb461180dcab674b3beca5ec9c11a1b976\n'
+    b'parent e8fd7135497b1027cba26ffab7851f1533ff08e3\n'
+    b'author Jane <jane@example.com> 1475953149 -0700\n'
+    b'committer Jane <jane@example.com> 1475953150 -0700\n'
+    b'gpgsig -----BEGIN PGP SIGNATURE-----\n'
+    b' \n'
+    b' abcd\n'
+    b' -----END PGP SIGNATURE-----\n'
+    b'\n'
+    b'\n'
+    b'Merge pull request #1234 \n'
+    b'from queso/cheese\n'
+    b'\n'
+    b'Body of the message.\n')
+
+
+class Test_parse_commit(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(raw_commit):
+        from ci_diff_helper._runners import parse_commit
+        return parse_commit(raw_commit)
+
+    def test_it(self):
+        headers, message = self._call_function_under_test(RAW_COMMIT)
+        self.assertEqual(
+            headers['parent'],
+            [b'47ebd0bb461180dcab674b3beca5ec9c11a1b976',
+             b'e8fd7135497b1027cba26ffab7851f1533ff08e3'])
+        self.assertEqual(
+            headers['tree'], [b'9c1d5b2d41c8ad3a3d2e5d1fb6d1e0b8e94bbf46'])
+        self.assertEqual(
+            headers['gpgsig'],
+            [b'-----BEGIN PGP SIGNATURE-----\n\nabcd\n'
+             b'-----END PGP SIGNATURE-----'])
+        self.assertEqual(
+            message,
+            b'\nMerge pull request #1234 \nfrom queso/cheese\n\n'
+            b'Body of the message.\n')
+
+
+class Test_commit_subject(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(message):
+        from ci_diff_helper._runners import commit_subject
+        return commit_subject(message)
+
+    def test_multiline_paragraph(self):
+        message = b'\nMerge pull request #1234 \nfrom queso/cheese\n\nBody\n'
+        result = self._call_function_under_test(message)
+        self.assertEqual(result, b'Merge pull request #1234 from queso/cheese')
+
+    def test_empty(self):
+        self.assertEqual(self._call_function_under_test(b''), b'')
+
+
+class TestSubprocessRunner(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._runners import SubprocessRunner
+        return SubprocessRunner
+
+    def _make_one(self):
+        return self._get_target_class()()
+
+    def test_check_output(self):
+        import mock
+
+        runner = self._make_one()
+        check_mock = mock.patch('subprocess.check_output',
+                                return_value=b' abc\n')
+        with check_mock as mocked:
+            result = runner.check_output(('foo', 'bar'))
+            mocked.assert_called_once_with(('foo', 'bar'))
+        self.assertEqual(result, u'abc')
+
+    def test_close(self):
+        runner = self._make_one()
+        self.assertIsNone(runner.close())
+
+
+class _FakeProc(object):
+
+    def __init__(self, output):
+        import io
+
+        self.stdin = io.BytesIO()
+        self.stdin.close = lambda: None
+        self.stdout = io.BytesIO(output)
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        self.returncode = 0
+        return self.returncode
+
+
+class TestGitBatchRunner(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._runners import GitBatchRunner
+        return GitBatchRunner
+
+    def _make_one(self):
+        return self._get_target_class()()
+
+    def _patch_popen(self, *outputs):
+        import mock
+
+        procs = [_FakeProc(output) for output in outputs]
+        return mock.patch('subprocess.Popen', side_effect=procs), procs
+
+    def test_rev_parse(self):
+        sha = 'fd5cffa5d437607159ceeda68895b9b53f23a531'
+        runner = self._make_one()
+        popen_patch, procs = self._patch_popen(
+            sha.encode('ascii') + b' commit 245\n')
+        with popen_patch as mocked:
+            result = runner.check_output(('git', 'rev-parse', 'HEAD'))
+            self.assertEqual(mocked.call_count, 1)
+        self.assertEqual(result, sha)
+        self.assertEqual(procs[0].stdin.getvalue(), b'HEAD\n')
+
+    def test_cat_file_type(self):
+        runner = self._make_one()
+        popen_patch, _ = self._patch_popen(b'abcd tree 12\n')
+        with popen_patch:
+            result = runner.check_output(('git', 'cat-file', '-t', 'abcd'))
+        self.assertEqual(result, 'tree')
+
+    def test_missing(self):
+        import subprocess
+
+        runner = self._make_one()
+        popen_patch, _ = self._patch_popen(
+            b'abcd missing\nabcd missing\n')
+        with popen_patch as mocked:
+            result = runner.check_output(
+                ('git', 'rev-parse', 'abcd'), ignore_err=True)
+            self.assertIsNone(result)
+            with self.assertRaises(subprocess.CalledProcessError):
+                runner.check_output(('git', 'cat-file', '-t', 'abcd'))
+            # Both queries re-use the same process.
+            self.assertEqual(mocked.call_count, 1)
+
+    def test_rev_parse_unknown_full_sha(self):
+        sha = 'FD5CFFA5D437607159CEEDA68895B9B53F23A531'
+        runner = self._make_one()
+        popen_patch, _ = self._patch_popen(
+            sha.encode('ascii') + b' missing\n')
+        with popen_patch:
+            result = runner.check_output(('git', 'rev-parse', sha))
+        # Matches ``git rev-parse``, which doesn't check the object.
+        self.assertEqual(result, sha.lower())
+
+    def _commit_output(self, sha):
+        header = sha + b' commit ' + str(len(RAW_COMMIT)).encode('ascii')
+        return header + b'\n' + RAW_COMMIT + b'\n'
+
+    def test_commit_info(self):
+        import mock
+        from ci_diff_helper import _runners
+
+        sha1 = b'8103a3b85aa5f3e2b14200bfef815539c1be109a'
+        sha2 = b'ce60976326725217c16fe84b5120c6a8661177a8'
+        runner = self._make_one()
+        popen_patch, procs = self._patch_popen(
+            self._commit_output(sha1) + self._commit_output(sha2) +
+            self._commit_output(sha1))
+        args = _runners.COMMIT_INFO_ARGS + ('HEAD', 'master', 'HEAD~1')
+        runner._shallow_commits = mock.Mock(return_value=frozenset())
+        with popen_patch as mocked:
+            result = runner.check_output(args)
+            self.assertEqual(mocked.call_count, 1)
+
+        record_tail = (
+            u'\n9c1d5b2d41c8ad3a3d2e5d1fb6d1e0b8e94bbf46\n'
+            u'47ebd0bb461180dcab674b3beca5ec9c11a1b976 '
+            u'e8fd7135497b1027cba26ffab7851f1533ff08e3\n'
+            u'1475953149\n1475953150\n'
+            u'Merge pull request #1234 from queso/cheese\0')
+        # NOTE: The repeated commit is only shown once.
+        expected = (sha1.decode('ascii') + record_tail +
+                    sha2.decode('ascii') + record_tail)
+        self.assertEqual(result, expected)
+        self.assertEqual(procs[0].stdin.getvalue(),
+                         b'HEAD^{commit}\nmaster^{commit}\nHEAD~1^{commit}\n')
+
+    def test_commit_info_missing(self):
+        from ci_diff_helper import _runners
+
+        runner = self._make_one()
+        popen_patch, _ = self._patch_popen(b'x missing\n')
+        with popen_patch:
+            self.assertIsNone(runner.check_output(
+                _runners.COMMIT_INFO_ARGS + ('x',), ignore_err=True))
+
+    def test_fallback(self):
+        import mock
+        from ci_diff_helper import _runners
+
+        runner = self._make_one()
+        commands = [
+            ('ls', '-l'),
+            ('git', 'diff', '--name-only', 'HEAD', 'master'),
+            ('git', 'rev-parse', '--show-toplevel'),
+            ('git', 'rev-parse', 'HEAD:has space'),
+            _runners.COMMIT_INFO_ARGS,
+            (),
+        ]
+        check_mock = mock.patch('subprocess.check_output',
+                                return_value=b'out\n')
+        popen_patch = mock.patch('subprocess.Popen')
+        with popen_patch as mocked_popen:
+            with check_mock as mocked:
+                for command in commands:
+                    self.assertEqual(runner.check_output(command), 'out')
+                self.assertEqual(mocked.call_count, len(commands))
+            mocked_popen.assert_not_called()
+
+    def test_restart_on_cwd_change(self):
+        import mock
+
+        runner = self._make_one()
+        popen_patch, procs = self._patch_popen(
+            b'abcd tree 12\n', b'abcd blob 12\n')
+        getcwd_patch = mock.patch('os.getcwd', side_effect=['/a', '/b'])
+        with getcwd_patch:
+            with popen_patch:
+                self.assertEqual(
+                    runner.check_output(('git', 'cat-file', '-t', 'abcd')),
+                    'tree')
+                self.assertEqual(
+                    runner.check_output(('git', 'cat-file', '-t', 'abcd')),
+                    'blob')
+        # The first process was shut down.
+        self.assertEqual(procs[0].returncode, 0)
+        self.assertIsNone(procs[1].returncode)
+        runner.close()
+        self.assertEqual(procs[1].returncode, 0)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_matches_subprocess(self):
+        from ci_diff_helper._runners import SubprocessRunner
+
+        runner = self._make_one()
+        expected_runner = SubprocessRunner()
+        from ci_diff_helper import _runners
+
+        commands = [
+            ('git', 'rev-parse', 'HEAD'),
+            ('git', 'rev-parse', 'F' * 40),
+            ('git', 'cat-file', '-t', 'HEAD'),
+            _runners.COMMIT_INFO_ARGS + ('HEAD', 'HEAD~0', 'HEAD'),
+        ]
+        try:
+            for command in commands:
+                self.assertEqual(
+                    runner.check_output(command),
+                    expected_runner.check_output(command))
+            self.assertIsNone(runner.check_output(
+                ('git', 'rev-parse', 'not-a-ref-at-all'), ignore_err=True))
+        finally:
+            runner.close()
+
+    def test__shallow_commits(self):
+        import os
+        import shutil
+        import tempfile
+        import mock
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'shallow')
+        with open(path, 'w') as file_obj:
+            file_obj.write('abc\ndef\n')
+
+        runner = self._make_one()
+        check_patch = mock.patch(
+            'ci_diff_helper._runners.SubprocessRunner.check_output',
+            side_effect=[path, path + '-missing', None])
+        with check_patch as mocked:
+            self.assertEqual(
+                runner._shallow_commits(), frozenset(['abc', 'def']))
+            # The result is cached until the runner is closed.
+            self.assertEqual(
+                runner._shallow_commits(), frozenset(['abc', 'def']))
+            runner.close()
+            self.assertEqual(runner._shallow_commits(), frozenset())
+            runner.close()
+            self.assertEqual(runner._shallow_commits(), frozenset())
+        self.assertEqual(mocked.call_count, 3)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_shallow_merge_commit(self):
+        import os
+        import shutil
+        import tempfile
+        from ci_diff_helper import _runners
+
+        clone_dir = os.path.join(
+            os.path.realpath(tempfile.mkdtemp()), 'clone')
+        runners = (self._make_one(), _runners.PythonGitRunner())
+        args = _runners.COMMIT_INFO_ARGS + ('HEAD',)
+        try:
+            with utils.TempRepo() as temp_repo:
+                temp_repo.commit('Initial.', a='a')
+                temp_repo.git('checkout', '--quiet', '-b', 'feature')
+                temp_repo.commit('Feature.', b='b')
+                temp_repo.git('checkout', '--quiet', 'master')
+                temp_repo.commit('Master.', c='c')
+                temp_repo.git('merge', '--quiet', '--no-edit', 'feature')
+                temp_repo.git('clone', '--quiet', '--depth=1',
+                              'file://' + temp_repo.path, clone_dir)
+            with utils.TempRepo.chdir(clone_dir):
+                expected = _runners.SubprocessRunner.check_output(args)
+                results = [runner.check_output(args) for runner in runners]
+                for runner in runners:
+                    runner.close()
+        finally:
+            shutil.rmtree(os.path.dirname(clone_dir))
+        self.assertEqual(results, [expected, expected])
+        # The (merge) boundary commit has no parents.
+        self.assertEqual(expected.split('\n')[2], '')
+
+
+class TestPythonGitRunner(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._runners import PythonGitRunner
+        return PythonGitRunner
+
+    def _make_one(self):
+        return self._get_target_class()()
+
+    def test_fallback_not_implemented(self):
+        import mock
+
+        runner = self._make_one()
+        discover_patch = mock.patch(
+            'ci_diff_helper._git_objects.Repository.discover',
+            side_effect=NotImplementedError)
+        check_mock = mock.patch('subprocess.check_output',
+                                return_value=b'out\n')
+        commands = [
+            ('git', 'rev-parse', 'HEAD'),
+            ('git', 'rev-parse', '--show-toplevel'),
+        ]
+        with discover_patch:
+            with check_mock as mocked:
+                for command in commands:
+                    self.assertEqual(runner.check_output(command), 'out')
+                self.assertEqual(mocked.call_count, len(commands))
+
+    def test_show_toplevel_bare(self):
+        import os
+
+        import mock
+
+        runner = self._make_one()
+        repo = mock.Mock(work_tree=None, spec=['work_tree'])
+        runner._repos[os.getcwd()] = repo
+        check_mock = mock.patch('subprocess.check_output',
+                                return_value=b'out\n')
+        with check_mock as mocked:
+            result = runner.check_output(
+                ('git', 'rev-parse', '--show-toplevel'))
+            mocked.assert_called_once_with(
+                ('git', 'rev-parse', '--show-toplevel'))
+        self.assertEqual(result, 'out')
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_matches_subprocess(self):
+        from ci_diff_helper import _runners
+
+        runner = self._make_one()
+        expected_runner = _runners.SubprocessRunner()
+        with utils.TempRepo() as temp_repo:
+            temp_repo.commit('Initial.', a='a')
+            temp_repo.commit('Second.\n\nBody.', b='b')
+            temp_repo.git('gc', '--quiet')
+            temp_repo.commit('Third.', c='c')
+            commands = [
+                ('git', 'rev-parse', 'HEAD'),
+                ('git', 'rev-parse', 'HEAD~2'),
+                ('git', 'rev-parse', 'f' * 40),
+                ('git', 'rev-parse', '--show-toplevel'),
+                ('git', 'cat-file', '-t', 'HEAD^{tree}'),
+                _runners.COMMIT_INFO_ARGS + ('HEAD', 'HEAD~1', 'HEAD~2'),
+            ]
+            try:
+                for command in commands:
+                    self.assertEqual(
+                        runner.check_output(command),
+                        expected_runner.check_output(command))
+                self.assertIsNone(runner.check_output(
+                    ('git', 'rev-parse', 'HEAD~3'), ignore_err=True))
+            finally:
+                runner.close()
+        self.assertEqual(runner._repos, {})
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_shallow_commit(self):
+        import os
+        import shutil
+        import tempfile
+        from ci_diff_helper import _runners
+
+        clone_dir = os.path.join(
+            os.path.realpath(tempfile.mkdtemp()), 'clone')
+        runner = self._make_one()
+        try:
+            with utils.TempRepo() as temp_repo:
+                temp_repo.commit('Initial.', a='a')
+                sha = temp_repo.commit('Second.', b='b')
+                temp_repo.git('clone', '--quiet', '--depth=1',
+                              'file://' + temp_repo.path, clone_dir)
+            with utils.TempRepo.chdir(clone_dir):
+                result = runner.check_output(
+                    _runners.COMMIT_INFO_ARGS + ('HEAD',))
+                expected = _runners.SubprocessRunner.check_output(
+                    _runners.COMMIT_INFO_ARGS + ('HEAD',))
+                runner.close()
+        finally:
+            shutil.rmtree(os.path.dirname(clone_dir))
+        self.assertEqual(result, expected)
+        # The shallow boundary commit has no parents.
+        sha_line, _, parents_line = result.split('\n')[:3]
+        self.assertEqual(sha_line, sha)
+        self.assertEqual(parents_line, '')
@@ -75,6 +75,82 @@ class Test_check_output(unittest.TestCase):
             self._call_function_under_test(huh='bad-kw')
 
 
+class Test_iter_output(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args, **kwargs):
+        from ci_diff_helper._utils import iter_output
+        return iter_output(*args, **kwargs)
+
+    @staticmethod
+    def _make_proc(chunks, return_code=0):
+        import mock
+
+        proc = mock.Mock(spec=['stdout', 'poll', 'kill', 'wait'])
+        proc.stdout.read1.side_effect = list(chunks) + [b'']
+        proc.wait.return_value = return_code
+        return proc
+
+    def _helper(self, chunks, return_code=0, **kwargs):
+        import mock
+
+        proc = self._make_proc(chunks, return_code=return_code)
+        popen_patch = mock.patch('subprocess.Popen', return_value=proc)
+        with popen_patch as mocked:
+            result = self._call_function_under_test('foo', **kwargs)
+            # Nothing is run until the generator is consumed.
+            mocked.assert_not_called()
+            try:
+                return list(result), proc
+            finally:
+                mocked.assert_called_once_with(
+                    ('foo',), stdout=mock.ANY)
+
+    def test_records_split_across_chunks(self):
+        chunks = [b'a.py\0b/c', b'.py\0', b'd\xc3\xa9.txt\0e']
+        result, proc = self._helper(chunks)
+        self.assertEqual(result, [u'a.py', u'b/c.py', u'd\xe9.txt', u'e'])
+        proc.kill.assert_not_called()
+        proc.stdout.close.assert_called_once_with()
+
+    def test_delimiter(self):
+        result, _ = self._helper([b'a\nb\n'], delimiter=b'\n')
+        self.assertEqual(result, [u'a', u'b'])
+
+    def test_empty(self):
+        result, _ = self._helper([])
+        self.assertEqual(result, [])
+
+    def test_failure(self):
+        import subprocess
+
+        with self.assertRaises(subprocess.CalledProcessError):
+            self._helper([b'a\0'], return_code=128)
+
+    def test_closed_early(self):
+        import mock
+
+        proc = self._make_proc([b'a\0b\0'])
+        with mock.patch('subprocess.Popen', return_value=proc):
+            result = self._call_function_under_test('foo')
+            self.assertEqual(next(result), u'a')
+            result.close()
+
+        proc.kill.assert_called_once_with()
+        proc.wait.assert_called_once_with()
+
+    def test_bad_keywords(self):
+        with self.assertRaises(TypeError):
+            list(self._call_function_under_test('foo', huh='bad-kw'))
+
+    def test_actual_call(self):
+        import sys
+
+        result = self._call_function_under_test(
+            sys.executable, '-c', 'import sys; sys.stdout.write("x\\0y\\0")')
+        self.assertEqual(list(result), [u'x', u'y'])
+
+
 class Test_pr_from_commit(unittest.TestCase):
 
     @staticmethod
@@ -102,3 +178,166 @@ class Test_pr_from_commit(unittest.TestCase):
         subject = 'Merge pull request #{:d} from queso/cheese'.format(expected)
         result = self._call_function_under_test(subject)
         self.assertEqual(result, expected)
+
+
+class Test_atomic_write(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(path, contents):
+        from ci_diff_helper._utils import atomic_write
+        return atomic_write(path, contents)
+
+    def test_it(self):
+        import os
+        import shutil
+        import tempfile
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'entry')
+        self._call_function_under_test(path, b'one')
+        self._call_function_under_test(path, b'two')
+        with open(path, 'rb') as file_obj:
+            self.assertEqual(file_obj.read(), b'two')
+        self.assertEqual(os.listdir(directory), ['entry'])
+
+
+class Test_locked(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(file_desc):
+        from ci_diff_helper._utils import locked
+        return locked(file_desc)
+
+    def test_it(self):
+        import mock
+
+        fcntl = mock.Mock(spec=['flock', 'LOCK_EX', 'LOCK_UN'])
+        with mock.patch('ci_diff_helper._utils.fcntl', new=fcntl):
+            with self._call_function_under_test(7):
+                fcntl.flock.assert_called_once_with(7, fcntl.LOCK_EX)
+        fcntl.flock.assert_called_with(7, fcntl.LOCK_UN)
+
+    def test_released_on_error(self):
+        import mock
+
+        fcntl = mock.Mock(spec=['flock', 'LOCK_EX', 'LOCK_UN'])
+        with mock.patch('ci_diff_helper._utils.fcntl', new=fcntl):
+            with self.assertRaises(KeyError):
+                with self._call_function_under_test(7):
+                    raise KeyError('nope')
+        fcntl.flock.assert_called_with(7, fcntl.LOCK_UN)
+
+
+class Test_try_lock(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(file_desc):
+        from ci_diff_helper._utils import try_lock
+        return try_lock(file_desc)
+
+    def _helper(self, **kwargs):
+        import mock
+
+        fcntl = mock.Mock(
+            spec=['flock', 'LOCK_EX', 'LOCK_NB'], LOCK_EX=2, LOCK_NB=4,
+            **kwargs)
+        with mock.patch('ci_diff_helper._utils.fcntl', new=fcntl):
+            result = self._call_function_under_test(7)
+        fcntl.flock.assert_called_once_with(7, 6)
+        return result
+
+    def test_free(self):
+        self.assertTrue(self._helper())
+
+    def test_held(self):
+        self.assertFalse(self._helper(**{'flock.side_effect': IOError}))
+
+
+class Test_get_runner(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper._utils import get_runner
+        return get_runner()
+
+    def _helper(self, env_value=None):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        mock_env = {}
+        if env_value is not None:
+            mock_env[env.GIT_BACKEND] = env_value
+        with mock.patch('os.environ', new=mock_env):
+            with mock.patch('ci_diff_helper._utils._RUNNER', new=None):
+                runner = self._call_function_under_test()
+                # Make sure the runner is cached.
+                self.assertIs(self._call_function_under_test(), runner)
+                return runner
+
+    def test_default(self):
+        from ci_diff_helper import _runners
+
+        runner = self._helper()
+        self.assertIsInstance(runner, _runners.SubprocessRunner)
+        self.assertNotIsInstance(runner, _runners.GitBatchRunner)
+
+    def test_batch(self):
+        from ci_diff_helper import _runners
+
+        runner = self._helper('Batch')
+        self.assertIsInstance(runner, _runners.GitBatchRunner)
+
+    def test_python(self):
+        from ci_diff_helper import _runners
+
+        runner = self._helper('python')
+        self.assertIsInstance(runner, _runners.PythonGitRunner)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self._helper('carrier-pigeon')
+
+
+class Test_set_runner(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(runner):
+        from ci_diff_helper._utils import set_runner
+        return set_runner(runner)
+
+    def test_it(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        runner = mock.Mock(spec=['check_output', 'close'])
+        with mock.patch('ci_diff_helper._utils._RUNNER',
+                        new=mock.sentinel.previous):
+            previous = self._call_function_under_test(runner)
+            self.assertIs(previous, mock.sentinel.previous)
+            result = _utils.check_output('git', 'status', ignore_err=True)
+            self.assertIs(result, runner.check_output.return_value)
+            runner.check_output.assert_called_once_with(
+                ('git', 'status'), ignore_err=True)
+
+
+class Test__close_runner(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper._utils import _close_runner
+        return _close_runner()
+
+    def test_unset(self):
+        import mock
+
+        with mock.patch('ci_diff_helper._utils._RUNNER', new=None):
+            self._call_function_under_test()
+
+    def test_set(self):
+        import mock
+
+        runner = mock.Mock(spec=['check_output', 'close'])
+        with mock.patch('ci_diff_helper._utils._RUNNER', new=runner):
+            self._call_function_under_test()
+        runner.close.assert_called_once_with()
@@ -0,0 +1,1035 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# NOTE: ``ci_diff_helper.aio`` uses ``async`` / ``await`` syntax, so it
+#       is only imported inside the tests (which are skipped on older
+#       versions of Python) and no coroutines are defined here.
+
+import sys
+import unittest
+
+from tests import fake_github
+from tests import utils
+
+
+_PY35 = sys.version_info >= (3, 5)
+_SKIP_MSG = 'Requires Python 3.5 or later'
+
+
+def _run_all(*make_coros):
+    import asyncio
+    from ci_diff_helper import aio
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return [loop.run_until_complete(make_coro())
+                for make_coro in make_coros]
+    finally:
+        # Close pooled connections while their loop is still open.
+        aio.get_transport().close()
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+def _run(make_coro):
+    return _run_all(make_coro)[0]
+
+
+def _done(value):
+    import asyncio
+
+    future = asyncio.Future()
+    future.set_result(value)
+    return future
+
+
+def _mock_stderr():
+    import mock
+
+    return mock.patch('sys.stderr')
+
+
+def _make_reader(data):
+    import asyncio
+
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def _make_response(status_code, **headers):
+    import requests
+
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    return response
+
+
+def _serve_once(reply):
+    """Accept one connection, read a request head and send ``reply``."""
+    import socket
+    import threading
+
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    received = []
+
+    def serve():
+        conn, _ = listener.accept()
+        with conn:
+            data = b''
+            while b'\r\n\r\n' not in data:
+                data += conn.recv(1024)
+            received.append(data)
+            conn.sendall(reply)
+        listener.close()
+
+    thread = threading.Thread(target=serve)
+    thread.daemon = True
+    thread.start()
+    return listener.getsockname(), received, thread
+
+
+class _FakeGitHub(fake_github.FakeGitHub):
+    """Also point the non-blocking transport at the fake server."""
+
+    _previous_transport = None
+
+    def __enter__(self):
+        import asyncio
+        import mock
+        from ci_diff_helper import aio
+
+        result = super(_FakeGitHub, self).__enter__()
+        address = self._server.server_address
+        transport = aio.Transport(trust_env=False)
+        transport._connect = mock.Mock(
+            side_effect=lambda *args: asyncio.open_connection(*address))
+        self._previous_transport = aio.set_transport(transport)
+        return result
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        from ci_diff_helper import aio
+
+        aio.set_transport(self._previous_transport)
+        return super(_FakeGitHub, self).__exit__(
+            exc_type, exc_value, traceback)
+
+
+@unittest.skipUnless(_PY35, _SKIP_MSG)
+class Test_async_check_output(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args, **kwargs):
+        from ci_diff_helper import aio
+        return _run(lambda: aio.async_check_output(*args, **kwargs))
+
+    def test_success(self):
+        result = self._call_function_under_test(
+            sys.executable, '-c', 'print(" abc ")')
+        self.assertEqual(result, 'abc')
+
+    def test_failure(self):
+        import subprocess
+
+        args = (sys.executable, '-c', 'import sys; sys.exit(3)')
+        with self.assertRaises(subprocess.CalledProcessError) as exc_info:
+            self._call_function_under_test(*args)
+        self.assertEqual(exc_info.exception.returncode, 3)
+        self.assertEqual(exc_info.exception.cmd, args)
+
+    def test_failure_ignore_err(self):
+        result = self._call_function_under_test(
+            sys.executable, '-c',
+            'import sys; sys.stderr.write("bad"); sys.exit(1)',
+            ignore_err=True)
+        self.assertIsNone(result)
+
+
+@unittest.skipUnless(_PY35 and utils.HAS_GIT, 'Requires Python 3.5 and git')
+class Test_git_functions(unittest.TestCase):
+
+    def test_async_git_root(self):
+        from ci_diff_helper import aio
+
+        with utils.TempRepo() as repo:
+            result = _run(aio.async_git_root)
+        self.assertEqual(result, repo.path)
+
+    def test_async_get_checked_in_files(self):
+        import os
+        from ci_diff_helper import aio
+
+        with utils.TempRepo() as repo:
+            repo.commit('Initial', **{'a.py': '', 'docs/b.rst': ''})
+            every_file = _run(aio.async_get_checked_in_files)
+            python_files = _run(lambda: aio.async_get_checked_in_files(
+                globs=['**/*.py']))
+        self.assertEqual(every_file, [
+            os.path.join(repo.path, 'a.py'),
+            os.path.join(repo.path, 'docs', 'b.rst'),
+        ])
+        self.assertEqual(python_files, [os.path.join(repo.path, 'a.py')])
+
+    def test_async_get_checked_in_files_empty(self):
+        from ci_diff_helper import aio
+
+        with utils.TempRepo():
+            result = _run(aio.async_get_checked_in_files)
+        self.assertEqual(result, [])
+
+    def test_async_get_changed_files(self):
+        from ci_diff_helper import aio
+        from ci_diff_helper import git_tools
+
+        with utils.TempRepo() as repo:
+            repo.commit('Initial', **{'a.py': 'a', 'b.rst': 'b'})
+            repo.commit('Change', **{'a.py': 'A', 'c.py': 'c'})
+            changed = _run(lambda: aio.async_get_changed_files(
+                'HEAD', 'HEAD~1'))
+            added = _run(lambda: aio.async_get_changed_files(
+                'HEAD~1', 'HEAD', globs=['**/*.py'],
+                statuses=[git_tools.FileStatus.added]))
+            unchanged = _run(lambda: aio.async_get_changed_files(
+                'HEAD', 'HEAD'))
+        self.assertEqual(changed, ['a.py', 'c.py'])
+        self.assertEqual(added, ['c.py'])
+        self.assertEqual(unchanged, [])
+
+    def test_async_get_changed_files_no_statuses(self):
+        import mock
+        from ci_diff_helper import aio
+
+        check_mock = mock.Mock()
+        with mock.patch('ci_diff_helper.aio.async_check_output',
+                        new=check_mock):
+            result = _run(lambda: aio.async_get_changed_files(
+                'HEAD', 'HEAD~1', statuses=()))
+        self.assertEqual(result, [])
+        check_mock.assert_not_called()
+
+    def test_concurrent(self):
+        import asyncio
+        import os
+        from ci_diff_helper import aio
+
+        with utils.TempRepo() as repo:
+            repo.commit('Initial', **{'a.py': 'a'})
+            repo.commit('Change', **{'b.py': 'b'})
+            result = _run(lambda: asyncio.gather(
+                aio.async_git_root(),
+                aio.async_get_changed_files('HEAD', 'HEAD~1'),
+                aio.async_get_checked_in_files(globs=['b.*'])))
+        self.assertEqual(result, [
+            repo.path, ['b.py'], [os.path.join(repo.path, 'b.py')]])
+
+
+@unittest.skipUnless(_PY35, _SKIP_MSG)
+class TestTransport(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import aio
+        return aio.Transport
+
+    def _make_one(self, *args, **kwargs):
+        return self._get_target_class()(*args, **kwargs)
+
+    def test_constructor(self):
+        transport = self._make_one(max_idle=2)
+        self.assertEqual(transport.max_idle, 2)
+        self.assertTrue(transport.trust_env)
+        self.assertEqual(transport._idle, {})
+
+    def test__get_proxy(self):
+        import mock
+
+        transport = self._make_one()
+        environ = {'HTTPS_PROXY': 'p:3128', 'NO_PROXY': 'direct.test'}
+        with mock.patch.dict('os.environ', environ, clear=True):
+            self.assertEqual(
+                transport._get_proxy('https://h/'), 'http://p:3128')
+            self.assertIsNone(transport._get_proxy('http://h/'))
+            self.assertIsNone(transport._get_proxy('https://direct.test/'))
+            transport.trust_env = False
+            self.assertIsNone(transport._get_proxy('https://h/'))
+
+    def test__open_tunnel(self):
+        import socket
+
+        (host, port), received, thread = _serve_once(
+            b'HTTP/1.1 200 Connection established\r\n\r\n')
+        proxy = 'http://u:p@{}:{}'.format(host, port)
+        sock = _run(lambda: self._get_target_class()._open_tunnel(
+            proxy, 'h', 443))
+        sock.close()
+        thread.join()
+        self.assertIsInstance(sock, socket.socket)
+        self.assertEqual(received, [
+            b'CONNECT h:443 HTTP/1.1\r\nHost: h:443\r\n'
+            b'Proxy-Authorization: Basic dTpw\r\n\r\n'])
+
+    def test__open_tunnel_refused(self):
+        import requests
+
+        (host, port), _, thread = _serve_once(
+            b'HTTP/1.1 407 Proxy Authentication Required\r\n\r\n')
+        proxy = 'http://{}:{}'.format(host, port)
+        with self.assertRaises(requests.exceptions.ProxyError):
+            _run(lambda: self._get_target_class()._open_tunnel(
+                proxy, 'h', 443))
+        thread.join()
+
+    def test__get_ssl_context(self):
+        import ssl
+
+        transport = self._make_one()
+        context = transport._get_ssl_context()
+        self.assertIsInstance(context, ssl.SSLContext)
+        self.assertIs(transport._get_ssl_context(), context)
+
+    def test__connect(self):
+        import mock
+
+        transport = self._make_one()
+        open_mock = mock.Mock(
+            side_effect=lambda *args, **kwargs: _done(mock.sentinel.conn))
+        with mock.patch('asyncio.open_connection', new=open_mock):
+            plain, secure = _run_all(
+                lambda: transport._connect('http', 'h', 80),
+                lambda: transport._connect('https', 'h', 443))
+        self.assertIs(plain, mock.sentinel.conn)
+        self.assertIs(secure, mock.sentinel.conn)
+        self.assertEqual(open_mock.mock_calls, [
+            mock.call('h', 80, ssl=None),
+            mock.call('h', 443, ssl=transport._ssl_context),
+        ])
+
+    def test__connect_proxy(self):
+        import mock
+
+        transport = self._make_one()
+        transport._open_tunnel = mock.Mock(
+            side_effect=lambda *args: _done(mock.sentinel.sock))
+        open_mock = mock.Mock(
+            side_effect=lambda *args, **kwargs: _done(mock.sentinel.conn))
+        proxy = 'http://p:3128'
+        with mock.patch('asyncio.open_connection', new=open_mock):
+            plain, secure = _run_all(
+                lambda: transport._connect('http', 'h', 80, proxy),
+                lambda: transport._connect('https', 'h', 443, proxy))
+        self.assertIs(plain, mock.sentinel.conn)
+        self.assertIs(secure, mock.sentinel.conn)
+        transport._open_tunnel.assert_called_once_with(proxy, 'h', 443)
+        self.assertEqual(open_mock.mock_calls, [
+            mock.call('p', 3128),
+            mock.call(sock=mock.sentinel.sock, ssl=transport._ssl_context,
+                      server_hostname='h'),
+        ])
+
+    def test__connect_https_proxy(self):
+        transport = self._make_one()
+        with self.assertRaises(NotImplementedError):
+            _run(lambda: transport._connect(
+                'https', 'h', 443, 'https://p:3128'))
+
+    def test__acquire_skips_closed(self):
+        import mock
+
+        transport = self._make_one()
+        key = ('http', 'h', 80)
+        closed = mock.Mock(spec=['at_eof'], **{'at_eof.return_value': True})
+        writer = mock.Mock(spec=['close'])
+        transport._idle[key] = [(closed, writer)]
+        transport._loop = mock.sentinel.loop
+        transport._connect = mock.Mock(
+            side_effect=lambda *args: _done(mock.sentinel.conn))
+        with mock.patch('asyncio.get_event_loop',
+                        return_value=mock.sentinel.loop):
+            result = _run(lambda: transport._acquire(key))
+        self.assertIs(result, mock.sentinel.conn)
+        writer.close.assert_called_once_with()
+        transport._connect.assert_called_once_with(*key)
+
+    def test__acquire_new_loop(self):
+        import mock
+
+        transport = self._make_one()
+        key = ('http', 'h', 80)
+        transport._idle[key] = [(mock.sentinel.reader, mock.sentinel.writer)]
+        transport._connect = mock.Mock(
+            side_effect=lambda *args: _done(mock.sentinel.conn))
+        result = _run(lambda: transport._acquire(key))
+        self.assertIs(result, mock.sentinel.conn)
+        self.assertEqual(transport._idle, {})
+        self.assertIsNotNone(transport._loop)
+
+    def test__release(self):
+        import mock
+
+        transport = self._make_one(max_idle=1)
+        key = ('http', 'h', 80)
+        first = (mock.sentinel.reader, mock.Mock(spec=['close']))
+        second = (mock.sentinel.reader, mock.Mock(spec=['close']))
+        transport._release(key, first)
+        transport._release(key, second)
+        self.assertEqual(transport._idle, {key: [first]})
+        second[1].close.assert_called_once_with()
+
+    def test__read_head(self):
+        data = b'HTTP/1.1 404 Not Found\r\nA: 1\r\nb-c: x: y\r\n\r\n'
+        status, reason, headers = _run(
+            lambda: self._get_target_class()._read_head(_make_reader(data)))
+        self.assertEqual(status, 404)
+        self.assertEqual(reason, 'Not Found')
+        self.assertEqual(dict(headers), {'A': '1', 'b-c': 'x: y'})
+        self.assertEqual(headers['B-C'], 'x: y')
+
+    def test__read_head_closed(self):
+        with self.assertRaises(ConnectionError):
+            _run(lambda: self._get_target_class()._read_head(
+                _make_reader(b'')))
+
+    def test__read_body_content_length(self):
+        result = _run(lambda: self._get_target_class()._read_body(
+            _make_reader(b'abcdef'), {'Content-Length': '4'}, 200))
+        self.assertEqual(result, (b'abcd', True))
+
+    def test__read_body_chunked(self):
+        data = b'3\r\nabc\r\n2;ext=1\r\nde\r\n0\r\nTrailer: 1\r\n\r\n'
+        headers = {'Transfer-Encoding': 'Chunked', 'Connection': 'close'}
+        result = _run(lambda: self._get_target_class()._read_body(
+            _make_reader(data), headers, 200))
+        self.assertEqual(result, (b'abcde', False))
+
+    def test__read_body_without_body(self):
+        import asyncio
+
+        klass = self._get_target_class()
+        # Nothing is fed to the readers, so reading them would hang.
+        results = _run_all(*[
+            lambda status=status: klass._read_body(
+                asyncio.StreamReader(), {}, status)
+            for status in (100, 204, 304)])
+        results.append(_run(lambda: klass._read_body(
+            asyncio.StreamReader(), {'Connection': 'close'}, 200,
+            method='HEAD')))
+        self.assertEqual(results, [(b'', True)] * 3 + [(b'', False)])
+
+    def test__read_body_until_close(self):
+        result = _run(lambda: self._get_target_class()._read_body(
+            _make_reader(b'everything'), {}, 200))
+        self.assertEqual(result, (b'everything', False))
+
+    def test_get(self):
+        with _FakeGitHub() as server:
+            from ci_diff_helper import aio
+
+            transport = aio.get_transport()
+            url = fake_github.PUBLIC_URL + '/repos/a/b/pulls/1'
+            responses = _run(lambda: transport.get(url, headers={'X': 'y'}))
+        self.assertEqual(responses.status_code, 404)
+        self.assertEqual(responses.reason, 'Not Found')
+        self.assertEqual(responses.url, url)
+        self.assertEqual(responses.json(), {'message': 'Not Found'})
+        self.assertEqual(server.requests, ['/repos/a/b/pulls/1'])
+        self.assertEqual(transport._idle, {})
+
+    def test_get_failure_closes(self):
+        import mock
+
+        transport = self._make_one(trust_env=False)
+        writer = mock.Mock(spec=['write', 'close'])
+        transport._connect = mock.Mock(
+            side_effect=lambda *args: _done((_make_reader(b''), writer)))
+        with self.assertRaises(ConnectionError):
+            _run(lambda: transport.get('http://h/'))
+        # The request is retried once on a new connection.
+        request = (
+            b'GET / HTTP/1.1\r\nAccept-Encoding: identity\r\n'
+            b'Host: h\r\nUser-Agent: ci-diff-helper\r\n\r\n')
+        self.assertEqual(
+            writer.write.mock_calls, [mock.call(request)] * 2)
+        self.assertEqual(writer.close.mock_calls, [mock.call()] * 2)
+        self.assertEqual(transport._connect.call_count, 2)
+        self.assertEqual(transport._idle, {})
+
+    def test_get_retries_reset(self):
+        import mock
+
+        transport = self._make_one(trust_env=False)
+        writer = mock.Mock(spec=['write', 'close'])
+        datas = [
+            b'HTTP/1.1 200 OK\r\nContent-Length: 4\r\n\r\n',
+            b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}',
+        ]
+        transport._connect = mock.Mock(side_effect=lambda *args: _done(
+            (_make_reader(datas.pop(0)), writer)))
+        response = _run(lambda: transport.get('http://h/'))
+        self.assertEqual(response.content, b'{}')
+        self.assertEqual(writer.write.call_count, 2)
+        self.assertEqual(transport._connect.call_count, 2)
+
+    def test_get_through_proxy(self):
+        import mock
+
+        transport = self._make_one()
+        proxy = 'http://u:p@p:3128'
+        transport._get_proxy = mock.Mock(return_value=proxy)
+        data = b'HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n{}'
+        writer = mock.Mock(spec=['write', 'close'])
+        transport._connect = mock.Mock(
+            side_effect=lambda *args: _done((_make_reader(data), writer)))
+        response = _run(lambda: transport.get('http://h/p?q=1#f'))
+        self.assertEqual(response.content, b'{}')
+        transport._connect.assert_called_once_with('http', 'h', 80, proxy)
+        writer.write.assert_called_once_with(
+            b'GET http://h/p?q=1 HTTP/1.1\r\nAccept-Encoding: identity\r\n'
+            b'Host: h\r\nProxy-Authorization: Basic dTpw\r\n'
+            b'User-Agent: ci-diff-helper\r\n\r\n')
+
+    def test_get_redirect(self):
+        import mock
+
+        transport = self._make_one()
+        moved = _make_response(301, Location='/new')
+        final = _make_response(200)
+        responses = [moved, final]
+        transport._request = mock.Mock(
+            side_effect=lambda *args: _done(responses.pop(0)))
+        headers = {'Authorization': 'token t'}
+        response = _run(lambda: transport.get('https://h/old', headers))
+        self.assertIs(response, final)
+        self.assertEqual(response.history, [moved])
+        self.assertEqual(transport._request.mock_calls, [
+            mock.call('https://h/old', headers),
+            mock.call('https://h/new', headers),
+        ])
+
+    def test_get_redirect_other_host(self):
+        import mock
+
+        transport = self._make_one()
+        moved = _make_response(307, Location='https://other/new')
+        responses = [moved, _make_response(200)]
+        transport._request = mock.Mock(
+            side_effect=lambda *args: _done(responses.pop(0)))
+        headers = {'authorization': 'token t', 'X': 'y'}
+        _run(lambda: transport.get('https://h/old', headers))
+        self.assertEqual(transport._request.mock_calls, [
+            mock.call('https://h/old', headers),
+            mock.call('https://other/new', {'X': 'y'}),
+        ])
+
+    def test_get_too_many_redirects(self):
+        import mock
+        import requests
+
+        transport = self._make_one()
+        transport._request = mock.Mock(side_effect=lambda *args: _done(
+            _make_response(302, Location='/loop')))
+        with self.assertRaises(requests.exceptions.TooManyRedirects):
+            _run(lambda: transport.get('https://h/loop'))
+        self.assertEqual(transport._request.call_count, 31)
+
+    def test_get_connection_close(self):
+        import mock
+
+        transport = self._make_one(trust_env=False)
+        data = b'HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n{}'
+        writer = mock.Mock(spec=['write', 'close'])
+        transport._connect = mock.Mock(
+            side_effect=lambda *args: _done((_make_reader(data), writer)))
+        response = _run(lambda: transport.get('https://h:8443/p?q=1'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'{}')
+        self.assertEqual(response.history, [])
+        transport._connect.assert_called_once_with(
+            'https', 'h', 8443, None)
+        writer.write.assert_called_once_with(mock.ANY)
+        self.assertTrue(writer.write.call_args[0][0].startswith(
+            b'GET /p?q=1 HTTP/1.1\r\n'))
+        writer.close.assert_called_once_with()
+        self.assertEqual(transport._idle, {})
+
+
+@unittest.skipUnless(_PY35, _SKIP_MSG)
+class Test__proxy_headers(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(proxy):
+        from ci_diff_helper import aio
+
+        return aio._proxy_headers(proxy)
+
+    def test_no_credentials(self):
+        self.assertEqual(self._call_function_under_test('http://p:1'), {})
+
+    def test_credentials(self):
+        result = self._call_function_under_test('http://us%40r:pw@p:1')
+        self.assertEqual(
+            result, {'Proxy-Authorization': 'Basic dXNAcjpwdw=='})
+
+
+@unittest.skipUnless(_PY35, _SKIP_MSG)
+class Test_transport_singleton(unittest.TestCase):
+
+    def test_get_and_set(self):
+        import mock
+        from ci_diff_helper import aio
+
+        with mock.patch('ci_diff_helper.aio._TRANSPORT', new=None):
+            transport = aio.get_transport()
+            self.assertIsInstance(transport, aio.Transport)
+            self.assertIs(aio.get_transport(), transport)
+            self.assertIs(aio.set_transport(None), transport)
+            self.assertIsNot(aio.get_transport(), transport)
+
+
+@unittest.skipUnless(_PY35, _SKIP_MSG)
+class Test_github_functions(unittest.TestCase):
+
+    def test_async_pr_info(self):
+        from ci_diff_helper import aio
+
+        with _FakeGitHub() as server:
+            server.add_pull_request(1337, 'base', 'head')
+            result = _run(lambda: aio.async_pr_info('a/b', 1337))
+        self.assertEqual(result['base']['sha'], 'base')
+        self.assertEqual(server.requests, ['/repos/a/b/pulls/1337'])
+
+    def test_async_pr_info_failure(self):
+        import requests
+        from ci_diff_helper import aio
+
+        with _FakeGitHub():
+            with _mock_stderr():
+                with self.assertRaises(requests.HTTPError):
+                    _run(lambda: aio.async_pr_info('a/b', 1))
+
+    def test_async_commit_compare(self):
+        from ci_diff_helper import aio
+
+        with _FakeGitHub(merge_base='abc') as server:
+            result = _run(lambda: aio.async_commit_compare('a/b', 'c', 'd'))
+        self.assertEqual(result['merge_base_commit'], {'sha': 'abc'})
+        self.assertEqual(server.requests, ['/repos/a/b/compare/c...d'])
+
+    def test_async_compare_merge_base(self):
+        from ci_diff_helper import aio
+
+        with _FakeGitHub(merge_base='abc') as server:
+            result = _run(lambda: aio.async_compare_merge_base(
+                'a/b', 'c', 'd'))
+        self.assertEqual(result, 'abc')
+        self.assertEqual(server.requests, [
+            '/repos/a/b/compare/c...d?per_page=1',
+        ])
+
+    def test_async_compare_merge_base_missing(self):
+        import mock
+        from ci_diff_helper import aio
+
+        get_mock = mock.Mock(side_effect=lambda url: _done(
+            mock.Mock(content=b'{}')))
+        with mock.patch('ci_diff_helper.aio._async_get', new=get_mock):
+            result = _run(lambda: aio.async_compare_merge_base(
+                'a/b', 'c', 'd'))
+        self.assertIsNone(result)
+
+    def test_concurrent_connection_reuse(self):
+        import asyncio
+        from ci_diff_helper import aio
+
+        pr_ids = list(range(1, 9))
+        with _FakeGitHub() as server:
+            for pr_id in pr_ids:
+                server.add_pull_request(pr_id, 'base{}'.format(pr_id), 'h')
+
+            def gather():
+                return asyncio.gather(*[
+                    aio.async_pr_info('a/b', pr_id) for pr_id in pr_ids])
+
+            results = _run(gather)
+            connections = server.connections
+            # Sequential requests re-use a single (idle) connection.
+            _run_all(lambda: aio.async_pr_info('a/b', 1),
+                     lambda: aio.async_pr_info('a/b', 2),
+                     lambda: aio.async_pr_info('a/b', 3))
+        self.assertEqual(
+            [result['base']['sha'] for result in results],
+            ['base{}'.format(pr_id) for pr_id in pr_ids])
+        self.assertEqual(len(server.requests), len(pr_ids) + 3)
+        self.assertEqual(server.connections, connections + 1)
+
+    def test_retry(self):
+        from ci_diff_helper import aio
+
+        with _FakeGitHub() as server:
+            server.add_pull_request(1, 'base', 'head')
+            server.inject_errors(429, count=2, retry_after=0)
+            result = _run(lambda: aio.async_pr_info('a/b', 1))
+        self.assertEqual(result['base']['sha'], 'base')
+        self.assertEqual(len(server.requests), 3)
+
+    def test_deadline(self):
+        import mock
+        import requests
+        from ci_diff_helper import _github
+        from ci_diff_helper import _rate_limit
+        from ci_diff_helper import aio
+
+        sleep_mock = mock.Mock(side_effect=lambda delay: _done(None))
+        with _FakeGitHub() as server:
+            _github.set_scheduler(_rate_limit.Scheduler(deadline=5.0))
+            server.inject_errors(429, count=3, retry_after=3)
+            with mock.patch('asyncio.sleep', new=sleep_mock):
+                with _mock_stderr():
+                    with self.assertRaises(requests.HTTPError):
+                        _run(lambda: aio.async_pr_info('a/b', 1))
+        sleep_mock.assert_called_once_with(3.0)
+        self.assertEqual(len(server.requests), 2)
+
+    def test_max_retries(self):
+        import requests
+        from ci_diff_helper import _github
+        from ci_diff_helper import _rate_limit
+        from ci_diff_helper import aio
+
+        with _FakeGitHub() as server:
+            _github.set_scheduler(_rate_limit.Scheduler(max_retries=1))
+            server.inject_errors(429, count=2, retry_after=0)
+            with _mock_stderr():
+                with self.assertRaises(requests.HTTPError):
+                    _run(lambda: aio.async_pr_info('a/b', 1))
+        self.assertEqual(len(server.requests), 2)
+
+    def test_pacing(self):
+        import mock
+        from ci_diff_helper import _github
+        from ci_diff_helper import _rate_limit
+        from ci_diff_helper import aio
+
+        scheduler = _rate_limit.Scheduler()
+        sleep_mock = mock.Mock(side_effect=lambda delay: _done(None))
+        with _FakeGitHub() as server:
+            server.add_pull_request(1, 'base', 'head')
+            _github.set_scheduler(scheduler)
+            with mock.patch.object(scheduler, 'delay', return_value=1.5):
+                with mock.patch('asyncio.sleep', new=sleep_mock):
+                    _run(lambda: aio.async_pr_info('a/b', 1))
+        sleep_mock.assert_called_once_with(1.5)
+        self.assertEqual(scheduler.remaining, 4999)
+
+
+@unittest.skipUnless(_PY35, _SKIP_MSG)
+class Test__async_get_cached(unittest.TestCase):
+
+    def _make_cache(self, **kwargs):
+        import shutil
+        import tempfile
+        from ci_diff_helper import _http_cache
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        return _http_cache.ResponseCache(directory, **kwargs)
+
+    def test_fresh(self):
+        from ci_diff_helper import _github
+        from ci_diff_helper import aio
+
+        with _FakeGitHub() as server:
+            server.add_pull_request(1, 'base', 'head')
+            _github.set_cache(self._make_cache(ttl=60.0))
+            first = _run(lambda: aio.async_pr_info('a/b', 1))
+            second = _run(lambda: aio.async_pr_info('a/b', 1))
+        self.assertEqual(first, second)
+        self.assertEqual(server.requests, ['/repos/a/b/pulls/1'])
+
+    def test_revalidated(self):
+        import asyncio
+        from ci_diff_helper import _github
+        from ci_diff_helper import aio
+
+        with _FakeGitHub() as server:
+            server.add_pull_request(1, 'base', 'head')
+            _github.set_cache(self._make_cache())
+            # The 304 has no body, so it must not be read until the
+            # (kept alive) connection is closed.
+            first, second = _run_all(
+                lambda: aio.async_pr_info('a/b', 1),
+                lambda: asyncio.wait_for(aio.async_pr_info('a/b', 1), 5.0))
+        self.assertEqual(first, second)
+        self.assertEqual(
+            server.requests, ['/repos/a/b/pulls/1', '/repos/a/b/pulls/1'])
+        self.assertEqual(server.connections, 1)
+
+    def test_not_modified(self):
+        import mock
+        import requests
+        from ci_diff_helper import _github
+        from ci_diff_helper import aio
+
+        cache = self._make_cache()
+        url = 'https://api.github.com/x'
+        stored = requests.Response()
+        stored.status_code = 200
+        stored.headers['ETag'] = '"v1"'
+        stored._content = b'{"a": 1}'
+        cache.put(url, {}, stored)
+
+        not_modified = requests.Response()
+        not_modified.status_code = 304
+        send_mock = mock.Mock(side_effect=lambda *args: _done(not_modified))
+        with mock.patch('ci_diff_helper.aio._async_send', new=send_mock):
+            with mock.patch.multiple('ci_diff_helper._github',
+                                     _get_headers=mock.Mock(return_value={}),
+                                     _CACHE=cache):
+                response = _run(lambda: aio._async_get(url))
+                self.assertIs(_github.get_cache(), cache)
+        self.assertEqual(response.json(), {'a': 1})
+        send_mock.assert_called_once_with(url, {'If-None-Match': '"v1"'})
+
+
+@unittest.skipUnless(_PY35 and utils.HAS_GIT, 'Requires Python 3.5 and git')
+class Test_async_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(config):
+        from ci_diff_helper import aio
+        return _run(lambda: aio.async_base(config))
+
+    def _travis_helper(self, environ):
+        import mock
+        from ci_diff_helper import travis
+
+        with mock.patch('os.environ', new=environ):
+            config = travis.Travis()
+            return config, self._call_function_under_test(config)
+
+    def test_cached(self):
+        import mock
+        from ci_diff_helper import travis
+
+        config = travis.Travis()
+        config._base = mock.sentinel.base
+        self.assertIs(
+            self._call_function_under_test(config), mock.sentinel.base)
+
+    def test_snapshot_missing(self):
+        import mock
+        from ci_diff_helper import _config_base
+        from ci_diff_helper import travis
+
+        snapshot = {
+            'version': _config_base._SNAPSHOT_VERSION,
+            'type': 'Travis',
+            'values': {'event_type': 'push'},
+        }
+        config = travis.Travis.from_snapshot(snapshot)
+        patch_base = mock.patch('ci_diff_helper.aio._travis_push_build_base')
+        with patch_base as mocked:
+            with self.assertRaises(ValueError):
+                self._call_function_under_test(config)
+        mocked.assert_not_called()
+
+    def test_shared_between_steps(self):
+        import shutil
+        import tempfile
+        import mock
+        from ci_diff_helper import _build_cache
+        from ci_diff_helper import travis
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache_patch = mock.patch(
+            'ci_diff_helper._build_cache._BUILD_CACHE',
+            new=_build_cache.BuildCache(directory))
+        environ = {
+            'TRAVIS_EVENT_TYPE': 'pull_request',
+            'TRAVIS_PULL_REQUEST': '1',
+            'TRAVIS_BRANCH': 'master',
+        }
+        with utils.TempRepo() as repo:
+            repo.commit('Initial')
+            with cache_patch:
+                with mock.patch('os.environ', new=environ):
+                    # Stored by an earlier step of the build.
+                    travis.Travis()._set_resolved('base', 'abc')
+                    config = travis.Travis()
+                    result = self._call_function_under_test(config)
+        self.assertEqual(result, 'abc')
+        self.assertEqual(config.base, 'abc')
+
+    def test_build_cache_off_loop(self):
+        import shutil
+        import tempfile
+        import threading
+        import mock
+        from ci_diff_helper import _build_cache
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = _build_cache.BuildCache(directory)
+        threads = []
+
+        def get_or_compute(key, compute):
+            threads.append(threading.current_thread())
+            return compute()
+
+        cache.get_or_compute = get_or_compute
+        cache_patch = mock.patch(
+            'ci_diff_helper._build_cache._BUILD_CACHE', new=cache)
+        # HEAD must be resolved without a blocking ``git`` command.
+        blocking_patch = mock.patch(
+            'ci_diff_helper._utils.check_output',
+            side_effect=AssertionError('Blocking'))
+        with utils.TempRepo() as repo:
+            start = repo.commit('Initial')
+            finish = repo.commit('Change')
+            environ = {
+                'TRAVIS_EVENT_TYPE': 'push',
+                'TRAVIS_COMMIT_RANGE': '{}...{}'.format(start, finish),
+                'TRAVIS_REPO_SLUG': 'a/b',
+            }
+            with cache_patch:
+                with blocking_patch:
+                    config, result = self._travis_helper(environ)
+        self.assertEqual(result, start)
+        self.assertEqual(
+            config._build_key, _build_cache.fingerprint(finish, environ))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_travis_pr(self):
+        config, result = self._travis_helper({
+            'TRAVIS_EVENT_TYPE': 'pull_request',
+            'TRAVIS_PULL_REQUEST': '1',
+            'TRAVIS_BRANCH': 'master',
+        })
+        self.assertEqual(result, 'master')
+        self.assertEqual(config.base, 'master')
+
+    def test_travis_push_local(self):
+        with utils.TempRepo() as repo:
+            start = repo.commit('Initial')
+            finish = repo.commit('Change')
+            config, result = self._travis_helper({
+                'TRAVIS_EVENT_TYPE': 'push',
+                'TRAVIS_COMMIT_RANGE': '{}...{}'.format(start[:7], finish),
+                'TRAVIS_REPO_SLUG': 'a/b',
+            })
+        self.assertEqual(result, start)
+        self.assertEqual(config._base, start)
+
+    def test_travis_push_not_merge_base(self):
+        with utils.TempRepo() as repo:
+            start = repo.commit('Initial')
+            finish = repo.commit('Change')
+            with self.assertRaises(ValueError):
+                self._travis_helper({
+                    'TRAVIS_EVENT_TYPE': 'push',
+                    'TRAVIS_COMMIT_RANGE': '{}...{}'.format(finish, start),
+                    'TRAVIS_REPO_SLUG': 'a/b',
+                })
+
+    def test_travis_push_github(self):
+        with utils.TempRepo():
+            with _FakeGitHub(merge_base='abc') as server:
+                _, result = self._travis_helper({
+                    'TRAVIS_EVENT_TYPE': 'push',
+                    'TRAVIS_COMMIT_RANGE': 'aaaaaaaaaaaa...bbbb',
+                    'TRAVIS_REPO_SLUG': 'a/b',
+                })
+        self.assertEqual(result, 'abc')
+        self.assertEqual(server.requests, [
+            '/repos/a/b/compare/aaaaaaaaaaaa...bbbb?per_page=1',
+        ])
+
+    def test_travis_push_github_missing(self):
+        import mock
+
+        compare_mock = mock.Mock(side_effect=lambda *args: _done(None))
+        with utils.TempRepo():
+            with mock.patch('ci_diff_helper.aio.async_compare_merge_base',
+                            new=compare_mock):
+                with self.assertRaises(KeyError):
+                    self._travis_helper({
+                        'TRAVIS_EVENT_TYPE': 'push',
+                        'TRAVIS_COMMIT_RANGE': 'aaaaaaaaaaaa...bbbb',
+                        'TRAVIS_REPO_SLUG': 'a/b',
+                    })
+        compare_mock.assert_called_once_with('a/b', 'aaaaaaaaaaaa', 'bbbb')
+
+    def test_travis_other_event(self):
+        with self.assertRaises(NotImplementedError):
+            self._travis_helper({'TRAVIS_EVENT_TYPE': 'cron'})
+
+    def _circle_ci_helper(self, environ):
+        import mock
+        from ci_diff_helper import circle_ci
+
+        with mock.patch('os.environ', new=environ):
+            config = circle_ci.CircleCI()
+            return config, self._call_function_under_test(config)
+
+    def test_circle_ci(self):
+        with _FakeGitHub() as server:
+            server.add_pull_request(1337, 'base-sha', 'head-sha')
+            config, result = self._circle_ci_helper({
+                'CIRCLE_PR_NUMBER': '1337',
+                'CIRCLE_REPOSITORY_URL': 'https://github.com/a/b',
+            })
+            # The pull request info is shared with the blocking API.
+            self.assertEqual(config._pr_info['head']['sha'], 'head-sha')
+        self.assertEqual(result, 'base-sha')
+        self.assertEqual(server.requests, ['/repos/a/b/pulls/1337'])
+
+    def test_circle_ci_missing_key(self):
+        from ci_diff_helper import circle_ci
+
+        config = circle_ci.CircleCI()
+        config._pr = 1
+        config._provider_slug_cached = (
+            circle_ci.CircleCIRepoProvider.github, 'a/b')
+        config._pr_info_cached = {}
+        with self.assertRaises(KeyError):
+            self._call_function_under_test(config)
+
+    def test_circle_ci_not_github(self):
+        with self.assertRaises(NotImplementedError):
+            self._circle_ci_helper({
+                'CIRCLE_PR_NUMBER': '1',
+                'CIRCLE_REPOSITORY_URL': 'https://bitbucket.org/a/b',
+            })
+
+    def test_circle_ci_not_pr(self):
+        with self.assertRaises(NotImplementedError):
+            self._circle_ci_helper({})
+
+    def test_unsupported(self):
+        from ci_diff_helper import appveyor
+
+        with self.assertRaises(NotImplementedError):
+            self._call_function_under_test(appveyor.AppVeyor())
+
+    def test_config_method(self):
+        from ci_diff_helper import travis
+
+        config = travis.Travis()
+        config._base = 'abc'
+        result = _run(config.async_base)
+        self.assertEqual(result, 'abc')
@@ -158,6 +158,20 @@ class TestAppVeyor(unittest.TestCase):
         config._tag = tag
         self.assertEqual(config.tag, tag)
 
+    def test_get_changed_files(self):
+        import mock
+
+        config = self._make_one()
+        patch_cache = mock.patch(
+            'ci_diff_helper._build_cache._BUILD_CACHE', new=None)
+        patch_changed = mock.patch(
+            'ci_diff_helper.change_cache.get_changed_files')
+        with patch_cache:
+            with patch_changed as mocked:
+                with self.assertRaises(NotImplementedError):
+                    config.get_changed_files()
+        mocked.assert_not_called()
+
     def test___repr__(self):
         import mock
         from ci_diff_helper import environment_vars as env
@@ -0,0 +1,525 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from six.moves import BaseHTTPServer
+
+
+class _StoreHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """A minimal HTTP object store, keeping values in memory."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        data = self.server.store.get(self.path)
+        if data is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        length = int(self.headers['Content-Length'])
+        self.server.store[self.path] = self.rfile.read(length)
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class _LocalStore(object):
+    """Run the HTTP object store on a local port."""
+
+    def __init__(self):
+        import threading
+
+        self.server = BaseHTTPServer.HTTPServer(
+            ('127.0.0.1', 0), _StoreHandler)
+        self.server.store = {}
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{:d}/changes/'.format(
+            self.server.server_address[1])
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class TestBackend(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.change_cache import Backend
+        return Backend
+
+    def _make_one(self):
+        return self._get_target_class()()
+
+    def test_get(self):
+        with self.assertRaises(NotImplementedError):
+            self._make_one().get('key')
+
+    def test_put(self):
+        with self.assertRaises(NotImplementedError):
+            self._make_one().put('key', b'data')
+
+
+class TestDirectoryBackend(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.change_cache import DirectoryBackend
+        return DirectoryBackend
+
+    def _make_one(self, **kwargs):
+        import os
+        import shutil
+        import tempfile
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        klass = self._get_target_class()
+        return klass(os.path.join(directory, 'changes'), **kwargs)
+
+    def test_constructor(self):
+        import os
+        from ci_diff_helper import change_cache
+
+        backend = self._make_one()
+        self.assertTrue(os.path.isdir(backend.directory))
+        self.assertEqual(backend.max_entries, change_cache._MAX_ENTRIES)
+        self.assertEqual(backend.max_bytes, change_cache._MAX_BYTES)
+        # Re-using an existing directory.
+        klass = self._get_target_class()
+        self.assertEqual(
+            klass(backend.directory).directory, backend.directory)
+
+    def test_get_missing(self):
+        backend = self._make_one()
+        self.assertIsNone(backend.get('abc'))
+
+    def test_put_and_get(self):
+        import os
+
+        backend = self._make_one()
+        backend.put('abc', b'data')
+        self.assertEqual(backend.get('abc'), b'data')
+        self.assertEqual(os.listdir(backend.directory), ['abc.changes'])
+
+    def _set_mtime(self, backend, key, mtime):
+        import os
+        os.utime(backend._path(key), (mtime, mtime))
+
+    def test_evict_max_entries(self):
+        backend = self._make_one(max_entries=2)
+        for index in range(3):
+            key = 'key' + str(index)
+            backend.put(key, b'data')
+            self._set_mtime(backend, key, 1000 + index)
+            # Reading a change set marks it as recently used.
+            self.assertIsNotNone(backend.get('key0'))
+            self._set_mtime(backend, 'key0', 2000 + index)
+
+        self.assertIsNotNone(backend.get('key0'))
+        self.assertIsNone(backend.get('key1'))
+        self.assertIsNotNone(backend.get('key2'))
+
+    def test_evict_max_bytes(self):
+        import os
+
+        backend = self._make_one(max_bytes=250)
+        backend.put('a', b'1' * 100)
+        self._set_mtime(backend, 'a', 1000)
+        backend.put('b', b'2' * 100)
+        self._set_mtime(backend, 'b', 1001)
+        backend.put('c', b'3' * 100)
+        self.assertIsNone(backend.get('a'))
+        self.assertIsNotNone(backend.get('b'))
+        self.assertIsNotNone(backend.get('c'))
+        # Stray files in the directory are left alone.
+        with open(os.path.join(backend.directory, 'README'), 'w'):
+            pass
+        backend._evict()
+        self.assertIn('README', os.listdir(backend.directory))
+
+
+class TestHTTPBackend(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.change_cache import HTTPBackend
+        return HTTPBackend
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_constructor(self):
+        import requests
+        from ci_diff_helper import change_cache
+
+        backend = self._make_one('http://store/changes/')
+        self.assertEqual(backend.base_url, 'http://store/changes')
+        self.assertIsInstance(backend.session, requests.Session)
+        self.assertEqual(backend.timeout, change_cache._HTTP_TIMEOUT)
+        self.assertEqual(backend._url('abc'), 'http://store/changes/abc')
+
+    def test_put_and_get(self):
+        with _LocalStore() as store:
+            backend = self._make_one(store.url)
+            self.assertIsNone(backend.get('abc'))
+            backend.put('abc', b'data')
+            self.assertEqual(backend.get('abc'), b'data')
+            self.assertEqual(store.server.store, {'/changes/abc': b'data'})
+
+    def test_unreachable(self):
+        import mock
+        import requests
+
+        session = mock.Mock(spec=['get', 'put'])
+        session.get.side_effect = requests.ConnectionError
+        session.put.side_effect = requests.ConnectionError
+        backend = self._make_one('http://store', session=session, timeout=1)
+        self.assertIsNone(backend.get('abc'))
+        backend.put('abc', b'data')
+        session.get.assert_called_once_with('http://store/abc', timeout=1)
+        session.put.assert_called_once_with(
+            'http://store/abc', data=b'data', timeout=1)
+
+
+class Test__resolve(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(blob_name1, blob_name2):
+        from ci_diff_helper.change_cache import _resolve
+        return _resolve(blob_name1, blob_name2)
+
+    def _helper(self, output):
+        import mock
+
+        patch_check = mock.patch(
+            'ci_diff_helper._utils.check_output', return_value=output)
+        with patch_check as mocked:
+            result = self._call_function_under_test('HEAD', 'master')
+            mocked.assert_called_once_with(
+                'git', 'rev-parse', 'HEAD^{commit}', 'master^{commit}',
+                ignore_err=True)
+        return result
+
+    def test_success(self):
+        self.assertEqual(self._helper('abc\ndef'), ('abc', 'def'))
+
+    def test_failure(self):
+        self.assertIsNone(self._helper(None))
+
+    def test_unexpected_output(self):
+        self.assertIsNone(self._helper('abc'))
+
+
+class TestChangeSetCache(unittest.TestCase):
+
+    SHA1 = 'c3b0c1d1e05e0a0e8d2c6a3a4d6e1b0f8d2c6a3a'
+    SHA2 = '8103a3b85aa5f3e2b14200bfef815539c1be109a'
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.change_cache import ChangeSetCache
+        return ChangeSetCache
+
+    def _make_one(self, backend=None):
+        import os
+        import shutil
+        import tempfile
+        from ci_diff_helper import change_cache
+
+        if backend is None:
+            directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, directory)
+            backend = change_cache.DirectoryBackend(
+                os.path.join(directory, 'changes'))
+        klass = self._get_target_class()
+        return klass(backend)
+
+    def test_key(self):
+        from ci_diff_helper import git_tools
+
+        klass = self._get_target_class()
+        key = klass.key(self.SHA1, self.SHA2)
+        self.assertEqual(len(key), 64)
+        self.assertNotEqual(klass.key(self.SHA2, self.SHA1), key)
+        # Every option is part of the key.
+        self.assertNotEqual(
+            klass.key(self.SHA1, self.SHA2, pathspecs=['a']), key)
+        self.assertNotEqual(
+            klass.key(self.SHA1, self.SHA2, globs=['a']), key)
+        self.assertNotEqual(
+            klass.key(self.SHA1, self.SHA2, statuses=[]), key)
+        self.assertNotEqual(
+            klass.key(self.SHA1, self.SHA2, pathspecs=['a'], prefix='b/'),
+            klass.key(self.SHA1, self.SHA2, pathspecs=['a']))
+        # But not the order of the values.
+        statuses = [git_tools.FileStatus.added, git_tools.FileStatus.deleted]
+        self.assertEqual(
+            klass.key(self.SHA1, self.SHA2, globs=['a', 'b'],
+                      statuses=statuses),
+            klass.key(self.SHA1, self.SHA2, globs=('b', 'a'),
+                      statuses=statuses[::-1]))
+
+    def _get_changed_files_helper(self, cache, files, **kwargs):
+        import mock
+
+        patch_resolve = mock.patch(
+            'ci_diff_helper.change_cache._resolve',
+            return_value=(self.SHA1, self.SHA2))
+        patch_changed = mock.patch(
+            'ci_diff_helper.git_tools.get_changed_files',
+            return_value=files)
+        with patch_resolve as mocked_resolve:
+            with patch_changed as mocked:
+                result = cache.get_changed_files('HEAD', 'master', **kwargs)
+                mocked_resolve.assert_called_once_with('HEAD', 'master')
+        return result, mocked
+
+    def test_get_changed_files(self):
+        import mock
+        from ci_diff_helper import git_tools
+
+        cache = self._make_one()
+        files = ['setup.py', 'project/feature.py']
+        statuses = iter([git_tools.FileStatus.added])
+        result, mocked = self._get_changed_files_helper(
+            cache, files, globs=['**/*.py'], statuses=statuses)
+        self.assertEqual(result, files)
+        mocked.assert_called_once_with(
+            self.SHA1, self.SHA2, pathspecs=None, globs=['**/*.py'],
+            statuses=[git_tools.FileStatus.added])
+
+        # The same change set is now cached.
+        result, mocked = self._get_changed_files_helper(
+            cache, None, globs=['**/*.py'],
+            statuses=[git_tools.FileStatus.added])
+        self.assertEqual(result, files)
+        mocked.assert_not_called()
+
+        # A different change set is not.
+        result, mocked = self._get_changed_files_helper(cache, [])
+        self.assertEqual(result, [])
+        self.assertEqual(mocked.mock_calls, [mock.call(
+            self.SHA1, self.SHA2, pathspecs=None, globs=None,
+            statuses=None)])
+
+    def test_get_changed_files_corrupt(self):
+        klass = self._get_target_class()
+        cache = self._make_one()
+        cache.backend.put(klass.key(self.SHA1, self.SHA2), b'not zlib')
+        result, mocked = self._get_changed_files_helper(cache, ['a.py'])
+        self.assertEqual(result, ['a.py'])
+        self.assertEqual(mocked.call_count, 1)
+
+    def test_get_changed_files_not_commits(self):
+        import mock
+
+        backend = mock.Mock(spec=[])
+        cache = self._make_one(backend=backend)
+        patch_resolve = mock.patch(
+            'ci_diff_helper.change_cache._resolve', return_value=None)
+        patch_changed = mock.patch(
+            'ci_diff_helper.git_tools.get_changed_files',
+            return_value=['a.py'])
+        with patch_resolve:
+            with patch_changed as mocked:
+                self.assertEqual(
+                    cache.get_changed_files('HEAD', 'tree', pathspecs=['a']),
+                    ['a.py'])
+        mocked.assert_called_once_with(
+            'HEAD', 'tree', pathspecs=['a'], globs=None, statuses=None)
+
+    def test_shared_http_store(self):
+        from ci_diff_helper import change_cache
+
+        files = ['docs/index.rst']
+        with _LocalStore() as store:
+            cache1 = self._make_one(change_cache.HTTPBackend(store.url))
+            result, mocked = self._get_changed_files_helper(cache1, files)
+            self.assertEqual(result, files)
+            self.assertEqual(mocked.call_count, 1)
+            # Another job (e.g. on another machine) re-uses the result.
+            cache2 = self._make_one(change_cache.HTTPBackend(store.url))
+            result, mocked = self._get_changed_files_helper(cache2, None)
+            self.assertEqual(result, files)
+            mocked.assert_not_called()
+
+    def test_actual_repository(self):
+        import os
+        import shutil
+        import subprocess
+        import tempfile
+        import mock
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(root)
+        environ = {
+            'GIT_AUTHOR_NAME': 'A', 'GIT_AUTHOR_EMAIL': 'a@example.com',
+            'GIT_COMMITTER_NAME': 'A', 'GIT_COMMITTER_EMAIL': 'a@example.com',
+        }
+        environ.update(os.environ)
+        for args in (('init', '-q'), ('commit', '-q', '--allow-empty',
+                                      '-m', 'First.')):
+            subprocess.check_call(('git',) + args, env=environ)
+        with open('setup.py', 'w'):
+            pass
+        for args in (('add', 'setup.py'), ('commit', '-q', '-m', 'Second.')):
+            subprocess.check_call(('git',) + args, env=environ)
+
+        cache = self._make_one()
+        self.assertEqual(
+            cache.get_changed_files('HEAD~1', 'HEAD'), ['setup.py'])
+        with mock.patch('ci_diff_helper.git_tools.get_changed_files') as m:
+            self.assertEqual(
+                cache.get_changed_files('HEAD~1', 'HEAD'), ['setup.py'])
+            m.assert_not_called()
+
+        # Pathspecs are relative to the current directory.
+        for name in ('a', 'b'):
+            os.mkdir(name)
+            with open(os.path.join(name, 'mod.py'), 'w'):
+                pass
+        for args in (('add', 'a', 'b'), ('commit', '-q', '-m', 'Third.')):
+            subprocess.check_call(('git',) + args, env=environ)
+        for name in ('a', 'b'):
+            os.chdir(os.path.join(root, name))
+            self.assertEqual(
+                cache.get_changed_files('HEAD~1', 'HEAD', pathspecs=['.']),
+                [name + '/mod.py'])
+
+
+class Test_get_change_cache(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.change_cache import get_change_cache
+        return get_change_cache()
+
+    def _helper(self, environ):
+        import os
+        import mock
+        from ci_diff_helper import _utils
+        from ci_diff_helper import change_cache
+
+        patch_env = mock.patch.dict(os.environ, environ, clear=True)
+        patch_cache = mock.patch(
+            'ci_diff_helper.change_cache._CACHE', new=_utils.UNSET)
+        with patch_env:
+            with patch_cache:
+                result = self._call_function_under_test()
+                # The result is re-used.
+                self.assertIs(change_cache._CACHE, result)
+                self.assertIs(self._call_function_under_test(), result)
+        return result
+
+    def test_disabled(self):
+        self.assertIsNone(self._helper({}))
+
+    def test_directory(self):
+        import shutil
+        import tempfile
+        from ci_diff_helper import change_cache
+        from ci_diff_helper import environment_vars as env
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = self._helper({env.CHANGE_CACHE_DIR: directory})
+        self.assertIsInstance(cache.backend, change_cache.DirectoryBackend)
+        self.assertEqual(cache.backend.directory, directory)
+
+    def test_url(self):
+        from ci_diff_helper import change_cache
+        from ci_diff_helper import environment_vars as env
+
+        cache = self._helper({
+            env.CHANGE_CACHE_URL: 'http://store/changes',
+            env.CHANGE_CACHE_DIR: '/not/used',
+        })
+        self.assertIsInstance(cache.backend, change_cache.HTTPBackend)
+        self.assertEqual(cache.backend.base_url, 'http://store/changes')
+
+
+class Test_set_change_cache(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(cache):
+        from ci_diff_helper.change_cache import set_change_cache
+        return set_change_cache(cache)
+
+    def test_it(self):
+        import mock
+        from ci_diff_helper import _utils
+        from ci_diff_helper import change_cache
+
+        cache = mock.sentinel.cache
+        with mock.patch('ci_diff_helper.change_cache._CACHE',
+                        new=_utils.UNSET):
+            self.assertIsNone(self._call_function_under_test(cache))
+            self.assertIs(change_cache._CACHE, cache)
+            self.assertIs(self._call_function_under_test(None), cache)
+            self.assertIsNone(change_cache._CACHE)
+
+
+class Test_get_changed_files(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(blob_name1, blob_name2, **kwargs):
+        from ci_diff_helper.change_cache import get_changed_files
+        return get_changed_files(blob_name1, blob_name2, **kwargs)
+
+    def test_disabled(self):
+        import mock
+
+        patch_cache = mock.patch(
+            'ci_diff_helper.change_cache._CACHE', new=None)
+        patch_changed = mock.patch(
+            'ci_diff_helper.git_tools.get_changed_files')
+        with patch_cache:
+            with patch_changed as mocked:
+                result = self._call_function_under_test(
+                    'HEAD', 'master', globs=['*.py'])
+        self.assertIs(result, mocked.return_value)
+        mocked.assert_called_once_with(
+            'HEAD', 'master', pathspecs=None, globs=['*.py'], statuses=None)
+
+    def test_enabled(self):
+        import mock
+
+        cache = mock.Mock(spec=['get_changed_files'])
+        with mock.patch('ci_diff_helper.change_cache._CACHE', new=cache):
+            result = self._call_function_under_test(
+                'HEAD', 'master', pathspecs=['docs'])
+        self.assertIs(result, cache.get_changed_files.return_value)
+        cache.get_changed_files.assert_called_once_with(
+            'HEAD', 'master', pathspecs=['docs'], globs=None, statuses=None)
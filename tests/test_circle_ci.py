@@ -164,9 +164,8 @@ class TestCircleCI(unittest.TestCase):
         self.assertIs(config._is_merge, _utils.UNSET)
         self.assertIs(config._pr, _utils.UNSET)
         self.assertIs(config._pr_info_cached, _utils.UNSET)
-        self.assertIs(config._provider, _utils.UNSET)
+        self.assertIs(config._provider_slug_cached, _utils.UNSET)
         self.assertIs(config._repo_url, _utils.UNSET)
-        self.assertIs(config._slug, _utils.UNSET)
         self.assertIs(config._tag, _utils.UNSET)
 
     def test___repr__(self):
@@ -255,8 +254,8 @@ class TestCircleCI(unittest.TestCase):
 
         config = self._make_one()
         config._repo_url = mock.sentinel.repo_url
-        # Make sure there is no _provider value set.
-        self.assertIs(config._provider, _utils.UNSET)
+        # Make sure there is no provider or slug value set.
+        self.assertIs(config._provider_slug_cached, _utils.UNSET)
 
         # Patch the helper so we can control the value.
         provider_patch = mock.patch(
@@ -281,7 +280,7 @@ class TestCircleCI(unittest.TestCase):
         provider_val = 'pro-bono-vide'
         config = self._slug_provider_helper(provider_val, None)
         # Test that the value is cached.
-        self.assertIs(config._provider, provider_val)
+        self.assertEqual(config._provider_slug_cached, (provider_val, None))
         # Test that cached value is re-used.
         self.assertIs(config.provider, provider_val)
 
@@ -294,10 +293,27 @@ class TestCircleCI(unittest.TestCase):
         config = self._slug_provider_helper(
             None, slug_val, slug_first=True)
         # Test that the value is cached.
-        self.assertIs(config._slug, slug_val)
+        self.assertEqual(config._provider_slug_cached, (None, slug_val))
         # Test that cached value is re-used.
         self.assertIs(config.slug, slug_val)
 
+    def test_provider_slug_snapshot(self):
+        import json
+        from ci_diff_helper import circle_ci
+
+        config = self._make_one()
+        config._active = True
+        config._repo_url = 'https://github.com/org/repo'
+        self.assertEqual(config.slug, 'org/repo')
+        snapshot = json.loads(json.dumps(config.snapshot()))
+        self.assertEqual(snapshot['values']['_provider_slug'],
+                         ['github', 'org/repo'])
+
+        restored = circle_ci.CircleCI.from_snapshot(snapshot)
+        self.assertIs(restored.provider,
+                      circle_ci.CircleCIRepoProvider.github)
+        self.assertEqual(restored.slug, 'org/repo')
+
     def test__pr_info_property_cache(self):
         import mock
 
@@ -347,6 +363,42 @@ class TestCircleCI(unittest.TestCase):
         self.assertIs(pr_info, mock.sentinel.info)
         self.assertEqual(get_info.call_count, 1)
 
+    def test__pr_info_property_threads(self):
+        import threading
+        import mock
+        from ci_diff_helper import circle_ci
+
+        config = self._make_one()
+        config._pr = 1
+        config._provider_slug_cached = (
+            circle_ci.CircleCIRepoProvider.github, 'a/b')
+        started = threading.Event()
+        finish = threading.Event()
+
+        def pr_info(slug, pr_id):
+            started.set()
+            finish.wait(5.0)
+            return {'base': {'sha': 'abc'}}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(config.base))
+            for _ in range(3)
+        ]
+        with mock.patch('ci_diff_helper._github.pr_info',
+                        side_effect=pr_info) as get_info:
+            threads[0].start()
+            started.wait(5.0)
+            for thread in threads[1:]:
+                thread.start()
+            finish.set()
+            for thread in threads:
+                thread.join()
+
+        # The API is only called once, the other threads wait for it.
+        get_info.assert_called_once_with('a/b', 1)
+        self.assertEqual(results, ['abc'] * 3)
+
     def test__pr_info_property_pr_not_github(self):
         import mock
         from ci_diff_helper import circle_ci
@@ -398,7 +450,7 @@ class TestCircleCI(unittest.TestCase):
         config._pr = 678
         config._pr_info_cached = {}
         # Also fake the info that shows up in the exception.
-        config._slug = 'foo/food'
+        config._provider_slug_cached = (None, 'foo/food')
 
         with self.assertRaises(KeyError):
             getattr(config, 'base')
@@ -0,0 +1,1041 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+import unittest
+
+
+_NO_UNIX_SOCKETS = not hasattr(socket, 'AF_UNIX')
+
+
+def _make_socket_path(test_case):
+    import os
+    import shutil
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    test_case.addCleanup(shutil.rmtree, directory)
+    return os.path.join(directory, 'daemon.sock')
+
+
+class _RunningServer(object):
+    """Run a server in a background thread."""
+
+    def __init__(self, server):
+        import threading
+
+        self.server = server
+        self.thread = threading.Thread(target=server.serve_forever)
+        self.thread.daemon = True
+
+    def __enter__(self):
+        import time
+        from ci_diff_helper import daemon
+
+        self.thread.start()
+        client = daemon.Client(path=self.server.path)
+        while not client.ping():
+            time.sleep(0.01)
+        return client
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        from ci_diff_helper import daemon
+
+        if not self.server._stopped:
+            daemon.Client(path=self.server.path).shutdown()
+        self.thread.join()
+
+
+class Test_socket_path(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.daemon import socket_path
+        return socket_path()
+
+    def test_from_env(self):
+        import os
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        environ = {env.DAEMON_SOCKET: '/run/ci.sock'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            self.assertEqual(self._call_function_under_test(), '/run/ci.sock')
+
+    def test_derived(self):
+        import os
+        import shutil
+        import stat
+        import tempfile
+        import mock
+
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        patch_temp = mock.patch(
+            'tempfile.gettempdir', return_value=temp_dir)
+        patch_root = mock.patch(
+            'ci_diff_helper.daemon._repo_root', return_value='/repo')
+        with mock.patch.dict(os.environ, {}, clear=True):
+            with patch_temp:
+                with patch_root:
+                    path = self._call_function_under_test()
+                with mock.patch('ci_diff_helper.daemon._repo_root',
+                                return_value='/other'):
+                    other_path = self._call_function_under_test()
+        socket_dir = os.path.join(
+            temp_dir, 'ci-diff-helper-{}'.format(os.getuid()))
+        self.assertEqual(os.path.dirname(path), socket_dir)
+        self.assertEqual(os.path.dirname(other_path), socket_dir)
+        self.assertEqual(stat.S_IMODE(os.stat(socket_dir).st_mode), 0o700)
+        self.assertTrue(os.path.basename(path).startswith('ci-diff-helper-'))
+        self.assertNotEqual(path, other_path)
+
+
+class Test__socket_dir(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.daemon import _socket_dir
+        return _socket_dir()
+
+    def _temp_dir(self):
+        import shutil
+        import tempfile
+        import mock
+
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        return temp_dir, mock.patch(
+            'tempfile.gettempdir', return_value=temp_dir)
+
+    def test_existing(self):
+        import os
+
+        temp_dir, patch_temp = self._temp_dir()
+        expected = os.path.join(
+            temp_dir, 'ci-diff-helper-{}'.format(os.getuid()))
+        os.mkdir(expected, 0o700)
+        with patch_temp:
+            self.assertEqual(self._call_function_under_test(), expected)
+
+    def test_shared(self):
+        import os
+
+        temp_dir, patch_temp = self._temp_dir()
+        path = os.path.join(
+            temp_dir, 'ci-diff-helper-{}'.format(os.getuid()))
+        os.mkdir(path)
+        os.chmod(path, 0o777)
+        with patch_temp:
+            with self.assertRaises(ValueError):
+                self._call_function_under_test()
+
+    def test_other_owner(self):
+        import os
+        import mock
+
+        temp_dir, patch_temp = self._temp_dir()
+        other_uid = os.getuid() + 1
+        # Created (for the other user) by the current user.
+        os.mkdir(os.path.join(
+            temp_dir, 'ci-diff-helper-{}'.format(other_uid)), 0o700)
+        with patch_temp:
+            with mock.patch('os.getuid', return_value=other_uid):
+                with self.assertRaises(ValueError):
+                    self._call_function_under_test()
+
+    def test_not_a_directory(self):
+        import os
+
+        temp_dir, patch_temp = self._temp_dir()
+        os.symlink(temp_dir, os.path.join(
+            temp_dir, 'ci-diff-helper-{}'.format(os.getuid())))
+        with patch_temp:
+            with self.assertRaises(ValueError):
+                self._call_function_under_test()
+
+    def test_mkdir_error(self):
+        import os
+
+        temp_dir, patch_temp = self._temp_dir()
+        os.rmdir(temp_dir)
+        with patch_temp:
+            with self.assertRaises(OSError):
+                self._call_function_under_test()
+        os.mkdir(temp_dir)
+
+
+class Test__check_owner(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(path):
+        from ci_diff_helper.daemon import _check_owner
+        return _check_owner(path)
+
+    def test_missing(self):
+        self.assertIsNone(self._call_function_under_test(
+            _make_socket_path(self)))
+
+    def test_owned(self):
+        import os
+
+        self.assertIsNone(self._call_function_under_test(
+            os.path.dirname(_make_socket_path(self))))
+
+    def test_other_owner(self):
+        import os
+        import mock
+
+        path = os.path.dirname(_make_socket_path(self))
+        with mock.patch('os.getuid', return_value=os.getuid() + 1):
+            with self.assertRaises(ValueError):
+                self._call_function_under_test(path)
+
+
+class Test__repo_root(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.daemon import _repo_root
+        return _repo_root()
+
+    def test_discovered(self):
+        import mock
+
+        repo = mock.Mock(work_tree='/repo', spec=['work_tree'])
+        with mock.patch('ci_diff_helper._git_objects.Repository.discover',
+                        return_value=repo):
+            self.assertEqual(self._call_function_under_test(), '/repo')
+
+    def test_fallback(self):
+        import mock
+
+        patch_discover = mock.patch(
+            'ci_diff_helper._git_objects.Repository.discover',
+            side_effect=NotImplementedError)
+        patch_root = mock.patch(
+            'ci_diff_helper.git_tools.git_root', return_value='/repo')
+        with patch_discover:
+            with patch_root:
+                self.assertEqual(self._call_function_under_test(), '/repo')
+
+
+class Test__idle_timeout(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.daemon import _idle_timeout
+        return _idle_timeout()
+
+    def test_default(self):
+        import os
+        import mock
+        from ci_diff_helper import daemon
+
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(self._call_function_under_test(),
+                             daemon._IDLE_TIMEOUT)
+
+    def test_from_env(self):
+        import os
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        environ = {env.DAEMON_IDLE_TIMEOUT: '1.5'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            self.assertEqual(self._call_function_under_test(), 1.5)
+
+
+class Test_MemoryBackend(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.daemon import _MemoryBackend
+        return _MemoryBackend
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_put_and_get(self):
+        backend = self._make_one(max_entries=2)
+        self.assertIsNone(backend.get('a'))
+        backend.put('a', b'1')
+        backend.put('b', b'2')
+        # Reading marks an entry as recently used.
+        self.assertEqual(backend.get('a'), b'1')
+        backend.put('c', b'3')
+        self.assertEqual(backend.get('a'), b'1')
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('c'), b'3')
+
+    def test_fallback(self):
+        import mock
+
+        fallback = mock.Mock(spec=['get', 'put'])
+        fallback.get.return_value = b'stored'
+        backend = self._make_one(fallback=fallback)
+        self.assertEqual(backend.get('a'), b'stored')
+        self.assertEqual(backend.get('a'), b'stored')
+        fallback.get.assert_called_once_with('a')
+        backend.put('b', b'new')
+        fallback.put.assert_called_once_with('b', b'new')
+        self.assertEqual(backend.get('b'), b'new')
+
+
+class Test__to_statuses(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(values):
+        from ci_diff_helper.daemon import _to_statuses
+        return _to_statuses(values)
+
+    def test_it(self):
+        from ci_diff_helper import git_tools
+
+        self.assertIsNone(self._call_function_under_test(None))
+        self.assertEqual(
+            self._call_function_under_test(['A', 'D']),
+            [git_tools.FileStatus.added, git_tools.FileStatus.deleted])
+
+
+class Test__ci_environ(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(environ):
+        from ci_diff_helper.daemon import _ci_environ
+        return _ci_environ(environ)
+
+    def test_it(self):
+        import os
+        import mock
+
+        environ = {'HOME': '/root', 'TRAVIS': 'true', 'TRAVIS_TAG': 'v1'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            with self._call_function_under_test({'CIRCLECI': 'true'}):
+                self.assertEqual(
+                    os.environ, {'HOME': '/root', 'CIRCLECI': 'true'})
+            self.assertEqual(os.environ, environ)
+
+    def test_failure(self):
+        import os
+        import mock
+
+        environ = {'TRAVIS': 'true'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            with self.assertRaises(KeyError):
+                with self._call_function_under_test({'APPVEYOR': 'True'}):
+                    os.environ['CIRCLECI'] = 'true'
+                    raise KeyError('Boom')
+            self.assertEqual(os.environ, environ)
+
+
+class TestServer(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.daemon import Server
+        return Server
+
+    def _make_one(self, path='/unused.sock', **kwargs):
+        import mock
+
+        klass = self._get_target_class()
+        with mock.patch('ci_diff_helper.change_cache._CACHE', new=None):
+            return klass(path, **kwargs)
+
+    def test_constructor(self):
+        from ci_diff_helper import daemon
+
+        server = self._make_one()
+        self.assertEqual(server.path, '/unused.sock')
+        self.assertEqual(server.idle_timeout, daemon._IDLE_TIMEOUT)
+        self.assertIsInstance(server._changes.backend, daemon._MemoryBackend)
+        self.assertIsNone(server._changes.backend.fallback)
+        self.assertIsNotNone(server._repo)
+
+    def test_constructor_fallback_backend(self):
+        import mock
+        from ci_diff_helper import change_cache
+
+        cache = change_cache.ChangeSetCache(mock.sentinel.backend)
+        klass = self._get_target_class()
+        with mock.patch('ci_diff_helper.change_cache._CACHE', new=cache):
+            server = klass('/unused.sock')
+        self.assertIs(server._changes.backend.fallback,
+                      mock.sentinel.backend)
+
+    def test_constructor_no_repo(self):
+        import mock
+
+        with mock.patch('ci_diff_helper._git_objects.Repository.discover',
+                        side_effect=NotImplementedError):
+            server = self._make_one()
+        self.assertIsNone(server._repo)
+
+    def test__state(self):
+        import os
+        import mock
+
+        server = self._make_one()
+        server._repo = mock.Mock(git_dir='/repo/.git', spec=['git_dir',
+                                                             'read_ref'])
+        server._repo.read_ref.return_value = 'abc'
+        stat_result = mock.Mock(st_mtime=10.5)
+        with mock.patch('os.stat', return_value=stat_result) as mocked:
+            self.assertEqual(server._state(), ('abc', 10.5))
+        mocked.assert_called_once_with(os.path.join('/repo/.git', 'index'))
+        server._repo.read_ref.assert_called_once_with('HEAD')
+
+        with mock.patch('os.stat', side_effect=OSError):
+            self.assertEqual(server._state(), ('abc', None))
+
+    def test__state_no_repo(self):
+        import mock
+
+        server = self._make_one()
+        server._repo = None
+        with mock.patch('ci_diff_helper._runners.SubprocessRunner.'
+                        'check_output', return_value='abc') as mocked:
+            self.assertEqual(server._state(), ('abc', None))
+        mocked.assert_called_once_with(
+            ('git', 'rev-parse', 'HEAD'), ignore_err=True)
+
+    def test__refresh(self):
+        import mock
+
+        server = self._make_one()
+        config1 = mock.Mock(spec=['invalidate'])
+        config2 = mock.Mock(spec=['invalidate'])
+        server._configs.update([((), config1), ((('A', 'B'),), config2)])
+        server._checked_in['key'] = ['a.py']
+        runner = mock.Mock(spec=['close'])
+        states = [('abc', 1.0), ('abc', 1.0), ('abc', 2.0)]
+        with mock.patch.object(server, '_state', side_effect=states):
+            with mock.patch('ci_diff_helper._utils._RUNNER', new=runner):
+                server._refresh()
+                self.assertEqual(server._checked_in, {})
+                server._checked_in['key'] = ['a.py']
+                # Nothing changed.
+                server._refresh()
+                self.assertEqual(server._checked_in, {'key': ['a.py']})
+                # The index was modified.
+                server._refresh()
+                self.assertEqual(server._checked_in, {})
+        self.assertEqual(config1.invalidate.call_count, 2)
+        self.assertEqual(config2.invalidate.call_count, 2)
+        self.assertEqual(runner.close.call_count, 2)
+
+    def test_handle_ping(self):
+        import os
+
+        server = self._make_one()
+        self.assertEqual(server.handle({'method': 'ping'}),
+                         {'result': {'pid': os.getpid()}})
+
+    def test_handle_shutdown(self):
+        server = self._make_one()
+        self.assertEqual(server.handle({'method': 'shutdown'}),
+                         {'result': None})
+        self.assertTrue(server._stopped)
+
+    def test_handle_unknown(self):
+        server = self._make_one()
+        response = server.handle({'method': 'nope'})
+        self.assertEqual(response, {
+            'error': {
+                'type': 'ValueError',
+                'args': ('Unknown method', 'nope'),
+            },
+        })
+
+    def test_handle_config(self):
+        import os
+        import mock
+
+        server = self._make_one()
+        config = mock.Mock(spec=['snapshot'])
+        patch_env = mock.patch.dict(os.environ, {'TRAVIS': 'true'},
+                                    clear=True)
+        with mock.patch.object(server, '_refresh') as refresh:
+            with mock.patch('ci_diff_helper.get_config',
+                            return_value=config) as get_config:
+                with patch_env:
+                    response1 = server.handle(
+                        {'method': 'config', 'params': {'names': ['base']}})
+                    params = {'environ': {'TRAVIS': 'true'}}
+                    response2 = server.handle(
+                        {'method': 'config', 'params': params})
+        self.assertEqual(response1, {'result': config.snapshot.return_value})
+        self.assertEqual(response2, {'result': config.snapshot.return_value})
+        get_config.assert_called_once_with()
+        self.assertEqual(config.snapshot.mock_calls,
+                         [mock.call(['base']), mock.call(())])
+        self.assertEqual(refresh.call_count, 2)
+
+    def test_handle_config_other_environ(self):
+        import os
+        import mock
+
+        def get_config():
+            return mock.Mock(spec=['snapshot'], environ=dict(os.environ))
+
+        server = self._make_one()
+        environ1 = {'TRAVIS': 'true', 'TRAVIS_PULL_REQUEST': '1'}
+        environ2 = {'TRAVIS': 'true', 'TRAVIS_PULL_REQUEST': '2'}
+        patch_env = mock.patch.dict(os.environ, {'HOME': '/root'},
+                                    clear=True)
+        with mock.patch.object(server, '_refresh'):
+            with mock.patch('ci_diff_helper.get_config', new=get_config):
+                with patch_env:
+                    for environ in (environ1, environ2, environ1):
+                        params = {'names': ['pr'], 'environ': environ}
+                        server.handle({'method': 'config', 'params': params})
+                    self.assertEqual(os.environ, {'HOME': '/root'})
+
+        self.assertEqual(len(server._configs), 2)
+        config1 = server._configs[tuple(sorted(environ1.items()))]
+        config2 = server._configs[tuple(sorted(environ2.items()))]
+        self.assertEqual(config1.environ, dict(environ1, HOME='/root'))
+        self.assertEqual(config2.environ, dict(environ2, HOME='/root'))
+        self.assertEqual(config1.snapshot.mock_calls,
+                         [mock.call(['pr']), mock.call(['pr'])])
+        config2.snapshot.assert_called_once_with(['pr'])
+
+    def test_handle_error(self):
+        import mock
+
+        server = self._make_one()
+        with mock.patch.object(server, '_refresh'):
+            with mock.patch('ci_diff_helper.get_config',
+                            side_effect=OSError(None, 'No environment')):
+                response = server.handle({'method': 'config'})
+        self.assertEqual(response, {
+            'error': {'type': 'OSError', 'args': (None, 'No environment')},
+        })
+
+    def test_handle_changed_files(self):
+        import mock
+        from ci_diff_helper import git_tools
+
+        server = self._make_one()
+        params = {
+            'blob_name1': 'HEAD',
+            'blob_name2': 'master',
+            'globs': ['*.py'],
+            'statuses': ['M'],
+        }
+        with mock.patch.object(server, '_refresh'):
+            with mock.patch.object(server._changes,
+                                   'get_changed_files') as mocked:
+                response = server.handle(
+                    {'method': 'changed_files', 'params': params})
+        self.assertEqual(response, {'result': mocked.return_value})
+        mocked.assert_called_once_with(
+            'HEAD', 'master', pathspecs=None, globs=['*.py'],
+            statuses=[git_tools.FileStatus.modified])
+
+    def test_handle_checked_in_files(self):
+        import mock
+
+        server = self._make_one()
+        request = {'method': 'checked_in_files', 'params': {'globs': ['*']}}
+        patch_files = mock.patch(
+            'ci_diff_helper.git_tools.get_checked_in_files',
+            return_value=['a.py'])
+        with mock.patch.object(server, '_refresh'):
+            with patch_files as mocked:
+                self.assertEqual(server.handle(request),
+                                 {'result': ['a.py']})
+                self.assertEqual(server.handle(request),
+                                 {'result': ['a.py']})
+        mocked.assert_called_once_with(pathspecs=None, globs=['*'])
+
+    @unittest.skipIf(_NO_UNIX_SOCKETS, 'Requires Unix domain sockets')
+    def test_serve_forever(self):
+        import os
+        import stat
+        import mock
+
+        path = _make_socket_path(self)
+        server = self._make_one(path=path)
+        patch_runner = mock.patch('ci_diff_helper._utils.set_runner')
+        patch_env = mock.patch.dict(os.environ, {}, clear=True)
+        with patch_runner as set_runner:
+            with patch_env:
+                with _RunningServer(server) as client:
+                    mode = stat.S_IMODE(os.stat(path).st_mode)
+                    self.assertEqual(mode, 0o600)
+                    self.assertEqual(client.call('ping'),
+                                     {'pid': os.getpid()})
+                    with self.assertRaises(ValueError):
+                        client.call('nope')
+                    client.shutdown()
+        self.assertFalse(os.path.exists(path))
+        # The server switched to the batch runner.
+        from ci_diff_helper import _runners
+        runner, = set_runner.call_args[0]
+        self.assertIsInstance(runner, _runners.GitBatchRunner)
+
+    @unittest.skipIf(_NO_UNIX_SOCKETS, 'Requires Unix domain sockets')
+    def test_serve_forever_idle(self):
+        import os
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        path = _make_socket_path(self)
+        server = self._make_one(path=path, idle_timeout=0.05)
+        environ = {env.GIT_BACKEND: 'subprocess'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            server.serve_forever()
+        self.assertFalse(os.path.exists(path))
+
+    @unittest.skipIf(_NO_UNIX_SOCKETS, 'Requires Unix domain sockets')
+    def test_broken_client(self):
+        import os
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        path = _make_socket_path(self)
+        server = self._make_one(path=path)
+        environ = {env.GIT_BACKEND: 'subprocess'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            with _RunningServer(server) as client:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(path)
+                sock.sendall(b'not json\n')
+                sock.close()
+                # The server is still running.
+                self.assertTrue(client.ping())
+
+    @unittest.skipIf(_NO_UNIX_SOCKETS, 'Requires Unix domain sockets')
+    def test_idle_client(self):
+        import os
+        import mock
+        from ci_diff_helper import daemon
+        from ci_diff_helper import environment_vars as env
+
+        path = _make_socket_path(self)
+        server = self._make_one(path=path, idle_timeout=0.05)
+        environ = {env.GIT_BACKEND: 'subprocess'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            with _RunningServer(server):
+                # A client which connects but never sends a request.
+                idle = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                idle.connect(path)
+                try:
+                    client = daemon.Client(path=path, timeout=5.0)
+                    self.assertEqual(
+                        client.call('ping'), {'pid': os.getpid()})
+                    # The server isn't idle while a client is connected.
+                    self.assertFalse(server._is_idle())
+                finally:
+                    idle.close()
+
+    def test__is_idle(self):
+        import mock
+
+        server = self._make_one(idle_timeout=10.0)
+        server._last_active = 100.0
+        with mock.patch('time.time', return_value=105.0):
+            self.assertFalse(server._is_idle())
+        with mock.patch('time.time', return_value=110.0):
+            self.assertTrue(server._is_idle())
+            server._connections = 1
+            self.assertFalse(server._is_idle())
+
+    @unittest.skipIf(_NO_UNIX_SOCKETS, 'Requires Unix domain sockets')
+    def test_stale_socket(self):
+        import os
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        path = _make_socket_path(self)
+        # A socket left behind by a server that exited.
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        self.assertTrue(os.path.exists(path))
+
+        server = self._make_one(path=path, idle_timeout=0.05)
+        environ = {env.GIT_BACKEND: 'subprocess'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            server.serve_forever()
+        self.assertFalse(os.path.exists(path))
+
+    @unittest.skipIf(_NO_UNIX_SOCKETS, 'Requires Unix domain sockets')
+    def test_already_running(self):
+        import os
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        path = _make_socket_path(self)
+        server = self._make_one(path=path)
+        environ = {env.GIT_BACKEND: 'subprocess'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            with _RunningServer(server):
+                with self.assertRaises(OSError):
+                    self._make_one(path=path).serve_forever()
+
+    @unittest.skipIf(_NO_UNIX_SOCKETS, 'Requires Unix domain sockets')
+    def test_bind_error(self):
+        import os
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        path = os.path.join(_make_socket_path(self), 'missing', 'x.sock')
+        server = self._make_one(path=path)
+        environ = {env.GIT_BACKEND: 'subprocess'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            with self.assertRaises(socket.error):
+                server.serve_forever()
+
+
+class TestClient(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.daemon import Client
+        return Client
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_constructor(self):
+        import mock
+        from ci_diff_helper import daemon
+
+        with mock.patch('ci_diff_helper.daemon.socket_path',
+                        return_value='/x.sock'):
+            client = self._make_one()
+        self.assertEqual(client.path, '/x.sock')
+        self.assertEqual(client.timeout, daemon._CLIENT_TIMEOUT)
+
+    def test_ping_not_running(self):
+        client = self._make_one(path=_make_socket_path(self))
+        self.assertFalse(client.ping())
+
+    def test_call_other_owner(self):
+        import os
+        import mock
+
+        path = os.path.dirname(_make_socket_path(self))
+        client = self._make_one(path=path)
+        with mock.patch('socket.socket') as mocked:
+            with mock.patch('os.getuid', return_value=os.getuid() + 1):
+                with self.assertRaises(ValueError):
+                    client.call('ping')
+        mocked.assert_not_called()
+
+    def _call_helper(self, response, method='ping', **params):
+        import mock
+
+        client = self._make_one(path='/x.sock')
+        sock = mock.Mock(spec=['settimeout', 'connect', 'makefile',
+                               'close'])
+        patch_send = mock.patch('ci_diff_helper.daemon._send')
+        patch_receive = mock.patch(
+            'ci_diff_helper.daemon._receive', return_value=response)
+        with mock.patch('socket.socket', return_value=sock):
+            with patch_send as mocked_send:
+                with patch_receive:
+                    try:
+                        return client.call(method, **params)
+                    finally:
+                        mocked_send.assert_called_once_with(
+                            sock.makefile.return_value,
+                            {'method': method, 'params': params})
+                        sock.connect.assert_called_once_with('/x.sock')
+                        sock.close.assert_called_once_with()
+
+    def test_call(self):
+        result = self._call_helper({'result': [1, 2]}, names=['a'])
+        self.assertEqual(result, [1, 2])
+
+    def test_call_closed(self):
+        with self.assertRaises(OSError):
+            self._call_helper(None)
+
+    def test_call_known_error(self):
+        error = {'type': 'KeyError', 'args': ['k']}
+        with self.assertRaises(KeyError):
+            self._call_helper({'error': error})
+
+    def test_call_unknown_error(self):
+        error = {'type': 'CalledProcessError', 'args': [128, 'git']}
+        with self.assertRaises(RuntimeError) as exc_info:
+            self._call_helper({'error': error})
+        self.assertEqual(exc_info.exception.args,
+                         ('CalledProcessError', 128, 'git'))
+
+    def _client_with_call(self, result):
+        import mock
+
+        client = self._make_one(path='/x.sock')
+        patch_call = mock.patch.object(client, 'call', return_value=result)
+        return client, patch_call
+
+    def test_shutdown(self):
+        client, patch_call = self._client_with_call(None)
+        with patch_call as mocked:
+            client.shutdown()
+        mocked.assert_called_once_with('shutdown')
+
+    def test_config(self):
+        from ci_diff_helper import _config_base
+        from ci_diff_helper import travis
+
+        snapshot = {
+            'version': _config_base._SNAPSHOT_VERSION,
+            'type': 'Travis',
+            'values': {'active': True, 'base': 'abc'},
+        }
+        client, patch_call = self._client_with_call(snapshot)
+        environ = {'HOME': '/root', 'TRAVIS': 'true'}
+        with patch_call as mocked:
+            config = client.config(iter(['base']), environ=environ)
+        mocked.assert_called_once_with(
+            'config', names=['base'], environ={'TRAVIS': 'true'})
+        self.assertIsInstance(config, travis.Travis)
+        self.assertEqual(config.base, 'abc')
+
+    def test_changed_files(self):
+        from ci_diff_helper import git_tools
+
+        client, patch_call = self._client_with_call(['a.py'])
+        with patch_call as mocked:
+            result = client.changed_files(
+                'HEAD', 'master', pathspecs=('docs',), globs=('*.py',),
+                statuses=[git_tools.FileStatus.added])
+        self.assertEqual(result, ['a.py'])
+        mocked.assert_called_once_with(
+            'changed_files', blob_name1='HEAD', blob_name2='master',
+            pathspecs=['docs'], globs=['*.py'], statuses=['A'])
+
+    def test_changed_files_defaults(self):
+        client, patch_call = self._client_with_call([])
+        with patch_call as mocked:
+            client.changed_files('HEAD', 'master')
+        mocked.assert_called_once_with(
+            'changed_files', blob_name1='HEAD', blob_name2='master',
+            pathspecs=None, globs=None, statuses=None)
+
+    def test_checked_in_files(self):
+        client, patch_call = self._client_with_call(['a.py'])
+        with patch_call as mocked:
+            self.assertEqual(client.checked_in_files(), ['a.py'])
+            client.checked_in_files(pathspecs=('a',), globs=('*.py',))
+        self.assertEqual(mocked.call_args_list[0][1],
+                         {'pathspecs': None, 'globs': None})
+        self.assertEqual(mocked.call_args_list[1][1],
+                         {'pathspecs': ['a'], 'globs': ['*.py']})
+
+    @unittest.skipIf(_NO_UNIX_SOCKETS, 'Requires Unix domain sockets')
+    def test_against_server(self):
+        import os
+        import mock
+        from ci_diff_helper import daemon
+        from ci_diff_helper import environment_vars as env
+
+        path = _make_socket_path(self)
+        with mock.patch('ci_diff_helper.change_cache._CACHE', new=None):
+            server = daemon.Server(path)
+        patch_files = mock.patch(
+            'ci_diff_helper.git_tools.get_checked_in_files',
+            return_value=['setup.py'])
+        environ = dict(os.environ)
+        environ[env.GIT_BACKEND] = 'subprocess'
+        with mock.patch.dict(os.environ, environ, clear=True):
+            with patch_files as mocked:
+                with _RunningServer(server):
+                    client = self._make_one(path=path)
+                    # Several requests, each on a new connection.
+                    for _ in range(3):
+                        self.assertEqual(client.checked_in_files(),
+                                         ['setup.py'])
+        mocked.assert_called_once_with(pathspecs=None, globs=None)
+
+
+class Test_start(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(path=None, idle_timeout=None):
+        from ci_diff_helper.daemon import start
+        return start(path=path, idle_timeout=idle_timeout)
+
+    def test_already_running(self):
+        import mock
+
+        patch_ping = mock.patch(
+            'ci_diff_helper.daemon.Client.ping', return_value=True)
+        with patch_ping:
+            with mock.patch('subprocess.Popen') as popen:
+                client = self._call_function_under_test(path='/x.sock')
+        self.assertEqual(client.path, '/x.sock')
+        popen.assert_not_called()
+
+    def test_spawn(self):
+        import sys
+        import mock
+
+        patch_ping = mock.patch(
+            'ci_diff_helper.daemon.Client.ping',
+            side_effect=[False, False, True])
+        patch_root = mock.patch(
+            'ci_diff_helper.daemon._repo_root', return_value='/repo')
+        with patch_ping:
+            with patch_root:
+                with mock.patch('time.sleep') as sleep:
+                    with mock.patch('subprocess.Popen') as popen:
+                        client = self._call_function_under_test(
+                            path='/x.sock', idle_timeout=5.0)
+        self.assertEqual(client.path, '/x.sock')
+        sleep.assert_called_once_with(0.05)
+        args, kwargs = popen.call_args
+        self.assertEqual(args, ([
+            sys.executable, '-m', 'ci_diff_helper.daemon', '--socket',
+            '/x.sock', 'serve', '--idle-timeout', '5.0'],))
+        self.assertEqual(kwargs['cwd'], '/repo')
+
+    def test_timeout(self):
+        import mock
+
+        patch_ping = mock.patch(
+            'ci_diff_helper.daemon.Client.ping', return_value=False)
+        patch_root = mock.patch(
+            'ci_diff_helper.daemon._repo_root', return_value='/repo')
+        patch_idle = mock.patch(
+            'ci_diff_helper.daemon._idle_timeout', return_value=1.0)
+        patch_time = mock.patch('time.time', side_effect=[0.0, 100.0])
+        with patch_ping:
+            with patch_root:
+                with patch_idle:
+                    with patch_time:
+                        with mock.patch('subprocess.Popen') as popen:
+                            with self.assertRaises(OSError):
+                                self._call_function_under_test(
+                                    path='/x.sock')
+        self.assertIn('1.0', popen.call_args[0][0])
+
+
+class Test_main(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(argv):
+        from ci_diff_helper.daemon import main
+        return main(argv)
+
+    def _helper(self, argv):
+        import mock
+        import six
+
+        stdout = six.StringIO()
+        stderr = six.StringIO()
+        with mock.patch('sys.stdout', new=stdout):
+            with mock.patch('sys.stderr', new=stderr):
+                status = self._call_function_under_test(argv)
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_serve(self):
+        import mock
+
+        patch_server = mock.patch('ci_diff_helper.daemon.Server')
+        patch_path = mock.patch(
+            'ci_diff_helper.daemon.socket_path', return_value='/x.sock')
+        patch_idle = mock.patch(
+            'ci_diff_helper.daemon._idle_timeout', return_value=60.0)
+        with patch_server as server_class:
+            with patch_path:
+                with patch_idle:
+                    self.assertEqual(self._helper(['serve']), (0, '', ''))
+                    self.assertEqual(
+                        self._helper(['--socket', '/y.sock', 'serve',
+                                      '--idle-timeout', '2']),
+                        (0, '', ''))
+        self.assertEqual(server_class.mock_calls, [
+            mock.call('/x.sock', idle_timeout=60.0),
+            mock.call().serve_forever(),
+            mock.call('/y.sock', idle_timeout=2.0),
+            mock.call().serve_forever(),
+        ])
+
+    def test_start(self):
+        import mock
+
+        client = mock.Mock(path='/x.sock', spec=['path'])
+        with mock.patch('ci_diff_helper.daemon.start',
+                        return_value=client) as mocked:
+            self.assertEqual(self._helper(['start']), (0, '/x.sock\n', ''))
+        mocked.assert_called_once_with(path=None, idle_timeout=None)
+
+    def test_stop(self):
+        import mock
+
+        with mock.patch('ci_diff_helper.daemon.Client') as client_class:
+            self.assertEqual(
+                self._helper(['--socket', '/x.sock', 'stop']), (0, '', ''))
+        client_class.assert_called_once_with(path='/x.sock')
+        client_class.return_value.shutdown.assert_called_once_with()
+
+    def test_config(self):
+        import os
+        import mock
+
+        snapshot = {'values': {'active': True, 'base': 'abc', 'tag': None}}
+        patch_env = mock.patch.dict(
+            os.environ, {'HOME': '/root', 'CIRCLECI': 'true'}, clear=True)
+        patch_client = mock.patch('ci_diff_helper.daemon.Client')
+        with patch_env:
+            with patch_client as client_class:
+                client_class.return_value.call.return_value = snapshot
+                status, stdout, _ = self._helper(['config', 'base', 'tag'])
+                self.assertEqual(status, 0)
+                self.assertEqual(stdout, '{"base": "abc", "tag": null}\n')
+                status, stdout, _ = self._helper(['config'])
+                self.assertEqual(
+                    stdout, '{"active": true, "base": "abc", "tag": null}\n')
+        client_class.return_value.call.assert_called_with(
+            'config', names=[], environ={'CIRCLECI': 'true'})
+
+    def test_changed_files(self):
+        import mock
+
+        with mock.patch('ci_diff_helper.daemon.Client') as client_class:
+            client = client_class.return_value
+            client.changed_files.return_value = ['a.py', 'b.py']
+            status, stdout, _ = self._helper(
+                ['changed-files', 'HEAD', 'master', '--glob', '*.py'])
+        self.assertEqual((status, stdout), (0, 'a.py\nb.py\n'))
+        client.changed_files.assert_called_once_with(
+            'HEAD', 'master', pathspecs=None, globs=['*.py'])
+
+    def test_checked_in_files(self):
+        import mock
+
+        with mock.patch('ci_diff_helper.daemon.Client') as client_class:
+            client = client_class.return_value
+            client.checked_in_files.return_value = ['a.py']
+            status, stdout, _ = self._helper(
+                ['checked-in-files', '--pathspec', 'docs'])
+        self.assertEqual((status, stdout), (0, 'a.py\n'))
+        client.checked_in_files.assert_called_once_with(
+            pathspecs=['docs'], globs=None)
+
+    def test_error(self):
+        import mock
+
+        with mock.patch('ci_diff_helper.daemon.Client') as client_class:
+            client_class.return_value.shutdown.side_effect = ValueError('x')
+            status, stdout, stderr = self._helper(['stop'])
+        self.assertEqual((status, stdout), (1, ''))
+        self.assertIn('ValueError', stderr)
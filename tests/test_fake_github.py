@@ -0,0 +1,186 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from tests import fake_github
+
+
+class TestFakeGitHub(unittest.TestCase):
+    """Exercise the real ``_github`` client against the fake server."""
+
+    @staticmethod
+    def _make_one(**kwargs):
+        return fake_github.FakeGitHub(**kwargs)
+
+    def test_compare_merge_base(self):
+        from ci_diff_helper import _github
+
+        with self._make_one(merge_base='abc') as server:
+            sha = _github.compare_merge_base('a/b', 'start', 'finish')
+        self.assertEqual(sha, 'abc')
+        self.assertEqual(server.requests, [
+            '/repos/a/b/compare/start...finish?per_page=1',
+        ])
+
+    def test_connection_reuse(self):
+        from ci_diff_helper import _github
+
+        with self._make_one() as server:
+            for _ in range(5):
+                _github.commit_compare('a/b', 'start', 'finish')
+        self.assertEqual(len(server.requests), 5)
+        self.assertEqual(server.connections, 1)
+
+    def test_compare_files(self):
+        from ci_diff_helper import _github
+
+        files = ['f{:03d}.py'.format(index) for index in range(250)]
+        with self._make_one(files=files, num_commits=120) as server:
+            result = list(_github.iter_compare_files('a/b', 'a', 'b'))
+        self.assertEqual(result, files)
+        # The files are all on the first page.
+        self.assertEqual(server.requests, [
+            '/repos/a/b/compare/a...b?per_page=1',
+        ])
+
+    def test_compare_later_pages(self):
+        with self._make_one(num_commits=3) as server:
+            session = server.make_session()
+            url = 'https://api.github.com/repos/a/b/compare/a...b'
+            page1 = session.get(url, params={'per_page': 2})
+            page2 = session.get(page1.links['next']['url'])
+            session.close()
+        self.assertEqual(len(page1.json()['commits']), 2)
+        self.assertEqual(page1.json()['files'][0]['filename'], 'setup.py')
+        self.assertEqual(len(page2.json()['commits']), 1)
+        self.assertEqual(page2.json()['files'], [])
+        self.assertNotIn('next', page2.links)
+
+    def test_pull_request(self):
+        from ci_diff_helper import _github
+
+        with self._make_one() as server:
+            server.add_pull_request(5, 'base', 'head', files=['a.py', 'b.py'])
+            info = _github.pr_info('a/b', 5)
+            files = list(_github.iter_pr_files('a/b', 5, per_page=1))
+        self.assertEqual(info['base']['sha'], 'base')
+        self.assertNotIn('_files', info)
+        self.assertEqual(files, ['a.py', 'b.py'])
+        self.assertEqual(len(server.requests), 3)
+
+    def test_not_found(self):
+        import mock
+        import requests
+        from ci_diff_helper import _github
+
+        with self._make_one():
+            with mock.patch('ci_diff_helper._github._rate_limit_info'):
+                with self.assertRaises(requests.exceptions.HTTPError):
+                    _github.pr_info('a/b', 404)
+
+    def test_retry_injected_errors(self):
+        import mock
+        from six.moves import http_client
+        from ci_diff_helper import _github
+        from ci_diff_helper import _rate_limit
+
+        sleep = mock.Mock()
+        with self._make_one(merge_base='abc') as server:
+            _github.set_scheduler(_rate_limit.Scheduler(sleep=sleep))
+            server.inject_errors(http_client.SERVICE_UNAVAILABLE, count=2)
+            sha = _github.compare_merge_base('a/b', 'start', 'finish')
+        self.assertEqual(sha, 'abc')
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_retry_reuses_connection(self):
+        import mock
+        from six.moves import http_client
+        from ci_diff_helper import _github
+        from ci_diff_helper import _rate_limit
+
+        with self._make_one() as server:
+            _github.set_scheduler(
+                _rate_limit.Scheduler(sleep=mock.Mock()))
+            for _ in range(3):
+                server.inject_errors(http_client.BAD_GATEWAY)
+                list(_github.iter_compare_files('a/b', 'start', 'finish'))
+        self.assertEqual(len(server.requests), 6)
+        self.assertEqual(server.connections, 1)
+
+    def test_retry_after(self):
+        import mock
+        from ci_diff_helper import _github
+        from ci_diff_helper import _rate_limit
+
+        sleep = mock.Mock()
+        with self._make_one() as server:
+            _github.set_scheduler(_rate_limit.Scheduler(sleep=sleep))
+            server.inject_errors(429, retry_after=2)
+            _github.commit_compare('a/b', 'start', 'finish')
+        sleep.assert_called_once_with(2.0)
+        self.assertEqual(len(server.requests), 2)
+
+    def test_rate_limit_exhausted(self):
+        import mock
+        import requests
+        from ci_diff_helper import _github
+        from ci_diff_helper import _rate_limit
+
+        with self._make_one(rate_limit=2) as server:
+            # Don't wait for the window to reset.
+            _github.set_scheduler(_rate_limit.Scheduler(deadline=0.0))
+            _github.commit_compare('a/b', 'start', 'finish')
+            scheduler = _github.get_scheduler()
+            self.assertEqual(scheduler.remaining, 1)
+            server.exhaust()
+            with mock.patch('ci_diff_helper._github._rate_limit_info'):
+                with self.assertRaises(requests.exceptions.HTTPError):
+                    _github.commit_compare('a/b', 'start', 'finish')
+            self.assertEqual(scheduler.remaining, 0)
+
+    def test_rate_limit_window_reset(self):
+        import time
+        from ci_diff_helper import _github
+
+        with self._make_one(rate_limit=1, reset_after=0.0) as server:
+            _github.commit_compare('a/b', 'start', 'finish')
+            _github.commit_compare('a/b', 'start', 'finish')
+            self.assertLessEqual(
+                int(_github.get_scheduler().reset), int(time.time()))
+        self.assertEqual(len(server.requests), 2)
+
+    def test_latency(self):
+        import time
+        from ci_diff_helper import _github
+
+        with self._make_one(latency=0.05):
+            start = time.time()
+            _github.commit_compare('a/b', 'start', 'finish')
+            self.assertGreaterEqual(time.time() - start, 0.05)
+
+    def test_restores_state(self):
+        import mock
+        from ci_diff_helper import _github
+
+        with mock.patch.multiple('ci_diff_helper._github',
+                                 _SESSION=mock.sentinel.session,
+                                 _CACHE=mock.sentinel.cache,
+                                 _SCHEDULER=mock.sentinel.scheduler):
+            with self._make_one():
+                self.assertIsNot(_github.get_session(),
+                                 mock.sentinel.session)
+                self.assertIsNone(_github.get_cache())
+            self.assertIs(_github.get_session(), mock.sentinel.session)
+            self.assertIs(_github.get_cache(), mock.sentinel.cache)
+            self.assertIs(_github.get_scheduler(), mock.sentinel.scheduler)
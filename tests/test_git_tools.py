@@ -41,6 +41,141 @@ class Test_git_root(unittest.TestCase):
         self.assertEqual(result, root_dir)
 
 
+class Test__pathspec_args(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(pathspecs, globs):
+        from ci_diff_helper.git_tools import _pathspec_args
+        return _pathspec_args(pathspecs, globs)
+
+    def test_empty(self):
+        self.assertEqual(self._call_function_under_test(None, None), [])
+        self.assertEqual(self._call_function_under_test([], ()), [])
+
+    def test_it(self):
+        result = self._call_function_under_test(
+            ['a', ':(exclude)b'], ['**/*.py'])
+        self.assertEqual(
+            result, ['--', 'a', ':(exclude)b', ':(top,glob)**/*.py'])
+
+
+class Test__diff_filter(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(statuses):
+        from ci_diff_helper.git_tools import _diff_filter
+        return _diff_filter(statuses)
+
+    def test_none(self):
+        self.assertIsNone(self._call_function_under_test(None))
+
+    def test_empty(self):
+        self.assertEqual(self._call_function_under_test(()), '')
+
+    def test_it(self):
+        from ci_diff_helper.git_tools import FileStatus
+
+        result = self._call_function_under_test(
+            [FileStatus.renamed, FileStatus.added, FileStatus.modified])
+        self.assertEqual(result, '--diff-filter=AMR')
+
+
+class Test_changed_files_command(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args, **kwargs):
+        from ci_diff_helper.git_tools import changed_files_command
+        return changed_files_command(*args, **kwargs)
+
+    def test_defaults(self):
+        self.assertEqual(self._call_function_under_test('a', 'b'),
+                         ['git', 'diff', '--name-only', 'a', 'b'])
+
+    def test_all_options(self):
+        from ci_diff_helper import git_tools
+
+        result = self._call_function_under_test(
+            'a', 'b', pathspecs=['docs'], globs=['*.py'],
+            statuses=[git_tools.FileStatus.added], nul_delimited=True)
+        self.assertEqual(result, [
+            'git', 'diff', '--name-only', '-z', '--diff-filter=A', 'a', 'b',
+            '--', 'docs', ':(top,glob)*.py',
+        ])
+
+    def test_no_statuses(self):
+        self.assertIsNone(
+            self._call_function_under_test('a', 'b', statuses=()))
+
+
+class Test_checked_in_files_command(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(**kwargs):
+        from ci_diff_helper.git_tools import checked_in_files_command
+        return checked_in_files_command(**kwargs)
+
+    def test_root(self):
+        self.assertIsNone(self._call_function_under_test())
+        self.assertEqual(self._call_function_under_test(root='/repo'),
+                         ['git', 'ls-files', '/repo'])
+        self.assertEqual(
+            self._call_function_under_test(root='/repo', nul_delimited=True),
+            ['git', 'ls-files', '-z', '/repo'])
+
+    def test_pathspecs(self):
+        result = self._call_function_under_test(
+            pathspecs=['docs'], globs=['*.py'], root='/repo')
+        self.assertEqual(
+            result, ['git', 'ls-files', '--', 'docs', ':(top,glob)*.py'])
+
+
+class Test_parse_files(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(cmd_output, **kwargs):
+        from ci_diff_helper.git_tools import parse_files
+        return parse_files(cmd_output, **kwargs)
+
+    def test_empty(self):
+        self.assertEqual(self._call_function_under_test(None), [])
+        self.assertEqual(self._call_function_under_test(''), [])
+
+    def test_relative(self):
+        self.assertEqual(self._call_function_under_test('a.py\nb/c.py'),
+                         ['a.py', 'b/c.py'])
+
+    def test_absolute(self):
+        result = self._call_function_under_test('a.py', absolute=True)
+        self.assertEqual(result, [os.path.abspath('a.py')])
+
+
+class Test_read_index(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.git_tools import read_index
+        return read_index()
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_it(self):
+        from ci_diff_helper import _git_index
+
+        with utils.TempRepo() as temp_repo:
+            temp_repo.commit('Initial.', **{'a.py': 'a', 'b/c.txt': 'c'})
+            index = self._call_function_under_test()
+            self.assertIsInstance(index, _git_index.GitIndex)
+            self.assertEqual(len(index), 2)
+            self.assertEqual(list(index.iter_paths()), ['a.py', 'b/c.txt'])
+            index.close()
+
+    def test_env_var(self):
+        import mock
+
+        with mock.patch('os.environ', new={'GIT_INDEX_FILE': 'other'}):
+            with self.assertRaises(NotImplementedError):
+                self._call_function_under_test()
+
+
 class Test_get_checked_in_files(unittest.TestCase):
 
     @staticmethod
@@ -95,6 +230,146 @@ class Test_get_checked_in_files(unittest.TestCase):
         root_dir = os.path.abspath(os.path.join(tests_dir, '..'))
         self.assertLessEqual(set(result), self._all_files(root_dir))
 
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_python_backend(self):
+        import mock
+        from ci_diff_helper import _runners
+
+        runner = _runners.PythonGitRunner()
+        with utils.TempRepo() as temp_repo:
+            temp_repo.commit('Initial.', **{'a.py': 'a', 'b/c.txt': 'c'})
+            with utils.TempRepo.chdir(os.path.join(temp_repo.path, 'b')):
+                expected = self._call_function_under_test()
+                with mock.patch('ci_diff_helper._utils._RUNNER',
+                                new=runner):
+                    with mock.patch('subprocess.Popen') as mocked:
+                        result = self._call_function_under_test()
+                        mocked.assert_not_called()
+            runner.close()
+        self.assertEqual(result, expected)
+        self.assertEqual(result, [
+            os.path.join(temp_repo.path, 'a.py'),
+            os.path.join(temp_repo.path, 'b', 'c.txt'),
+        ])
+
+    def test_as_table(self):
+        import mock
+        from ci_diff_helper import paths
+
+        git_root = os.path.join('totally', 'on', 'your', 'filesystem')
+        mock_root = mock.patch('ci_diff_helper.git_tools.git_root',
+                               return_value=git_root)
+        filenames = ['a.py', os.path.join('b', 'c.py')]
+        mock_iter = mock.patch('ci_diff_helper._utils.iter_output',
+                               return_value=iter(filenames))
+        mock_abspath = mock.patch('os.path.abspath', new=self._do_nothing)
+        with mock_abspath:
+            with mock_root:
+                with mock_iter as mocked:
+                    from ci_diff_helper import git_tools
+                    result = git_tools.get_checked_in_files(as_table=True)
+                    mocked.assert_called_once_with(
+                        'git', 'ls-files', '-z', git_root)
+        self.assertIsInstance(result, paths.PathTable)
+        self.assertEqual(list(result), filenames)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_python_backend_as_table(self):
+        import mock
+        from ci_diff_helper import _runners
+        from ci_diff_helper import git_tools
+        from ci_diff_helper import paths
+
+        runner = _runners.PythonGitRunner()
+        with utils.TempRepo() as temp_repo:
+            temp_repo.commit('Initial.', **{'a.py': 'a', 'b/c.txt': 'c'})
+            expected = git_tools.get_checked_in_files(as_table=True)
+            with mock.patch('ci_diff_helper._utils._RUNNER', new=runner):
+                result = git_tools.get_checked_in_files(as_table=True)
+            runner.close()
+        self.assertIsInstance(result, paths.PathTable)
+        self.assertEqual(list(result), list(expected))
+
+    def test_pathspecs(self):
+        import mock
+
+        mock_output = mock.patch('ci_diff_helper._utils.check_output',
+                                 return_value='a.py\nb/c.py')
+        mock_root = mock.patch('ci_diff_helper.git_tools.git_root')
+        mock_abspath = mock.patch('os.path.abspath', new=self._do_nothing)
+        with mock_abspath:
+            with mock_root as mocked_root:
+                with mock_output as mocked:
+                    from ci_diff_helper import git_tools
+                    result = git_tools.get_checked_in_files(
+                        pathspecs=['b'], globs=['**/*.py'])
+                    mocked.assert_called_once_with(
+                        'git', 'ls-files', '--', 'b', ':(top,glob)**/*.py')
+                mocked_root.assert_not_called()
+        self.assertEqual(result, ['a.py', 'b/c.py'])
+
+    def test_pathspecs_no_match(self):
+        import mock
+
+        mock_output = mock.patch('ci_diff_helper._utils.check_output',
+                                 return_value='')
+        with mock_output:
+            from ci_diff_helper import git_tools
+            result = git_tools.get_checked_in_files(globs=['*.nope'])
+        self.assertEqual(result, [])
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_globs_actual_call(self):
+        import mock
+        from ci_diff_helper import _runners
+        from ci_diff_helper import git_tools
+
+        runner = _runners.PythonGitRunner()
+        with utils.TempRepo() as temp_repo:
+            temp_repo.commit('Initial.', **{
+                'a.py': 'a',
+                'b/c.py': 'c',
+                'b/d.txt': 'd',
+            })
+            with utils.TempRepo.chdir(os.path.join(temp_repo.path, 'b')):
+                # Pathspecs are never answered from the index.
+                with mock.patch('ci_diff_helper._utils._RUNNER',
+                                new=runner):
+                    result = git_tools.get_checked_in_files(
+                        globs=['**/*.py'])
+                    local_result = git_tools.get_checked_in_files(
+                        pathspecs=['*.txt'], as_table=True)
+            runner.close()
+        self.assertEqual(result, [
+            os.path.join(temp_repo.path, 'a.py'),
+            os.path.join(temp_repo.path, 'b', 'c.py'),
+        ])
+        self.assertEqual(list(local_result),
+                         [os.path.join(temp_repo.path, 'b', 'd.txt')])
+
+    def test_python_backend_fallback(self):
+        import mock
+        from ci_diff_helper import _runners
+
+        runner = _runners.PythonGitRunner()
+        repo = mock.Mock(work_tree=None, git_dir='/x.git',
+                         spec=['work_tree', 'git_dir'])
+        runner._repos[os.getcwd()] = repo
+        git_root = os.path.join('totally', 'on', 'your', 'filesystem')
+        mock_root = mock.patch('ci_diff_helper.git_tools.git_root',
+                               return_value=git_root)
+        mock_output = mock.patch('ci_diff_helper._utils.check_output',
+                                 return_value='a.py')
+        mock_abspath = mock.patch('os.path.abspath', new=self._do_nothing)
+        with mock.patch('ci_diff_helper._utils._RUNNER', new=runner):
+            with mock_abspath:
+                with mock_root:
+                    with mock_output as mocked:
+                        result = self._call_function_under_test()
+                        mocked.assert_called_once_with(
+                            'git', 'ls-files', git_root)
+        self.assertEqual(result, ['a.py'])
+
 
 class Test_get_changed_files(unittest.TestCase):
 
@@ -124,6 +399,51 @@ class Test_get_changed_files(unittest.TestCase):
         expected = ['foo.py', os.path.join('bar', 'baz.txt')]
         self._helper('\n'.join(expected), expected)
 
+    def test_filters(self):
+        import mock
+        from ci_diff_helper.git_tools import FileStatus
+
+        output_patch = mock.patch('ci_diff_helper._utils.check_output',
+                                  return_value='foo.py')
+        with output_patch as mocked:
+            from ci_diff_helper import git_tools
+            result = git_tools.get_changed_files(
+                'HEAD', 'master', pathspecs=['src'], globs=['*.py'],
+                statuses=[FileStatus.modified, FileStatus.added])
+            mocked.assert_called_once_with(
+                'git', 'diff', '--name-only', '--diff-filter=AM',
+                'HEAD', 'master', '--', 'src', ':(top,glob)*.py')
+        self.assertEqual(result, ['foo.py'])
+
+    def test_no_statuses(self):
+        import mock
+
+        output_patch = mock.patch('ci_diff_helper._utils.check_output')
+        with output_patch as mocked:
+            from ci_diff_helper import git_tools
+            result = git_tools.get_changed_files(
+                'HEAD', 'master', statuses=())
+            mocked.assert_not_called()
+        self.assertEqual(result, [])
+
+    def test_as_table(self):
+        import mock
+        from ci_diff_helper import paths
+
+        filenames = ['foo.py', 'bar/baz.txt', 'bar/quux.py']
+        iter_patch = mock.patch(
+            'ci_diff_helper.git_tools.iter_changed_files',
+            return_value=iter(filenames))
+        with iter_patch as mocked:
+            from ci_diff_helper import git_tools
+            result = git_tools.get_changed_files('HEAD', 'master',
+                                                 as_table=True)
+            mocked.assert_called_once_with(
+                'HEAD', 'master', pathspecs=None, globs=None, statuses=None)
+        self.assertIsInstance(result, paths.PathTable)
+        self.assertEqual(result.sep, '/')
+        self.assertEqual(list(result), filenames)
+
     @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
     def test_actual_call_same(self):
         blob_name1 = '7575455ec442498f3d1c5b2a8d3bc7861918d987'
@@ -160,6 +480,423 @@ class Test_get_changed_files(unittest.TestCase):
         self.assertEqual(result, expected)
 
 
+class Test_iter_changed_files(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(blob_name1, blob_name2):
+        from ci_diff_helper import git_tools
+
+        return git_tools.iter_changed_files(blob_name1, blob_name2)
+
+    def test_it(self):
+        import mock
+
+        blob_name1 = 'HEAD'
+        blob_name2 = '031cf739bc419eb2c320f8c897b03c04796943a9'
+        output_patch = mock.patch('ci_diff_helper._utils.iter_output')
+        with output_patch as mocked:
+            result = self._call_function_under_test(blob_name1, blob_name2)
+            self.assertIs(result, mocked.return_value)
+            mocked.assert_called_once_with(
+                'git', 'diff', '--name-only', '-z', blob_name1, blob_name2)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call_same(self):
+        result = self._call_function_under_test('HEAD', 'HEAD')
+        self.assertEqual(list(result), [])
+
+    def test_filters(self):
+        import mock
+        from ci_diff_helper import git_tools
+
+        output_patch = mock.patch('ci_diff_helper._utils.iter_output')
+        with output_patch as mocked:
+            result = git_tools.iter_changed_files(
+                'HEAD', 'master', globs=['docs/**'],
+                statuses=[git_tools.FileStatus.deleted])
+            self.assertIs(result, mocked.return_value)
+            mocked.assert_called_once_with(
+                'git', 'diff', '--name-only', '-z', '--diff-filter=D',
+                'HEAD', 'master', '--', ':(top,glob)docs/**')
+
+    def test_no_statuses(self):
+        import mock
+        from ci_diff_helper import git_tools
+
+        output_patch = mock.patch('ci_diff_helper._utils.iter_output')
+        with output_patch as mocked:
+            result = git_tools.iter_changed_files(
+                'HEAD', 'master', statuses=[])
+            self.assertEqual(list(result), [])
+            mocked.assert_not_called()
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_filters_actual_call(self):
+        from ci_diff_helper import git_tools
+
+        with utils.TempRepo() as temp_repo:
+            temp_repo.commit('Initial.', **{
+                'a.py': 'a', 'b/c.py': 'c', 'd.txt': 'd'})
+            temp_repo.write('a.py', 'changed')
+            temp_repo.git('rm', '--quiet', 'b/c.py')
+            temp_repo.commit('Second.', **{'b/e.py': 'e', 'f.txt': 'f'})
+            result = list(git_tools.iter_changed_files(
+                'HEAD~1', 'HEAD', globs=['**/*.py'],
+                statuses=[git_tools.FileStatus.added,
+                          git_tools.FileStatus.modified]))
+        self.assertEqual(result, ['a.py', 'b/e.py'])
+
+
+class TestFileStatus(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import git_tools
+        return git_tools.FileStatus
+
+    def test_members(self):
+        klass = self._get_target_class()
+        self.assertEqual(
+            set([enum_val.value for enum_val in klass]),
+            set('ACDMRTUX'))
+
+
+class TestFileChange(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import git_tools
+        return git_tools.FileChange
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_constructor_defaults(self):
+        from ci_diff_helper import git_tools
+
+        change = self._make_one(git_tools.FileStatus.modified, 'a', 'a')
+        self.assertIs(change.status, git_tools.FileStatus.modified)
+        self.assertEqual(change.old_path, 'a')
+        self.assertEqual(change.new_path, 'a')
+        self.assertIsNone(change.old_mode)
+        self.assertIsNone(change.new_mode)
+        self.assertIsNone(change.old_sha)
+        self.assertIsNone(change.new_sha)
+        self.assertIsNone(change.score)
+
+    def test_slots(self):
+        from ci_diff_helper import git_tools
+
+        change = self._make_one(git_tools.FileStatus.added, None, 'a')
+        with self.assertRaises(AttributeError):
+            change.extra = 1
+
+    def test_path(self):
+        from ci_diff_helper import git_tools
+
+        added = self._make_one(git_tools.FileStatus.added, None, 'a')
+        self.assertEqual(added.path, 'a')
+        deleted = self._make_one(git_tools.FileStatus.deleted, 'b', None)
+        self.assertEqual(deleted.path, 'b')
+
+    def test_equality(self):
+        from ci_diff_helper import git_tools
+
+        status = git_tools.FileStatus.renamed
+        change1 = self._make_one(status, 'a', 'b', score=90)
+        change2 = self._make_one(status, 'a', 'b', score=90)
+        change3 = self._make_one(status, 'a', 'b', score=91)
+        self.assertEqual(change1, change2)
+        self.assertNotEqual(change1, change3)
+        self.assertNotEqual(change1, object())
+
+    def test___repr__(self):
+        from ci_diff_helper import git_tools
+
+        change = self._make_one(git_tools.FileStatus.renamed, 'a', 'b')
+        self.assertEqual(repr(change), "<FileChange R 'a' -> 'b'>")
+
+
+class Test_get_changes(unittest.TestCase):
+
+    SHA1 = 'fd5cffa5d437607159ceeda68895b9b53f23a531'
+    SHA2 = '47ebd0bb461180dcab674b3beca5ec9c11a1b976'
+    NULL_SHA = '0' * 40
+
+    @staticmethod
+    def _call_function_under_test(*args, **kwargs):
+        from ci_diff_helper.git_tools import get_changes
+        return get_changes(*args, **kwargs)
+
+    def _helper(self, records, expected_args, **kwargs):
+        import mock
+
+        output_patch = mock.patch('ci_diff_helper._utils.iter_output',
+                                  return_value=iter(records))
+        with output_patch as mocked:
+            result = self._call_function_under_test(
+                'HEAD', 'master', **kwargs)
+            mocked.assert_called_once_with(*expected_args)
+        return result
+
+    def test_all_statuses(self):
+        from ci_diff_helper.git_tools import FileChange
+        from ci_diff_helper.git_tools import FileStatus
+
+        records = [
+            ':100644 100644 {} {} M'.format(self.SHA1, self.SHA2),
+            'a.py',
+            ':000000 100755 {} {} A'.format(self.NULL_SHA, self.SHA2),
+            u'b\xe9.sh',
+            ':100644 000000 {} {} D'.format(self.SHA1, self.NULL_SHA),
+            'c.txt',
+            ':100644 100644 {} {} R086'.format(self.SHA1, self.SHA2),
+            'old/d.py',
+            'new/d.py',
+        ]
+        expected_args = (
+            'git', 'diff', '--raw', '-z', '-M', '--no-abbrev',
+            'HEAD', 'master')
+        result = self._helper(records, expected_args)
+        expected = [
+            FileChange(FileStatus.modified, 'a.py', 'a.py',
+                       old_mode=0o100644, new_mode=0o100644,
+                       old_sha=self.SHA1, new_sha=self.SHA2),
+            FileChange(FileStatus.added, None, u'b\xe9.sh',
+                       new_mode=0o100755, new_sha=self.SHA2),
+            FileChange(FileStatus.deleted, 'c.txt', None,
+                       old_mode=0o100644, old_sha=self.SHA1),
+            FileChange(FileStatus.renamed, 'old/d.py', 'new/d.py',
+                       old_mode=0o100644, new_mode=0o100644,
+                       old_sha=self.SHA1, new_sha=self.SHA2, score=86),
+        ]
+        self.assertEqual(result, expected)
+
+    def test_statuses(self):
+        from ci_diff_helper.git_tools import FileStatus
+
+        statuses = [FileStatus.modified, FileStatus.added]
+        expected_args = (
+            'git', 'diff', '--raw', '-z', '-M', '--no-abbrev',
+            '--diff-filter=AM', 'HEAD', 'master')
+        result = self._helper([], expected_args, statuses=statuses)
+        self.assertEqual(result, [])
+
+    def test_no_statuses(self):
+        import mock
+
+        with mock.patch('ci_diff_helper._utils.iter_output') as mocked:
+            result = self._call_function_under_test(
+                'HEAD', 'master', statuses=())
+            mocked.assert_not_called()
+        self.assertEqual(result, [])
+
+    def test_bad_record(self):
+        import mock
+
+        output_patch = mock.patch('ci_diff_helper._utils.iter_output',
+                                  return_value=iter(['not-raw', 'a.py']))
+        with output_patch:
+            with self.assertRaises(ValueError):
+                self._call_function_under_test('HEAD', 'master')
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call_same(self):
+        result = self._call_function_under_test('HEAD', 'HEAD')
+        self.assertEqual(result, [])
+
+
+def _commit_record(sha, parents=(), subject='Subject.'):
+    tree = '9c1d5b2d41c8ad3a3d2e5d1fb6d1e0b8e94bbf46'
+    fields = (sha, tree, ' '.join(parents), '1475953149', '1475953150',
+              subject)
+    return '\n'.join(fields) + '\0'
+
+
+class TestCommitInfo(unittest.TestCase):
+
+    SHA = '8103a3b85aa5f3e2b14200bfef815539c1be109a'
+    PARENT1 = 'e9b5c87f8153fd177a0e10f7abda0b4bb4730626'
+    PARENT2 = 'ce60976326725217c16fe84b5120c6a8661177a8'
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import git_tools
+        return git_tools.CommitInfo
+
+    def _make_one(self, parents):
+        klass = self._get_target_class()
+        return klass(self.SHA, 'tree-sha', parents, 10, 11, 'Hi.')
+
+    def test_from_record(self):
+        klass = self._get_target_class()
+        record = _commit_record(
+            self.SHA, parents=(self.PARENT1,), subject='A\nsubject.')
+        commit = klass.from_record(record.rstrip('\0'))
+        self.assertEqual(commit.sha, self.SHA)
+        self.assertEqual(commit.tree,
+                         '9c1d5b2d41c8ad3a3d2e5d1fb6d1e0b8e94bbf46')
+        self.assertEqual(commit.parents, (self.PARENT1,))
+        self.assertEqual(commit.author_time, 1475953149)
+        self.assertEqual(commit.committer_time, 1475953150)
+        self.assertEqual(commit.subject, 'A\nsubject.')
+
+    def test_to_record(self):
+        klass = self._get_target_class()
+        record = _commit_record(
+            self.SHA, parents=(self.PARENT1, self.PARENT2),
+            subject='A\nsubject.').rstrip('\0')
+        commit = klass.from_record(record)
+        self.assertEqual(commit.to_record(), record)
+        self.assertEqual(self._make_one(()).to_record(),
+                         '\n'.join([self.SHA, 'tree-sha', '', '10', '11',
+                                    'Hi.']))
+
+    def test_is_merge(self):
+        commit = self._make_one((self.PARENT1,))
+        self.assertFalse(commit.is_merge)
+        commit = self._make_one((self.PARENT1, self.PARENT2))
+        self.assertTrue(commit.is_merge)
+
+    def test_is_merge_unexpected(self):
+        commit = self._make_one(())
+        with self.assertRaises(NotImplementedError):
+            getattr(commit, 'is_merge')
+
+    def test___repr__(self):
+        commit = self._make_one(())
+        self.assertEqual(repr(commit), '<CommitInfo {}>'.format(self.SHA))
+
+
+class Test_get_commits(unittest.TestCase):
+
+    SHA1 = '8103a3b85aa5f3e2b14200bfef815539c1be109a'
+    SHA2 = 'e9b5c87f8153fd177a0e10f7abda0b4bb4730626'
+
+    @staticmethod
+    def _call_function_under_test(*revisions):
+        from ci_diff_helper.git_tools import get_commits
+        return get_commits(*revisions)
+
+    def _patch_cache(self):
+        import mock
+        return mock.patch.dict('ci_diff_helper.git_tools._COMMIT_CACHE',
+                               clear=True)
+
+    def test_single_call(self):
+        import mock
+        from ci_diff_helper import _runners
+
+        cmd_output = _commit_record(self.SHA1) + _commit_record(self.SHA2)
+        output_patch = mock.patch('ci_diff_helper._utils.check_output',
+                                  return_value=cmd_output)
+        with self._patch_cache():
+            with output_patch as mocked:
+                commit1, commit2 = self._call_function_under_test(
+                    'HEAD', 'master')
+                mocked.assert_called_once_with(
+                    *(_runners.COMMIT_INFO_ARGS + ('HEAD', 'master')))
+                # Lookups by SHA are now memoized.
+                result = self._call_function_under_test(
+                    self.SHA2, self.SHA1)
+                self.assertEqual(mocked.call_count, 1)
+
+        self.assertEqual(commit1.sha, self.SHA1)
+        self.assertEqual(commit2.sha, self.SHA2)
+        self.assertEqual(result, [commit2, commit1])
+
+    def test_same_commit(self):
+        import mock
+
+        cmd_outputs = [_commit_record(self.SHA1), self.SHA1 + '\n' +
+                       self.SHA1]
+        output_patch = mock.patch('ci_diff_helper._utils.check_output',
+                                  side_effect=cmd_outputs)
+        with self._patch_cache():
+            with output_patch as mocked:
+                commit1, commit2, commit3 = self._call_function_under_test(
+                    'HEAD', 'master', 'HEAD')
+                self.assertEqual(mocked.call_count, 2)
+                mocked.assert_called_with(
+                    'git', 'rev-parse', 'HEAD^{commit}', 'master^{commit}')
+
+        self.assertIs(commit1, commit2)
+        self.assertIs(commit1, commit3)
+
+    def test_all_cached(self):
+        import mock
+        from ci_diff_helper import git_tools
+
+        commit = git_tools.CommitInfo(self.SHA1, 'tree', (), 1, 2, 'Hi.')
+        output_patch = mock.patch('ci_diff_helper._utils.check_output')
+        with self._patch_cache():
+            git_tools._COMMIT_CACHE[self.SHA1] = commit
+            with output_patch as mocked:
+                result = self._call_function_under_test(self.SHA1)
+                mocked.assert_not_called()
+
+        self.assertEqual(result, [commit])
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call(self):
+        from ci_diff_helper import _utils
+
+        with self._patch_cache():
+            head, = self._call_function_under_test('HEAD')
+        self.assertEqual(
+            head.sha, _utils.check_output('git', 'rev-parse', 'HEAD'))
+        self.assertEqual(
+            head.subject,
+            _utils.check_output('git', 'log', '--pretty=%s', '-1', 'HEAD'))
+
+
+class Test_commit_info(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args):
+        from ci_diff_helper.git_tools import commit_info
+        return commit_info(*args)
+
+    def _helper(self, *args):
+        import mock
+
+        commits_patch = mock.patch('ci_diff_helper.git_tools.get_commits',
+                                   return_value=[mock.sentinel.commit])
+        with commits_patch as mocked:
+            result = self._call_function_under_test(*args)
+        self.assertIs(result, mock.sentinel.commit)
+        return mocked
+
+    def test_default(self):
+        mocked = self._helper()
+        mocked.assert_called_once_with('HEAD')
+
+    def test_explicit(self):
+        mocked = self._helper('master')
+        mocked.assert_called_once_with('master')
+
+    def _not_one_helper(self, commits):
+        import mock
+
+        commits_patch = mock.patch('ci_diff_helper.git_tools.get_commits',
+                                   return_value=commits)
+        with commits_patch as mocked:
+            with self.assertRaises(ValueError) as exc_info:
+                self._call_function_under_test('a..b')
+        mocked.assert_called_once_with('a..b')
+        self.assertEqual(exc_info.exception.args,
+                         ('Expected exactly one commit', 'a..b', commits))
+
+    def test_no_commits(self):
+        self._not_one_helper([])
+
+    def test_several_commits(self):
+        import mock
+
+        self._not_one_helper([mock.sentinel.commit1, mock.sentinel.commit2])
+
+
 class Test_merge_commit(unittest.TestCase):
 
     @staticmethod
@@ -169,13 +906,16 @@ class Test_merge_commit(unittest.TestCase):
 
     def _helper(self, parents, revision='HEAD'):
         import mock
+        from ci_diff_helper import git_tools
 
-        output_patch = mock.patch('ci_diff_helper._utils.check_output',
-                                  return_value=parents)
-        with output_patch as mocked:
+        commit = git_tools.CommitInfo(
+            'fd5cffa5d437607159ceeda68895b9b53f23a531', 'tree',
+            tuple(parents.split()), 1, 2, 'Hi.')
+        info_patch = mock.patch('ci_diff_helper.git_tools.commit_info',
+                                return_value=commit)
+        with info_patch as mocked:
             result = self._call_function_under_test(revision)
-            mocked.assert_called_once_with(
-                'git', 'log', '--pretty=%P', '-1', revision)
+            mocked.assert_called_once_with(revision)
             return result
 
     def test_non_merge_default(self):
@@ -209,23 +949,18 @@ class Test_commit_subject(unittest.TestCase):
         from ci_diff_helper.git_tools import commit_subject
         return commit_subject(*args)
 
-    def test_non_merge_default(self):
+    def _helper(self, revision, *args):
         import mock
 
-        output_patch = mock.patch('ci_diff_helper._utils.check_output')
-        with output_patch as mocked:
-            result = self._call_function_under_test()
-            self.assertIs(result, mocked.return_value)
-            mocked.assert_called_once_with(
-                'git', 'log', '--pretty=%s', '-1', 'HEAD')
+        info_patch = mock.patch('ci_diff_helper.git_tools.commit_info')
+        with info_patch as mocked:
+            result = self._call_function_under_test(*args)
+            self.assertIs(result, mocked.return_value.subject)
+            mocked.assert_called_once_with(revision)
+
+    def test_non_merge_default(self):
+        self._helper('HEAD')
 
     def test_non_merge_explicit(self):
-        import mock
         revision = 'ffe035e3c4b4d11053b6162fce96474bb15c6869'
-
-        output_patch = mock.patch('ci_diff_helper._utils.check_output')
-        with output_patch as mocked:
-            result = self._call_function_under_test(revision)
-            self.assertIs(result, mocked.return_value)
-            mocked.assert_called_once_with(
-                'git', 'log', '--pretty=%s', '-1', revision)
+        self._helper(revision, revision)
@@ -0,0 +1,311 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+PATHS = (
+    '/repo/setup.py',
+    '/repo/pkg/__init__.py',
+    '/repo/pkg/feature.py',
+    '/repo/pkg/sub/test_feature.py',
+    '/repo/docs/index.rst',
+    '/repo/pkg/notes.txt',
+    '/top-level',
+)
+
+
+class Test__split(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(path, sep):
+        from ci_diff_helper.paths import _split
+        return _split(path, sep)
+
+    def test_nested(self):
+        self.assertEqual(self._call_function_under_test('a/b/c', '/'),
+                         ('a/b/', 'c'))
+
+    def test_root(self):
+        self.assertEqual(self._call_function_under_test('/c', '/'),
+                         ('/', 'c'))
+
+    def test_relative(self):
+        self.assertEqual(self._call_function_under_test('c', '/'),
+                         ('', 'c'))
+
+
+class TestPathTable(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.paths import PathTable
+        return PathTable
+
+    def _make_one(self, paths=PATHS, sep='/'):
+        klass = self._get_target_class()
+        return klass.from_paths(iter(paths), sep=sep)
+
+    def test_from_paths(self):
+        table = self._make_one()
+        self.assertEqual(len(table), len(PATHS))
+        self.assertEqual(list(table), list(PATHS))
+        self.assertEqual(table.sep, '/')
+        # Directories are stored once each.
+        self.assertEqual(table.directories, [
+            '/repo/',
+            '/repo/pkg/',
+            '/repo/pkg/sub/',
+            '/repo/docs/',
+            '/',
+        ])
+        self.assertIsInstance(table._buffer, bytes)
+
+    def test_from_paths_default_sep(self):
+        import os
+
+        table = self._get_target_class().from_paths([])
+        self.assertEqual(table.sep, os.sep)
+        self.assertEqual(list(table), [])
+
+    def test_relative_paths(self):
+        paths = ['setup.py', 'pkg/a.py', 'pkg/b.py']
+        table = self._make_one(paths)
+        self.assertEqual(list(table), paths)
+        self.assertEqual(table.directories, ['', 'pkg/'])
+        self.assertEqual(list(table.with_prefix('pkg/a')), ['pkg/a.py'])
+        self.assertEqual(list(table.with_prefix('se')), ['setup.py'])
+
+    def test___getitem__(self):
+        table = self._make_one()
+        self.assertEqual(table[0], PATHS[0])
+        self.assertEqual(table[5], PATHS[5])
+        self.assertEqual(table[-1], PATHS[-1])
+        with self.assertRaises(IndexError):
+            table[len(PATHS)]
+        with self.assertRaises(IndexError):
+            table[-len(PATHS) - 1]
+
+    def test___getitem__slice(self):
+        klass = self._get_target_class()
+        table = self._make_one()
+        sliced = table[1:5:2]
+        self.assertIsInstance(sliced, klass)
+        self.assertEqual(list(sliced), list(PATHS[1:5:2]))
+        self.assertEqual(list(table[::-1]), list(PATHS[::-1]))
+
+    def test_sequence_mixins(self):
+        table = self._make_one()
+        self.assertEqual(table.index('/repo/pkg/feature.py'), 2)
+        self.assertEqual(table.count('/repo/setup.py'), 1)
+        self.assertEqual(list(reversed(table)), list(reversed(PATHS)))
+
+    def test___contains__(self):
+        table = self._make_one()
+        for path in PATHS:
+            self.assertIn(path, table)
+        self.assertNotIn('/repo/setup', table)
+        self.assertNotIn('/repo/setup.pyc', table)
+        self.assertNotIn('/repo/nope/setup.py', table)
+
+    def test___repr__(self):
+        table = self._make_one()
+        self.assertEqual(repr(table), '<PathTable (7 paths)>')
+
+    def test_with_prefix(self):
+        table = self._make_one()
+        self.assertEqual(list(table.with_prefix('/repo/pkg/')), [
+            '/repo/pkg/__init__.py',
+            '/repo/pkg/feature.py',
+            '/repo/pkg/sub/test_feature.py',
+            '/repo/pkg/notes.txt',
+        ])
+        self.assertEqual(list(table.with_prefix('/repo/pkg/f')),
+                         ['/repo/pkg/feature.py'])
+        self.assertEqual(list(table.with_prefix('/repo/pkg/s')),
+                         ['/repo/pkg/sub/test_feature.py'])
+        self.assertEqual(list(table.with_prefix('/repo/pk')), list(
+            table.with_prefix('/repo/pkg')))
+        self.assertEqual(list(table.with_prefix('/t')), ['/top-level'])
+        self.assertEqual(list(table.with_prefix('/nope')), [])
+
+    def test_with_suffix(self):
+        table = self._make_one()
+        filtered = table.with_suffix('.py')
+        self.assertEqual(list(filtered), [
+            '/repo/setup.py',
+            '/repo/pkg/__init__.py',
+            '/repo/pkg/feature.py',
+            '/repo/pkg/sub/test_feature.py',
+        ])
+        # Filtered tables only report the directories they use.
+        self.assertEqual(filtered.directories,
+                         ['/repo/', '/repo/pkg/', '/repo/pkg/sub/'])
+        self.assertEqual(list(table.with_suffix('s.txt')),
+                         ['/repo/pkg/notes.txt'])
+
+    def test_in_directory(self):
+        table = self._make_one()
+        self.assertEqual(list(table.in_directory('/repo/pkg')), [
+            '/repo/pkg/__init__.py',
+            '/repo/pkg/feature.py',
+            '/repo/pkg/sub/test_feature.py',
+            '/repo/pkg/notes.txt',
+        ])
+        self.assertEqual(
+            list(table.in_directory('/repo/pkg/', recursive=False)), [
+                '/repo/pkg/__init__.py',
+                '/repo/pkg/feature.py',
+                '/repo/pkg/notes.txt',
+            ])
+        self.assertEqual(list(table.in_directory('/repo/pk')), [])
+
+
+class Test__common_length(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(label, components, start):
+        from ci_diff_helper.paths import _common_length
+        return _common_length(label, components, start)
+
+    def test_partial(self):
+        result = self._call_function_under_test(
+            ('b', 'c', 'd'), ('a', 'b', 'c', 'x'), 1)
+        self.assertEqual(result, 2)
+
+    def test_path_shorter(self):
+        result = self._call_function_under_test(
+            ('b', 'c', 'd'), ('a', 'b'), 1)
+        self.assertEqual(result, 1)
+
+
+class TestChangeIndex(unittest.TestCase):
+
+    CHANGED = (
+        'services/foo/main.py',
+        'services/foo/lib/util.py',
+        'services/foo/lib/deep/er/file.txt',
+        'services/bar/README.md',
+        'setup.py',
+    )
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.paths import ChangeIndex
+        return ChangeIndex
+
+    def _make_one(self, paths=CHANGED, sep='/'):
+        klass = self._get_target_class()
+        return klass(paths, sep=sep)
+
+    def test_constructor_defaults(self):
+        import os
+
+        index = self._get_target_class()()
+        self.assertEqual(index.sep, os.sep)
+        self.assertEqual(len(index), 0)
+        self.assertFalse(index.has_prefix(''))
+
+    def test_constructor_path_table(self):
+        from ci_diff_helper.paths import PathTable
+
+        table = PathTable.from_paths(['a\\b', 'a\\c'], sep='\\')
+        index = self._get_target_class()(table)
+        self.assertEqual(index.sep, '\\')
+        self.assertEqual(index.count('a'), 2)
+
+    def test___len__(self):
+        index = self._make_one(self.CHANGED + self.CHANGED[:2])
+        self.assertEqual(len(index), len(self.CHANGED))
+
+    def test___contains__(self):
+        index = self._make_one()
+        for path in self.CHANGED:
+            self.assertIn(path, index)
+        self.assertNotIn('services/foo', index)
+        self.assertNotIn('services/foo/lib/deep', index)
+        self.assertNotIn('services/foo/lib/deep/er/nope', index)
+        self.assertNotIn('nope', index)
+
+    def test___repr__(self):
+        self.assertEqual(repr(self._make_one()), '<ChangeIndex (5 paths)>')
+
+    def test_compressed(self):
+        index = self._make_one(['a/b/c/d.py'])
+        label, child = index._root.children['a']
+        self.assertEqual(label, ('a', 'b', 'c', 'd.py'))
+        self.assertTrue(child.terminal)
+        self.assertEqual(child.children, {})
+
+    def test_split_edge(self):
+        index = self._make_one(['a/b/c/d.py', 'a/b/x.py', 'a/b'])
+        label, middle = index._root.children['a']
+        self.assertEqual(label, ('a', 'b'))
+        self.assertTrue(middle.terminal)
+        self.assertEqual(middle.count, 3)
+        self.assertEqual(sorted(middle.children), ['c', 'x.py'])
+        self.assertEqual(middle.children['c'][0], ('c', 'd.py'))
+
+    def test_has_prefix(self):
+        index = self._make_one()
+        self.assertTrue(index.has_prefix('services/foo'))
+        self.assertTrue(index.has_prefix('services/foo/'))
+        self.assertTrue(index.has_prefix('services/foo/lib/deep'))
+        self.assertTrue(index.has_prefix('setup.py'))
+        self.assertFalse(index.has_prefix('services/baz'))
+        self.assertFalse(index.has_prefix('services/foo/lib/deep/x'))
+        # Prefixes are matched on whole components.
+        self.assertFalse(index.has_prefix('services/fo'))
+
+    def test_count(self):
+        index = self._make_one()
+        self.assertEqual(index.count(''), 5)
+        self.assertEqual(index.count('services'), 4)
+        self.assertEqual(index.count('services/foo'), 3)
+        self.assertEqual(index.count('services/foo/lib/deep'), 1)
+        self.assertEqual(index.count('services/foo/main.py'), 1)
+        self.assertEqual(index.count('nope'), 0)
+
+    def test_child_counts(self):
+        index = self._make_one()
+        self.assertEqual(index.child_counts('services'),
+                         {'foo': 3, 'bar': 1})
+        self.assertEqual(index.child_counts('services/foo/lib'),
+                         {'util.py': 1, 'deep': 1})
+        # Inside a compressed edge.
+        self.assertEqual(index.child_counts('services/foo/lib/deep'),
+                         {'er': 1})
+        self.assertEqual(index.child_counts('nope'), {})
+        self.assertEqual(index.child_counts('setup.py'), {})
+
+    def test_longest_prefix(self):
+        owners = self._make_one(['services/foo', 'services', 'libs/a/b'])
+        self.assertEqual(owners.longest_prefix('services/foo/main.py'),
+                         'services/foo')
+        self.assertEqual(owners.longest_prefix('services/foo'),
+                         'services/foo')
+        self.assertEqual(owners.longest_prefix('services/bar/x.py'),
+                         'services')
+        self.assertIsNone(owners.longest_prefix('libs/a/c.py'))
+        self.assertIsNone(owners.longest_prefix('libs'))
+        self.assertIsNone(owners.longest_prefix('setup.py'))
+
+    def test_longest_prefix_root(self):
+        owners = self._make_one(['', 'a'])
+        self.assertEqual(owners.longest_prefix('b/c'), '')
+        self.assertEqual(owners.longest_prefix('a/c'), 'a')
+
+    def test_absolute_paths(self):
+        index = self._make_one(['/repo/a.py', '/repo/pkg/b.py'])
+        self.assertEqual(index.count('/repo'), 2)
+        self.assertEqual(index.longest_prefix('/repo/pkg/b.py'),
+                         '/repo/pkg/b.py')
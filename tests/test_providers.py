@@ -0,0 +1,180 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class TestChangedFiles(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.providers import ChangedFiles
+        return ChangedFiles
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_it(self):
+        from ci_diff_helper.providers import ChangeSource
+
+        files = ['a.py', 'b/c.py']
+        changed = self._make_one(files, ChangeSource.compare, False)
+        self.assertIs(changed.files, files)
+        self.assertIs(changed.source, ChangeSource.compare)
+        self.assertFalse(changed.complete)
+        self.assertEqual(len(changed), 2)
+        self.assertEqual(list(changed), files)
+        self.assertEqual(
+            repr(changed),
+            '<ChangedFiles (2 files, source=compare, complete=False)>')
+
+
+class Test__has_history(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(blob_name1, blob_name2):
+        from ci_diff_helper.providers import _has_history
+        return _has_history(blob_name1, blob_name2)
+
+    def _helper(self, merge_base):
+        import mock
+
+        with mock.patch('ci_diff_helper._utils.check_output',
+                        return_value=merge_base) as mocked:
+            result = self._call_function_under_test('HEAD', 'master')
+        mocked.assert_called_once_with(
+            'git', 'merge-base', 'HEAD', 'master', ignore_err=True)
+        return result
+
+    def test_found(self):
+        self.assertTrue(self._helper('abc'))
+
+    def test_missing(self):
+        self.assertFalse(self._helper(None))
+
+
+class Test__resolve(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(blob_name):
+        from ci_diff_helper.providers import _resolve
+        return _resolve(blob_name)
+
+    def _helper(self, sha):
+        import mock
+
+        with mock.patch('ci_diff_helper._utils.check_output',
+                        return_value=sha) as mocked:
+            result = self._call_function_under_test('master')
+        mocked.assert_called_once_with(
+            'git', 'rev-parse', '--verify', '--quiet', 'master^{commit}',
+            ignore_err=True)
+        return result
+
+    def test_local(self):
+        self.assertEqual(self._helper('abc'), 'abc')
+
+    def test_missing(self):
+        self.assertEqual(self._helper(None), 'master')
+
+
+class Test_changed_files(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args, **kwargs):
+        from ci_diff_helper.providers import changed_files
+        return changed_files(*args, **kwargs)
+
+    def test_no_slug(self):
+        import mock
+        from ci_diff_helper.providers import ChangeSource
+
+        files = ['a.py']
+        with mock.patch('ci_diff_helper.git_tools.get_changed_files',
+                        return_value=files) as mocked:
+            with mock.patch('ci_diff_helper.providers._has_history') as hist:
+                result = self._call_function_under_test('HEAD', 'master')
+
+        self.assertIs(result.files, files)
+        self.assertIs(result.source, ChangeSource.git)
+        self.assertTrue(result.complete)
+        mocked.assert_called_once_with('HEAD', 'master')
+        hist.assert_not_called()
+
+    def test_local_history(self):
+        import mock
+        from ci_diff_helper.providers import ChangeSource
+
+        files = ['a.py']
+        with mock.patch('ci_diff_helper.git_tools.get_changed_files',
+                        return_value=files):
+            with mock.patch('ci_diff_helper.providers._has_history',
+                            return_value=True) as hist:
+                result = self._call_function_under_test(
+                    'HEAD', 'master', slug='a/b', pr_id=1)
+
+        self.assertIs(result.source, ChangeSource.git)
+        hist.assert_called_once_with('HEAD', 'master')
+
+    def _github_helper(self, num_files, **kwargs):
+        import mock
+
+        files = ['f{:d}.py'.format(index) for index in range(num_files)]
+        patch_history = mock.patch('ci_diff_helper.providers._has_history',
+                                   return_value=False)
+        patch_resolve = mock.patch('ci_diff_helper.providers._resolve',
+                                   new=lambda blob_name: blob_name + '-sha')
+        patch_pr = mock.patch('ci_diff_helper._github.iter_pr_files',
+                              return_value=iter(files))
+        patch_compare = mock.patch(
+            'ci_diff_helper._github.iter_compare_files',
+            return_value=iter(files))
+        with patch_history, patch_resolve:
+            with patch_pr as pr_files, patch_compare as compare_files:
+                result = self._call_function_under_test(
+                    'HEAD', 'master', slug='a/b', **kwargs)
+        self.assertEqual(result.files, files)
+        return result, pr_files, compare_files
+
+    def test_pull_request(self):
+        from ci_diff_helper.providers import ChangeSource
+
+        result, pr_files, compare_files = self._github_helper(3, pr_id=1)
+        self.assertIs(result.source, ChangeSource.pull_request)
+        self.assertTrue(result.complete)
+        pr_files.assert_called_once_with('a/b', 1)
+        compare_files.assert_not_called()
+
+    def test_pull_request_truncated(self):
+        import mock
+
+        with mock.patch('ci_diff_helper._github.PR_FILES_LIMIT', new=3):
+            result, _, _ = self._github_helper(3, pr_id=1)
+        self.assertFalse(result.complete)
+
+    def test_compare(self):
+        from ci_diff_helper.providers import ChangeSource
+
+        result, pr_files, compare_files = self._github_helper(3)
+        self.assertIs(result.source, ChangeSource.compare)
+        self.assertTrue(result.complete)
+        compare_files.assert_called_once_with('a/b', 'master-sha', 'HEAD-sha')
+        pr_files.assert_not_called()
+
+    def test_compare_truncated(self):
+        import mock
+
+        with mock.patch('ci_diff_helper._github.COMPARE_FILES_LIMIT',
+                        new=2):
+            result, _, _ = self._github_helper(2)
+        self.assertFalse(result.complete)
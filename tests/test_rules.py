@@ -0,0 +1,195 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class Test__translate_class(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(pattern, start):
+        from ci_diff_helper.rules import _translate_class
+        return _translate_class(pattern, start)
+
+    def test_simple(self):
+        result = self._call_function_under_test('x[a-c]y', 1)
+        self.assertEqual(result, ('[a-c]', 6))
+
+    def test_negated(self):
+        self.assertEqual(self._call_function_under_test('[!ab]', 0),
+                         ('[^/ab]', 5))
+        self.assertEqual(self._call_function_under_test('[^ab]', 0),
+                         ('[^/ab]', 5))
+
+    def test_leading_bracket(self):
+        self.assertEqual(self._call_function_under_test('[]a]', 0),
+                         ('[]a]', 4))
+
+    def test_backslash(self):
+        self.assertEqual(self._call_function_under_test('[\\]', 0),
+                         ('[\\\\]', 3))
+
+    def test_unterminated(self):
+        self.assertEqual(self._call_function_under_test('[ab', 0),
+                         (None, 1))
+
+
+class Test_translate(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(pattern):
+        from ci_diff_helper.rules import translate
+        return translate(pattern)
+
+    def _matches(self, pattern, path):
+        import re
+
+        regex = self._call_function_under_test(pattern)
+        return re.match('(?s)(?:' + regex + r')\Z', path) is not None
+
+    def test_basename(self):
+        self.assertTrue(self._matches('*.py', 'a.py'))
+        self.assertTrue(self._matches('*.py', 'x/y/a.py'))
+        self.assertFalse(self._matches('*.py', 'a.pyc'))
+        self.assertTrue(self._matches('**.py', 'a.py'))
+
+    def test_anchored(self):
+        self.assertTrue(self._matches('/a.py', 'a.py'))
+        self.assertFalse(self._matches('/a.py', 'x/a.py'))
+        self.assertTrue(self._matches('a/*.py', 'a/b.py'))
+        self.assertFalse(self._matches('a/*.py', 'a/c/b.py'))
+        self.assertFalse(self._matches('a/*.py', 'x/a/b.py'))
+
+    def test_double_star(self):
+        self.assertTrue(self._matches('a/**/b', 'a/b'))
+        self.assertTrue(self._matches('a/**/b', 'a/x/y/b'))
+        self.assertTrue(self._matches('**/b', 'b'))
+        self.assertTrue(self._matches('**/b', 'x/b/c'))
+        self.assertTrue(self._matches('a/**', 'a/b/c'))
+        self.assertFalse(self._matches('a/**', 'a'))
+        # Not an entire component, so the same as ``*``.
+        self.assertFalse(self._matches('a**/b', 'ax/y/b'))
+
+    def test_directory(self):
+        self.assertFalse(self._matches('docs/', 'docs'))
+        self.assertTrue(self._matches('docs/', 'docs/x'))
+        self.assertTrue(self._matches('docs/', 'a/docs/x'))
+        self.assertTrue(self._matches('docs', 'docs'))
+        self.assertTrue(self._matches('docs', 'x/docs/y'))
+
+    def test_wildcards(self):
+        self.assertTrue(self._matches('?.py', 'a.py'))
+        self.assertFalse(self._matches('?.py', 'ab.py'))
+        self.assertFalse(self._matches('a?c', 'a/c'))
+        self.assertTrue(self._matches('[!a]*.py', 'b.py'))
+        self.assertFalse(self._matches('[!a]*.py', 'a.py'))
+        self.assertTrue(self._matches('[abc', '[abc'))
+
+    def test_escaped(self):
+        self.assertTrue(self._matches('\\*x', '*x'))
+        self.assertFalse(self._matches('\\*x', 'ax'))
+        self.assertTrue(self._matches('a+b.txt', 'a+b.txt'))
+        self.assertFalse(self._matches('a+b.txt', 'aab.txt'))
+
+
+class Test__parse_patterns(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(patterns):
+        from ci_diff_helper.rules import _parse_patterns
+        return _parse_patterns(patterns)
+
+    def test_it(self):
+        from ci_diff_helper.rules import translate
+
+        result = self._call_function_under_test(
+            ['', '# comment', '*.py', '!docs/', '\\!bang'])
+        self.assertEqual(result, [
+            (translate('*.py'), False),
+            (translate('docs/'), True),
+            (translate('!bang'), False),
+        ])
+
+
+class TestRuleSet(unittest.TestCase):
+
+    RULES = {
+        'docs': ['docs/', '*.rst'],
+        'python': ['*.py', '!docs/**', 'docs/conf.py'],
+        'services-foo': ['/services/foo/'],
+        'never': ['!*.py'],
+        'empty': [],
+    }
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.rules import RuleSet
+        return RuleSet
+
+    def _make_one(self, rules=None):
+        if rules is None:
+            rules = self.RULES
+        return self._get_target_class()(rules)
+
+    def test_constructor(self):
+        rule_set = self._make_one()
+        self.assertEqual(rule_set.names, sorted(self.RULES))
+        self.assertEqual(len(rule_set._compiled), 1)
+
+    def test_constructor_pairs(self):
+        rule_set = self._make_one([('b', ['*.py']), ('a', ['*.rst'])])
+        self.assertEqual(rule_set.names, ['b', 'a'])
+
+    def test_match_path(self):
+        rule_set = self._make_one()
+        self.assertEqual(rule_set.match_path('setup.py'), set(['python']))
+        self.assertEqual(rule_set.match_path('docs/index.md'),
+                         set(['docs']))
+        self.assertEqual(rule_set.match_path('docs/api/x.py'),
+                         set(['docs']))
+        # A later pattern can re-include a path.
+        self.assertEqual(rule_set.match_path('docs/conf.py'),
+                         set(['docs', 'python']))
+        self.assertEqual(rule_set.match_path('services/foo/a/b.txt'),
+                         set(['services-foo']))
+        self.assertEqual(rule_set.match_path('x/services/foo/b.txt'),
+                         set())
+
+    def test_match(self):
+        rule_set = self._make_one()
+        paths = ['README.rst', 'services/foo/main.py', 'Makefile']
+        self.assertEqual(rule_set.match(paths),
+                         set(['docs', 'python', 'services-foo']))
+        self.assertEqual(rule_set.match([]), set())
+
+    def test_match_stops_early(self):
+        rule_set = self._make_one({'a': ['*.py'], 'b': ['*.txt']})
+
+        def paths():
+            yield 'a.py'
+            yield 'b.txt'
+            raise AssertionError('Should not be reached')
+
+        self.assertEqual(rule_set.match(paths()), set(['a', 'b']))
+
+    def test_many_rules(self):
+        from ci_diff_helper import rules
+
+        num_rules = 2 * rules._MAX_GROUPS + 1
+        rule_set = self._make_one(dict(
+            ('rule{:03d}'.format(index),
+             ['/project{:03d}/'.format(index)])
+            for index in range(num_rules)))
+        self.assertEqual(len(rule_set._compiled), 3)
+        paths = ['project000/a.py', 'project150/b.py', 'project198/c.py']
+        self.assertEqual(rule_set.match(paths),
+                         set(['rule000', 'rule150', 'rule198']))
@@ -74,12 +74,12 @@ class Test__travis_event_type(unittest.TestCase):
                 self._call_function_under_test()
 
 
-class Test__get_commit_range(unittest.TestCase):
+class Test_get_commit_range(unittest.TestCase):
 
     @staticmethod
     def _call_function_under_test():
-        from ci_diff_helper.travis import _get_commit_range
-        return _get_commit_range()
+        from ci_diff_helper.travis import get_commit_range
+        return get_commit_range()
 
     def test_success(self):
         import mock
@@ -102,6 +102,22 @@ class Test__get_commit_range(unittest.TestCase):
                 self._call_function_under_test()
 
 
+class Test_check_merge_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(merge_base, start, finish):
+        from ci_diff_helper.travis import check_merge_base
+        return check_merge_base(merge_base, start, finish)
+
+    def test_success(self):
+        self.assertIsNone(self._call_function_under_test('a', 'a', 'b'))
+
+    def test_failure(self):
+        with self.assertRaises(ValueError) as exc_info:
+            self._call_function_under_test(None, 'a', 'b')
+        self.assertEqual(exc_info.exception.args[1:], (None, 'a', 'b'))
+
+
 class Test__verify_merge_base(unittest.TestCase):
 
     @staticmethod
@@ -157,18 +173,13 @@ class Test__get_merge_base_from_github(unittest.TestCase):
         import mock
 
         sha = 'f8c2476b625f6a6f35a9e7f4d566c9b036722f11'
-        payload = {
-            'merge_base_commit': {
-                'sha': sha,
-            },
-        }
         slug = 'a/b'
         start = '1234'
         finish = '6789'
 
         compare_patch = mock.patch(
-            'ci_diff_helper._github.commit_compare',
-            return_value=payload)
+            'ci_diff_helper._github.compare_merge_base',
+            return_value=sha)
         with compare_patch as mocked:
             result = self._call_function_under_test(slug, start, finish)
             self.assertEqual(result, sha)
@@ -182,14 +193,31 @@ class Test__get_merge_base_from_github(unittest.TestCase):
         finish = '6789'
 
         compare_patch = mock.patch(
-            'ci_diff_helper._github.commit_compare',
-            return_value={})
+            'ci_diff_helper._github.compare_merge_base',
+            return_value=None)
         with compare_patch as mocked:
             with self.assertRaises(KeyError):
                 self._call_function_under_test(slug, start, finish)
             mocked.assert_called_once_with(slug, start, finish)
 
 
+class Test_check_github_merge_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(sha, slug, start, finish):
+        from ci_diff_helper.travis import check_github_merge_base
+        return check_github_merge_base(sha, slug, start, finish)
+
+    def test_success(self):
+        self.assertEqual(
+            self._call_function_under_test('abc', 'a/b', '1', '2'), 'abc')
+
+    def test_failure(self):
+        with self.assertRaises(KeyError) as exc_info:
+            self._call_function_under_test(None, 'a/b', '1', '2')
+        self.assertEqual(exc_info.exception.args[2:], ('a/b', '1', '2'))
+
+
 class Test__push_build_base(unittest.TestCase):
 
     @staticmethod
@@ -204,7 +232,7 @@ class Test__push_build_base(unittest.TestCase):
         finish = 'wxyz'
         slug = 'raindrops/roses'
         patch_range = mock.patch(
-            'ci_diff_helper.travis._get_commit_range',
+            'ci_diff_helper.travis.get_commit_range',
             return_value=(start, finish))
         # Make sure ``start_full`` is empty, indicating that the
         # local ``git`` checkout doesn't have the commit.
@@ -235,7 +263,7 @@ class Test__push_build_base(unittest.TestCase):
         start_full = 'abcd-zomg-more'
         finish = 'wxyz'
         patch_range = mock.patch(
-            'ci_diff_helper.travis._get_commit_range',
+            'ci_diff_helper.travis.get_commit_range',
             return_value=(start, finish))
         # Just hide the verification / make it do nothing.
         patch_verify = mock.patch(
@@ -507,41 +535,42 @@ class TestTravis(unittest.TestCase):
 
     def _merged_pr_helper(self, event_type, is_merge=False, pr_id=None):
         import mock
+        from ci_diff_helper import git_tools
 
         config = self._make_one()
         # Stub out the event type.
         config._event_type = event_type
 
-        patch_merge = mock.patch(
-            'ci_diff_helper.git_tools.merge_commit',
-            return_value=is_merge)
-        patch_subject = mock.patch(
-            'ci_diff_helper.git_tools.commit_subject',
-            return_value='#{}'.format(pr_id))
-        with patch_merge as mocked_merge:
-            with patch_subject as mocked_subject:
-                result = config.merged_pr
-
-        return mocked_merge, mocked_subject, result
+        parents = ('e9b5c87f8153fd177a0e10f7abda0b4bb4730626',)
+        if is_merge:
+            parents += ('ce60976326725217c16fe84b5120c6a8661177a8',)
+        head_commit = git_tools.CommitInfo(
+            '8103a3b85aa5f3e2b14200bfef815539c1be109a',
+            '9c1d5b2d41c8ad3a3d2e5d1fb6d1e0b8e94bbf46',
+            parents, 1475953149, 1475953150, '#{}'.format(pr_id))
+        patch_info = mock.patch(
+            'ci_diff_helper.git_tools.commit_info',
+            return_value=head_commit)
+        with patch_info as mocked_info:
+            result = config.merged_pr
+
+        return mocked_info, result
 
     def test_merged_pr_in_pr(self):
         from ci_diff_helper import travis
 
         event_type = travis.TravisEventType.pull_request
-        mocked_merge, mocked_subject, result = self._merged_pr_helper(
-            event_type)
-        mocked_merge.assert_not_called()
-        mocked_subject.assert_not_called()
+        mocked_info, result = self._merged_pr_helper(event_type)
+        mocked_info.assert_not_called()
         self.assertIsNone(result)
 
     def test_merged_pr_non_merge(self):
         from ci_diff_helper import travis
 
         event_type = travis.TravisEventType.push
-        mocked_merge, mocked_subject, result = self._merged_pr_helper(
+        mocked_info, result = self._merged_pr_helper(
             event_type, is_merge=False)
-        mocked_merge.assert_called_once_with()
-        mocked_subject.assert_not_called()
+        mocked_info.assert_called_once_with()
         self.assertIsNone(result)
 
     def test_merged_pr_in_merge(self):
@@ -549,10 +578,10 @@ class TestTravis(unittest.TestCase):
 
         event_type = travis.TravisEventType.push
         pr_id = 1355
-        mocked_merge, mocked_subject, result = self._merged_pr_helper(
+        mocked_info, result = self._merged_pr_helper(
             event_type, is_merge=True, pr_id=pr_id)
-        mocked_merge.assert_called_once_with()
-        mocked_subject.assert_called_once_with()
+        # Both the merge check and the subject share one lookup.
+        mocked_info.assert_called_once_with()
         self.assertEqual(result, pr_id)
 
     def test_merged_pr_unsupported(self):
@@ -569,15 +598,86 @@ class TestTravis(unittest.TestCase):
         config = self._make_one()
         config._merged_pr = 4567
 
-        patch_merge = mock.patch('ci_diff_helper.git_tools.merge_commit')
-        patch_subject = mock.patch('ci_diff_helper.git_tools.commit_subject')
-        with patch_merge as mocked_merge:
-            with patch_subject as mocked_subject:
-                result = config.merged_pr
+        patch_info = mock.patch('ci_diff_helper.git_tools.commit_info')
+        with patch_info as mocked_info:
+            result = config.merged_pr
 
         self.assertEqual(result, config._merged_pr)
-        mocked_merge.assert_not_called()
-        mocked_subject.assert_not_called()
+        mocked_info.assert_not_called()
+
+    def test_prefetch(self):
+        import mock
+        from ci_diff_helper import travis
+
+        config = self._make_one()
+        config._event_type = travis.TravisEventType.push
+        config._base = 'abc'
+        patch_info = mock.patch('ci_diff_helper.git_tools.commit_info')
+        with patch_info as mocked_info:
+            mocked_info.return_value.is_merge = False
+            config.prefetch(['base', 'is_merge', 'merged_pr'])
+
+        # ``is_merge`` and ``merged_pr`` share a single lookup.
+        mocked_info.assert_called_once_with()
+        self.assertFalse(config._is_merge)
+        self.assertIsNone(config._merged_pr)
+
+    def test_invalidate(self):
+        from ci_diff_helper import _utils
+        from ci_diff_helper import travis
+
+        config = self._make_one()
+        config._event_type = travis.TravisEventType.pull_request
+        config._branch = 'master'
+        config._slug = 'a/b'
+        self.assertEqual(config.base, 'master')
+        self.assertIsNone(config.merged_pr)
+        self.assertEqual(config.repo_url, 'https://github.com/a/b')
+
+        config.invalidate('event_type')
+        self.assertIs(config._event_type, _utils.UNSET)
+        self.assertIs(config._base, _utils.UNSET)
+        self.assertIs(config._merged_pr, _utils.UNSET)
+        # Properties which don't depend on the event type are kept.
+        self.assertEqual(config._branch, 'master')
+        self.assertEqual(config._repo_url, 'https://github.com/a/b')
+
+    def test_snapshot_round_trip(self):
+        import json
+        import pickle
+        import mock
+        from ci_diff_helper import _config_base
+        from ci_diff_helper import environment_vars as env
+        from ci_diff_helper import git_tools
+        from ci_diff_helper import travis
+
+        config = self._make_one()
+        config._event_type = travis.TravisEventType.push
+        config._base = 'abc'
+        config._head_commit_cached = git_tools.CommitInfo(
+            'a' * 40, 'b' * 40, ('c' * 40, 'd' * 40), 10, 11, 'Merge.')
+        mock_env = {env.IN_TRAVIS: 'true'}
+        with mock.patch('os.environ', new=mock_env):
+            snapshot = config.snapshot(['is_merge', 'merged_pr'])
+        self.assertEqual(snapshot['type'], 'Travis')
+        self.assertEqual(snapshot['values']['event_type'], 'push')
+
+        snapshot = pickle.loads(pickle.dumps(json.loads(json.dumps(
+            snapshot))))
+        # Nothing is computed when restoring.
+        with mock.patch('os.environ', new={}):
+            restored = _config_base.Config.from_snapshot(snapshot)
+            self.assertIsInstance(restored, travis.Travis)
+            self.assertEqual(repr(restored), '<Travis (active=True)>')
+            self.assertIs(restored.event_type, travis.TravisEventType.push)
+            self.assertFalse(restored.in_pr)
+            self.assertEqual(restored.base, 'abc')
+            self.assertTrue(restored.is_merge)
+            self.assertIsNone(restored.merged_pr)
+            self.assertEqual(restored._head_commit.parents,
+                             ('c' * 40, 'd' * 40))
+            with self.assertRaises(ValueError):
+                getattr(restored, 'slug')
 
     def test_tag_property(self):
         # NOTE: This method is only needed for test coverage. The defined
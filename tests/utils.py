@@ -10,6 +10,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
 import subprocess
 
 
@@ -21,3 +22,70 @@ try:
     del _PROC
 except OSError:  # pragma: NO COVER
     HAS_GIT = False
+
+
+class TempRepo(object):
+    """Context manager for a throwaway ``git`` repository.
+
+    On entry, creates the repository in a temporary directory and makes
+    it the current working directory. On exit, restores the working
+    directory and removes the repository.
+    """
+
+    def __init__(self):
+        self.path = None
+        self._prev_cwd = None
+
+    @staticmethod
+    @contextlib.contextmanager
+    def chdir(path):
+        import os
+
+        prev_cwd = os.getcwd()
+        os.chdir(path)
+        try:
+            yield
+        finally:
+            os.chdir(prev_cwd)
+
+    def git(self, *args):
+        output = subprocess.check_output(('git',) + args, cwd=self.path)
+        return output.decode('utf-8').strip()
+
+    def write(self, filename, contents):
+        import os
+
+        path = os.path.join(self.path, filename)
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        with open(path, 'w') as file_obj:
+            file_obj.write(contents)
+
+    def commit(self, message, **files):
+        for filename, contents in files.items():
+            self.write(filename, contents)
+        self.git('add', '--all')
+        self.git('commit', '--quiet', '--allow-empty', '-m', message)
+        return self.git('rev-parse', 'HEAD')
+
+    def __enter__(self):
+        import os
+        import tempfile
+
+        self.path = os.path.realpath(tempfile.mkdtemp())
+        self.git('init', '--quiet')
+        self.git('symbolic-ref', 'HEAD', 'refs/heads/master')
+        self.git('config', 'user.name', 'Test User')
+        self.git('config', 'user.email', 'test@example.com')
+        self.git('config', 'commit.gpgsign', 'false')
+        self._prev_cwd = os.getcwd()
+        os.chdir(self.path)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        import os
+        import shutil
+
+        os.chdir(self._prev_cwd)
+        shutil.rmtree(self.path)